@@ -4,6 +4,9 @@ Main entry point for the Spain Energy Streamlit application.
 This file serves as the home page. All other pages are in the pages/ folder.
 """
 
+import startup_profile
+startup_profile.page_started("app")
+
 import streamlit as st
 
 st.set_page_config(
@@ -22,6 +25,10 @@ except Exception:
 from style_config import apply_brand_styling
 apply_brand_styling()
 
+# Read the published copy of the database, not the one ingest writes to
+from db import use_published_db
+use_published_db()
+
 st.title("Overview")
 st.markdown("""
 Welcome to the Spain Energy Dashboard!
@@ -38,6 +45,7 @@ pages = [
     ("PV Captured Factor", "pages/05_PV_Captured_Factor.py"),
     ("PPA Effective Prices", "pages/06_PPA_Effective_Price.py"),
     ("BESS Spreads", "pages/07_BESS_Spreads.py"),
+    ("Captured Price Matrix", "pages/08_Captured_Price_Matrix.py"),
 ]
 
 # Create clickable links to pages using st.page_link
@@ -45,3 +53,9 @@ for page_name, page_path in pages:
     st.page_link(page_path, label=page_name)
 
 st.info("💡 **Tip**: Click on any page name above or select a page from the sidebar to get started!")
+
+# Shared price cache counters (hits/misses/evictions)
+from session_state import show_cache_debug_panel
+show_cache_debug_panel()
+
+startup_profile.page_rendered("app")
@@ -5,15 +5,28 @@ Uses omie_downloader.py to download files (supports both daily .1 files
 and yearly .zip archives), parses them, and stores prices in the
 historical_prices table under the OMIE_DA_prices column.
 """
+import argparse
+import io
 import sqlite3
+import zipfile
 from datetime import datetime, timedelta
 from pathlib import Path
+from typing import Iterable
 import time
 
+import numpy as np
 import pandas as pd
 
-from db import DB_PATH, DATA_DIR
-from omie_downloader import download_range, get_file_index, DATA_DIR as OMIE_DATA_DIR
+from db import DB_PATH, DATA_DIR, reader, writer
+from coverage_index import missing_days
+from price_store import delete_series_range, migrate_legacy_schema, upsert_series
+from publish import publish
+from snapshots import refresh_snapshots
+from omie_downloader import download_days, download_range, get_file_index, DATA_DIR as OMIE_DATA_DIR
+
+
+# Days from here on are re-parsed on every full backfill (15-minute prices)
+OMIE_REUPLOAD_FROM = datetime(2025, 10, 1).date()
 
 
 def find_omie_file(day: str) -> Path | None:
@@ -45,9 +58,13 @@ def find_omie_file(day: str) -> Path | None:
     return None
 
 
-def parse_omie_file(file_path: Path) -> pd.DataFrame:
+# Fields of a marginalpdbc record: Year;Month;Day;Period;Price1;Price2;
+OMIE_RECORD_COLUMNS = ["year", "month", "day", "period", "OMIE_SP_DA_prices", "OMIE_PT_DA_prices"]
+
+
+def parse_omie_records(contents: Iterable[bytes]) -> pd.DataFrame:
     """
-    Parse an OMIE .1 file and return a DataFrame with prices.
+    Parse the raw contents of one or more OMIE .1 files in a single vectorized pass.
     
     File format:
     - Header: MARGINALPDBC;
@@ -57,152 +74,255 @@ def parse_omie_file(file_path: Path) -> pd.DataFrame:
     Price1 = Spain (OMIE_SP_DA_prices)
     Price2 = Portugal (OMIE_PT_DA_prices)
     
-    For hourly data (before Oct 2025): Period is 1-24 (hours)
-    For 15-minute data (Oct 2025+): Period is 1-96 (15-minute intervals)
-    Some files may have more than 96 periods (e.g., 100) - handle dynamically
+    Resolution is detected per file (each file holds one day) from the maximum period:
+    - Hourly data (before Oct 2025): Period is 1-24 (hours), 23 or 25 on DST days
+    - 15-minute data (Oct 2025+): Period is 1-96; DST days can run to 100,
+      and periods past 24:00 are dropped (as are hour 25 on hourly DST days)
+    
+    Args:
+        contents: Iterable of file contents (bytes), e.g. members of a yearly ZIP
     
     Returns:
-        DataFrame with columns: datetime, year, month, day, hour, minute, 
-        OMIE_SP_DA_prices, OMIE_PT_DA_prices
+        DataFrame with columns: datetime, year, month, day, hour, minute,
+        OMIE_SP_DA_prices, OMIE_PT_DA_prices, sorted by datetime.
         Datetime format: "YYYY-MM-DD HH:MM:SS" (standardized format)
     """
-    rows = []
+    raw = b"\n".join(contents)
+    if not raw.strip():
+        return pd.DataFrame()
     
-    with open(file_path, "r", encoding="latin-1") as f:
-        all_lines = [line.strip() for line in f if line.strip() and line.strip() != "MARGINALPDBC;" and line.strip() != "*"]
+    # Header/footer lines become all-NaN rows and are dropped below
+    df = pd.read_csv(
+        io.BytesIO(raw),
+        sep=";",
+        header=None,
+        names=OMIE_RECORD_COLUMNS,
+        usecols=range(len(OMIE_RECORD_COLUMNS)),
+        na_values=["MARGINALPDBC", "*"],
+        encoding="latin-1",
+    )
+    for col in OMIE_RECORD_COLUMNS:
+        df[col] = pd.to_numeric(df[col], errors="coerce")
+    # At least Spain price must exist
+    df = df.dropna(subset=["year", "month", "day", "period", "OMIE_SP_DA_prices"])
+    if df.empty:
+        return pd.DataFrame()
+    
+    year = df["year"].astype("int64")
+    month = df["month"].astype("int64")
+    day = df["day"].astype("int64")
+    period = df["period"].astype("int64") - 1  # 0-based
+    
+    # Hourly files have at most 25 periods (October DST change); more means 15-minute data
+    max_period = period.groupby([year, month, day]).transform("max") + 1
+    is_15min = (max_period > 25).to_numpy()
+    hour = np.where(is_15min, period // 4, period)
+    minute = np.where(is_15min, (period % 4) * 15, 0)
+    
+    out = pd.DataFrame(
+        {
+            "year": year.to_numpy(),
+            "month": month.to_numpy(),
+            "day": day.to_numpy(),
+            "hour": hour,
+            "minute": minute,
+            "OMIE_SP_DA_prices": df["OMIE_SP_DA_prices"].to_numpy(dtype=float),
+            "OMIE_PT_DA_prices": df["OMIE_PT_DA_prices"].to_numpy(dtype=float),
+        }
+    )
+    # Skip periods outside the day (e.g. 97-100 on 15-minute DST files)
+    out = out[(out["hour"] >= 0) & (out["hour"] <= 23)]
+    
+    # Invalid calendar dates are dropped as well
+    dt = pd.to_datetime(out[["year", "month", "day", "hour", "minute"]], errors="coerce")
+    out = out[dt.notna()]
+    dt = dt[dt.notna()]
+    out.insert(0, "datetime", dt.dt.strftime("%Y-%m-%d %H:%M:%S"))
+    return out.sort_values("datetime", kind="stable").reset_index(drop=True)
+
+
+def parse_omie_file(file_path: Path) -> pd.DataFrame:
+    """
+    Parse an OMIE .1 file and return a DataFrame with prices.
     
-    # Detect resolution by checking the maximum period number
-    # If max period > 24, it's 15-minute data
+    See parse_omie_records for the file format and returned columns.
+    """
+    return parse_omie_records([Path(file_path).read_bytes()])
+
+
+def parse_omie_zip(zip_path: Path) -> pd.DataFrame:
+    """
+    Parse every .1 member of a yearly marginalpdbc ZIP without extracting it to disk.
+    
+    Returns:
+        One DataFrame for the whole archive (see parse_omie_records)
+    """
+    with zipfile.ZipFile(zip_path, "r") as zf:
+        members = sorted(m for m in zf.namelist() if m.endswith(".1"))
+        return parse_omie_records(zf.read(m) for m in members)
+
+
+def parse_omie_year(year: int) -> pd.DataFrame:
+    """
+    Parse all downloaded OMIE data for a year into one DataFrame.
+    
+    Reads marginalpdbc_YYYY.zip directly when it has been downloaded, and
+    otherwise the daily .1 files (downloaded directly or previously extracted).
+    
+    Returns:
+        DataFrame with one row per interval of the year (empty if no files)
+    """
+    zip_path = OMIE_DATA_DIR / f"marginalpdbc_{year}.zip"
+    if zip_path.exists():
+        try:
+            return parse_omie_zip(zip_path)
+        except zipfile.BadZipFile:
+            print(f"  Invalid ZIP file {zip_path.name}, falling back to daily files")
+    
+    files = {p.name: p for p in (OMIE_DATA_DIR / f"marginalpdbc_{year}").glob(f"marginalpdbc_{year}????.1")}
+    # Direct downloads take precedence over extracted copies (as in find_omie_file)
+    files.update({p.name: p for p in OMIE_DATA_DIR.glob(f"marginalpdbc_{year}????.1")})
+    return parse_omie_records(files[name].read_bytes() for name in sorted(files))
+
+
+def _parse_omie_file_loop(file_path: Path) -> pd.DataFrame:
+    """
+    The former line-by-line parser of one .1 file.
+
+    Kept as the reference for the parser tests (tests/test_backfill_omie.py)
+    and the benchmark in main(); not used by the backfill. It reads any day
+    with more than 24 periods as 15-minute data, so the 25-hour October DST
+    days come out spread over 00:00-06:00 (parse_omie_records reads them as
+    hourly).
+    """
+    rows = []
+    with open(file_path, "r", encoding="latin-1") as f:
+        lines = [line.strip() for line in f if line.strip() and line.strip() not in ("MARGINALPDBC;", "*")]
+
     max_period = 0
-    for line in all_lines:
+    for line in lines:
         parts = line.split(";")
         if len(parts) >= 4:
             try:
-                period = int(parts[3])
-                max_period = max(max_period, period)
-            except (ValueError, IndexError):
+                max_period = max(max_period, int(parts[3]))
+            except ValueError:
                 continue
-    
-    # Determine if 15-minute data: if max period > 24, it's 15-minute
     is_15min_data = max_period > 24
-    
-    # For 15-minute data, always use 4 intervals per hour (15-minute intervals)
-    # Some files may have extra periods beyond 96, which we'll skip
-    if is_15min_data:
-        intervals_per_hour = 4  # Always 4 for 15-minute data (00, 15, 30, 45)
-    else:
-        intervals_per_hour = 1  # Hourly data
-    
-    for line in all_lines:
-        # Parse data row: Year;Month;Day;Period;Price1;Price2;
+
+    for line in lines:
         parts = line.split(";")
-        if len(parts) >= 6:  # Need at least 6 parts for both prices
-            try:
-                year = int(parts[0])
-                month = int(parts[1])
-                day = int(parts[2])
-                period = int(parts[3])
-                # Price1 = Spain, Price2 = Portugal
-                price_sp = float(parts[4]) if parts[4] else None
-                price_pt = float(parts[5]) if len(parts) > 5 and parts[5] else None
-                
-                if price_sp is not None:  # At least Spain price must exist
-                    if is_15min_data:
-                        # 15-minute data: period is 1 to max_period (usually 96, but can be more)
-                        # Convert period to hour and minute
-                        # Period 1 = 00:00, Period 2 = 00:15, ..., Period 96 = 23:45
-                        period_0_indexed = period - 1  # Convert to 0-based
-                        hour = period_0_indexed // 4  # 4 intervals per hour (0-23)
-                        minute = (period_0_indexed % 4) * 15  # 0, 15, 30, 45
-                        
-                        # Skip periods that would result in invalid hours (> 23)
-                        # This handles files with periods beyond 96 (e.g., 97-100)
-                        if hour > 23:
-                            continue  # Skip periods beyond 24 hours
-                    else:
-                        # Hourly data: period is 1-24 (hours)
-                        # Convert to 0-23 hour format
-                        # Period 1 = hour 0, Period 24 = hour 23
-                        hour = period - 1 if period <= 24 else period - 1
-                        if hour < 0 or hour > 23:
-                            continue  # Skip invalid hours
-                        minute = 0
-                    
-                    # Create datetime string in standardized format: "YYYY-MM-DD HH:MM:SS"
-                    dt = datetime(year, month, day, hour, minute)
-                    datetime_str = dt.strftime("%Y-%m-%d %H:%M:%S")
-                    
-                    rows.append({
-                        "datetime": datetime_str,
-                        "year": year,
-                        "month": month,
-                        "day": day,
-                        "hour": hour,
-                        "minute": minute,
-                        "OMIE_SP_DA_prices": price_sp,
-                        "OMIE_PT_DA_prices": price_pt,
-                    })
-            except (ValueError, IndexError, OverflowError) as e:
-                # Silently skip invalid lines instead of printing warnings for every one
+        if len(parts) < 6:
+            continue
+        try:
+            year, month, day, period = (int(p) for p in parts[:4])
+            price_sp = float(parts[4]) if parts[4] else None
+            price_pt = float(parts[5]) if parts[5] else None
+            if price_sp is None:
                 continue
-    
-    if not rows:
-        return pd.DataFrame()
-    
+            if is_15min_data:
+                hour, minute = (period - 1) // 4, ((period - 1) % 4) * 15
+            else:
+                hour, minute = period - 1, 0
+            if hour < 0 or hour > 23:
+                continue
+            dt = datetime(year, month, day, hour, minute)
+        except (ValueError, OverflowError):
+            continue
+        rows.append({
+            "datetime": dt.strftime("%Y-%m-%d %H:%M:%S"),
+            "year": year,
+            "month": month,
+            "day": day,
+            "hour": hour,
+            "minute": minute,
+            "OMIE_SP_DA_prices": price_sp,
+            "OMIE_PT_DA_prices": price_pt,
+        })
     return pd.DataFrame(rows)
 
 
+def _insert_omie_prices_loop(df: pd.DataFrame, conn: sqlite3.Connection) -> int:
+    """
+    The former per-row SELECT, then UPDATE or INSERT, into historical_prices.
+
+    Kept for the benchmark in main(); writes the legacy table only.
+    """
+    cur = conn.cursor()
+    for _, row in df.iterrows():
+        cur.execute("SELECT datetime FROM historical_prices WHERE datetime = ?", (row["datetime"],))
+        if cur.fetchone() is not None:
+            cur.execute(
+                "UPDATE historical_prices SET OMIE_SP_DA_prices = ?, OMIE_PT_DA_prices = ? WHERE datetime = ?",
+                (row["OMIE_SP_DA_prices"], row["OMIE_PT_DA_prices"], row["datetime"]),
+            )
+        else:
+            cur.execute(
+                """
+                INSERT INTO historical_prices
+                (datetime, year, month, day, hour, minute, ESIOS_600_DA_prices, OMIE_SP_DA_prices, OMIE_PT_DA_prices)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                (
+                    row["datetime"], row["year"], row["month"], row["day"], row["hour"], row["minute"],
+                    None, row["OMIE_SP_DA_prices"], row["OMIE_PT_DA_prices"],
+                ),
+            )
+    return len(df)
+
+
 def ensure_omie_columns_exist():
     """Add OMIE_SP_DA_prices and OMIE_PT_DA_prices columns to historical_prices table if they don't exist."""
-    conn = sqlite3.connect(DB_PATH)
-    cur = conn.cursor()
+    with writer() as conn:
+        cur = conn.cursor()
+    
+        # Check existing columns
+        cur.execute("PRAGMA table_info(historical_prices)")
+        columns = [col[1] for col in cur.fetchall()]
+    
+        # Add Spain column
+        if "OMIE_SP_DA_prices" not in columns:
+            print("Adding OMIE_SP_DA_prices column to historical_prices table...")
+            cur.execute("ALTER TABLE historical_prices ADD COLUMN OMIE_SP_DA_prices REAL")
+            print("✓ OMIE_SP_DA_prices column added")
+        else:
+            print("OMIE_SP_DA_prices column already exists")
     
-    # Check existing columns
-    cur.execute("PRAGMA table_info(historical_prices)")
-    columns = [col[1] for col in cur.fetchall()]
-    
-    # Add Spain column
-    if "OMIE_SP_DA_prices" not in columns:
-        print("Adding OMIE_SP_DA_prices column to historical_prices table...")
-        cur.execute("ALTER TABLE historical_prices ADD COLUMN OMIE_SP_DA_prices REAL")
-        conn.commit()
-        print("✓ OMIE_SP_DA_prices column added")
-    else:
-        print("OMIE_SP_DA_prices column already exists")
-    
-    # Add Portugal column
-    if "OMIE_PT_DA_prices" not in columns:
-        print("Adding OMIE_PT_DA_prices column to historical_prices table...")
-        cur.execute("ALTER TABLE historical_prices ADD COLUMN OMIE_PT_DA_prices REAL")
-        conn.commit()
-        print("✓ OMIE_PT_DA_prices column added")
-    else:
-        print("OMIE_PT_DA_prices column already exists")
-    
-    # Migrate old OMIE_DA_prices to OMIE_SP_DA_prices if it exists
-    if "OMIE_DA_prices" in columns and "OMIE_SP_DA_prices" in columns:
-        print("Migrating OMIE_DA_prices to OMIE_SP_DA_prices...")
-        cur.execute(
-            """
-            UPDATE historical_prices 
-            SET OMIE_SP_DA_prices = OMIE_DA_prices 
-            WHERE OMIE_SP_DA_prices IS NULL AND OMIE_DA_prices IS NOT NULL
-            """
-        )
-        migrated = cur.rowcount
-        conn.commit()
-        if migrated > 0:
-            print(f"✓ Migrated {migrated} rows from OMIE_DA_prices to OMIE_SP_DA_prices")
+        # Add Portugal column
+        if "OMIE_PT_DA_prices" not in columns:
+            print("Adding OMIE_PT_DA_prices column to historical_prices table...")
+            cur.execute("ALTER TABLE historical_prices ADD COLUMN OMIE_PT_DA_prices REAL")
+            print("✓ OMIE_PT_DA_prices column added")
+        else:
+            print("OMIE_PT_DA_prices column already exists")
     
-    conn.close()
+        # Migrate old OMIE_DA_prices to OMIE_SP_DA_prices if it exists
+        if "OMIE_DA_prices" in columns and "OMIE_SP_DA_prices" in columns:
+            print("Migrating OMIE_DA_prices to OMIE_SP_DA_prices...")
+            cur.execute(
+                """
+                UPDATE historical_prices 
+                SET OMIE_SP_DA_prices = OMIE_DA_prices 
+                WHERE OMIE_SP_DA_prices IS NULL AND OMIE_DA_prices IS NOT NULL
+                """
+            )
+            migrated = cur.rowcount
+            if migrated > 0:
+                print(f"✓ Migrated {migrated} rows from OMIE_DA_prices to OMIE_SP_DA_prices")
 
 
-def insert_omie_prices(df: pd.DataFrame) -> int:
+def insert_omie_prices(df: pd.DataFrame, conn: sqlite3.Connection | None = None) -> int:
     """
     Insert or update OMIE prices in the historical_prices table.
     
-    Updates existing rows or inserts new ones.
-    Updates both OMIE_SP_DA_prices and OMIE_PT_DA_prices columns, leaving other columns unchanged.
+    All rows go through a single executemany of
+    INSERT ... ON CONFLICT(datetime) DO UPDATE, so existing rows only get
+    OMIE_SP_DA_prices and OMIE_PT_DA_prices updated (other columns unchanged)
+    and new rows are inserted with ESIOS_600_DA_prices left NULL.
+    
+    Args:
+        df: Parsed OMIE rows (see parse_omie_file), typically a whole year
+        conn: Optional write connection; the caller's transaction commits.
+            If omitted, the shared writer is used and committed here.
     
     Returns:
         Number of rows inserted/updated
@@ -210,116 +330,274 @@ def insert_omie_prices(df: pd.DataFrame) -> int:
     if df.empty:
         return 0
     
-    conn = sqlite3.connect(DB_PATH)
-    cur = conn.cursor()
+    if conn is None:
+        with writer() as conn:
+            return insert_omie_prices(df, conn)
     
-    updated_count = 0
-    inserted_count = 0
+    cols = ["datetime", "year", "month", "day", "hour", "minute", "OMIE_SP_DA_prices", "OMIE_PT_DA_prices"]
+    # Replace NaN with None so sqlite3 binds NULL
+    rows = list(df[cols].astype(object).where(df[cols].notna(), None).itertuples(index=False, name=None))
+    conn.executemany(
+        """
+        INSERT INTO historical_prices
+        (datetime, year, month, day, hour, minute, OMIE_SP_DA_prices, OMIE_PT_DA_prices)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT(datetime) DO UPDATE SET
+            OMIE_SP_DA_prices = excluded.OMIE_SP_DA_prices,
+            OMIE_PT_DA_prices = excluded.OMIE_PT_DA_prices
+        """,
+        rows,
+    )
     
-    for _, row in df.iterrows():
-        # Check if row exists
-        cur.execute(
-            "SELECT datetime FROM historical_prices WHERE datetime = ?",
-            (row["datetime"],)
-        )
-        exists = cur.fetchone() is not None
-        
-        if exists:
-            # Update existing row
-            cur.execute(
-                """
-                UPDATE historical_prices 
-                SET OMIE_SP_DA_prices = ?, OMIE_PT_DA_prices = ? 
-                WHERE datetime = ?
-                """,
-                (
-                    row.get("OMIE_SP_DA_prices"),
-                    row.get("OMIE_PT_DA_prices"),
-                    row["datetime"]
-                )
-            )
-            updated_count += 1
-        else:
-            # Insert new row (need all required columns)
-            cur.execute(
-                """
-                INSERT INTO historical_prices
-                (datetime, year, month, day, hour, minute, ESIOS_600_DA_prices, OMIE_SP_DA_prices, OMIE_PT_DA_prices)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-                """,
-                (
-                    row["datetime"],
-                    row["year"],
-                    row["month"],
-                    row["day"],
-                    row["hour"],
-                    row["minute"],
-                    None,  # ESIOS_600_DA_prices
-                    row.get("OMIE_SP_DA_prices"),
-                    row.get("OMIE_PT_DA_prices"),
-                )
-            )
-            inserted_count += 1
+    # Keep the columnar store in step with the legacy table
+    upsert_series(df, {"OMIE_SP_DA_prices": "OMIE_SP", "OMIE_PT_DA_prices": "OMIE_PT"}, conn=conn)
     
-    conn.commit()
-    conn.close()
+    return len(rows)
+
+
+def flush_omie_year(year: int, df: pd.DataFrame) -> int:
+    """
+    Write one year of parsed OMIE rows in a single transaction and report throughput.
     
-    return updated_count + inserted_count
+    Returns:
+        Number of rows inserted/updated
+    """
+    if df.empty:
+        return 0
+    start = time.perf_counter()
+    rows = insert_omie_prices(df)
+    elapsed = time.perf_counter() - start
+    rate = rows / elapsed if elapsed > 0 else float("inf")
+    n_days = df["datetime"].str[:10].nunique()
+    print(f"{year}: Inserted {rows} rows from {n_days} days in {elapsed:.2f}s ({rate:,.0f} rows/s)")
+    return rows
 
 
-def get_existing_omie_dates() -> set[str]:
+def get_missing_omie_dates(start_date: datetime, end_date: datetime) -> set[str]:
     """
-    Get set of dates (YYYYMMDD) that already have OMIE data.
-    Excludes dates from October 2025 onwards (need re-upload with 15-minute parsing).
+    Get set of dates (YYYYMMDD) between start_date and end_date that need OMIE data.
+    
+    Holes are read from the OMIE_SP coverage bitmap (see coverage_index), so
+    only days with missing intervals are parsed. Dates from October 2025
+    onwards are always included (need re-upload with 15-minute parsing).
     """
-    conn = sqlite3.connect(DB_PATH)
-    cur = conn.cursor()
+    end = end_date.date() + timedelta(days=1)
+    missing = {d.strftime("%Y%m%d") for d in missing_days("OMIE_SP", start_date.date(), end)}
+    current = max(start_date.date(), OMIE_REUPLOAD_FROM)
+    while current < end:
+        missing.add(current.strftime("%Y%m%d"))
+        current += timedelta(days=1)
+    return missing
+
+
+def get_omie_watermark() -> datetime | None:
+    """Return the latest datetime with an OMIE Spain price in historical_prices, or None."""
+    if not DB_PATH.exists():
+        return None
+    with reader() as conn:
+        try:
+            # Walks the datetime primary key backwards and stops at the first OMIE row
+            cur = conn.execute(
+                "SELECT datetime FROM historical_prices WHERE OMIE_SP_DA_prices IS NOT NULL "
+                "ORDER BY datetime DESC LIMIT 1"
+            )
+            row = cur.fetchone()
+        except sqlite3.OperationalError:
+            row = None
+    return datetime.strptime(row[0][:19], "%Y-%m-%d %H:%M:%S") if row else None
+
+
+def sync_incremental() -> int:
+    """
+    Fetch and store only the OMIE days after the database watermark.
     
-    try:
-        # Only get dates before October 2025 (hourly data, already correct)
-        # Check for either OMIE_SP_DA_prices or OMIE_DA_prices (for backward compatibility)
-        cur.execute(
-            """
-            SELECT DISTINCT year || '-' || printf('%02d', month) || '-' || printf('%02d', day) as date_str 
-            FROM historical_prices 
-            WHERE (OMIE_SP_DA_prices IS NOT NULL OR OMIE_DA_prices IS NOT NULL)
-            AND (year < 2025 OR (year = 2025 AND month < 10))
-            """
-        )
-        dates = {row[0].replace("-", "") for row in cur.fetchall()}
-    except sqlite3.OperationalError:
-        dates = set()
+    The day-ahead file for tomorrow is the newest OMIE can have published, so
+    when the watermark already covers tomorrow nothing touches the network.
+    Otherwise the (cached, conditionally requested) file index is checked and
+    only the missing daily files are downloaded, parsed and upserted.
+    
+    Returns:
+        Number of rows inserted/updated
+    """
+    watermark = get_omie_watermark()
+    if watermark is None:
+        print("No OMIE data in the database yet. Run a full backfill first (without --incremental).")
+        return 0
+    
+    last_available = datetime.now().date() + timedelta(days=1)
+    first_missing = watermark.date() + timedelta(days=1)
+    if first_missing > last_available:
+        print(f"OMIE data is up to date (latest {watermark}).")
+        return 0
+    
+    file_index = get_file_index()
+    days = []
+    current = first_missing
+    while current <= last_available:
+        if f"marginalpdbc_{current.strftime('%Y%m%d')}.1" in file_index:
+            days.append(current.strftime("%Y%m%d"))
+        current += timedelta(days=1)
+    if not days:
+        print(f"No new OMIE files after {watermark.date()}.")
+        return 0
     
-    conn.close()
-    return dates
+    paths = download_days(days, file_index)
+    df = parse_omie_records(path.read_bytes() for path in paths)
+    if df.empty:
+        print("No data parsed from the new files.")
+        return 0
+    
+    rows = insert_omie_prices(df)
+    print(f"Inserted {rows} rows for {len(days)} new days ({days[0]} to {days[-1]}).")
+    return rows
 
 
 def delete_omie_from_oct_2025():
-    """Delete OMIE_SP_DA_prices and OMIE_PT_DA_prices data from October 1, 2025 onwards to allow re-upload."""
-    conn = sqlite3.connect(DB_PATH)
-    cur = conn.cursor()
-    
-    cutoff_date = "2025-10-01 00:00:00"
-    cur.execute(
-        """
-        UPDATE historical_prices 
-        SET OMIE_SP_DA_prices = NULL, OMIE_PT_DA_prices = NULL 
-        WHERE datetime >= ?
-        """,
-        (cutoff_date,)
-    )
-    
-    rows_affected = cur.rowcount
-    conn.commit()
-    conn.close()
+    """
+    Delete OMIE Spain and Portugal prices from October 1, 2025 onwards to allow re-upload.
+
+    Clears both the legacy historical_prices columns and the price store
+    series the pages read, so a date that fails to re-parse shows as missing
+    instead of keeping its old price.
+    """
+    cutoff_date = f"{OMIE_REUPLOAD_FROM} 00:00:00"
+    with writer() as conn:
+        cur = conn.execute(
+            """
+            UPDATE historical_prices 
+            SET OMIE_SP_DA_prices = NULL, OMIE_PT_DA_prices = NULL 
+            WHERE datetime >= ?
+            """,
+            (cutoff_date,)
+        )
+        rows_affected = cur.rowcount
+        store_values = delete_series_range(["OMIE_SP", "OMIE_PT"], cutoff_date, conn=conn)
     
-    if rows_affected > 0:
-        print(f"✓ Deleted OMIE data from {rows_affected} rows (from {cutoff_date} onwards)")
+    if rows_affected > 0 or store_values > 0:
+        print(f"✓ Deleted OMIE data from {rows_affected} rows and {store_values} stored values (from {cutoff_date} onwards)")
         print("  These dates will be re-uploaded with correct 15-minute parsing and both Spain/Portugal prices")
 
 
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Backfill OMIE day-ahead prices into the local database.")
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help=(
+            "Only fetch days newer than the latest OMIE price already stored "
+            "(fast enough to run from cron every 15 minutes)."
+        ),
+    )
+    parser.add_argument(
+        "--benchmark",
+        type=int,
+        nargs="?",
+        const=2,
+        metavar="YEARS",
+        help=(
+            "Time the former per-file parse-and-insert path against the one-pass parser "
+            "on YEARS (default 2) years of synthetic files, instead of backfilling."
+        ),
+    )
+    return parser.parse_args()
+
+
+def _synthetic_omie_day(day: datetime, periods: int, rng: np.random.Generator) -> bytes:
+    """Contents of a marginalpdbc .1 file with random prices."""
+    lines = ["MARGINALPDBC;"]
+    for period, (sp, pt) in enumerate(rng.normal(60, 20, (periods, 2)).round(2), start=1):
+        lines.append(f"{day.year};{day.month:02d};{day.day:02d};{period};{sp:.2f};{pt:.2f};")
+    lines.append("*")
+    return ("\n".join(lines) + "\n").encode("latin-1")
+
+
+def run_benchmark(years: int) -> None:
+    """
+    Time the former per-file parse-and-insert path against the one-pass parser and bulk UPSERT.
+
+    Runs on synthetic daily files (hourly, with the two DST days, up to
+    September 2025, 15-minute afterwards) in a temporary directory, so the
+    real database is not touched.
+    """
+    import os
+    import tempfile
+
+    from db import close_connections
+
+    rng = np.random.default_rng(0)
+    end = datetime(2025, 12, 31)
+    current = datetime(end.year - years + 1, 1, 1)
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        try:
+            files = []
+            while current <= end:
+                # Hourly days have 23 or 25 periods on the DST changes (last Sunday of March / October)
+                last_sunday = current.month in (3, 10) and current.weekday() == 6 and (current + timedelta(days=7)).month != current.month
+                if current.date() >= OMIE_REUPLOAD_FROM:
+                    periods = 96
+                elif last_sunday:
+                    periods = 23 if current.month == 3 else 25
+                else:
+                    periods = 24
+                path = Path(tmp) / f"marginalpdbc_{current:%Y%m%d}.1"
+                path.write_bytes(_synthetic_omie_day(current, periods, rng))
+                files.append(path)
+                current += timedelta(days=1)
+            print(f"{len(files):,} daily files, {years} year(s)")
+
+            with writer() as conn:
+                conn.execute(
+                    """
+                    CREATE TABLE historical_prices (
+                        datetime TEXT PRIMARY KEY, year INTEGER, month INTEGER, day INTEGER,
+                        hour INTEGER, minute INTEGER,
+                        ESIOS_600_DA_prices REAL, OMIE_SP_DA_prices REAL, OMIE_PT_DA_prices REAL
+                    )
+                    """
+                )
+            # Mark the (empty) store as filled, so insert_omie_prices writes it as in production
+            migrate_legacy_schema()
+
+            start = time.perf_counter()
+            frames = [_parse_omie_file_loop(path) for path in files]
+            loop_parse = time.perf_counter() - start
+            start = time.perf_counter()
+            with writer() as conn:
+                loop_rows = sum(_insert_omie_prices_loop(df, conn) for df in frames)
+            loop_insert = time.perf_counter() - start
+
+            start = time.perf_counter()
+            df = parse_omie_records(path.read_bytes() for path in files)
+            new_parse = time.perf_counter() - start
+            start = time.perf_counter()
+            new_rows = insert_omie_prices(df)
+            new_insert = time.perf_counter() - start
+        finally:
+            close_connections()
+            os.chdir(cwd)
+
+    print(f"{'step':<10}{'per file':>12}{'one pass':>12}")
+    print(f"{'parse':<10}{loop_parse:>11.3f}s{new_parse:>11.3f}s ({loop_parse / new_parse:.0f}x)")
+    print(f"{'insert':<10}{loop_insert:>11.3f}s{new_insert:>11.3f}s ({loop_insert / new_insert:.0f}x)")
+    total_loop, total_new = loop_parse + loop_insert, new_parse + new_insert
+    print(f"{'total':<10}{total_loop:>11.3f}s{total_new:>11.3f}s ({total_loop / total_new:.0f}x)")
+    print(f"Rows: {loop_rows:,} per file, {new_rows:,} one pass (the one-pass insert also writes the price store)")
+
+
 def main():
     """Backfill OMIE prices from 2018 to today."""
+    args = parse_args()
+    if args.benchmark:
+        run_benchmark(args.benchmark)
+        return
+    if args.incremental:
+        sync_incremental()
+        print(f"Snapshots refreshed ({len(refresh_snapshots())} rewritten).")
+        print("Dashboard copy published." if publish() else "Dashboard copy already current.")
+        return
+    
     print("OMIE Price Backfill")
     print("=" * 50)
     
@@ -330,24 +608,29 @@ def main():
     print("\nCleaning up incorrect 15-minute data from October 2025 onwards...")
     delete_omie_from_oct_2025()
     
-    # Get dates that already have data (only before Oct 2025)
-    print("\nChecking existing data...")
-    existing_dates = get_existing_omie_dates()
-    print(f"Found {len(existing_dates)} dates with existing OMIE data (before Oct 2025)")
-    
     # Generate date range from 2018-01-01 to today
     start_date = datetime(2018, 1, 1)
     end_date = datetime.now()
     
+    # Get dates with holes (plus everything from Oct 2025)
+    print("\nChecking existing data...")
+    missing_dates = get_missing_omie_dates(start_date, end_date)
+    print(f"Found {len(missing_dates)} dates missing OMIE data (including the re-upload from Oct 2025)")
+    
+    # Nothing before the first hole needs downloading
+    start_date = max(start_date, datetime.strptime(min(missing_dates), "%Y%m%d"))
+    
     print(f"\nStep 1: Downloading OMIE files from {start_date.strftime('%Y-%m-%d')} to {end_date.strftime('%Y-%m-%d')}...")
     print("(This will download from most recent to oldest, using ZIP files when available)")
     print("=" * 50)
     
-    # Download files using omie_downloader (most recent to oldest)
+    # Download files using omie_downloader (most recent to oldest).
+    # Yearly ZIPs are read in place by parse_omie_year, so they are not extracted.
     download_stats = download_range(
         start_date.strftime("%Y%m%d"),
         end_date.strftime("%Y%m%d"),
-        force=False  # Don't re-download existing files
+        force=False,  # Don't re-download existing files
+        extract=False,
     )
     
     print(f"\nStep 2: Parsing and inserting data into database...")
@@ -357,57 +640,49 @@ def main():
     total_inserted = 0
     failed_dates = []
     
-    # Process all dates from start to end
-    current_date = start_date
-    while current_date <= end_date:
-        date_str = current_date.strftime("%Y%m%d")
-        date_display = current_date.strftime("%Y-%m-%d")
-        
-        # Skip if we already have data for this date
-        if date_str in existing_dates:
-            if current_date.day == 1:  # Print progress monthly
-                print(f"{date_display}: Already have data, skipping...")
+    # Each year is parsed in one pass (straight out of the ZIP when there is one)
+    # and written in one transaction
+    for year in range(start_date.year, end_date.year + 1):
+        wanted = set()
+        current_date = max(start_date, datetime(year, 1, 1))
+        while current_date <= min(end_date, datetime(year, 12, 31)):
+            date_str = current_date.strftime("%Y%m%d")
+            # Skip if we already have data for this date
+            if date_str in missing_dates:
+                wanted.add(date_str)
             current_date += timedelta(days=1)
+        if not wanted:
+            print(f"{year}: Already have data, skipping...")
             continue
         
-        # Find the downloaded file
-        file_path = find_omie_file(date_str)
+        try:
+            t0 = time.perf_counter()
+            df = parse_omie_year(year)
+            if not df.empty:
+                date_keys = df["datetime"].str[:10].str.replace("-", "", regex=False)
+                df = df[date_keys.isin(wanted)].reset_index(drop=True)
+            print(f"{year}: Parsed {len(df)} rows in {time.perf_counter() - t0:.2f}s")
+        except Exception as e:
+            print(f"{year}: Error parsing: {e}")
+            df = pd.DataFrame()
         
-        if file_path is None:
-            failed_dates.append(date_display)
-            current_date += timedelta(days=1)
-            continue
+        parsed_days = set(df["datetime"].str[:10].str.replace("-", "", regex=False)) if not df.empty else set()
+        total_parsed += len(parsed_days)
+        missing = sorted(wanted - parsed_days)
         
-        # Parse file
         try:
-            df = parse_omie_file(file_path)
-            if df.empty:
-                if current_date.day == 1:  # Print progress monthly
-                    print(f"{date_display}: No data parsed")
-                current_date += timedelta(days=1)
-                continue
-            
-            total_parsed += 1
-            
-            # Insert into database
-            rows_inserted = insert_omie_prices(df)
-            total_inserted += rows_inserted
-            
-            if current_date.day == 1 or rows_inserted > 0:  # Print progress monthly or when data inserted
-                print(f"{date_display}: Inserted {rows_inserted} rows")
-            
+            total_inserted += flush_omie_year(year, df)
         except Exception as e:
-            print(f"{date_display}: Error parsing/inserting: {e}")
-            failed_dates.append(date_display)
-        
-        current_date += timedelta(days=1)
+            print(f"{year}: Error inserting: {e}")
+            missing = sorted(wanted)
+        failed_dates.extend(f"{d[:4]}-{d[4:6]}-{d[6:]}" for d in missing)
     
     print("\n" + "=" * 50)
     print("Summary:")
     print(f"  Daily files downloaded: {download_stats['daily_files']}")
     print(f"  Yearly ZIPs downloaded: {download_stats['yearly_zips']}")
     print(f"  Files extracted from ZIPs: {download_stats['total_extracted']}")
-    print(f"  Files parsed: {total_parsed}")
+    print(f"  Days parsed: {total_parsed}")
     print(f"  Total rows inserted/updated: {total_inserted}")
     if failed_dates:
         print(f"  Failed dates: {len(failed_dates)}")
@@ -415,6 +690,8 @@ def main():
             print(f"    {', '.join(failed_dates)}")
         else:
             print(f"    {', '.join(failed_dates[:20])} ... and {len(failed_dates) - 20} more")
+    print(f"Snapshots refreshed ({len(refresh_snapshots())} rewritten).")
+    print("Dashboard copy published." if publish() else "Dashboard copy already current.")
 
 
 if __name__ == "__main__":
@@ -1,13 +1,21 @@
 import argparse
 import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime, timedelta, timezone
+from typing import Optional
 
-from requests.exceptions import HTTPError
+import pandas as pd
+import requests
+from requests.exceptions import RequestException
 
 from config import EsiosConfig, ESIOS_API_TOKEN, INDICATORS
-from db import init_db, insert_prices
-from esios_client import get_indicator_data
+from coverage_index import missing_ranges
+from db import get_completed_chunks, init_checkpoints, init_db, insert_prices, mark_chunk_completed
+from esios_client import TokenBucket, get_indicator_data, make_session
 from fetch_spot_to_csv import transform_indicator_values
+from price_store import series_for_indicator
+from publish import publish
+from snapshots import refresh_snapshots
 
 
 def parse_args() -> argparse.Namespace:
@@ -39,15 +47,36 @@ def parse_args() -> argparse.Namespace:
         "--sleep",
         type=float,
         default=1.0,
-        help="Seconds to sleep between API calls (default: 1.0).",
+        help="Seconds between API calls when --rate is not given (default: 1.0).",
+    )
+    parser.add_argument(
+        "--rate",
+        type=float,
+        default=None,
+        help="Maximum API requests per second across all workers (default: 1 / --sleep).",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=4,
+        help="Number of chunks fetched concurrently (default: 4).",
+    )
+    parser.add_argument(
+        "--no-resume",
+        action="store_true",
+        help=(
+            "Refetch the whole range, ignoring stored data and the chunks recorded "
+            "as completed in the checkpoint table."
+        ),
     )
     parser.add_argument(
         "--indicator",
         type=int,
+        nargs="+",
         choices=list(INDICATORS.keys()),
-        default=EsiosConfig().spot_indicator_id,
+        default=[EsiosConfig().spot_indicator_id],
         help=(
-            "ESIOS indicator ID to backfill "
+            "ESIOS indicator ID(s) to backfill "
             f"(default: {EsiosConfig().spot_indicator_id}). "
             "Supported options: "
             + ", ".join(f"{k} ({v})" for k, v in INDICATORS.items())
@@ -56,6 +85,131 @@ def parse_args() -> argparse.Namespace:
     return parser.parse_args()
 
 
+def iter_chunks(start: datetime, end: datetime, chunk_days: int) -> list[tuple[str, str]]:
+    """Split [start, end) into (start_iso, end_iso) chunks of at most chunk_days."""
+    chunks = []
+    current = start
+    while current < end:
+        chunk_end = min(current + timedelta(days=chunk_days), end)
+        chunks.append(
+            (current.isoformat().replace("+00:00", "Z"), chunk_end.isoformat().replace("+00:00", "Z"))
+        )
+        current = chunk_end
+    return chunks
+
+
+def plan_chunks(indicator_id: int, start: datetime, end: datetime, chunk_days: int) -> list[tuple[str, str]]:
+    """
+    Chunks covering only the holes of an indicator's stored series in [start, end).
+
+    Holes come from the coverage bitmap (wall-clock Madrid time) and are
+    converted to UTC. Holes lying inside a chunk already recorded as completed
+    are gaps at the source and are not fetched again. The rest are grouped so
+    that holes less than chunk_days apart share a request, so a plan never
+    needs more requests than fetching the whole range.
+    """
+    naive_start = start.astimezone(timezone.utc).replace(tzinfo=None)
+    naive_end = end.astimezone(timezone.utc).replace(tzinfo=None)
+    # Wall-clock labels reach up to two hours past the UTC bounds
+    holes = missing_ranges(series_for_indicator(indicator_id), naive_start, naive_end + timedelta(hours=2))
+    completed = [
+        (datetime.fromisoformat(s.replace("Z", "+00:00")), datetime.fromisoformat(e.replace("Z", "+00:00")))
+        for s, e in get_completed_chunks(indicator_id)
+    ]
+    spans: list[list[datetime]] = []
+    for hole_start, hole_end in holes:
+        utc = pd.DatetimeIndex([hole_start, hole_end]).tz_localize(
+            "Europe/Madrid", nonexistent="shift_forward", ambiguous=True
+        ).tz_convert("UTC")
+        lo, hi = max(utc[0].to_pydatetime(), start), min(utc[1].to_pydatetime(), end)
+        if lo >= hi or any(s <= lo and hi <= e for s, e in completed):
+            continue
+        if spans and lo - spans[-1][1] < timedelta(days=chunk_days):
+            spans[-1][1] = hi
+        else:
+            spans.append([lo, hi])
+    return [chunk for lo, hi in spans for chunk in iter_chunks(lo, hi, chunk_days)]
+
+
+def fetch_chunk(
+    indicator_id: int,
+    start_iso: str,
+    end_iso: str,
+    session: requests.Session,
+    limiter: TokenBucket,
+) -> pd.DataFrame:
+    """Fetch and transform one chunk (runs in a worker thread; no database access)."""
+    limiter.acquire()
+    data = get_indicator_data(indicator_id, start=start_iso, end=end_iso, session=session)
+    values = data["indicator"]["values"]
+    if not values:
+        return pd.DataFrame()
+    return transform_indicator_values(values)
+
+
+def is_final(end_iso: str) -> bool:
+    """Return True if a chunk ends far enough in the past for its data to be final."""
+    chunk_end = datetime.fromisoformat(end_iso.replace("Z", "+00:00"))
+    return chunk_end <= datetime.now(timezone.utc) - timedelta(days=1)
+
+
+def run_backfill(
+    tasks: list[tuple[int, str, str]],
+    workers: int,
+    rate: float,
+    session: Optional[requests.Session] = None,
+    limiter: Optional[TokenBucket] = None,
+) -> tuple[int, int]:
+    """
+    Fetch (indicator_id, start_iso, end_iso) chunks concurrently and store them.
+
+    Requests are paced by a shared token bucket; chunks that end more than a
+    day in the past are recorded as completed once stored.
+
+    Args:
+        tasks: Chunks to fetch
+        workers: Number of chunks fetched concurrently
+        rate: Maximum API requests per second across all workers
+        session: Optional session (default: a pooled, retrying session, see make_session)
+        limiter: Optional rate limiter shared by the workers (default: a
+                 TokenBucket of ``rate`` with a burst of ``workers``)
+
+    Returns:
+        Tuple of (rows stored, chunks failed)
+    """
+    # Burst of at most one request per worker, then the steady rate
+    limiter = limiter or TokenBucket(rate=rate, capacity=workers)
+    session = session or make_session(pool_size=workers)
+    total_rows = 0
+    failed = 0
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {
+            pool.submit(fetch_chunk, indicator_id, start_iso, end_iso, session, limiter): (indicator_id, start_iso, end_iso)
+            for indicator_id, start_iso, end_iso in tasks
+        }
+        # Writes stay on the main thread so SQLite sees a single writer
+        for future in as_completed(futures):
+            indicator_id, start_iso, end_iso = futures[future]
+            try:
+                df = future.result()
+            except (RequestException, KeyError, ValueError) as e:
+                failed += 1
+                print(f"  Skipping chunk {indicator_id} {start_iso} -> {end_iso} due to error: {e}")
+                continue
+
+            if df.empty:
+                print(f"  {indicator_id} {start_iso} -> {end_iso}: no data returned.")
+            else:
+                insert_prices(df, indicator_id)
+                total_rows += len(df)
+                print(f"  {indicator_id} {start_iso} -> {end_iso}: stored {len(df)} rows.")
+
+            # Chunks still receiving data are fetched again next run
+            if is_final(end_iso):
+                mark_chunk_completed(indicator_id, start_iso, end_iso, len(df))
+    return total_rows, failed
+
+
 def main() -> None:
     if not ESIOS_API_TOKEN:
         raise SystemExit(
@@ -64,48 +218,34 @@ def main() -> None:
         )
 
     args = parse_args()
-    indicator_id = args.indicator
-    init_db(indicator_id)
-
     start = datetime.fromisoformat(args.start).replace(tzinfo=timezone.utc)
     end = datetime.fromisoformat(args.end).replace(tzinfo=timezone.utc)
-
-    current = start
-    while current < end:
-        chunk_end = min(current + timedelta(days=args.chunk_days), end)
-
-        start_iso = current.isoformat().replace("+00:00", "Z")
-        end_iso = chunk_end.isoformat().replace("+00:00", "Z")
-
-        print(
-            f"Fetching indicator {indicator_id} "
-            f"from {start_iso} to {end_iso}..."
-        )
-
-        try:
-            data = get_indicator_data(indicator_id, start=start_iso, end=end_iso)
-        except HTTPError as e:
-            print(f"  Skipping chunk {start_iso} -> {end_iso} due to HTTP error: {e}")
-            current = chunk_end
-            time.sleep(args.sleep)
-            continue
-
-        values = data["indicator"]["values"]
-        df = transform_indicator_values(values)
-
-        if df.empty:
-            print("  No data returned for this chunk.")
-        else:
-            insert_prices(df, indicator_id)
-            print(f"  Stored {len(df)} rows for this chunk.")
-
-        current = chunk_end
-        time.sleep(args.sleep)
-
-    print("Backfill complete.")
+    chunks = iter_chunks(start, end, args.chunk_days)
+
+    init_checkpoints()
+    tasks = []
+    for indicator_id in args.indicator:
+        init_db(indicator_id)
+        # Only the holes in the stored series are fetched unless --no-resume
+        pending = chunks if args.no_resume else plan_chunks(indicator_id, start, end, args.chunk_days)
+        if not args.no_resume:
+            print(f"Indicator {indicator_id}: {len(pending)} chunks cover the missing data.")
+        tasks.extend((indicator_id, start_iso, end_iso) for start_iso, end_iso in pending)
+
+    if not tasks:
+        print("Nothing to backfill.")
+        return
+
+    workers = max(1, args.workers)
+    rate = args.rate if args.rate else (1.0 / args.sleep if args.sleep > 0 else float(workers))
+    print(f"Fetching {len(tasks)} chunks with {workers} workers at up to {rate:g} requests/s...")
+    t0 = time.perf_counter()
+    total_rows, failed = run_backfill(tasks, workers, rate)
+    elapsed = time.perf_counter() - t0
+    print(f"Backfill complete: {total_rows} rows in {elapsed:.1f}s ({failed} chunks failed; rerun to retry them).")
+    print(f"Snapshots refreshed ({len(refresh_snapshots())} rewritten).")
+    print("Dashboard copy published." if publish() else "Dashboard copy already current.")
 
 
 if __name__ == "__main__":
     main()
-
-
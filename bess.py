@@ -0,0 +1,925 @@
+"""
+Battery energy storage system (BESS) dispatch engine.
+
+Prices are laid out as a (days × intervals-per-day) matrix so that charge and
+discharge windows are evaluated once for the whole history and the state of
+charge is advanced one interval column at a time across all days together.
+
+For fixed daily schedules the dispatch depends only on where the windows fall
+within a day, not on prices, so a parameter sweep simulates each configuration
+once per distinct day layout and prices every day with a matrix product
+(see sweep_bess). optimize_battery_operations instead picks each day's
+revenue-maximizing dispatch with a dynamic programme over the state of charge.
+"""
+import os
+from datetime import time
+from typing import Iterable, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+
+def _window_mask(offset_ns: np.ndarray, start: time, duration_ns: int) -> np.ndarray:
+    """Return True for intervals that fall within [start, start + duration) on their own date."""
+    start_ns = (start.hour * 60 + start.minute) * 60 * 1_000_000_000
+    return (offset_ns >= start_ns) & (offset_ns < start_ns + duration_ns)
+
+
+def _day_grid(dates: pd.Series) -> tuple[np.ndarray, np.ndarray, int, int]:
+    """
+    Map each (time-sorted) row to a (day, position-within-day) cell.
+
+    Returns:
+        Tuple of (day_idx, pos_idx, n_days, intervals_per_day)
+    """
+    day_idx, uniques = pd.factorize(dates, sort=True)
+    n_days = len(uniques)
+    day_starts = np.searchsorted(day_idx, np.arange(n_days), side="left")
+    pos_idx = np.arange(len(day_idx)) - day_starts[day_idx]
+    width = int(pos_idx.max()) + 1 if len(pos_idx) else 0
+    return day_idx, pos_idx, n_days, width
+
+
+def _interval_hours(ts: pd.Series) -> float:
+    """Interval length in hours: 0.25 when the median spacing is ~15 minutes, else 1.0."""
+    if len(ts) > 1:
+        time_diffs = ts.diff().dropna()
+        median_diff = time_diffs.median()
+        # If median difference is around 15 minutes, we have 15-minute data
+        if median_diff <= pd.Timedelta(minutes=20) and median_diff >= pd.Timedelta(minutes=10):
+            return 0.25
+    return 1.0
+
+
+def _advance_soc(
+    charge_grid: np.ndarray,
+    discharge_grid: np.ndarray,
+    capacity_mwh,
+    step_mwh,
+    efficiency,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Advance the state of charge through a grid of charge/discharge flags.
+
+    Each row is one day starting with an empty battery; the last axis is the
+    position within the day. capacity_mwh, step_mwh and efficiency are scalars
+    or arrays broadcasting against one column of the grid.
+
+    Returns:
+        Tuple of (charge_mwh, discharge_mwh, soc) grids shaped like the inputs
+    """
+    charge_mwh = np.zeros(charge_grid.shape)
+    discharge_mwh = np.zeros(charge_grid.shape)
+    soc_grid = np.zeros(charge_grid.shape)
+    soc = np.zeros(charge_grid.shape[:-1])
+
+    # The SOC is clipped to [0, capacity], so it is advanced one interval column
+    # at a time, vectorised across all rows
+    for j in range(charge_grid.shape[-1]):
+        charge_energy = np.where(
+            charge_grid[..., j] & (soc < capacity_mwh),
+            np.minimum(step_mwh, capacity_mwh - soc),
+            0.0,
+        )
+        soc = soc + charge_energy
+
+        discharge_energy = np.where(
+            discharge_grid[..., j] & (soc > 0),
+            np.minimum(step_mwh, soc * efficiency),
+            0.0,
+        )
+        soc = soc - np.where(discharge_energy > 0, discharge_energy / efficiency, 0.0)
+
+        charge_mwh[..., j] = charge_energy
+        discharge_mwh[..., j] = discharge_energy
+        soc_grid[..., j] = soc
+
+    return charge_mwh, discharge_mwh, soc_grid
+
+
+def simulate_battery_operations(
+    df: pd.DataFrame,
+    capacity_mw: float,
+    duration_hours: float,
+    efficiency: float,
+    charge1: time,
+    discharge1: time,
+    charge2: Optional[time] = None,
+    discharge2: Optional[time] = None,
+) -> pd.DataFrame:
+    """
+    Simulate battery charging and discharging operations.
+
+    Args:
+        df: DataFrame with datetime and price_eur_per_mwh columns
+        capacity_mw: Battery capacity in MW
+        duration_hours: Battery duration in hours
+        efficiency: Round-trip efficiency (0-1)
+        charge1, discharge1: First cycle times
+        charge2, discharge2: Optional second cycle times
+
+    Returns:
+        DataFrame with added columns:
+        - charge_mwh: Energy charged in this hour (MWh)
+        - discharge_mwh: Energy discharged in this hour (MWh)
+        - battery_soc: State of charge at end of hour (MWh)
+        - charge_cost: Cost of charging in this hour (€)
+        - discharge_revenue: Revenue from discharging in this hour (€)
+        - net_revenue: Net revenue (discharge - charge) in this hour (€)
+        - cycle: Which cycle this hour belongs to (0 = none, 1 = first, 2 = second)
+    """
+    df = df.copy()
+    df = df.sort_values("datetime_parsed")
+
+    capacity_mwh = capacity_mw * duration_hours
+
+    # Detect data resolution by checking time differences
+    interval_hours = _interval_hours(df["datetime_parsed"])
+
+    # Extract time components
+    ts = df["datetime_parsed"]
+    df["hour_of_day"] = ts.dt.hour
+    df["minute"] = ts.dt.minute
+    df["date"] = ts.dt.date
+
+    n = len(df)
+    if n == 0:
+        for col in ["charge_mwh", "discharge_mwh", "battery_soc", "charge_cost", "discharge_revenue", "net_revenue"]:
+            df[col] = 0.0
+        df["cycle"] = 0
+        return df
+
+    # Offset of each interval from midnight of its own date, in nanoseconds
+    ts_ns = ts.values.astype("datetime64[ns]").astype(np.int64)
+    offset_ns = ts_ns - ts.dt.normalize().values.astype("datetime64[ns]").astype(np.int64)
+    duration_ns = pd.Timedelta(hours=duration_hours).value
+
+    # Charge/discharge windows evaluated once for every interval
+    in_charge1 = _window_mask(offset_ns, charge1, duration_ns)
+    in_discharge1 = _window_mask(offset_ns, discharge1, duration_ns)
+    if charge2 is not None and discharge2 is not None:
+        in_charge2 = _window_mask(offset_ns, charge2, duration_ns)
+        in_discharge2 = _window_mask(offset_ns, discharge2, duration_ns)
+    else:
+        in_charge2 = np.zeros(n, dtype=bool)
+        in_discharge2 = np.zeros(n, dtype=bool)
+
+    is_charging = in_charge1 | in_charge2
+    is_discharging = in_discharge1 | in_discharge2
+    # A later matching window wins, so cycle 2 takes precedence over cycle 1
+    cycle_num = np.where(in_charge2 | in_discharge2, 2, np.where(in_charge1 | in_discharge1, 1, 0))
+
+    # Lay intervals out as a (days × intervals-per-day) grid; padding cells stay idle
+    day_idx, pos_idx, n_days, width = _day_grid(df["date"])
+    charge_grid = np.zeros((n_days, width), dtype=bool)
+    discharge_grid = np.zeros((n_days, width), dtype=bool)
+    charge_grid[day_idx, pos_idx] = is_charging & ~is_discharging
+    discharge_grid[day_idx, pos_idx] = is_discharging & ~is_charging
+
+    # Charge/discharge at full MW rate for one interval
+    # For hourly data: 10MW * 1.0 hour = 10MWh per hour
+    # For 15-min data: 10MW * 0.25 hour = 2.5MWh per 15-min interval
+    step_mwh = capacity_mw * interval_hours
+
+    return _apply_dispatch(
+        df, day_idx, pos_idx, charge_grid, discharge_grid, cycle_num, capacity_mwh, step_mwh, efficiency
+    )
+
+
+def _apply_dispatch(
+    df: pd.DataFrame,
+    day_idx: np.ndarray,
+    pos_idx: np.ndarray,
+    charge_grid: np.ndarray,
+    discharge_grid: np.ndarray,
+    cycle_num: np.ndarray,
+    capacity_mwh: float,
+    step_mwh: float,
+    efficiency: float,
+) -> pd.DataFrame:
+    """Run charge/discharge flags through the SOC kernel and add the dispatch columns to df."""
+    # Start each day with empty battery
+    charge_mwh, discharge_mwh, soc_grid = _advance_soc(charge_grid, discharge_grid, capacity_mwh, step_mwh, efficiency)
+
+    # Back from the grid to one value per interval
+    charge = charge_mwh[day_idx, pos_idx]
+    discharge = discharge_mwh[day_idx, pos_idx]
+    price = df["price_eur_per_mwh"].to_numpy(dtype=float)
+
+    # Cost is negative (money going out), revenue positive
+    charge_cost = np.where(charge > 0, -(charge * price), 0.0)
+    discharge_revenue = np.where(discharge > 0, discharge * price, 0.0)
+
+    df["charge_mwh"] = charge
+    df["discharge_mwh"] = discharge
+    df["battery_soc"] = soc_grid[day_idx, pos_idx]
+    df["charge_cost"] = charge_cost
+    df["discharge_revenue"] = discharge_revenue
+    # Cumulative net revenue across ALL days (not reset per day)
+    df["net_revenue"] = np.cumsum(charge_cost + discharge_revenue)
+    df["cycle"] = np.where((charge > 0) | (discharge > 0), cycle_num, 0)
+
+    return df
+
+
+# Perfect-foresight dispatch: the state of charge lives on a lattice where a
+# full charge step adds `a` units and a full discharge step draws `b` units,
+# with a/b close to the round-trip efficiency (see _efficiency_lattice)
+OPTIMAL_MAX_LATTICE = 20
+OPTIMAL_LATTICE_TOLERANCE = 0.005
+OPTIMAL_DAY_BATCH = 256
+
+# Dynamic-programme actions
+_IDLE, _CHARGE, _DISCHARGE = 0, 1, 2
+
+
+def _efficiency_lattice(efficiency: float) -> tuple[int, int]:
+    """
+    Return the smallest (a, b) with a/b within OPTIMAL_LATTICE_TOLERANCE of the efficiency.
+
+    Falls back to the closest ratio with a <= OPTIMAL_MAX_LATTICE.
+    """
+    best, best_error = (1, 1), float("inf")
+    for a in range(1, OPTIMAL_MAX_LATTICE + 1):
+        b = max(a, round(a / efficiency))
+        error = abs(a / b - efficiency) / efficiency
+        if error <= OPTIMAL_LATTICE_TOLERANCE:
+            return a, b
+        if error < best_error:
+            best, best_error = (a, b), error
+    return best
+
+
+def _stage_transitions(max_cycles: Optional[int]) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Next stage after a charge / discharge action for each stage (-1 = not allowed).
+
+    Stage 0 is before the first charge; stage 2k-1 charges and stage 2k
+    discharges in cycle k. Without a cycle limit a single stage is used.
+    """
+    if max_cycles is None:
+        return np.array([0]), np.array([0])
+    n_stages = 2 * max_cycles + 1
+    stages = np.arange(n_stages)
+    odd = stages % 2 == 1
+    charge_next = np.where(odd, stages, np.where(stages < n_stages - 1, stages + 1, -1))
+    discharge_next = np.where(odd, stages + 1, np.where(stages > 0, stages, -1))
+    return charge_next, discharge_next
+
+
+def _optimal_flags(
+    prices: np.ndarray,
+    valid: np.ndarray,
+    levels: int,
+    a: int,
+    b: int,
+    max_cycles: Optional[int],
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Revenue-maximizing charge/discharge flags for a batch of days.
+
+    Backward dynamic programme over (stage, SOC level), vectorised across days,
+    then a forward pass that follows the stored decisions from an empty battery.
+
+    Args:
+        prices: (days, positions) prices, padding cells ignored
+        valid: (days, positions) True where an interval exists
+        levels: Number of SOC lattice levels (0 = empty, levels - 1 = full)
+        a, b: Lattice units added by a full charge / drawn by a full discharge
+        max_cycles: Maximum charge-then-discharge cycles per day (None = no limit)
+
+    Returns:
+        Tuple of (charge, discharge, cycle) grids shaped like prices
+    """
+    n_days, width = prices.shape
+    charge_next, discharge_next = _stage_transitions(max_cycles)
+    n_stages = len(charge_next)
+    charge_stage = np.maximum(charge_next, 0)[:, None]
+    discharge_stage = np.maximum(discharge_next, 0)[:, None]
+
+    level = np.arange(levels)
+    charged = np.minimum(a, levels - 1 - level)
+    drawn = np.minimum(b, level)
+    level_up = level + charged
+    level_down = level - drawn
+    # Grid energy per lattice unit, in units of one charge unit
+    delivered = drawn * (a / b)
+    charge_blocked = np.broadcast_to((charge_next < 0)[:, None], (n_stages, levels))
+    discharge_blocked = np.broadcast_to((discharge_next < 0)[:, None], (n_stages, levels))
+
+    value = np.zeros((n_days, n_stages, levels))
+    decisions = np.empty((width, n_days, n_stages, levels), dtype=np.int8)
+    for j in range(width - 1, -1, -1):
+        price = prices[:, j][:, None, None]
+        active = valid[:, j][:, None, None]
+        charge_value = value[:, charge_stage, level_up] - price * charged
+        discharge_value = value[:, discharge_stage, level_down] + price * delivered
+        charge_value[:, charge_blocked] = -np.inf
+        discharge_value[:, discharge_blocked] = -np.inf
+        charge_value = np.where(active, charge_value, -np.inf)
+        discharge_value = np.where(active, discharge_value, -np.inf)
+
+        # Ties go to the earlier action, so idling is preferred when nothing is gained
+        choice = np.where(charge_value > value, _CHARGE, _IDLE)
+        best = np.maximum(value, charge_value)
+        choice = np.where(discharge_value > best, _DISCHARGE, choice)
+        value = np.maximum(best, discharge_value)
+        decisions[j] = choice
+
+    charge = np.zeros((n_days, width), dtype=bool)
+    discharge = np.zeros((n_days, width), dtype=bool)
+    cycle = np.zeros((n_days, width), dtype=np.int64)
+    days = np.arange(n_days)
+    stage = np.zeros(n_days, dtype=np.int64)
+    soc = np.zeros(n_days, dtype=np.int64)
+    phase = np.zeros(n_days, dtype=np.int64)
+    last = np.full(n_days, _IDLE)
+    for j in range(width):
+        action = decisions[j, days, stage, soc]
+        is_charge = (action == _CHARGE) & (charged[soc] > 0)
+        is_discharge = (action == _DISCHARGE) & (drawn[soc] > 0)
+        # A charge after a discharge (or the first charge of the day) starts a new cycle
+        phase = phase + (is_charge & (last != _CHARGE))
+        last = np.where(is_charge, _CHARGE, np.where(is_discharge, _DISCHARGE, last))
+        charge[:, j] = is_charge
+        discharge[:, j] = is_discharge
+        cycle[:, j] = phase
+        stage = np.where(action == _CHARGE, charge_next[stage], np.where(action == _DISCHARGE, discharge_next[stage], stage))
+        soc = np.where(action == _CHARGE, level_up[soc], np.where(action == _DISCHARGE, level_down[soc], soc))
+    return charge, discharge, cycle
+
+
+def optimize_battery_operations(
+    df: pd.DataFrame,
+    capacity_mw: float,
+    duration_hours: float,
+    efficiency: float,
+    max_cycles: Optional[int] = 1,
+) -> pd.DataFrame:
+    """
+    Dispatch the battery with perfect foresight of each day's prices.
+
+    Every day starts empty and independently picks the revenue-maximizing
+    sequence of full-power charge, discharge and idle intervals (charging stops
+    at full and discharging at empty, as in simulate_battery_operations), with
+    at most max_cycles charge-then-discharge cycles. This is the upper bound for
+    any fixed daily schedule.
+
+    Args:
+        df: DataFrame with datetime_parsed and price_eur_per_mwh columns
+        capacity_mw: Battery capacity in MW
+        duration_hours: Battery duration in hours
+        efficiency: Round-trip efficiency (0-1)
+        max_cycles: Maximum cycles per day (None = no limit)
+
+    Returns:
+        DataFrame with the same added columns as simulate_battery_operations
+    """
+    df = df.copy()
+    df = df.sort_values("datetime_parsed")
+
+    capacity_mwh = capacity_mw * duration_hours
+    interval_hours = _interval_hours(df["datetime_parsed"])
+
+    ts = df["datetime_parsed"]
+    df["hour_of_day"] = ts.dt.hour
+    df["minute"] = ts.dt.minute
+    df["date"] = ts.dt.date
+
+    if len(df) == 0:
+        for col in ["charge_mwh", "discharge_mwh", "battery_soc", "charge_cost", "discharge_revenue", "net_revenue"]:
+            df[col] = 0.0
+        df["cycle"] = 0
+        return df
+
+    day_idx, pos_idx, n_days, width = _day_grid(df["date"])
+    prices = np.zeros((n_days, width))
+    prices[day_idx, pos_idx] = df["price_eur_per_mwh"].to_numpy(dtype=float)
+    valid = np.zeros((n_days, width), dtype=bool)
+    valid[day_idx, pos_idx] = True
+
+    step_mwh = capacity_mw * interval_hours
+    a, b = _efficiency_lattice(efficiency)
+    levels = max(int(round(a * capacity_mwh / step_mwh)), 0) + 1
+
+    charge_grid = np.zeros((n_days, width), dtype=bool)
+    discharge_grid = np.zeros((n_days, width), dtype=bool)
+    cycle_grid = np.zeros((n_days, width), dtype=np.int64)
+    # Days are independent; batches bound the size of the decision table
+    for start in range(0, n_days, OPTIMAL_DAY_BATCH):
+        batch = slice(start, start + OPTIMAL_DAY_BATCH)
+        charge_grid[batch], discharge_grid[batch], cycle_grid[batch] = _optimal_flags(
+            prices[batch], valid[batch], levels, a, b, max_cycles
+        )
+
+    return _apply_dispatch(
+        df,
+        day_idx,
+        pos_idx,
+        charge_grid,
+        discharge_grid,
+        cycle_grid[day_idx, pos_idx],
+        capacity_mwh,
+        step_mwh,
+        efficiency,
+    )
+
+
+def validate_cycles(
+    charge1: time, discharge1: time,
+    charge2: Optional[time], discharge2: Optional[time]
+) -> Tuple[bool, str]:
+    """
+    Validate that charge/discharge cycles don't overlap.
+
+    Returns:
+        (is_valid, error_message)
+    """
+    if charge2 is None or discharge2 is None:
+        # Single cycle: just check charge is before discharge
+        if charge1 >= discharge1:
+            return False, "Charge time must be before discharge time for cycle 1."
+        return True, ""
+
+    # Two cycles: check all constraints
+    if charge1 >= discharge1:
+        return False, "Charge time must be before discharge time for cycle 1."
+    if charge2 >= discharge2:
+        return False, "Charge time must be before discharge time for cycle 2."
+
+    # Check if cycle 2 is completely before cycle 1
+    if discharge2 <= charge1:
+        return True, ""
+
+    # Check if cycle 2 is completely after cycle 1
+    if charge2 >= discharge1:
+        return True, ""
+
+    # Otherwise, they overlap
+    return False, "Cycles overlap. Charge and discharge times must not overlap between cycles."
+
+
+BESS_METRICS = [
+    "total_charge_mwh",
+    "total_discharge_mwh",
+    "avg_charge_price",
+    "avg_discharge_price",
+    "avg_spread",
+    "total_revenue",
+    "daily_avg_revenue",
+    "total_cycles",
+]
+
+
+def compute_bess_metrics(df: pd.DataFrame) -> dict:
+    """
+    Compute BESS performance metrics.
+
+    Returns:
+        Dictionary with metrics:
+        - total_charge_mwh: Total energy charged (MWh)
+        - total_discharge_mwh: Total energy discharged (MWh)
+        - avg_charge_price: Average charge price (€/MWh)
+        - avg_discharge_price: Average discharge price (€/MWh)
+        - avg_spread: Average spread (€/MWh)
+        - total_revenue: Total net revenue (€)
+        - daily_avg_revenue: Daily average revenue (€)
+        - total_cycles: Total number of cycles
+    """
+    empty = {
+        "total_charge_mwh": 0.0,
+        "total_discharge_mwh": 0.0,
+        "avg_charge_price": 0.0,
+        "avg_discharge_price": 0.0,
+        "avg_spread": 0.0,
+        "total_revenue": 0.0,
+        "daily_avg_revenue": 0.0,
+        "total_cycles": 0,
+    }
+    if df.empty:
+        return empty
+
+    # Filter to hours with activity
+    active_df = df[(df["charge_mwh"] > 0) | (df["discharge_mwh"] > 0)]
+    if active_df.empty:
+        return empty
+
+    # Total energy
+    total_charge_mwh = active_df["charge_mwh"].sum()
+    total_discharge_mwh = active_df["discharge_mwh"].sum()
+
+    # Weighted average charge price (total cost / total energy; charge_cost is negative)
+    if total_charge_mwh > 0:
+        avg_charge_price = -active_df["charge_cost"].sum() / total_charge_mwh
+    else:
+        avg_charge_price = 0.0
+
+    # Weighted average discharge price (total revenue / total energy)
+    if total_discharge_mwh > 0:
+        avg_discharge_price = active_df["discharge_revenue"].sum() / total_discharge_mwh
+    else:
+        avg_discharge_price = 0.0
+
+    # Average spread: we pay P_c per MWh charged and get P_d per MWh discharged
+    avg_spread = avg_discharge_price - avg_charge_price if (avg_charge_price > 0 and avg_discharge_price > 0) else 0.0
+
+    # net_revenue is already cumulative across all days, so the last value
+    # chronologically is the total
+    total_revenue = df.sort_values("datetime_parsed")["net_revenue"].iloc[-1]
+
+    # Daily average revenue
+    num_days = df["date"].nunique()
+    daily_avg_revenue = total_revenue / num_days if num_days > 0 else 0.0
+
+    # Total cycles (count unique days with at least one discharge)
+    total_cycles = active_df[active_df["discharge_mwh"] > 0]["date"].nunique()
+
+    return {
+        "total_charge_mwh": total_charge_mwh,
+        "total_discharge_mwh": total_discharge_mwh,
+        "avg_charge_price": avg_charge_price,
+        "avg_discharge_price": avg_discharge_price,
+        "avg_spread": avg_spread,
+        "total_revenue": total_revenue,
+        "daily_avg_revenue": daily_avg_revenue,
+        "total_cycles": total_cycles,
+    }
+
+
+# Chart groupings of the BESS page -> group columns of the daily partials
+# ("month_year" feeds the calendar-month view, averaged across years)
+BESS_GROUPINGS = {
+    "yearly": ["year"],
+    "year_month": ["year_month"],
+    "month_year": ["year", "month"],
+    "daily": ["date"],
+    "day_of_week": ["weekday", "weekday_order"],
+}
+
+_PARTIAL_SUMS = ["charge_mwh", "charge_cost", "discharge_mwh", "discharge_revenue"]
+
+
+def bess_daily_partials(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Sum dispatch energy, cost and revenue per day over intervals with activity.
+
+    Args:
+        df: Output of simulate_battery_operations / optimize_battery_operations
+
+    Returns:
+        DataFrame with one row per active day: date (datetime64), year, month,
+        year_month, weekday, weekday_order and the charge_mwh, charge_cost,
+        discharge_mwh and discharge_revenue sums
+    """
+    active = df[(df["charge_mwh"] > 0) | (df["discharge_mwh"] > 0)]
+    day = active["datetime_parsed"].dt.normalize().rename("date")
+    partials = active[_PARTIAL_SUMS].groupby(day).sum().reset_index()
+    dates = partials["date"].dt
+    partials["year"] = dates.year
+    partials["month"] = dates.month
+    partials["year_month"] = dates.to_period("M").dt.to_timestamp()
+    partials["weekday"] = dates.day_name()
+    partials["weekday_order"] = dates.weekday
+    return partials
+
+
+def grouped_price_metrics(partials: pd.DataFrame, group_cols: list[str]) -> pd.DataFrame:
+    """
+    Energy-weighted charge/discharge prices and spread per group.
+
+    Args:
+        partials: Output of bess_daily_partials
+        group_cols: Columns to group by
+
+    Returns:
+        DataFrame with group_cols, avg_charge_price, avg_discharge_price and avg_spread
+    """
+    sums = partials.groupby(group_cols, as_index=False)[_PARTIAL_SUMS].sum()
+    charge_mwh = sums["charge_mwh"].to_numpy()
+    discharge_mwh = sums["discharge_mwh"].to_numpy()
+    with np.errstate(divide="ignore", invalid="ignore"):
+        # charge_cost is negative, so the average price is minus cost per MWh
+        avg_charge = np.where(charge_mwh > 0, -sums["charge_cost"].to_numpy() / charge_mwh, 0.0)
+        avg_discharge = np.where(discharge_mwh > 0, sums["discharge_revenue"].to_numpy() / discharge_mwh, 0.0)
+    result = sums[group_cols].copy()
+    result["avg_charge_price"] = avg_charge
+    result["avg_discharge_price"] = avg_discharge
+    result["avg_spread"] = np.where((avg_charge > 0) & (avg_discharge > 0), avg_discharge - avg_charge, 0.0)
+    return result
+
+
+def bess_price_metrics(df: pd.DataFrame, groupings: Optional[Iterable[str]] = None) -> dict[str, pd.DataFrame]:
+    """
+    Compute grouped price metrics for several groupings from one set of daily partials.
+
+    Args:
+        df: Output of simulate_battery_operations / optimize_battery_operations
+        groupings: Keys of BESS_GROUPINGS (default: all)
+
+    Returns:
+        Dict mapping grouping -> grouped_price_metrics DataFrame
+    """
+    partials = bess_daily_partials(df)
+    return {
+        grouping: grouped_price_metrics(partials, BESS_GROUPINGS[grouping])
+        for grouping in (groupings or BESS_GROUPINGS)
+    }
+
+
+# ---------------------------------------------------------------------------
+# Parameter sweep
+# ---------------------------------------------------------------------------
+
+# (charge1, discharge1, charge2, discharge2); cycle 2 is None for one cycle per day
+Schedule = Tuple[time, time, Optional[time], Optional[time]]
+
+SWEEP_BATCH_SIZE = 256
+SWEEP_WORKERS = os.cpu_count() or 1
+
+# Window start that no intra-day offset reaches (no second cycle)
+_NO_WINDOW = np.iinfo(np.int64).max // 4
+
+# Additive per-group sums produced by the sweep kernel
+_SWEEP_SUMS = ["charge_mwh", "charge_cost", "discharge_mwh", "discharge_revenue", "cycles"]
+
+# Worker-side sweep inputs (set by _init_sweep_worker or in-process)
+_SWEEP_STATE: dict = {}
+
+
+def cycle_schedules(hours: Iterable[int] = range(24), cycles: Sequence[int] = (1, 2)) -> list[Schedule]:
+    """
+    Enumerate fixed daily charge/discharge schedules on whole hours.
+
+    Two-cycle schedules are listed once, with cycle 1 first; swapping the
+    cycles gives the same dispatch.
+
+    Args:
+        hours: Candidate window start hours
+        cycles: Cycles per day to include (1 and/or 2)
+
+    Returns:
+        List of (charge1, discharge1, charge2, discharge2) that pass validate_cycles
+    """
+    starts = [time(h, 0) for h in sorted(set(hours))]
+    pairs = [(c, d) for c in starts for d in starts if c < d]
+    schedules: list[Schedule] = []
+    if 1 in cycles:
+        schedules += [(c, d, None, None) for c, d in pairs]
+    if 2 in cycles:
+        for c1, d1 in pairs:
+            for c2, d2 in pairs:
+                if c2 >= d1 and validate_cycles(c1, d1, c2, d2)[0]:
+                    schedules.append((c1, d1, c2, d2))
+    return schedules
+
+
+def _time_ns(t: Optional[time]) -> int:
+    if t is None:
+        return _NO_WINDOW
+    return (t.hour * 60 + t.minute) * 60 * 1_000_000_000
+
+
+def _sweep_layout(df: pd.DataFrame) -> dict:
+    """
+    Reduce a price history to what a fixed daily schedule can see.
+
+    Days are grouped by layout (the intra-day offset of each position) and
+    year; within such a group every day dispatches identically, so only the
+    per-position price sums matter.
+
+    Returns:
+        Dict with layouts (distinct rows of intra-day offsets, -1 in padding),
+        layout_prices (layouts × years × positions price sums), layout_days
+        (layouts × years day counts), years and interval_hours
+    """
+    df = df.sort_values("datetime_parsed")
+    ts = df["datetime_parsed"]
+    ts_ns = ts.values.astype("datetime64[ns]").astype(np.int64)
+    day_ns = ts.dt.normalize().values.astype("datetime64[ns]").astype(np.int64)
+
+    day_idx, pos_idx, n_days, width = _day_grid(pd.Series(day_ns))
+    price_grid = np.zeros((n_days, width))
+    price_grid[day_idx, pos_idx] = df["price_eur_per_mwh"].to_numpy(dtype=float)
+    offset_grid = np.full((n_days, width), -1, dtype=np.int64)
+    offset_grid[day_idx, pos_idx] = ts_ns - day_ns
+
+    # Most days share one of a handful of layouts (hourly, 15-minute, DST, gaps)
+    layouts, day_layout = np.unique(offset_grid, axis=0, return_inverse=True)
+    day_layout = day_layout.reshape(-1)
+
+    day_years = pd.DatetimeIndex(np.unique(day_ns).astype("datetime64[ns]")).year.to_numpy()
+    years, day_year = np.unique(day_years, return_inverse=True)
+    cell = day_layout * len(years) + day_year
+    n_cells = len(layouts) * len(years)
+    layout_prices = np.zeros((n_cells, width))
+    np.add.at(layout_prices, cell, price_grid)
+    layout_days = np.bincount(cell, minlength=n_cells)
+    return {
+        "layouts": layouts,
+        "layout_prices": layout_prices.reshape(len(layouts), len(years), width),
+        "layout_days": layout_days.reshape(len(layouts), len(years)).astype(np.float64),
+        "years": years,
+        "interval_hours": _interval_hours(ts),
+    }
+
+
+def _sweep_batch(configs: np.ndarray) -> np.ndarray:
+    """
+    Simulate a batch of configurations against the shared price layout.
+
+    Args:
+        configs: (K, 7) array of capacity_mw, duration_hours, efficiency and the
+                 charge1/discharge1/charge2/discharge2 window starts (ns)
+
+    Returns:
+        (years, K, len(_SWEEP_SUMS)) array of additive sums per year
+    """
+    state = _SWEEP_STATE
+    layout_prices = state["layout_prices"]
+    layout_days = state["layout_days"]
+
+    capacity_mw, duration_hours, efficiency = configs[:, 0], configs[:, 1], configs[:, 2]
+    duration_ns = (duration_hours * 3600 * 1_000_000_000).astype(np.int64)[:, None, None, None]
+    starts = configs[:, 3:7].astype(np.int64)[:, :, None, None]
+    offsets = state["layouts"][None, None, :, :]
+
+    # Windows for every configuration on every layout: (K, layouts, positions)
+    in_window = (offsets >= starts) & (offsets < starts + duration_ns)
+    is_charging = in_window[:, 0] | in_window[:, 2]
+    is_discharging = in_window[:, 1] | in_window[:, 3]
+    charge_grid = is_charging & ~is_discharging
+    discharge_grid = is_discharging & ~is_charging
+
+    capacity_mwh = (capacity_mw * duration_hours)[:, None]
+    step_mwh = (capacity_mw * state["interval_hours"])[:, None]
+    charge, discharge, _ = _advance_soc(charge_grid, discharge_grid, capacity_mwh, step_mwh, efficiency[:, None])
+
+    # Energy depends only on the layout; prices enter through the per-layout sums
+    sums = np.empty((layout_days.shape[1], len(configs), len(_SWEEP_SUMS)))
+    sums[..., 0] = layout_days.T @ charge.sum(axis=2).T
+    sums[..., 1] = np.einsum("lyw,klw->yk", layout_prices, charge)
+    sums[..., 2] = layout_days.T @ discharge.sum(axis=2).T
+    sums[..., 3] = np.einsum("lyw,klw->yk", layout_prices, discharge)
+    sums[..., 4] = layout_days.T @ (discharge.sum(axis=2) > 0).T
+    return sums
+
+
+def _init_sweep_worker(shm_name: str, shape: tuple, layout: dict) -> None:
+    """Attach a worker to the shared per-layout price sums."""
+    from multiprocessing import shared_memory
+
+    shm = shared_memory.SharedMemory(name=shm_name)
+    _SWEEP_STATE.clear()
+    _SWEEP_STATE.update(layout)
+    _SWEEP_STATE["shm"] = shm
+    _SWEEP_STATE["layout_prices"] = np.ndarray(shape, dtype=np.float64, buffer=shm.buf)
+
+
+def _sweep_metrics(sums: np.ndarray, n_days: np.ndarray) -> dict:
+    """Turn additive sums (..., len(_SWEEP_SUMS)) into compute_bess_metrics columns."""
+    charge_mwh, charge_cost, discharge_mwh, discharge_revenue, cycles = np.moveaxis(sums, -1, 0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        avg_charge = np.where(charge_mwh > 0, charge_cost / charge_mwh, 0.0)
+        avg_discharge = np.where(discharge_mwh > 0, discharge_revenue / discharge_mwh, 0.0)
+    total_revenue = discharge_revenue - charge_cost
+    return {
+        "total_charge_mwh": charge_mwh,
+        "total_discharge_mwh": discharge_mwh,
+        "avg_charge_price": avg_charge,
+        "avg_discharge_price": avg_discharge,
+        "avg_spread": np.where((avg_charge > 0) & (avg_discharge > 0), avg_discharge - avg_charge, 0.0),
+        "total_revenue": total_revenue,
+        "daily_avg_revenue": total_revenue / n_days,
+        "total_cycles": cycles.astype(np.int64),
+    }
+
+
+def _rank_sweep(
+    metrics: dict,
+    config_frame: pd.DataFrame,
+    capacity_mwh: np.ndarray,
+    years: Optional[np.ndarray] = None,
+    top_n: Optional[int] = None,
+) -> pd.DataFrame:
+    """Rank sweep metrics (configs, or years × configs) by total revenue, best first."""
+    n_configs = len(config_frame)
+    n_groups = 1 if years is None else len(years)
+    frame = pd.DataFrame({name: np.ravel(values) for name, values in metrics.items()})
+    frame["daily_revenue_per_mwh"] = frame["daily_avg_revenue"] / np.tile(capacity_mwh, n_groups)
+    frame["config"] = np.tile(np.arange(n_configs), n_groups)
+    if years is None:
+        frame = frame.sort_values("total_revenue", ascending=False, kind="stable")
+        frame["rank"] = np.arange(1, len(frame) + 1)
+    else:
+        frame.insert(0, "year", np.repeat(years, n_configs))
+        frame = frame.sort_values(["year", "total_revenue"], ascending=[True, False], kind="stable")
+        frame["rank"] = frame.groupby("year").cumcount() + 1
+    if top_n is not None:
+        frame = frame[frame["rank"] <= top_n]
+
+    # Configuration columns after the year, metrics after the configuration
+    details = config_frame.iloc[frame["config"].to_numpy()].reset_index(drop=True)
+    frame = frame.drop(columns="config").reset_index(drop=True)
+    leading = [] if years is None else ["year"]
+    return pd.concat([frame[leading], details, frame.drop(columns=leading)], axis=1)
+
+
+def sweep_bess(
+    df: pd.DataFrame,
+    capacity_mw: float,
+    durations: Sequence[float],
+    efficiencies: Sequence[float],
+    schedules: Sequence[Schedule],
+    top_n: Optional[int] = None,
+    workers: Optional[int] = None,
+) -> dict[str, pd.DataFrame]:
+    """
+    Evaluate every (duration, efficiency, schedule) combination over a price history.
+
+    Results match compute_bess_metrics(simulate_battery_operations(...)) for
+    each configuration. Batches of configurations are spread over a process
+    pool that reads the price grid from shared memory.
+
+    Args:
+        df: DataFrame with datetime_parsed and price_eur_per_mwh columns
+        capacity_mw: Battery capacity in MW
+        durations: Battery durations in hours
+        efficiencies: Round-trip efficiencies (0-1)
+        schedules: (charge1, discharge1, charge2, discharge2) tuples, e.g. from cycle_schedules
+        top_n: Keep only the best N configurations (per year for "yearly")
+        workers: Worker processes (default SWEEP_WORKERS; 1 runs in-process)
+
+    Returns:
+        Dict with "overall" (whole period) and "yearly" DataFrames ranked by
+        total_revenue: duration_hours, efficiency, cycles, charge1, discharge1,
+        charge2, discharge2, the compute_bess_metrics columns,
+        daily_revenue_per_mwh and rank ("yearly" also has year)
+    """
+    configs = [
+        (duration, efficiency, schedule)
+        for duration in durations
+        for efficiency in efficiencies
+        for schedule in schedules
+    ]
+    if df.empty or not configs:
+        return {"overall": pd.DataFrame(), "yearly": pd.DataFrame()}
+
+    layout = _sweep_layout(df)
+    layout_prices = layout.pop("layout_prices")
+    config_array = np.array(
+        [
+            (capacity_mw, duration, efficiency, *(_time_ns(t) for t in schedule))
+            for duration, efficiency, schedule in configs
+        ],
+        dtype=np.float64,
+    )
+    # Window starts are exact in float64 (< 2**53 ns) except the sentinel,
+    # which only has to stay beyond any intra-day offset
+    batches = [config_array[i:i + SWEEP_BATCH_SIZE] for i in range(0, len(config_array), SWEEP_BATCH_SIZE)]
+
+    workers = min(workers or SWEEP_WORKERS, len(batches))
+    if workers <= 1:
+        _SWEEP_STATE.clear()
+        _SWEEP_STATE.update(layout, layout_prices=layout_prices)
+        try:
+            results = [_sweep_batch(batch) for batch in batches]
+        finally:
+            _SWEEP_STATE.clear()
+    else:
+        # Process pool machinery is only imported when a sweep fans out
+        from concurrent.futures import ProcessPoolExecutor
+        from multiprocessing import shared_memory
+
+        shm = shared_memory.SharedMemory(create=True, size=max(layout_prices.nbytes, 1))
+        try:
+            np.ndarray(layout_prices.shape, dtype=np.float64, buffer=shm.buf)[:] = layout_prices
+            with ProcessPoolExecutor(
+                max_workers=workers,
+                initializer=_init_sweep_worker,
+                initargs=(shm.name, layout_prices.shape, layout),
+            ) as pool:
+                results = list(pool.map(_sweep_batch, batches))
+        finally:
+            shm.close()
+            shm.unlink()
+    sums = np.concatenate(results, axis=1)  # (years, configs, sums)
+
+    config_frame = pd.DataFrame(
+        {
+            "duration_hours": [c[0] for c in configs],
+            "efficiency": [c[1] for c in configs],
+            "cycles": [1 if c[2][2] is None else 2 for c in configs],
+            "charge1": [c[2][0] for c in configs],
+            "discharge1": [c[2][1] for c in configs],
+            "charge2": pd.Series([c[2][2] for c in configs], dtype=object),
+            "discharge2": pd.Series([c[2][3] for c in configs], dtype=object),
+        }
+    )
+    capacity_mwh = capacity_mw * config_frame["duration_hours"].to_numpy()
+    n_days = layout["layout_days"].sum(axis=0)
+    overall = _sweep_metrics(sums.sum(axis=0), n_days.sum())
+    yearly = _sweep_metrics(sums, n_days[:, None])
+    return {
+        "overall": _rank_sweep(overall, config_frame, capacity_mwh, top_n=top_n),
+        "yearly": _rank_sweep(yearly, config_frame, capacity_mwh, years=layout["years"], top_n=top_n),
+    }
@@ -6,13 +6,12 @@ from typing import Dict, List, Tuple
 
 import numpy as np
 import pandas as pd
-import sqlite3
 
-# Import config to get INDICATORS
-try:
-    from config import INDICATORS
-except ImportError:
-    INDICATORS = {}
+from db import reader
+from price_cache import cached, slice_by_datetime
+from price_store import has_series, price_frame, read_series, series_for_indicator, series_for_source
+from series_catalog import catalog_sources
+from utils import datetime_range_clause
 
 
 DATA_DIR = "data"
@@ -21,7 +20,7 @@ PRICES_DB = os.path.join(DATA_DIR, "data.db")
 PV_DB = PRICES_DB
 
 
-@dataclass
+@dataclass(frozen=True)
 class MarketInfo:
     table: str
     datetime_col: str
@@ -29,21 +28,23 @@ class MarketInfo:
     label: str
 
 
-def _connect(path: str) -> sqlite3.Connection:
-    return sqlite3.connect(path)
+# Forecast markets and their labels, listed after the historical markets
+FORECAST_LABELS = {
+    "Aurora_Jun_2025": "Aurora June 2025 (forecast)",
+    "Baringa_Q2_2025": "Baringa Q2 2025 (forecast)",
+}
 
 
-def _get_table_name(indicator_id: int) -> str:
+def list_markets() -> Dict[str, MarketInfo]:
     """
-    Return the SQLite table name for a given indicator in data.db.
-    Matches the logic from db.py but for data.db.
+    List available markets (cached until any price data is written).
+
+    See _list_markets_uncached for the market order.
     """
-    if indicator_id == 600:
-        return "historical_prices"
-    return f"spot_prices_{indicator_id}"
+    return cached("markets", "list_markets", _list_markets_uncached, version_name="")
 
 
-def list_markets() -> Dict[str, MarketInfo]:
+def _list_markets_uncached() -> Dict[str, MarketInfo]:
     """
     List available markets including both historical (spot_prices) and forecasts (aurora, baringa).
     
@@ -59,134 +60,39 @@ def list_markets() -> Dict[str, MarketInfo]:
     if not os.path.exists(PRICES_DB):
         return markets
     
-    conn = _connect(PRICES_DB)
-    cur = conn.cursor()
+    # Everything comes from the series catalog (one small query)
+    # config loads .env; imported here so page startup does not pay for it
+    try:
+        from config import INDICATORS
+    except ImportError:
+        INDICATORS = {}
+    sources = catalog_sources()
+
+    def add(market_id: str, series: str, label: str) -> None:
+        if series in sources and market_id not in markets:
+            table, price_col = sources[series]
+            markets[market_id] = MarketInfo(table=table, datetime_col="datetime", price_col=price_col, label=label)
     
     # 1) Add OMIE DA prices first (standardized order)
-    cur.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='historical_prices'")
-    if cur.fetchone():
-        cur.execute("PRAGMA table_info(historical_prices)")
-        cols = [c[1] for c in cur.fetchall()]
-        if "OMIE_SP_DA_prices" in cols:
-            cur.execute("SELECT COUNT(*) FROM historical_prices WHERE OMIE_SP_DA_prices IS NOT NULL")
-            if cur.fetchone()[0] > 0:
-                markets["omie_da"] = MarketInfo(
-                    table="historical_prices",
-                    datetime_col="datetime",
-                    price_col="OMIE_SP_DA_prices",
-                    label="OMIE DA SP (historical)"
-                )
-    
-    # Add historical spot prices
-    if not INDICATORS:
-        # Fallback: try to discover tables if INDICATORS is not available
-        if not os.path.exists(PRICES_DB):
-            return markets
-
-        conn = _connect(PRICES_DB)
-        cur = conn.cursor()
-        cur.execute("SELECT name FROM sqlite_master WHERE type='table' ORDER BY name")
-        tables = [r[0] for r in cur.fetchall()]
-
-        for t in tables:
-            cur.execute(f"PRAGMA table_info({t})")
-            cols = cur.fetchall()
-            if not cols:
-                continue
-            text_cols = [c[1] for c in cols if c[2].upper().startswith("TEXT")]
-            real_cols = [
-                c[1] for c in cols if c[2].upper() in ("REAL", "NUMERIC", "FLOAT", "DOUBLE")
-            ]
-            if text_cols and real_cols:
-                dt_col = text_cols[0]
-                price_col = real_cols[0]
-                label = t.upper()
-                markets[t] = MarketInfo(table=t, datetime_col=dt_col, price_col=price_col, label=label)
-
-        conn.close()
-        return markets
-    
-    # Use INDICATORS from config.py
-    if not os.path.exists(PRICES_DB):
-        return markets
-
-    conn = _connect(PRICES_DB)
-    cur = conn.cursor()
+    add("omie_da", "OMIE_SP", "OMIE DA SP (historical)")
     
+    # 2) Add historical spot prices (ESIOS DA 600 with standardized label)
     for indicator_id, indicator_name in INDICATORS.items():
-        table_name = _get_table_name(indicator_id)
-        
-        # Check if table exists
-        cur.execute("SELECT name FROM sqlite_master WHERE type='table' AND name=?", (table_name,))
-        if not cur.fetchone():
-            continue
-        
-        # Get column info
-        cur.execute(f"PRAGMA table_info({table_name})")
-        cols = cur.fetchall()
-        if not cols:
-            continue
-        
-        text_cols = [c[1] for c in cols if c[2].upper().startswith("TEXT")]
-        real_cols = [
-            c[1] for c in cols if c[2].upper() in ("REAL", "NUMERIC", "FLOAT", "DOUBLE")
-        ]
-        all_col_names = [c[1] for c in cols]
-        
-        if text_cols and real_cols:
-            dt_col = text_cols[0]
-            
-            # Determine the correct price column based on indicator ID
-            # This matches the logic in pages/01_Real_Time_Prices.py load_data()
-            if indicator_id == 600:
-                # For indicator 600, use 'ESIOS_600_DA_prices' column
-                if "ESIOS_600_DA_prices" in all_col_names:
-                    price_col = "ESIOS_600_DA_prices"
-                else:
-                    # Fallback to first real column if day_ahead_prices doesn't exist
-                    price_col = real_cols[0]
-            else:
-                # For other indicators (612, 613, 614), use column named after indicator ID
-                indicator_col = str(indicator_id)
-                if indicator_col in all_col_names:
-                    price_col = indicator_col
-                else:
-                    # Fallback to first real column if indicator column doesn't exist
-                    price_col = real_cols[0]
-            
-            # 2) Add ESIOS DA 600 with standardized label
-            if indicator_id == 600:
-                label = "ESIOS DA 600 (historical)"
-            else:
-                label = f"{indicator_id} – {indicator_name}"
-            markets[str(indicator_id)] = MarketInfo(
-                table=table_name, 
-                datetime_col=dt_col, 
-                price_col=price_col, 
-                label=label
-            )
-    
-    conn.close()
+        if indicator_id == 600:
+            label = "ESIOS DA 600 (historical)"
+        else:
+            label = f"{indicator_id} – {indicator_name}"
+        add(str(indicator_id), series_for_indicator(indicator_id), label)
     
     # 3) Add forecast sources with standardized labels (after historical)
-    if os.path.exists(PRICES_DB):
-        conn = _connect(PRICES_DB)
-        cur = conn.cursor()
-        cur.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='forecasts'")
-        if cur.fetchone():
-            for source_name, label in [
-                ("Aurora_Jun_2025", "Aurora June 2025 (forecast)"),
-                ("Baringa_Q2_2025", "Baringa Q2 2025 (forecast)")
-            ]:
-                cur.execute("SELECT COUNT(*) FROM forecasts WHERE source = ?", (source_name,))
-                if cur.fetchone()[0] > 0:
-                    markets[source_name] = MarketInfo(
-                        table="forecasts",
-                        datetime_col="datetime",
-                        price_col="price_eur_per_mwh",
-                        label=label
-                    )
-        conn.close()
+    for source_name, label in FORECAST_LABELS.items():
+        add(source_name, source_name, label)
+    
+    if not INDICATORS:
+        # Fallback: list every other cataloged series under its own name
+        for series in sorted(sources):
+            if series != "OMIE_SP":
+                add(series, series, series)
     
     return markets
 
@@ -195,15 +101,61 @@ def list_pv_profiles() -> List[str]:
     """Return available PV profile column names from pv.db.pv_profiles."""
     if not os.path.exists(PV_DB):
         return []
-    conn = _connect(PV_DB)
-    cur = conn.cursor()
-    cur.execute("PRAGMA table_info(pv_profiles)")
-    cols = [r[1] for r in cur.fetchall()]
-    conn.close()
+    with reader() as conn:
+        cols = [r[1] for r in conn.execute("PRAGMA table_info(pv_profiles)").fetchall()]
     # first three columns are month, day, hour
     return [c for c in cols if c not in ("month", "day", "hour")]
 
 
+def _load_legacy_price_series(
+    market: str,
+    info: MarketInfo,
+    start_dt: pd.Timestamp | None = None,
+    end_dt: pd.Timestamp | None = None,
+) -> pd.DataFrame:
+    """Load a market's prices from the legacy historical_prices / forecasts tables."""
+    # Date range is pushed down to SQLite so only the requested rows are read
+    range_sql, range_params = datetime_range_clause(start_dt, end_dt)
+    with reader() as conn:
+        # Handle forecasts vs historical differently
+        if market in ["Aurora_Jun_2025", "Baringa_Q2_2025"]:
+            # Forecast data
+            df = pd.read_sql(
+                f"SELECT datetime, price_eur_per_mwh FROM forecasts WHERE source = ?{range_sql}",
+                conn,
+                params=[market, *range_params],
+            )
+        elif market == "omie_da":
+            # OMIE DA historical data (Spain prices)
+            df = pd.read_sql(
+                "SELECT datetime, OMIE_SP_DA_prices as price_eur_per_mwh FROM historical_prices "
+                f"WHERE OMIE_SP_DA_prices IS NOT NULL{range_sql}",
+                conn,
+                params=range_params,
+            )
+        else:
+            # Historical data (ESIOS indicators)
+            df = pd.read_sql(
+                f'SELECT datetime, "{info.price_col}" as price_eur_per_mwh FROM {info.table} '
+                f'WHERE "{info.price_col}" IS NOT NULL{range_sql}',
+                conn,
+                params=range_params,
+            )
+
+    # Parse datetime and strip any timezone to avoid naive/aware comparison issues.
+    from timestamps import parse_timestamps
+
+    df["datetime"] = parse_timestamps(df["datetime"])
+    df = df.dropna(subset=["datetime"]).copy()
+    
+    df["year"] = df["datetime"].dt.year
+    df["month"] = df["datetime"].dt.month
+    df["day"] = df["datetime"].dt.day
+    df["hour"] = df["datetime"].dt.hour
+    df["minute"] = df["datetime"].dt.minute
+    return df
+
+
 def load_price_series(
     market: str, 
     start_dt: pd.Timestamp | None = None, 
@@ -213,6 +165,9 @@ def load_price_series(
     """
     Load price series for a given market (historical or forecast).
     
+    Migrated series are served from the shared in-memory cache (see price_cache);
+    otherwise the date range is applied in SQL on the legacy tables.
+    
     Args:
         market: Market identifier (e.g., "600" for historical, "Aurora_Jun_2025" or "Baringa_Q2_2025" for forecasts)
         start_dt: Optional start datetime filter
@@ -227,44 +182,14 @@ def load_price_series(
         raise ValueError(f"Unknown market '{market}'. Available: {list(markets.keys())}")
     info = markets[market]
 
-    conn = _connect(PRICES_DB)
-    
-    # Handle forecasts vs historical differently
-    if market in ["Aurora_Jun_2025", "Baringa_Q2_2025"]:
-        # Forecast data
-        df = pd.read_sql(
-            "SELECT datetime, year, month, day, hour, minute, price_eur_per_mwh FROM forecasts WHERE source = ?",
-            conn,
-            params=(market,)
-        )
-    elif market == "omie_da":
-        # OMIE DA historical data (Spain prices)
-        df = pd.read_sql(
-            "SELECT datetime, year, month, day, hour, minute, OMIE_SP_DA_prices as price_eur_per_mwh FROM historical_prices WHERE OMIE_SP_DA_prices IS NOT NULL",
-            conn
-        )
+    series = series_for_source(market)
+    if has_series(series):
+        # Columnar store: datetime64 index straight from the integer key
+        # Full series is cached per data version; the date range is a row slice of it
+        full = cached("price_frame", series, lambda: price_frame(read_series(series)))
+        df = slice_by_datetime(full, start_dt, end_dt).drop(columns=["datetime_parsed"])
     else:
-        # Historical data (ESIOS indicators)
-        df = pd.read_sql(f"SELECT * FROM {info.table}", conn)
-    
-    conn.close()
-
-    # Parse datetime and strip any timezone to avoid naive/aware comparison issues.
-    # Use shared parse_timestamp utility function
-    from utils import parse_timestamp
-    
-    dt_parsed = df["datetime"].apply(parse_timestamp)
-    df["datetime"] = pd.to_datetime(dt_parsed, errors="coerce")
-    df = df.dropna(subset=["datetime"]).copy()
-    
-    # Rename price column if needed (for historical data)
-    if "price_eur_per_mwh" not in df.columns:
-        df = df.rename(columns={info.price_col: "price_eur_per_mwh"})
-
-    if start_dt is not None:
-        df = df[df["datetime"] >= pd.to_datetime(start_dt)]
-    if end_dt is not None:
-        df = df[df["datetime"] <= pd.to_datetime(end_dt)]
+        df = _load_legacy_price_series(market, info, start_dt, end_dt)
 
     if df.empty:
         return df
@@ -277,10 +202,6 @@ def load_price_series(
         df = apply_inflation_to_forecasts(df, inflation_rate)
         # Keep datetime_parsed for consistency with other code
 
-    df["year"] = df["datetime"].dt.year
-    df["month"] = df["datetime"].dt.month
-    df["day"] = df["datetime"].dt.day
-    df["hour"] = df["datetime"].dt.hour
     df["weekday"] = df["datetime"].dt.day_name()
     return df
 
@@ -289,10 +210,20 @@ def load_pv_profile(profile_col: str) -> pd.DataFrame:
     """Load a single PV profile as month, day, hour, pv_mwh."""
     if not os.path.exists(PV_DB):
         raise FileNotFoundError(PV_DB)
-    conn = _connect(PV_DB)
+    return cached("pv_profile", profile_col, lambda: _load_pv_profile_uncached(profile_col), version_name="pv_profiles")
+
+
+def _load_pv_profile_uncached(profile_col: str) -> pd.DataFrame:
+    from snapshots import snapshot_pv_profile
+    snapshot = snapshot_pv_profile(profile_col)
+    if snapshot is not None:
+        slots, values = snapshot
+        month, day, hour = _slot_fields(slots)
+        return pd.DataFrame({"month": month, "day": day, "hour": hour, "pv_mwh": values.astype(float)})
+
     query = f"SELECT month, day, hour, {profile_col} AS pv_mwh FROM pv_profiles"
-    df = pd.read_sql(query, conn)
-    conn.close()
+    with reader() as conn:
+        df = pd.read_sql(query, conn)
     df = df.dropna(subset=["pv_mwh"]).copy()
     df["month"] = df["month"].astype(int)
     df["day"] = df["day"].astype(int)
@@ -306,30 +237,19 @@ def join_price_with_pv(prices: pd.DataFrame, pv: pd.DataFrame) -> pd.DataFrame:
     
     Filters out rows where price_eur_per_mwh is NULL before joining,
     so that PV production is only included when there's a valid price.
+    Rows whose (month, day, hour) has no PV value (e.g. Feb 29 on a
+    365-day profile) are dropped, as with an inner merge.
     """
     if prices.empty or pv.empty:
         return prices.iloc[0:0].copy()
 
-    # Filter out NULL prices before joining
-    # This ensures PV production is only included when there's a valid price
-    prices = prices[prices["price_eur_per_mwh"].notna()].copy()
-    
-    if prices.empty:
-        return prices
-
-    pv_keys = pv[["month", "day"]].drop_duplicates()
-    has_feb29 = ((pv_keys["month"] == 2) & (pv_keys["day"] == 29)).any()
-    if not has_feb29:
-        prices = prices[~((prices["month"] == 2) & (prices["day"] == 29))].copy()
-
-    merged = prices.merge(
-        pv[["month", "day", "hour", "pv_mwh"]],
-        on=["month", "day", "hour"],
-        how="inner",
-    )
-    if merged.empty:
-        return merged
+    # Look PV up in the dense profile instead of merging on (month, day, hour)
+    dense = pv_profile_array(pv)
+    pv_values = dense[_calendar_fields(prices["datetime"])["slot"]]
+    keep = prices["price_eur_per_mwh"].notna().to_numpy() & ~np.isnan(pv_values)
 
+    merged = prices[keep].reset_index(drop=True)
+    merged["pv_mwh"] = pv_values[keep]
     merged["pv_weighted_price_component"] = merged["price_eur_per_mwh"] * merged["pv_mwh"]
     return merged
 
@@ -360,6 +280,320 @@ def compute_captured_price_aggregations(
     return grouped[group_cols + ["captured_price"]]
 
 
+# Dense PV profiles: one slot per hour of a leap year, so every (month, day, hour)
+# including Feb 29 has a fixed position and prices map to PV by integer arithmetic.
+PV_SLOTS = 366 * 24
+_LEAP_MONTH_START_DAY = np.cumsum([0, 31, 29, 31, 30, 31, 30, 31, 31, 30, 31, 30])
+
+# Group columns produced for each chart grouping (see chart_config.CHART_ORDER)
+CAPTURED_GROUPINGS = {
+    "yearly": ["year"],
+    "year_month": ["year_month"],
+    "calendar_month": ["month"],
+    "daily": ["date"],
+    "day_of_week": ["weekday", "weekday_order"],
+    "hour_of_day": ["hour"],
+}
+_WEEKDAY_NAMES = np.array(["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"])
+
+
+def pv_profile_array(pv: pd.DataFrame) -> np.ndarray:
+    """
+    Lay a PV profile (month, day, hour, pv_mwh) out as a dense 8784-slot array.
+
+    Slots without a value in the profile (e.g. Feb 29) are NaN.
+    """
+    dense = np.full(PV_SLOTS, np.nan)
+    if pv.empty:
+        return dense
+    slots = _slot_index(pv["month"].to_numpy(), pv["day"].to_numpy(), pv["hour"].to_numpy())
+    dense[slots] = pv["pv_mwh"].to_numpy(dtype=float)
+    return dense
+
+
+def load_pv_array(profile_col: str) -> np.ndarray:
+    """Load a PV profile as a dense 8784-slot array (see pv_profile_array)."""
+    return cached(
+        "pv_array", profile_col, lambda: pv_profile_array(load_pv_profile(profile_col)), version_name="pv_profiles"
+    )
+
+
+def _slot_index(month: np.ndarray, day: np.ndarray, hour: np.ndarray) -> np.ndarray:
+    return (_LEAP_MONTH_START_DAY[month.astype(np.int64) - 1] + day.astype(np.int64) - 1) * 24 + hour.astype(np.int64)
+
+
+def _slot_fields(slots: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Inverse of _slot_index: (month, day, hour) of dense PV slots."""
+    slots = np.asarray(slots, dtype=np.int64)
+    day_of_year = slots // 24
+    month = np.searchsorted(_LEAP_MONTH_START_DAY, day_of_year, side="right")
+    return month, day_of_year - _LEAP_MONTH_START_DAY[month - 1] + 1, slots % 24
+
+
+def _civil_from_days(days: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Year, month, day of days since 1970-01-01 (proleptic Gregorian, integer arithmetic only)."""
+    z = days + 719468
+    era = z // 146097
+    doe = z - era * 146097
+    yoe = (doe - doe // 1460 + doe // 36524 - doe // 146096) // 365
+    doy = doe - (365 * yoe + yoe // 4 - yoe // 100)
+    mp = (5 * doy + 2) // 153
+    day = doy - (153 * mp + 2) // 5 + 1
+    month = np.where(mp < 10, mp + 3, mp - 9)
+    year = yoe + era * 400 + (month <= 2)
+    return year, month, day
+
+
+def _calendar_fields(datetimes: pd.Series) -> dict[str, np.ndarray]:
+    """Per-row day offset, hour and PV slot, plus calendar fields per distinct day."""
+    minutes = datetimes.to_numpy(dtype="datetime64[m]").astype(np.int64)
+    day_index = minutes // 1440
+    first_day = int(day_index.min()) if len(day_index) else 0
+    day_offset = day_index - first_day
+    n_days = int(day_offset.max()) + 1 if len(day_offset) else 0
+
+    # Calendar fields are only computed once per day in the range
+    days = np.arange(first_day, first_day + n_days)
+    year, month, day = _civil_from_days(days)
+    day_slot = _slot_index(month, day, np.zeros_like(day))
+    hour = minutes % 1440 // 60
+    return {
+        "day_offset": day_offset,
+        "hour": hour,
+        "slot": day_slot[day_offset] + hour,
+        "days": days,
+        "day_slot": day_slot,
+        "year": year,
+        "month": month,
+        "month_index": (year - 1970) * 12 + month - 1,  # months since 1970-01
+        "weekday": (days + 3) % 7,  # 1970-01-01 was a Thursday; Monday=0 … Sunday=6
+    }
+
+
+def _group_labels(grouping: str, codes: np.ndarray) -> Dict[str, object]:
+    """Group column values for the integer group codes of a grouping."""
+    if grouping == "year_month":
+        return {"year_month": pd.to_datetime(codes.astype("datetime64[M]")).astype("datetime64[ns]")}
+    if grouping == "daily":
+        return {"date": pd.to_datetime(codes.astype("datetime64[D]")).date}
+    if grouping == "day_of_week":
+        return {"weekday": _WEEKDAY_NAMES[codes], "weekday_order": codes}
+    return {CAPTURED_GROUPINGS[grouping][0]: codes}
+
+
+def _captured_sums_2d(
+    prices: pd.DataFrame,
+    pv: np.ndarray,
+    groupings: List[str],
+) -> Dict[str, tuple]:
+    """
+    Captured-price sums for every column of a (PV_SLOTS, n_profiles) PV array.
+
+    Prices are binned once by (day, hour of day) with bincount, so 15-minute
+    rows share their hour's PV value. Per-day sums for all profiles are one
+    contraction of the bins with the day's PV slots. Each calendar grouping
+    is then one matrix multiply of a (groups x days) indicator with them.
+
+    Returns:
+        Dictionary mapping grouping -> (codes, sum_price_pv, sum_pv, sum_price, n_prices),
+        where sum_price_pv and sum_pv are (groups, n_profiles) arrays and only
+        groups with at least one price are kept
+    """
+    unknown = [g for g in groupings if g not in CAPTURED_GROUPINGS]
+    if unknown:
+        raise ValueError(f"Unknown grouping(s) {unknown}. Available: {list(CAPTURED_GROUPINGS)}")
+    n_profiles = pv.shape[1]
+
+    price = prices["price_eur_per_mwh"].to_numpy(dtype=float)
+    has_price = ~np.isnan(price)
+    if prices.empty or not has_price.any():
+        empty = np.empty((0, n_profiles))
+        return {g: (np.empty(0, dtype=np.int64), empty, empty, np.empty(0), np.empty(0)) for g in groupings}
+    if not has_price.all():
+        prices = prices[has_price]
+        price = price[has_price]
+
+    fields = _calendar_fields(prices["datetime"])
+    n_days = len(fields["days"])
+    cell = fields["day_offset"] * 24 + fields["hour"]
+    price_bins = np.bincount(cell, weights=price, minlength=n_days * 24).reshape(n_days, 24)
+    count_bins = np.bincount(cell, minlength=n_days * 24).reshape(n_days, 24).astype(float)
+
+    # PV of every (day, hour) cell for every profile; missing slots contribute nothing
+    day_pv = pv[fields["day_slot"][:, None] + np.arange(24)]
+    day_pv = np.where(np.isnan(day_pv), 0.0, day_pv)
+
+    day_sums = (
+        np.einsum("dh,dhm->dm", price_bins, day_pv),
+        np.einsum("dh,dhm->dm", count_bins, day_pv),
+        price_bins.sum(axis=1),
+        count_bins.sum(axis=1),
+    )
+    day_keys = {
+        "yearly": fields["year"],
+        "year_month": fields["month_index"],
+        "calendar_month": fields["month"],
+        "day_of_week": fields["weekday"],
+    }
+
+    out = {}
+    for grouping in groupings:
+        if grouping == "hour_of_day":
+            codes = np.arange(24)
+            sums = (
+                np.einsum("dh,dhm->hm", price_bins, day_pv),
+                np.einsum("dh,dhm->hm", count_bins, day_pv),
+                price_bins.sum(axis=0),
+                count_bins.sum(axis=0),
+            )
+        elif grouping == "daily":
+            codes, sums = fields["days"], day_sums
+        else:
+            key = day_keys[grouping]
+            first = int(key.min())
+            codes = np.arange(first, int(key.max()) + 1)
+            indicator = np.zeros((len(codes), n_days))
+            indicator[key - first, np.arange(n_days)] = 1.0
+            sums = tuple(indicator @ values for values in day_sums)
+        present = sums[3] > 0
+        out[grouping] = (codes[present], *(values[present] for values in sums))
+    return out
+
+
+def captured_price_sums(
+    prices: pd.DataFrame,
+    pv: np.ndarray,
+    groupings: List[str] | None = None,
+) -> Dict[str, pd.DataFrame]:
+    """
+    Per-group sums for PV captured prices, without joining prices to PV.
+
+    Each price row is mapped to its PV slot by integer arithmetic (15-minute
+    rows share their hour's PV value), so the cost is linear in the number
+    of price rows (see _captured_sums_2d).
+
+    Args:
+        prices: DataFrame with datetime and price_eur_per_mwh columns
+        pv: Dense PV array from load_pv_array / pv_profile_array
+        groupings: Names from CAPTURED_GROUPINGS (default: all of them)
+
+    Returns:
+        Dictionary mapping grouping -> DataFrame with the grouping's columns and:
+        - sum_price_pv, sum_pv: over rows with a price and a PV value
+        - sum_price, n_prices: over rows with a price (baseload average)
+    """
+    groupings = list(CAPTURED_GROUPINGS) if groupings is None else groupings
+    out = {}
+    for grouping, (codes, sum_price_pv, sum_pv, sum_price, n_prices) in _captured_sums_2d(
+        prices, pv[:, None], groupings
+    ).items():
+        group_cols = CAPTURED_GROUPINGS[grouping]
+        sums = pd.DataFrame({
+            **_group_labels(grouping, codes),
+            "sum_price_pv": sum_price_pv[:, 0],
+            "sum_pv": sum_pv[:, 0],
+            "sum_price": sum_price,
+            "n_prices": n_prices.astype(np.int64),
+        })
+        if grouping == "day_of_week":
+            # Same row order as a groupby on (weekday, weekday_order)
+            sums = sums.sort_values(group_cols, ignore_index=True)
+        out[grouping] = sums
+    return out
+
+
+def captured_price_by(
+    prices: pd.DataFrame,
+    pv: np.ndarray,
+    groupings: List[str] | None = None,
+) -> Dict[str, pd.DataFrame]:
+    """
+    PV-weighted captured price per group, computed from the dense PV array.
+
+    Same result as join_price_with_pv followed by
+    compute_captured_price_aggregations with each grouping's columns.
+
+    Returns:
+        Dictionary mapping grouping -> DataFrame with group columns and captured_price
+    """
+    out = {}
+    for grouping, sums in captured_price_sums(prices, pv, groupings).items():
+        group_cols = CAPTURED_GROUPINGS[grouping]
+        sums = sums[sums["sum_pv"] > 0].copy()
+        sums["captured_price"] = sums["sum_price_pv"] / sums["sum_pv"]
+        out[grouping] = sums[group_cols + ["captured_price"]].reset_index(drop=True)
+    return out
+
+
+def captured_price_matrix(
+    markets: List[str],
+    profiles: List[str],
+    start_dt: pd.Timestamp | None = None,
+    end_dt: pd.Timestamp | None = None,
+    inflation_rate: float = 0.0,
+    groupings: List[str] | None = None,
+) -> Dict[str, pd.DataFrame]:
+    """
+    Captured prices and capture factors for every market x PV profile pair.
+
+    Each market's prices are loaded and binned once; the profiles are the
+    columns of one 2-D PV array, so a single pass per market serves all of
+    them (see _captured_sums_2d).
+
+    Args:
+        markets: Market identifiers (see list_markets)
+        profiles: PV profile columns (see list_pv_profiles)
+        start_dt: Optional start datetime filter
+        end_dt: Optional end datetime filter
+        inflation_rate: Annual inflation rate (0.0-1.0) for forecasts only
+        groupings: Names from CAPTURED_GROUPINGS (default: all of them)
+
+    Returns:
+        Dictionary mapping grouping -> long DataFrame with columns market,
+        profile, the grouping's columns, sum_price_pv, sum_pv, sum_price,
+        n_prices, captured_price, baseload_price and capture_factor.
+        Groups without PV output are left out.
+    """
+    groupings = list(CAPTURED_GROUPINGS) if groupings is None else groupings
+    pv = np.column_stack([load_pv_array(p) for p in profiles]) if profiles else np.empty((PV_SLOTS, 0))
+
+    frames: Dict[str, List[pd.DataFrame]] = {g: [] for g in groupings}
+    for market in markets:
+        prices = load_price_series(market, start_dt=start_dt, end_dt=end_dt, inflation_rate=inflation_rate)
+        if prices.empty:
+            continue
+        sums = _captured_sums_2d(prices, pv, groupings)
+        for grouping, (codes, sum_price_pv, sum_pv, sum_price, n_prices) in sums.items():
+            labels = _group_labels(grouping, codes)
+            for i, profile in enumerate(profiles):
+                frames[grouping].append(pd.DataFrame({
+                    "market": market,
+                    "profile": profile,
+                    **labels,
+                    "sum_price_pv": sum_price_pv[:, i],
+                    "sum_pv": sum_pv[:, i],
+                    "sum_price": sum_price,
+                    "n_prices": n_prices.astype(np.int64),
+                }))
+
+    out = {}
+    for grouping in groupings:
+        group_cols = CAPTURED_GROUPINGS[grouping]
+        columns = ["market", "profile"] + group_cols + [
+            "sum_price_pv", "sum_pv", "sum_price", "n_prices", "captured_price", "baseload_price", "capture_factor"
+        ]
+        if not frames[grouping]:
+            out[grouping] = pd.DataFrame(columns=columns)
+            continue
+        df = pd.concat(frames[grouping], ignore_index=True)
+        df = df[df["sum_pv"] > 0].reset_index(drop=True)
+        df["captured_price"] = df["sum_price_pv"] / df["sum_pv"]
+        df["baseload_price"] = df["sum_price"] / df["n_prices"]
+        df["capture_factor"] = df["captured_price"] / df["baseload_price"]
+        out[grouping] = df[columns]
+    return out
+
+
 def compute_typical_day_profiles() -> pd.DataFrame:
     """
     Compute average PV output by hour across the synthetic year for each profile.
@@ -369,9 +603,8 @@ def compute_typical_day_profiles() -> pd.DataFrame:
     if not profiles:
         return pd.DataFrame(columns=["hour", "profile", "pv_mwh"])
 
-    conn = _connect(PV_DB)
-    df = pd.read_sql("SELECT * FROM pv_profiles", conn)
-    conn.close()
+    with reader() as conn:
+        df = pd.read_sql("SELECT * FROM pv_profiles", conn)
 
     long_rows = []
     for p in profiles:
@@ -14,7 +14,8 @@ ESIOS_API_TOKEN = os.getenv("ESIOS_API_TOKEN")
 class EsiosConfig:
     """Basic configuration for ESIOS API access."""
 
-    base_url: str = "https://api.esios.ree.es"
+    # ESIOS_BASE_URL points the client at another server (e.g. a local fake for testing)
+    base_url: str = os.getenv("ESIOS_BASE_URL", "https://api.esios.ree.es")
     spot_indicator_id: int = 600  # default indicator
 
 
@@ -0,0 +1,373 @@
+"""
+Coverage bitmaps of the market price series, for gap detection and backfill planning.
+
+Every ESIOS and OMIE series in price_store has one bitmap in the
+``coverage_bitmaps`` table, with one bit per expected interval on a fixed
+wall-clock grid: hourly from COVERAGE_ORIGIN, quarter-hourly from
+QUARTER_HOUR_START (the SDAC 15-minute go-live). A bit is set when the store
+holds a value for the interval; a value at a finer resolution than the grid
+marks the grid interval containing it.
+
+price_store.upsert_series updates the bits of every write, so "which
+intervals are missing in this range" is answered from a few kilobytes per
+series instead of scanning prices. The backfill scripts use it to download
+only the holes, and ``python coverage_index.py`` prints a gaps report.
+
+The hour skipped when clocks go forward (last Sunday of March, 02:00 in
+Europe/Madrid) is not expected. Sources that drop a different hour on that
+day (OMIE numbers hourly periods from 00:00) still count as complete days in
+missing_days.
+"""
+import argparse
+import sqlite3
+import time
+from datetime import date
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from db import DB_PATH, query_live, reader, writer
+from price_store import PRICE_STORE_TABLE, _store_columns, to_epoch_minutes
+
+
+COVERAGE_TABLE = "coverage_bitmaps"
+
+# Series with a fixed market grid (forecasts are hourly to 2050 and not tracked)
+COVERED_PREFIXES = ("ESIOS_", "OMIE_")
+
+# Grid in epoch minutes: hourly from the origin, quarter-hourly from the go-live
+COVERAGE_ORIGIN = int(to_epoch_minutes(["2014-01-01"])[0])
+QUARTER_HOUR_START = int(to_epoch_minutes(["2025-10-01"])[0])
+_HOURLY_SLOTS = (QUARTER_HOUR_START - COVERAGE_ORIGIN) // 60
+
+
+def is_tracked(series: str) -> bool:
+    """Return True if the series has a coverage bitmap."""
+    return series.startswith(COVERED_PREFIXES)
+
+
+def init_coverage(conn: sqlite3.Connection) -> None:
+    """Create the coverage_bitmaps table if it does not exist."""
+    conn.execute(
+        f"""
+        CREATE TABLE IF NOT EXISTS {COVERAGE_TABLE} (
+            series TEXT PRIMARY KEY,
+            bits BLOB NOT NULL,
+            covered INTEGER NOT NULL,
+            updated_at TEXT
+        )
+        """
+    )
+
+
+def interval_index(ts: np.ndarray) -> np.ndarray:
+    """Grid interval holding each epoch-minute timestamp (-1 before the origin)."""
+    ts = np.asarray(ts, dtype=np.int64)
+    index = np.where(
+        ts < QUARTER_HOUR_START,
+        (ts - COVERAGE_ORIGIN) // 60,
+        _HOURLY_SLOTS + (ts - QUARTER_HOUR_START) // 15,
+    )
+    return np.where(ts < COVERAGE_ORIGIN, -1, index)
+
+
+def interval_start(index: np.ndarray) -> np.ndarray:
+    """Epoch-minute start of grid intervals (inverse of interval_index)."""
+    index = np.asarray(index, dtype=np.int64)
+    return np.where(
+        index < _HOURLY_SLOTS,
+        COVERAGE_ORIGIN + index * 60,
+        QUARTER_HOUR_START + (index - _HOURLY_SLOTS) * 15,
+    )
+
+
+def _unpack(blob: bytes) -> np.ndarray:
+    return np.unpackbits(np.frombuffer(blob, dtype=np.uint8), bitorder="little").astype(bool)
+
+
+def _load_bits(cur: sqlite3.Cursor, series: str) -> Optional[np.ndarray]:
+    cur.execute(f"SELECT bits FROM {COVERAGE_TABLE} WHERE series = ?", (series,))
+    row = cur.fetchone()
+    return None if row is None else _unpack(row[0])
+
+
+def _store_bits(conn: sqlite3.Connection, series: str, bits: np.ndarray) -> None:
+    conn.execute(
+        f"""
+        INSERT OR REPLACE INTO {COVERAGE_TABLE} (series, bits, covered, updated_at)
+        VALUES (?, ?, ?, datetime('now'))
+        """,
+        (series, np.packbits(bits, bitorder="little").tobytes(), int(bits.sum())),
+    )
+
+
+def update_coverage(series: str, ts: np.ndarray, present: np.ndarray, conn: sqlite3.Connection) -> None:
+    """
+    Set (or clear) the bits of written intervals.
+
+    Called inside the writer transaction of price_store.upsert_series.
+
+    Args:
+        series: Store series name (untracked series are ignored)
+        ts: Epoch-minute timestamps written
+        present: Whether each timestamp now has a value (False clears its bit)
+        conn: Write connection (committed by the caller's transaction)
+    """
+    if not is_tracked(series) or len(ts) == 0:
+        return
+    init_coverage(conn)
+    index = interval_index(ts)
+    keep = index >= 0
+    index, present = index[keep], np.asarray(present, dtype=bool)[keep]
+    if len(index) == 0:
+        return
+    bits = _load_bits(conn.cursor(), series)
+    if bits is None:
+        bits = np.zeros(0, dtype=bool)
+    size = int(index.max()) + 1
+    if size > len(bits):
+        bits = np.concatenate([bits, np.zeros(size - len(bits), dtype=bool)])
+    # Intervals finer than the grid: any value present marks the interval
+    bits[index[~present]] = False
+    bits[index[present]] = True
+    _store_bits(conn, series, bits)
+
+
+def rebuild_coverage(series_list: Optional[list[str]] = None) -> dict[str, int]:
+    """
+    Rebuild the bitmaps of the given series (default: every tracked price_store series).
+
+    Returns:
+        Dictionary mapping series name -> number of covered intervals
+    """
+    with writer() as conn:
+        init_coverage(conn)
+        cur = conn.cursor()
+        columns = _store_columns(cur)
+        if series_list is None:
+            series_list = [c for c in columns if c != "ts" and is_tracked(c)]
+        counts = {}
+        for series in series_list:
+            conn.execute(f"DELETE FROM {COVERAGE_TABLE} WHERE series = ?", (series,))
+            if series not in columns:
+                continue
+            cur.execute(f'SELECT ts FROM {PRICE_STORE_TABLE} WHERE "{series}" IS NOT NULL')
+            ts = np.array([row[0] for row in cur.fetchall()], dtype=np.int64)
+            update_coverage(series, ts, np.ones(len(ts), dtype=bool), conn)
+            cur.execute(f"SELECT covered FROM {COVERAGE_TABLE} WHERE series = ?", (series,))
+            row = cur.fetchone()
+            counts[series] = row[0] if row else 0
+        return counts
+
+
+def _query_coverage(sql: str, params: tuple = ()) -> list[tuple]:
+    """
+    Run a coverage query, building the bitmaps first if the table is missing.
+
+    If the pages' published copy lacks the table, the query falls back to
+    the live database (see db.query_live).
+    """
+    if not DB_PATH.exists():
+        return []
+    try:
+        with reader() as conn:
+            return conn.execute(sql, params).fetchall()
+    except sqlite3.OperationalError as exc:
+        if "no such table" not in str(exc):
+            raise
+    return query_live(sql, params, build=rebuild_coverage)
+
+
+def _series_bits(series: str) -> np.ndarray:
+    rows = _query_coverage(f"SELECT bits FROM {COVERAGE_TABLE} WHERE series = ?", (series,))
+    if not rows:
+        return np.zeros(0, dtype=bool)
+    return _unpack(rows[0][0])
+
+
+def _grid(start_dt, end_dt) -> tuple[np.ndarray, np.ndarray]:
+    """Grid indexes in [start_dt, end_dt) and the mask of intervals expected to have data."""
+    lo = max(int(interval_index(to_epoch_minutes([start_dt]))[0]), 0)
+    hi = int(interval_index(to_epoch_minutes([end_dt]) - 1)[0]) + 1
+    index = np.arange(lo, max(hi, lo), dtype=np.int64)
+    starts = interval_start(index).astype("datetime64[m]")
+
+    # Last Sunday of March, 02:00-03:00 local time does not exist
+    years = np.unique(starts.astype("datetime64[Y]"))
+    march_31 = (years.astype("datetime64[M]") + 3).astype("datetime64[D]") - 1
+    weekday = (march_31.astype(np.int64) + 3) % 7  # Monday = 0
+    skipped = (march_31 - (weekday + 1) % 7).astype("datetime64[m]").astype(np.int64) + 120
+    start_min = starts.astype(np.int64)
+    expected = np.ones(len(index), dtype=bool)
+    for skipped_start in skipped:
+        expected &= ~((start_min >= skipped_start) & (start_min < skipped_start + 60))
+    return index, expected
+
+
+def _covered(bits: np.ndarray, index: np.ndarray) -> np.ndarray:
+    covered = np.zeros(len(index), dtype=bool)
+    inside = index < len(bits)
+    covered[inside] = bits[index[inside]]
+    return covered
+
+
+def _ranges(missing: np.ndarray, merge_minutes: int = 0) -> list[tuple[pd.Timestamp, pd.Timestamp]]:
+    """Collapse sorted missing interval indexes into (start, end) ranges."""
+    if len(missing) == 0:
+        return []
+    starts = interval_start(missing)
+    ends = interval_start(missing + 1)
+    # A new range starts wherever a hole begins after the previous one ended
+    breaks = np.flatnonzero(starts[1:] - ends[:-1] > merge_minutes) + 1
+    firsts = np.concatenate([[0], breaks])
+    lasts = np.concatenate([breaks - 1, [len(missing) - 1]])
+    return [
+        (pd.Timestamp(int(starts[f]) * 60, unit="s"), pd.Timestamp(int(ends[l]) * 60, unit="s"))
+        for f, l in zip(firsts, lasts)
+    ]
+
+
+def missing_intervals(series: str, start_dt, end_dt) -> pd.DatetimeIndex:
+    """
+    Return the start of every expected interval in [start_dt, end_dt) without a value.
+
+    Args:
+        series: Store series name (e.g. OMIE_SP, ESIOS_600)
+        start_dt: Inclusive start (anything pd.Timestamp accepts)
+        end_dt: Exclusive end
+
+    Returns:
+        Naive DatetimeIndex of missing interval starts
+    """
+    index, expected = _grid(start_dt, end_dt)
+    missing = index[expected & ~_covered(_series_bits(series), index)]
+    return pd.DatetimeIndex(interval_start(missing).astype("datetime64[m]").astype("datetime64[ns]"))
+
+
+def missing_ranges(
+    series: str,
+    start_dt,
+    end_dt,
+    merge_within: Optional[pd.Timedelta] = None,
+) -> list[tuple[pd.Timestamp, pd.Timestamp]]:
+    """
+    Return the holes in [start_dt, end_dt) as (start, end) ranges, end exclusive.
+
+    Args:
+        series: Store series name
+        start_dt: Inclusive start
+        end_dt: Exclusive end
+        merge_within: Optional distance under which neighbouring holes are merged
+                      (fewer, larger downloads)
+
+    Returns:
+        List of (start, end) naive Timestamps, in order
+    """
+    index, expected = _grid(start_dt, end_dt)
+    missing = index[expected & ~_covered(_series_bits(series), index)]
+    merge_minutes = int(merge_within / pd.Timedelta(minutes=1)) if merge_within is not None else 0
+    return _ranges(missing, merge_minutes)
+
+
+def missing_days(series: str, start_dt, end_dt) -> list[date]:
+    """
+    Return the days in [start_dt, end_dt) with fewer values than expected intervals.
+
+    Counting per day, rather than checking each interval, treats a spring-forward
+    day as complete whichever hour its source leaves out.
+    """
+    index, expected = _grid(start_dt, end_dt)
+    if len(index) == 0:
+        return []
+    covered = _covered(_series_bits(series), index)
+    unique_days, codes = np.unique(interval_start(index) // 1440, return_inverse=True)
+    have = np.bincount(codes, weights=covered, minlength=len(unique_days))
+    need = np.bincount(codes, weights=expected, minlength=len(unique_days))
+    return [day.item() for day in unique_days[have < need].astype("datetime64[D]")]
+
+
+def coverage_report(start_dt=None, end_dt=None) -> pd.DataFrame:
+    """
+    Summarise the gaps of every tracked series.
+
+    Args:
+        start_dt: Optional start (default: each series' first covered interval)
+        end_dt: Optional exclusive end (default: the end of its last covered interval)
+
+    Returns:
+        DataFrame indexed by series with columns: start, end, expected, covered,
+        missing, coverage_pct, gaps, largest_gap
+    """
+    rows = []
+    for series, blob in _query_coverage(f"SELECT series, bits FROM {COVERAGE_TABLE} ORDER BY series"):
+        bits = _unpack(blob)
+        present = np.flatnonzero(bits)
+        if len(present) == 0:
+            continue
+        lo = pd.Timestamp(int(interval_start(present[0])) * 60, unit="s") if start_dt is None else pd.Timestamp(start_dt)
+        hi = pd.Timestamp(int(interval_start(present[-1] + 1)) * 60, unit="s") if end_dt is None else pd.Timestamp(end_dt)
+        index, expected = _grid(lo, hi)
+        covered = _covered(bits, index) & expected
+        holes = _ranges(index[expected & ~covered])
+        rows.append(
+            {
+                "series": series,
+                "start": lo,
+                "end": hi,
+                "expected": int(expected.sum()),
+                "covered": int(covered.sum()),
+                "missing": int(expected.sum() - covered.sum()),
+                "coverage_pct": 100.0 * covered.sum() / expected.sum() if expected.any() else 100.0,
+                "gaps": len(holes),
+                "largest_gap": max((end - start for start, end in holes), default=pd.Timedelta(0)),
+            }
+        )
+    columns = ["series", "start", "end", "expected", "covered", "missing", "coverage_pct", "gaps", "largest_gap"]
+    return pd.DataFrame(rows, columns=columns).set_index("series")
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Print the gaps report of the market price series.")
+    parser.add_argument("--start", type=str, help="Start date (YYYY-MM-DD), inclusive")
+    parser.add_argument("--end", type=str, help="End date (YYYY-MM-DD), exclusive")
+    parser.add_argument("--series", type=str, help="List the holes of one series")
+    parser.add_argument("--rebuild", action="store_true", help="Rebuild the bitmaps from price_store first")
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    if not DB_PATH.exists():
+        print(f"Database {DB_PATH} does not exist. Nothing to report.")
+        return
+    if args.rebuild:
+        start = time.perf_counter()
+        counts = rebuild_coverage()
+        print(f"✓ Rebuilt {len(counts)} coverage bitmap(s) in {time.perf_counter() - start:.1f}s")
+
+    start = time.perf_counter()
+    if args.series:
+        lo = args.start or "2018-01-01"
+        hi = args.end or pd.Timestamp.now().normalize().strftime("%Y-%m-%d")
+        holes = missing_ranges(args.series, lo, hi)
+        for hole_start, hole_end in holes:
+            print(f"  {hole_start} -> {hole_end} ({hole_end - hole_start})")
+        print(f"{args.series}: {len(holes)} hole(s) between {lo} and {hi} ({time.perf_counter() - start:.3f}s)")
+        return
+
+    report = coverage_report(args.start, args.end)
+    if report.empty:
+        print("No tracked series have data yet.")
+        return
+    for series, row in report.iterrows():
+        print(
+            f"  {series}: {row['coverage_pct']:.2f}% of {row['expected']} intervals "
+            f"({row['start']:%Y-%m-%d} to {row['end']:%Y-%m-%d}), "
+            f"{row['gaps']} gap(s), largest {row['largest_gap']}"
+        )
+    print(f"✓ Report built in {time.perf_counter() - start:.3f}s")
+
+
+if __name__ == "__main__":
+    main()
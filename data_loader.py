@@ -1,14 +1,17 @@
 """
 Unified data loading module for both historical and forecast data.
 """
-import sqlite3
 from datetime import datetime
 from typing import Literal, Optional
 
 import pandas as pd
 
-from db import DB_PATH
-from utils import parse_timestamp
+from db import reader
+from price_cache import cached, slice_by_datetime
+from price_store import has_series, price_frame, read_series, series_for_source
+from series_catalog import catalog_date_range
+from timestamps import parse_timestamps
+from utils import datetime_range_clause
 
 DataSource = Literal["historical_prices", "omie_da", "Aurora_Jun_2025", "Baringa_Q2_2025"]
 
@@ -45,6 +48,53 @@ def apply_inflation_to_forecasts(df: pd.DataFrame, inflation_rate: float, base_d
     return df
 
 
+def _load_legacy_price_data(
+    source: DataSource,
+    start_dt: Optional[pd.Timestamp] = None,
+    end_dt: Optional[pd.Timestamp] = None,
+) -> pd.DataFrame:
+    """Load a price source from the legacy historical_prices / forecasts tables."""
+    # Date range is pushed down to SQLite so only the requested rows are read
+    range_sql, range_params = datetime_range_clause(start_dt, end_dt)
+    try:
+        with reader() as conn:
+            if source == "historical_prices":
+                # Load historical ESIOS 600 prices
+                df = pd.read_sql(
+                    "SELECT datetime, year, month, day, hour, minute, ESIOS_600_DA_prices as price_eur_per_mwh "
+                    f"FROM historical_prices WHERE ESIOS_600_DA_prices IS NOT NULL{range_sql} ORDER BY datetime",
+                    conn,
+                    params=range_params,
+                )
+            elif source == "omie_da":
+                # Load historical OMIE day-ahead prices (Spain prices)
+                df = pd.read_sql(
+                    "SELECT datetime, year, month, day, hour, minute, OMIE_SP_DA_prices as price_eur_per_mwh "
+                    f"FROM historical_prices WHERE OMIE_SP_DA_prices IS NOT NULL{range_sql} ORDER BY datetime",
+                    conn,
+                    params=range_params,
+                )
+            else:
+                # Load forecast data (aurora or baringa)
+                df = pd.read_sql(
+                    "SELECT datetime, year, month, day, hour, minute, price_eur_per_mwh, source "
+                    f"FROM forecasts WHERE source = ?{range_sql} ORDER BY datetime",
+                    conn,
+                    params=[source, *range_params],
+                )
+    except Exception:
+        return pd.DataFrame()
+    
+    if df.empty:
+        return df
+    
+    # Parse datetimes in bulk (wall-clock time, offsets dropped)
+    parsed = parse_timestamps(df["datetime"])
+    df = df[parsed.notna()].copy()
+    df["datetime_parsed"] = parsed[parsed.notna()]
+    return df
+
+
 def load_price_data(
     source: DataSource,
     start_dt: Optional[pd.Timestamp] = None,
@@ -54,6 +104,9 @@ def load_price_data(
     """
     Load price data from either historical (historical_prices) or forecast (aurora/baringa) sources.
     
+    Migrated series are served from the shared in-memory cache (see price_cache);
+    otherwise the date range is applied in SQL on the legacy tables.
+    
     Args:
         source: Data source - "historical_prices" for historical, "Aurora_Jun_2025" or "Baringa_Q2_2025" for forecasts
         start_dt: Optional start datetime filter
@@ -62,50 +115,20 @@ def load_price_data(
     Returns:
         DataFrame with columns: datetime, datetime_parsed, year, month, day, hour, minute, price_eur_per_mwh
     """
-    conn = sqlite3.connect(DB_PATH)
-    
-    try:
-        if source == "historical_prices":
-            # Load historical ESIOS 600 prices
-            df = pd.read_sql(
-                "SELECT datetime, year, month, day, hour, minute, ESIOS_600_DA_prices as price_eur_per_mwh "
-                "FROM historical_prices WHERE ESIOS_600_DA_prices IS NOT NULL ORDER BY datetime",
-                conn
-            )
-        elif source == "omie_da":
-            # Load historical OMIE day-ahead prices (Spain prices)
-            df = pd.read_sql(
-                "SELECT datetime, year, month, day, hour, minute, OMIE_SP_DA_prices as price_eur_per_mwh "
-                "FROM historical_prices WHERE OMIE_SP_DA_prices IS NOT NULL ORDER BY datetime",
-                conn
-            )
-        else:
-            # Load forecast data (aurora or baringa)
-            df = pd.read_sql(
-                "SELECT datetime, year, month, day, hour, minute, price_eur_per_mwh, source "
-                "FROM forecasts WHERE source = ? ORDER BY datetime",
-                conn,
-                params=(source,)
-            )
-    except Exception:
-        return pd.DataFrame()
-    finally:
-        conn.close()
+    series = series_for_source(source)
+    if has_series(series):
+        # Columnar store: datetime64 index straight from the integer key
+        # Full series is cached per data version; the date range is a row slice of it
+        full = cached("price_frame", series, lambda: price_frame(read_series(series)))
+        df = slice_by_datetime(full, start_dt, end_dt, column="datetime_parsed")
+        if source not in ("historical_prices", "omie_da"):
+            df["source"] = source
+    else:
+        df = _load_legacy_price_data(source, start_dt, end_dt)
     
     if df.empty:
         return df
     
-    # Parse datetime using shared utility
-    parsed = df["datetime"].apply(parse_timestamp)
-    df = df[parsed.notna()].copy()
-    df["datetime_parsed"] = parsed[parsed.notna()]
-    
-    # Apply date filters if provided
-    if start_dt is not None:
-        df = df[df["datetime_parsed"] >= pd.to_datetime(start_dt)]
-    if end_dt is not None:
-        df = df[df["datetime_parsed"] <= pd.to_datetime(end_dt)]
-    
     # Apply inflation to forecasts (not historical data)
     if source not in ("historical_prices", "omie_da") and inflation_rate > 0.0:
         df = apply_inflation_to_forecasts(df, inflation_rate)
@@ -120,37 +143,11 @@ def get_data_source_date_range(source: DataSource) -> tuple[pd.Timestamp, pd.Tim
     Returns:
         Tuple of (min_datetime, max_datetime)
     """
-    conn = sqlite3.connect(DB_PATH)
-    
-    try:
-        if source == "historical_prices":
-            query = "SELECT MIN(datetime) as min_dt, MAX(datetime) as max_dt FROM historical_prices WHERE ESIOS_600_DA_prices IS NOT NULL"
-            df = pd.read_sql(query, conn)
-        elif source == "omie_da":
-            query = "SELECT MIN(datetime) as min_dt, MAX(datetime) as max_dt FROM historical_prices WHERE OMIE_SP_DA_prices IS NOT NULL"
-            df = pd.read_sql(query, conn)
-        else:
-            query = "SELECT MIN(datetime) as min_dt, MAX(datetime) as max_dt FROM forecasts WHERE source = ?"
-            params = (source,)
-            df = pd.read_sql(query, conn, params=params)
-        
-        if df.empty or df.iloc[0]["min_dt"] is None:
-            return pd.Timestamp("2018-01-01"), pd.Timestamp.now()
-        
-        min_str = str(df.iloc[0]["min_dt"])
-        max_str = str(df.iloc[0]["max_dt"])
-        
-        min_dt = parse_timestamp(min_str)
-        max_dt = parse_timestamp(max_str)
-        
-        if min_dt is None or max_dt is None:
-            return pd.Timestamp("2018-01-01"), pd.Timestamp.now()
-        
-        return pd.Timestamp(min_dt), pd.Timestamp(max_dt)
-    except Exception:
+    # Read from the series catalog; nothing is scanned per call
+    date_range = catalog_date_range(series_for_source(source))
+    if date_range is None:
         return pd.Timestamp("2018-01-01"), pd.Timestamp.now()
-    finally:
-        conn.close()
+    return date_range
 
 
 def get_default_date_range(source: DataSource, min_dt: pd.Timestamp, max_dt: pd.Timestamp) -> tuple[pd.Timestamp, pd.Timestamp]:
@@ -1,12 +1,360 @@
+"""
+SQLite access for the app and the ingest scripts.
+
+All modules get their connections here instead of calling sqlite3.connect:
+- reader(): read-only connections from a small pool. They are reused across
+  Streamlit reruns and sessions, and a thread reuses the one it already holds
+  when calls nest. Processes that called use_published_db() (the dashboard
+  pages) read the published copy built by publish.py instead, opened
+  immutable so reads take no locks at all.
+- writer(): the single write connection. Writers are serialised by a
+  process-wide lock, and the transaction commits when the outermost block
+  exits (or rolls back on error).
+- connect(): a one-off connection with the same settings, for maintenance
+  scripts. connect_reader() is the one-off counterpart of reader(), for
+  generators that cannot hold a pooled connection.
+
+Every connection uses the same pragmas (mmap, a larger page cache, in-memory
+temp tables) and times its statements; query_stats() returns the totals.
+"""
+import os
 import sqlite3
+import threading
+import time
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Optional
+from typing import Callable, Iterator, Optional
 
 import pandas as pd
 
+from timestamps import format_timestamps
+
 
 DATA_DIR = Path("data")
 DB_PATH = DATA_DIR / "data.db"
+# Read-optimised copy of DB_PATH for the dashboard (see publish.py)
+PUBLISHED_DB_PATH = DATA_DIR / "data.published.db"
+
+# Set PUBLISHED_DB=0 to make the dashboard read the live database
+PUBLISHED_DB_ENABLED = os.getenv("PUBLISHED_DB", "1") not in ("", "0")
+
+# Connection settings
+READ_POOL_SIZE = 8
+SQLITE_TIMEOUT_SECONDS = 30.0
+SQLITE_MMAP_BYTES = 256 * 1024 * 1024
+SQLITE_CACHE_KIB = 64 * 1024
+
+
+_stats_lock = threading.Lock()
+# Normalised SQL -> [calls, total seconds, max seconds]
+_query_stats: dict[str, list] = {}
+
+
+def _record_query(sql: str, seconds: float, calls: int = 1) -> None:
+    key = " ".join(sql.split())
+    with _stats_lock:
+        entry = _query_stats.setdefault(key, [0, 0.0, 0.0])
+        entry[0] += calls
+        entry[1] += seconds
+        entry[2] = max(entry[2], seconds)
+
+
+class TimedCursor(sqlite3.Cursor):
+    """Cursor recording execute and fetch time per statement."""
+
+    _sql = ""
+
+    def execute(self, sql, parameters=(), /):
+        self._sql = sql
+        start = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            _record_query(sql, time.perf_counter() - start)
+
+    def executemany(self, sql, seq_of_parameters, /):
+        self._sql = sql
+        start = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            _record_query(sql, time.perf_counter() - start)
+
+    def fetchmany(self, size=None):
+        start = time.perf_counter()
+        try:
+            return super().fetchmany(self.arraysize if size is None else size)
+        finally:
+            _record_query(self._sql, time.perf_counter() - start, calls=0)
+
+    def fetchall(self):
+        start = time.perf_counter()
+        try:
+            return super().fetchall()
+        finally:
+            _record_query(self._sql, time.perf_counter() - start, calls=0)
+
+
+class TimedConnection(sqlite3.Connection):
+    """Connection whose cursors (and pd.read_sql queries) are timed."""
+
+    # (resolved path, inode) the connection was opened on
+    pool_key: tuple = ()
+
+    def cursor(self, factory=TimedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=(), /):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters, /):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+
+_read_published = False
+
+
+def use_published_db(enabled: bool = True) -> None:
+    """
+    Make reader() use the published copy of the database in this process.
+
+    Called by the dashboard pages. Falls back to the live database while no
+    copy has been published (or with PUBLISHED_DB=0). Ingest scripts keep
+    reading the live database so they see their own writes.
+    """
+    global _read_published
+    _read_published = enabled
+
+
+def _read_path() -> Path:
+    if _read_published and PUBLISHED_DB_ENABLED and PUBLISHED_DB_PATH.exists():
+        return PUBLISHED_DB_PATH
+    return DB_PATH
+
+
+def _db_key(path: Optional[Path] = None) -> tuple:
+    """Resolved DB path and inode, so a replaced file gets fresh connections."""
+    path = (path or DB_PATH).resolve()
+    try:
+        return str(path), os.stat(path).st_ino
+    except FileNotFoundError:
+        return str(path), None
+
+
+def _open(read_only: bool, path: Optional[Path] = None) -> TimedConnection:
+    path = path or DB_PATH
+    if read_only:
+        uri = f"{path.resolve().as_uri()}?mode=ro"
+        if path == PUBLISHED_DB_PATH:
+            # Published copies are never modified in place (publish.py swaps
+            # in a new file), so SQLite can skip locking and change detection
+            uri += "&immutable=1"
+        conn = sqlite3.connect(
+            uri, uri=True, timeout=SQLITE_TIMEOUT_SECONDS, check_same_thread=False, factory=TimedConnection
+        )
+    else:
+        DATA_DIR.mkdir(exist_ok=True)
+        conn = sqlite3.connect(
+            DB_PATH, timeout=SQLITE_TIMEOUT_SECONDS, check_same_thread=False, factory=TimedConnection
+        )
+        # WAL lets the dashboard keep reading while a backfill writes, and
+        # synchronous=NORMAL only syncs at checkpoints instead of every commit
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute(f"PRAGMA mmap_size={SQLITE_MMAP_BYTES}")
+    conn.execute(f"PRAGMA cache_size=-{SQLITE_CACHE_KIB}")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    conn.pool_key = _db_key(path)
+    return conn
+
+
+def connect(read_only: bool = False) -> sqlite3.Connection:
+    """
+    Open a standalone connection with the shared settings.
+
+    For maintenance scripts; the caller commits and closes it.
+
+    Args:
+        read_only: Open the database read-only
+
+    Returns:
+        A new connection to DB_PATH
+    """
+    return _open(read_only)
+
+
+def connect_reader() -> sqlite3.Connection:
+    """
+    Open a standalone read-only connection to the database reader() reads.
+
+    For readers that cannot hold a pooled connection, such as generators
+    that may be suspended between chunks or abandoned; the caller closes it.
+
+    Returns:
+        A new connection to DB_PATH, or to PUBLISHED_DB_PATH (immutable)
+        after use_published_db()
+    """
+    return _open(read_only=True, path=_read_path())
+
+
+_pool_lock = threading.Lock()
+# (resolved path, inode) -> idle read-only connections
+_read_pool: dict[tuple, list[TimedConnection]] = {}
+_local = threading.local()
+
+
+def _checkout() -> TimedConnection:
+    path = _read_path()
+    key = _db_key(path)
+    with _pool_lock:
+        # Idle connections to a replaced file would keep it open on disk
+        for stale in [k for k in _read_pool if k != key]:
+            for conn in _read_pool.pop(stale):
+                conn.close()
+        idle = _read_pool.get(key)
+        if idle:
+            return idle.pop()
+    return _open(read_only=True, path=path)
+
+
+def _checkin(conn: TimedConnection) -> None:
+    if conn.pool_key == _db_key(_read_path()):
+        with _pool_lock:
+            idle = _read_pool.setdefault(conn.pool_key, [])
+            if len(idle) < READ_POOL_SIZE:
+                idle.append(conn)
+                return
+    conn.close()
+
+
+@contextmanager
+def reader() -> Iterator[sqlite3.Connection]:
+    """
+    Borrow a read-only connection from the pool.
+
+    Nested calls in the same thread share the outer connection.
+
+    Yields:
+        A read-only connection to DB_PATH, or to PUBLISHED_DB_PATH after
+        use_published_db() (do not close it)
+    """
+    held = getattr(_local, "reader", None)
+    if held is not None:
+        yield held
+        return
+    conn = _checkout()
+    _local.reader = conn
+    try:
+        yield conn
+    finally:
+        _local.reader = None
+        _checkin(conn)
+
+
+def query_live(sql: str, params: tuple = (), build: Optional[Callable[[], object]] = None) -> list[tuple]:
+    """
+    Run a read query on the live database, bypassing the published copy.
+
+    For tables derived on first use: the published copy is read-only, so a
+    copy made before such a table existed can only be read through the live
+    database until the next publish.
+
+    Args:
+        sql: Query to run
+        params: Query parameters
+        build: Called once to create the table if the query finds it missing
+
+    Returns:
+        The query's rows
+    """
+    for attempt in range(2):
+        conn = _open(read_only=True)
+        try:
+            return conn.execute(sql, params).fetchall()
+        except sqlite3.OperationalError as exc:
+            if attempt or build is None or "no such table" not in str(exc):
+                raise
+        finally:
+            conn.close()
+        build()
+    return []
+
+
+_writer_lock = threading.RLock()
+_writer_conn: Optional[TimedConnection] = None
+
+
+@contextmanager
+def writer() -> Iterator[sqlite3.Connection]:
+    """
+    Hold the write connection for one transaction.
+
+    Writers in other threads wait for the lock. Nested calls share the
+    transaction, which commits when the outermost block exits and rolls
+    back if it raises.
+
+    Yields:
+        The write connection to DB_PATH (do not commit or close it)
+    """
+    global _writer_conn
+    with _writer_lock:
+        depth = getattr(_local, "writer_depth", 0)
+        if _writer_conn is None or _writer_conn.pool_key != _db_key():
+            if _writer_conn is not None:
+                _writer_conn.close()
+            _writer_conn = _open(read_only=False)
+            # Transactions are opened explicitly below, so schema changes
+            # roll back together with the data
+            _writer_conn.isolation_level = None
+        conn = _writer_conn
+        if depth == 0:
+            # Take the write lock up front rather than upgrading mid-transaction
+            conn.execute("BEGIN IMMEDIATE")
+        _local.writer_depth = depth + 1
+        try:
+            yield conn
+            if depth == 0:
+                conn.execute("COMMIT")
+        except BaseException:
+            if depth == 0 and conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
+        finally:
+            _local.writer_depth = depth
+
+
+def close_connections() -> None:
+    """Close the pooled readers and the writer (e.g. before replacing the DB file)."""
+    global _writer_conn
+    with _pool_lock:
+        for idle in _read_pool.values():
+            for conn in idle:
+                conn.close()
+        _read_pool.clear()
+    with _writer_lock:
+        if _writer_conn is not None:
+            _writer_conn.close()
+            _writer_conn = None
+
+
+def query_stats() -> pd.DataFrame:
+    """
+    Return per-statement timing collected since start-up (or the last reset).
+
+    Returns:
+        DataFrame with sql, calls, total_s, mean_s and max_s, slowest total first
+    """
+    with _stats_lock:
+        rows = [(sql, calls, total, peak) for sql, (calls, total, peak) in _query_stats.items()]
+    df = pd.DataFrame(rows, columns=["sql", "calls", "total_s", "max_s"])
+    df["mean_s"] = df["total_s"] / df["calls"].where(df["calls"] > 0)
+    return df[["sql", "calls", "total_s", "mean_s", "max_s"]].sort_values("total_s", ascending=False, ignore_index=True)
+
+
+def reset_query_stats() -> None:
+    """Clear the collected query timings."""
+    with _stats_lock:
+        _query_stats.clear()
 
 
 def get_table_name(indicator_id: int) -> str:
@@ -23,26 +371,21 @@ def get_table_name(indicator_id: int) -> str:
 
 def init_db(indicator_id: int) -> None:
     """Create the SQLite database and table for the indicator if they do not exist."""
-    DATA_DIR.mkdir(exist_ok=True)
-    conn = sqlite3.connect(DB_PATH)
-    cur = conn.cursor()
-
     table = get_table_name(indicator_id)
-    cur.execute(
-        f"""
-        CREATE TABLE IF NOT EXISTS {table} (
-            datetime TEXT PRIMARY KEY,
-            year INTEGER,
-            month INTEGER,
-            day INTEGER,
-            hour INTEGER,
-            minute INTEGER,
-            price_eur_per_mwh REAL
+    with writer() as conn:
+        conn.execute(
+            f"""
+            CREATE TABLE IF NOT EXISTS {table} (
+                datetime TEXT PRIMARY KEY,
+                year INTEGER,
+                month INTEGER,
+                day INTEGER,
+                hour INTEGER,
+                minute INTEGER,
+                price_eur_per_mwh REAL
+            )
+            """
         )
-        """
-    )
-    conn.commit()
-    conn.close()
 
 
 def get_latest_datetime(indicator_id: int) -> Optional[str]:
@@ -52,18 +395,13 @@ def get_latest_datetime(indicator_id: int) -> Optional[str]:
     if not DB_PATH.exists():
         return None
 
-    conn = sqlite3.connect(DB_PATH)
-    cur = conn.cursor()
     table = get_table_name(indicator_id)
-    try:
-        cur.execute(f"SELECT MAX(datetime) FROM {table}")
-    except sqlite3.OperationalError:
-        # Table doesn't exist yet
-        conn.close()
-        return None
-
-    row = cur.fetchone()
-    conn.close()
+    with reader() as conn:
+        try:
+            row = conn.execute(f"SELECT MAX(datetime) FROM {table}").fetchone()
+        except sqlite3.OperationalError:
+            # Table doesn't exist yet
+            return None
 
     if row is None or row[0] is None:
         return None
@@ -77,50 +415,14 @@ def insert_prices(df: pd.DataFrame, indicator_id: int) -> None:
     Expects columns: datetime, year, month, day, hour, minute, price_eur_per_mwh.
     Uses INSERT OR REPLACE on the datetime primary key.
     """
-    conn = sqlite3.connect(DB_PATH)
-    cur = conn.cursor()
-
     table = get_table_name(indicator_id)
 
     # Ensure we are writing simple strings for the datetime column.
     # Standardize datetime format to "YYYY-MM-DD HH:MM:SS"
     df_to_write = df.copy()
-    
-    def standardize_datetime(ts):
-        """Convert datetime to standardized format."""
-        ts_str = str(ts)
-        # Handle ISO format with T and Z
-        if "T" in ts_str:
-            ts_str = ts_str.replace("T", " ")
-        if ts_str.endswith("Z"):
-            ts_str = ts_str[:-1]
-        if "+" in ts_str:
-            ts_str = ts_str.split("+")[0]
-        # Parse and reformat
-        try:
-            from datetime import datetime
-            formats = [
-                "%Y-%m-%d %H:%M:%S",
-                "%Y-%m-%dT%H:%M:%S",
-                "%Y-%m-%dT%H:%M:%SZ",
-                "%Y-%m-%d %H:%M:%S.%f",
-                "%Y-%m-%dT%H:%M:%S.%fZ",
-            ]
-            for fmt in formats:
-                try:
-                    dt = datetime.strptime(ts_str, fmt)
-                    return dt.strftime("%Y-%m-%d %H:%M:%S")
-                except ValueError:
-                    continue
-            # Fallback to fromisoformat
-            dt = datetime.fromisoformat(ts_str.replace("Z", "+00:00"))
-            if dt.tzinfo:
-                dt = dt.replace(tzinfo=None)
-            return dt.strftime("%Y-%m-%d %H:%M:%S")
-        except Exception:
-            return ts_str  # Return original if parsing fails
-    
-    df_to_write["datetime"] = df_to_write["datetime"].apply(standardize_datetime)
+    canonical = format_timestamps(df_to_write["datetime"])
+    # Keep the original value if it cannot be parsed
+    df_to_write["datetime"] = canonical.where(canonical.notna(), df_to_write["datetime"].astype(str))
 
     rows = list(
         df_to_write[
@@ -136,15 +438,68 @@ def insert_prices(df: pd.DataFrame, indicator_id: int) -> None:
         ].itertuples(index=False, name=None)
     )
 
-    cur.executemany(
-        f"""
-        INSERT OR REPLACE INTO {table}
-        (datetime, year, month, day, hour, minute, price_eur_per_mwh)
-        VALUES (?, ?, ?, ?, ?, ?, ?)
-        """,
-        rows,
-    )
-    conn.commit()
-    conn.close()
+    from price_store import series_for_indicator, upsert_series
+
+    with writer() as conn:
+        conn.executemany(
+            f"""
+            INSERT OR REPLACE INTO {table}
+            (datetime, year, month, day, hour, minute, price_eur_per_mwh)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            """,
+            rows,
+        )
+
+        # Keep the columnar store in step with the legacy table
+        upsert_series(df_to_write, {"price_eur_per_mwh": series_for_indicator(indicator_id)}, conn=conn)
+
 
 
+
+CHECKPOINTS_TABLE = "backfill_checkpoints"
+
+
+def init_checkpoints() -> None:
+    """Create the table recording completed backfill chunks if it does not exist."""
+    with writer() as conn:
+        conn.execute(
+            f"""
+            CREATE TABLE IF NOT EXISTS {CHECKPOINTS_TABLE} (
+                indicator_id INTEGER,
+                chunk_start TEXT,
+                chunk_end TEXT,
+                rows INTEGER,
+                completed_at TEXT,
+                PRIMARY KEY (indicator_id, chunk_start, chunk_end)
+            )
+            """
+        )
+
+
+def get_completed_chunks(indicator_id: int) -> set[tuple[str, str]]:
+    """Return the (chunk_start, chunk_end) ISO pairs already backfilled for this indicator."""
+    if not DB_PATH.exists():
+        return set()
+    with reader() as conn:
+        try:
+            cur = conn.execute(
+                f"SELECT chunk_start, chunk_end FROM {CHECKPOINTS_TABLE} WHERE indicator_id = ?",
+                (indicator_id,),
+            )
+            return set(cur.fetchall())
+        except sqlite3.OperationalError:
+            # Table doesn't exist yet
+            return set()
+
+
+def mark_chunk_completed(indicator_id: int, chunk_start: str, chunk_end: str, rows: int) -> None:
+    """Record a backfill chunk as done so a restarted run skips it."""
+    with writer() as conn:
+        conn.execute(
+            f"""
+            INSERT OR REPLACE INTO {CHECKPOINTS_TABLE}
+            (indicator_id, chunk_start, chunk_end, rows, completed_at)
+            VALUES (?, ?, ?, ?, datetime('now'))
+            """,
+            (indicator_id, chunk_start, chunk_end, rows),
+        )
@@ -1,11 +1,25 @@
+import threading
+import time
 from datetime import datetime
-from typing import Any, Dict, Optional
+from typing import Any, Callable, Dict, Optional
 
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 from config import EsiosConfig, HEADERS
 
 
+# (connect, read) timeout in seconds for every ESIOS request
+DEFAULT_TIMEOUT = (10, 120)
+
+# Responses worth retrying: rate limited or transient server errors
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+_default_session: Optional[requests.Session] = None
+_default_session_lock = threading.Lock()
+
+
 def iso_with_z(dt: datetime) -> str:
     """Format a naive or offset-aware datetime as ISO 8601 with Z suffix."""
     if dt.tzinfo is None:
@@ -13,18 +27,101 @@ def iso_with_z(dt: datetime) -> str:
     return dt.astimezone(tz=None).isoformat().replace("+00:00", "Z")
 
 
+def make_session(pool_size: int = 10, retries: int = 5, backoff_factor: float = 1.0) -> requests.Session:
+    """
+    Create a pooled session that retries 429/5xx responses with exponential backoff.
+
+    Args:
+        pool_size: Maximum number of kept-alive connections (use at least the worker count)
+        retries: Maximum number of retries per request
+        backoff_factor: Base delay in seconds; waits grow as backoff_factor * 2 ** (retry - 1).
+            A Retry-After header sent by the server takes precedence.
+
+    Returns:
+        requests.Session with the retrying adapter mounted for http and https
+    """
+    retry = Retry(
+        total=retries,
+        backoff_factor=backoff_factor,
+        status_forcelist=RETRY_STATUSES,
+        allowed_methods=frozenset(["GET"]),
+        respect_retry_after_header=True,
+        # Hand back the last response so raise_for_status reports the real status
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+    session = requests.Session()
+    session.headers.update(HEADERS)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def _get_default_session() -> requests.Session:
+    global _default_session
+    with _default_session_lock:
+        if _default_session is None:
+            _default_session = make_session()
+        return _default_session
+
+
+class TokenBucket:
+    """
+    Thread-safe token-bucket rate limiter.
+
+    Tokens refill at ``rate`` per second up to ``capacity``; acquire() blocks
+    until a token is available, so bursts are capped at ``capacity`` requests.
+    ``clock`` and ``sleep`` default to time.monotonic and time.sleep (tests
+    pass a simulated clock).
+    """
+
+    def __init__(
+        self,
+        rate: float,
+        capacity: float = 1.0,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+    ):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = rate
+        self.capacity = max(capacity, 1.0)
+        self._clock = clock
+        self._sleep = sleep
+        self._tokens = self.capacity
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        """Take one token, sleeping until one is available."""
+        while True:
+            with self._lock:
+                now = self._clock()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                # Tolerance: refilling after sleeping exactly `wait` can land a
+                # rounding error short of a whole token
+                if self._tokens >= 1.0 - 1e-9:
+                    self._tokens = max(self._tokens - 1.0, 0.0)
+                    return
+                wait = (1.0 - self._tokens) / self.rate
+            self._sleep(wait)
+
+
 def get_indicator_data(
     indicator_id: int,
     start: str,
     end: str,
     time_trunc: Optional[str] = None,
     session: Optional[requests.Session] = None,
+    timeout=DEFAULT_TIMEOUT,
 ) -> Dict[str, Any]:
     """
     Fetch raw indicator data from ESIOS.
 
     - ``start`` and ``end`` must be ISO 8601 strings with a timezone (e.g. ``2025-01-01T00:00:00Z``).
     - ``time_trunc`` can be ``hour`` or ``quarter`` (15-minute), or None for native resolution.
+    - Without ``session``, a shared pooled session with retries (see make_session) is used.
     """
     cfg = EsiosConfig()
     url = f"{cfg.base_url}/indicators/{indicator_id}"
@@ -36,9 +133,7 @@ def get_indicator_data(
     if time_trunc:
         params["time_trunc"] = time_trunc
 
-    client = session or requests
-    resp = client.get(url, headers=HEADERS, params=params)
+    client = session or _get_default_session()
+    resp = client.get(url, headers=HEADERS, params=params, timeout=timeout)
     resp.raise_for_status()
     return resp.json()
-
-
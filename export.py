@@ -0,0 +1,342 @@
+"""
+Streaming export of raw data for downloads and the command line.
+
+Exports are written chunk by chunk (CSV, gzip-compressed CSV or Parquet) to
+a file instead of building the whole CSV string in memory, so peak memory is
+one chunk plus the output file regardless of the date range. Chunks come
+either from a DataFrame the page already holds or straight from the
+``price_store`` table. CSV datetimes are formatted per chunk with
+utils.format_datetime_for_csv.
+
+On the pages, an export is only written after the user asks for it
+("Prepare export"). The file is kept on disk, keyed on its data, columns
+and format, and reruns serve it without writing it again. Streamlit loads
+the file into memory to serve the download button. So the flat peak memory
+holds for writing the file, and for the command line. A page holds one
+copy of the finished file while its download button is shown.
+
+Usage:
+    python export.py --series OMIE_SP --start 2018-01-01 --end 2025-12-31 --format csv.gz
+"""
+import argparse
+import gzip
+import hashlib
+import importlib.util
+import os
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Iterable, Iterator, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+from data_loader import apply_inflation_to_forecasts
+from db import _read_path, connect_reader
+from price_store import PRICE_STORE_TABLE, _store_columns, from_epoch_minutes, price_frame, to_epoch_minutes
+from utils import format_datetime_for_csv
+
+
+DEFAULT_CHUNK_ROWS = 100_000
+# zlib level 6: near level-9 size at a fraction of the time (9 is gzip.open's default)
+GZIP_COMPRESSLEVEL = 6
+
+# Export format -> (file suffix, MIME type)
+EXPORT_FORMATS = {
+    "csv": (".csv", "text/csv"),
+    "csv.gz": (".csv.gz", "application/gzip"),
+    "parquet": (".parquet", "application/vnd.apache.parquet"),
+}
+
+# Exports prepared on the pages; files older than EXPORT_MAX_AGE_HOURS are removed
+EXPORT_DIR = Path(tempfile.gettempdir()) / "spain_energy_exports"
+EXPORT_MAX_AGE_HOURS = 24
+
+# Builds the chunks for the selected columns (None = all columns)
+ChunkSource = Callable[[Optional[list[str]]], Iterable[pd.DataFrame]]
+
+
+def available_formats() -> list[str]:
+    """Return the export formats usable here (Parquet needs pyarrow)."""
+    # Only check that pyarrow is installed; importing it is left to Parquet exports
+    has_pyarrow = importlib.util.find_spec("pyarrow") is not None
+    return [fmt for fmt in EXPORT_FORMATS if fmt != "parquet" or has_pyarrow]
+
+
+def iter_frame_chunks(
+    df: pd.DataFrame,
+    columns: Optional[list[str]] = None,
+    chunk_rows: int = DEFAULT_CHUNK_ROWS,
+) -> Iterator[pd.DataFrame]:
+    """
+    Yield consecutive row slices of a DataFrame.
+
+    Args:
+        df: DataFrame to export
+        columns: Optional subset of columns (in export order)
+        chunk_rows: Rows per chunk
+
+    Yields:
+        DataFrames of at most chunk_rows rows
+    """
+    if columns is not None:
+        df = df[[c for c in columns if c in df.columns]]
+    if df.empty:
+        # Still yield the (empty) frame, so CSV exports get their header row
+        yield df
+        return
+    for start in range(0, len(df), chunk_rows):
+        yield df.iloc[start:start + chunk_rows]
+
+
+def iter_store_chunks(
+    series: str,
+    start_dt: Optional[pd.Timestamp] = None,
+    end_dt: Optional[pd.Timestamp] = None,
+    columns: Optional[list[str]] = None,
+    inflation_rate: float = 0.0,
+    chunk_rows: int = DEFAULT_CHUNK_ROWS,
+) -> Iterator[pd.DataFrame]:
+    """
+    Yield a price_store series in the price_frame shape, one chunk at a time.
+
+    Rows are paged on the integer ts key, so only one chunk is held in memory.
+
+    Args:
+        series: Store series name (see price_store.series_for_source)
+        start_dt: Optional inclusive start datetime
+        end_dt: Optional inclusive end datetime
+        columns: Optional subset of price_frame columns (in export order)
+        inflation_rate: Annual inflation applied as in data_loader.load_price_data (0 = none)
+        chunk_rows: Rows per chunk
+
+    Yields:
+        DataFrames with the price_frame columns (or the selected subset)
+    """
+    if not _read_path().exists():
+        return
+    # One base date for the whole export, so chunks are inflated consistently
+    base_date = pd.Timestamp.now()
+    lo = int(to_epoch_minutes([start_dt])[0]) if start_dt is not None else None
+    hi = int(to_epoch_minutes([end_dt])[0]) if end_dt is not None else None
+
+    # Own connection rather than a pooled one: the generator may be
+    # suspended between chunks or abandoned part-way. It reads the same
+    # database as reader() (the published copy on the pages)
+    conn = connect_reader()
+    try:
+        cur = conn.cursor()
+        if series not in _store_columns(cur):
+            return
+        query = f'SELECT ts, "{series}" FROM {PRICE_STORE_TABLE} WHERE "{series}" IS NOT NULL AND ts > ?'
+        params: list = []
+        if hi is not None:
+            query += " AND ts <= ?"
+            params.append(hi)
+        query += " ORDER BY ts LIMIT ?"
+        last = lo - 1 if lo is not None else np.iinfo(np.int64).min
+        while True:
+            cur.execute(query, [last, *params, chunk_rows])
+            rows = cur.fetchall()
+            if not rows:
+                break
+            data = np.array(rows, dtype=np.float64)
+            ts = data[:, 0].astype(np.int64)
+            last = int(ts[-1])
+            chunk = price_frame(pd.Series(data[:, 1], index=from_epoch_minutes(ts), name=series))
+            if inflation_rate > 0.0:
+                chunk = apply_inflation_to_forecasts(chunk, inflation_rate, base_date=base_date)
+            if columns is not None:
+                chunk = chunk[[c for c in columns if c in chunk.columns]]
+            yield chunk
+            if len(rows) < chunk_rows:
+                break
+    finally:
+        conn.close()
+
+
+def _write_csv(chunks: Iterable[pd.DataFrame], handle) -> int:
+    rows = 0
+    header = True
+    for chunk in chunks:
+        chunk = format_datetime_for_csv(chunk)
+        chunk.to_csv(handle, header=header, index=False)
+        header = False
+        rows += len(chunk)
+    return rows
+
+
+def _write_parquet(chunks: Iterable[pd.DataFrame], path: Path) -> int:
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:  # Parquet export is optional
+        raise RuntimeError("Parquet export requires pyarrow (pip install pyarrow)") from None
+    rows = 0
+    writer = None
+    try:
+        for chunk in chunks:
+            if writer is None:
+                table = pa.Table.from_pandas(chunk, preserve_index=False)
+                writer = pq.ParquetWriter(path, table.schema)
+            else:
+                table = pa.Table.from_pandas(chunk, schema=writer.schema, preserve_index=False)
+            writer.write_table(table)
+            rows += len(chunk)
+    finally:
+        if writer is not None:
+            writer.close()
+    return rows
+
+
+def write_export(chunks: Iterable[pd.DataFrame], path: Union[str, Path], fmt: str = "csv") -> int:
+    """
+    Write chunks to a file in the given format.
+
+    The file is written under a temporary name and renamed into place, so a
+    failed export never leaves a truncated file behind.
+
+    Args:
+        chunks: DataFrames with identical columns
+        path: Output file path
+        fmt: One of EXPORT_FORMATS
+
+    Returns:
+        Number of rows written
+    """
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format: {fmt}")
+    path = Path(path)
+    tmp_path = path.with_name(f".{path.name}.tmp")
+    try:
+        if fmt == "parquet":
+            rows = _write_parquet(chunks, tmp_path)
+        elif fmt == "csv.gz":
+            with gzip.open(tmp_path, "wt", compresslevel=GZIP_COMPRESSLEVEL, encoding="utf-8", newline="") as handle:
+                rows = _write_csv(chunks, handle)
+        else:
+            with open(tmp_path, "w", encoding="utf-8", newline="") as handle:
+                rows = _write_csv(chunks, handle)
+        if fmt == "parquet" and rows == 0:
+            # No chunks: an empty file rather than an invalid Parquet footer
+            tmp_path.touch()
+        os.replace(tmp_path, path)
+    finally:
+        if tmp_path.exists():
+            tmp_path.unlink()
+    return rows
+
+
+def _prepared_export_path(
+    data: Union[pd.DataFrame, ChunkSource],
+    file_stem: str,
+    columns: list[str],
+    fmt: str,
+    key: str,
+    data_key: str,
+) -> Path:
+    """Path of the prepared export for this data, column selection and format."""
+    digest = hashlib.sha1(f"{file_stem}|{columns}|{fmt}|{data_key}".encode())
+    if isinstance(data, pd.DataFrame):
+        # Frames are hashed, so a filter change on the page prepares a new file
+        digest.update(pd.util.hash_pandas_object(data[columns], index=False).to_numpy().tobytes())
+    return EXPORT_DIR / f"{key}_{digest.hexdigest()[:16]}{EXPORT_FORMATS[fmt][0]}"
+
+
+def _prune_exports() -> None:
+    """Remove prepared exports older than EXPORT_MAX_AGE_HOURS."""
+    cutoff = time.time() - EXPORT_MAX_AGE_HOURS * 3600
+    for path in EXPORT_DIR.glob("*"):
+        try:
+            if path.stat().st_mtime < cutoff:
+                path.unlink()
+        except FileNotFoundError:
+            pass
+
+
+def export_download_button(
+    label: str,
+    data: Union[pd.DataFrame, ChunkSource],
+    file_stem: str,
+    columns: list[str],
+    key: str,
+    data_key: str = "",
+) -> None:
+    """
+    Render column/format pickers, a "Prepare export" button and the download button.
+
+    The export is written once, when the user prepares it, and served from
+    the prepared file on later reruns (see module docstring).
+
+    Args:
+        label: Download button label
+        data: DataFrame already held by the page, or a callable returning the
+              chunks for the selected columns (e.g. from iter_store_chunks)
+        file_stem: File name without suffix
+        columns: Exportable columns, all selected by default
+        key: Unique widget key prefix for the page
+        data_key: Identifies what a callable data source returns beyond
+                  file_stem (e.g. inflation rate and data version); DataFrames
+                  are hashed instead
+    """
+    import streamlit as st
+
+    col1, col2 = st.columns([3, 1])
+    selected = col1.multiselect("Columns", options=columns, default=columns, key=f"{key}_columns")
+    fmt = col2.selectbox("Format", options=available_formats(), key=f"{key}_format")
+    if not selected:
+        st.info("Select at least one column to export.")
+        return
+
+    path = _prepared_export_path(data, file_stem, selected, fmt, key, data_key)
+    if not path.exists():
+        if not st.button("Prepare export", key=f"{key}_prepare"):
+            return
+        EXPORT_DIR.mkdir(parents=True, exist_ok=True)
+        _prune_exports()
+        if isinstance(data, pd.DataFrame):
+            chunks = iter_frame_chunks(data, selected)
+        else:
+            chunks = data(selected)
+        with st.spinner("Preparing export..."):
+            write_export(chunks, path, fmt)
+
+    suffix, mime = EXPORT_FORMATS[fmt]
+    with open(path, "rb") as handle:
+        st.download_button(
+            label=label,
+            data=handle,
+            file_name=f"{file_stem}{suffix}",
+            mime=mime,
+            key=f"{key}_download",
+        )
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Export a price_store series to CSV, gzip CSV or Parquet.")
+    parser.add_argument("--series", required=True, help="Store series name (e.g. OMIE_SP, ESIOS_600, Aurora_Jun_2025)")
+    parser.add_argument("--start", type=str, help="Start date (YYYY-MM-DD), inclusive")
+    parser.add_argument("--end", type=str, help="End date (YYYY-MM-DD), inclusive")
+    parser.add_argument("--format", choices=list(EXPORT_FORMATS), default="csv", help="Output format")
+    parser.add_argument("--columns", type=str, help="Comma-separated columns (default: all)")
+    parser.add_argument("--inflation", type=float, default=0.0, help="Annual inflation rate as a decimal")
+    parser.add_argument("--out", type=str, help="Output path (default: <series><suffix>)")
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    start_dt = pd.Timestamp(args.start) if args.start else None
+    end_dt = pd.Timestamp(args.end) + pd.Timedelta(days=1) - pd.Timedelta(minutes=1) if args.end else None
+    columns = [c.strip() for c in args.columns.split(",")] if args.columns else None
+    out = Path(args.out) if args.out else Path(f"{args.series}{EXPORT_FORMATS[args.format][0]}")
+
+    start = time.perf_counter()
+    chunks = iter_store_chunks(args.series, start_dt, end_dt, columns, inflation_rate=args.inflation)
+    rows = write_export(chunks, out, args.format)
+    elapsed = time.perf_counter() - start
+    print(f"✓ Exported {rows} rows of {args.series} to {out} in {elapsed:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
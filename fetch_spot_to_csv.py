@@ -7,6 +7,9 @@ import pandas as pd
 from config import EsiosConfig, ESIOS_API_TOKEN, INDICATORS
 from esios_client import get_indicator_data
 from db import init_db, insert_prices, get_latest_datetime
+from publish import publish
+from snapshots import refresh_snapshots
+from timestamps import format_timestamps, parse_timestamps
 
 
 def transform_indicator_values(values: list[dict]) -> pd.DataFrame:
@@ -32,28 +35,18 @@ def transform_indicator_values(values: list[dict]) -> pd.DataFrame:
     # Keep the raw timestamp exactly as returned by the API so there is no shift.
     df["timestamp"] = df[ts_col].astype(str)
 
-    # Parse per-row using Python datetime, without changing the label or forcing UTC.
-    def _parse_ts(s: str):
-        s = str(s)
-        # Normalise trailing 'Z' to '+00:00' so datetime.fromisoformat can handle it.
-        if s.endswith("Z"):
-            s = s[:-1] + "+00:00"
-        try:
-            return datetime.fromisoformat(s)
-        except ValueError:
-            return None
-
-    parsed = df["timestamp"].apply(_parse_ts)
+    # Parse in bulk, keeping the wall-clock label (offset dropped, no UTC shift).
+    parsed = parse_timestamps(df["timestamp"])
     mask = parsed.notna()
     df = df[mask].copy()
     parsed = parsed[mask]
 
     # Add nicer time breakdown for visualization / querying, based on the parsed datetimes.
-    df["year"] = parsed.apply(lambda d: d.year)
-    df["month"] = parsed.apply(lambda d: d.month)
-    df["day"] = parsed.apply(lambda d: d.day)
-    df["hour"] = parsed.apply(lambda d: d.hour)
-    df["minute"] = parsed.apply(lambda d: d.minute)
+    df["year"] = parsed.dt.year
+    df["month"] = parsed.dt.month
+    df["day"] = parsed.dt.day
+    df["hour"] = parsed.dt.hour
+    df["minute"] = parsed.dt.minute
 
     # Keep only what's useful
     if "value" not in df.columns:
@@ -64,46 +57,7 @@ def transform_indicator_values(values: list[dict]) -> pd.DataFrame:
     ].copy()
     
     # Standardize datetime format to "YYYY-MM-DD HH:MM:SS"
-    def standardize_datetime(ts_str):
-        """Convert datetime string to standardized format."""
-        ts = str(ts_str)
-        # Handle ISO format with T and Z
-        if "T" in ts:
-            ts = ts.replace("T", " ")
-        if ts.endswith("Z"):
-            ts = ts[:-1]
-        if "+" in ts:
-            ts = ts.split("+")[0]
-        if "-" in ts and len(ts.split("-")) > 3:
-            # Remove timezone offset
-            parts = ts.split("-")
-            if len(parts) > 3:
-                ts = "-".join(parts[:3]) + " " + parts[-1].split(" ")[-1] if " " in parts[-1] else ts
-        
-        # Parse and reformat
-        try:
-            formats = [
-                "%Y-%m-%d %H:%M:%S",
-                "%Y-%m-%dT%H:%M:%S",
-                "%Y-%m-%dT%H:%M:%SZ",
-                "%Y-%m-%d %H:%M:%S.%f",
-                "%Y-%m-%dT%H:%M:%S.%fZ",
-            ]
-            for fmt in formats:
-                try:
-                    dt = datetime.strptime(ts, fmt)
-                    return dt.strftime("%Y-%m-%d %H:%M:%S")
-                except ValueError:
-                    continue
-            # Fallback to fromisoformat
-            dt = datetime.fromisoformat(ts.replace("Z", "+00:00"))
-            if dt.tzinfo:
-                dt = dt.replace(tzinfo=None)
-            return dt.strftime("%Y-%m-%d %H:%M:%S")
-        except Exception:
-            return ts  # Return original if parsing fails
-    
-    df["datetime"] = df["timestamp"].apply(standardize_datetime)
+    df["datetime"] = format_timestamps(parsed)
     df = df.rename(columns={"value": "price_eur_per_mwh"})
     df = df[["datetime", "year", "month", "day", "hour", "minute", "price_eur_per_mwh"]]
     df.sort_values("datetime", inplace=True)
@@ -208,6 +162,8 @@ def main() -> None:
         f"Saved {len(df)} rows to {out_path} "
         f"and into data/data.db table for indicator {indicator_id}."
     )
+    print(f"Snapshots refreshed ({len(refresh_snapshots())} rewritten).")
+    print("Dashboard copy published." if publish() else "Dashboard copy already current.")
 
 
 if __name__ == "__main__":
@@ -6,39 +6,34 @@ Aurora format: Datetime, Price
 
 Both will be imported into a forecasts table with a 'source' column to distinguish them.
 """
-import sqlite3
 from datetime import datetime
-from pathlib import Path
 
 import pandas as pd
 
-DATA_DIR = Path("data")
-DB_PATH = DATA_DIR / "data.db"
+from db import reader, writer
+from price_store import upsert_series
+from publish import publish
+from snapshots import refresh_snapshots
 
 
 def init_forecasts_table():
     """Create the forecasts table if it doesn't exist."""
-    DATA_DIR.mkdir(exist_ok=True)
-    conn = sqlite3.connect(DB_PATH)
-    cur = conn.cursor()
-    
-    cur.execute(
-        """
-        CREATE TABLE IF NOT EXISTS forecasts (
-            datetime TEXT,
-            year INTEGER,
-            month INTEGER,
-            day INTEGER,
-            hour INTEGER,
-            minute INTEGER,
-            price_eur_per_mwh REAL,
-            source TEXT,
-            PRIMARY KEY (datetime, source)
+    with writer() as conn:
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS forecasts (
+                datetime TEXT,
+                year INTEGER,
+                month INTEGER,
+                day INTEGER,
+                hour INTEGER,
+                minute INTEGER,
+                price_eur_per_mwh REAL,
+                source TEXT,
+                PRIMARY KEY (datetime, source)
+            )
+            """
         )
-        """
-    )
-    conn.commit()
-    conn.close()
     print("Forecasts table initialized.")
 
 
@@ -78,20 +73,18 @@ def import_baringa():
     df_out['datetime'] = df_out['datetime'].astype(str)
     
     # Insert into database
-    conn = sqlite3.connect(DB_PATH)
-    cur = conn.cursor()
-    
     rows = list(df_out.itertuples(index=False, name=None))
-    cur.executemany(
-        """
-        INSERT OR REPLACE INTO forecasts
-        (datetime, year, month, day, hour, minute, price_eur_per_mwh, source)
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-        """,
-        rows,
-    )
-    conn.commit()
-    conn.close()
+    with writer() as conn:
+        conn.executemany(
+            """
+            INSERT OR REPLACE INTO forecasts
+            (datetime, year, month, day, hour, minute, price_eur_per_mwh, source)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+            rows,
+        )
+        # Keep the columnar store in step with the forecasts table
+        upsert_series(df_out, {"price_eur_per_mwh": 'Baringa_Q2_2025'}, conn=conn)
     
     print(f"Imported {len(df_out)} rows from Baringa.")
 
@@ -131,20 +124,18 @@ def import_aurora():
     df_out['datetime'] = df_out['datetime'].astype(str)
     
     # Insert into database
-    conn = sqlite3.connect(DB_PATH)
-    cur = conn.cursor()
-    
     rows = list(df_out.itertuples(index=False, name=None))
-    cur.executemany(
-        """
-        INSERT OR REPLACE INTO forecasts
-        (datetime, year, month, day, hour, minute, price_eur_per_mwh, source)
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-        """,
-        rows,
-    )
-    conn.commit()
-    conn.close()
+    with writer() as conn:
+        conn.executemany(
+            """
+            INSERT OR REPLACE INTO forecasts
+            (datetime, year, month, day, hour, minute, price_eur_per_mwh, source)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+            rows,
+        )
+        # Keep the columnar store in step with the forecasts table
+        upsert_series(df_out, {"price_eur_per_mwh": 'Aurora_Jun_2025'}, conn=conn)
     
     print(f"Imported {len(df_out)} rows from Aurora.")
 
@@ -165,13 +156,13 @@ def main():
         print(f"Error importing Aurora: {e}")
     
     # Show summary
-    conn = sqlite3.connect(DB_PATH)
-    cur = conn.cursor()
-    cur.execute("SELECT source, COUNT(*) FROM forecasts GROUP BY source")
+    with reader() as conn:
+        rows = conn.execute("SELECT source, COUNT(*) FROM forecasts GROUP BY source").fetchall()
     print("\nImport summary:")
-    for row in cur.fetchall():
+    for row in rows:
         print(f"  {row[0]}: {row[1]} rows")
-    conn.close()
+    print(f"Snapshots refreshed ({len(refresh_snapshots())} rewritten).")
+    print("Dashboard copy published." if publish() else "Dashboard copy already current.")
     
     print("\nForecast import complete!")
 
@@ -16,11 +16,22 @@ This script:
 - Adds columns '612', '613', '614' (REAL) to main spot_prices if missing
 - Copies price_eur_per_mwh from old.spot_prices_612/613/614 into those columns,
   matching on datetime.
+- Writes the same values to the price store as series ESIOS_612/613/614
+  (refreshing rollups, catalog, coverage and data versions), then refreshes
+  the snapshots and the dashboard copy.
 """
 
 import os
 import sqlite3
 
+import pandas as pd
+
+from db import connect
+from price_store import series_for_indicator, upsert_series
+from publish import publish
+from snapshots import refresh_snapshots
+from timestamps import parse_timestamps
+
 BASE = "data"
 MAIN_DB = os.path.join(BASE, "data.db")
 OLD_DB = os.path.join(BASE, "spot_prices.db")
@@ -35,7 +46,7 @@ def main() -> None:
         print(f"{OLD_DB} does not exist.")
         return
 
-    conn = sqlite3.connect(MAIN_DB)
+    conn = connect()
     cur = conn.cursor()
 
     # Rename base price column to day_ahead_prices (if not already renamed)
@@ -67,6 +78,7 @@ def main() -> None:
     conn.commit()
 
     # For each indicator, update from the corresponding old.spot_prices_<ind> table
+    imported: dict[str, pd.DataFrame] = {}
     for ind in indicators:
         src_table = f"spot_prices_{ind}"
         print(f"Importing indicator {ind} from old.{src_table} into {TABLE}...")
@@ -96,12 +108,22 @@ def main() -> None:
             """
         )
         conn.commit()
+        imported[ind] = pd.read_sql(f"SELECT datetime, price_eur_per_mwh FROM old.{src_table}", conn)
 
     print("Detaching old DB...")
     cur.execute("DETACH DATABASE old")
     conn.close()
     print("Done importing indicators 612, 613, 614 into data.db spot_prices.")
 
+    # Keep the columnar store in step with the legacy table
+    for ind, df in imported.items():
+        df["datetime_parsed"] = parse_timestamps(df["datetime"])
+        df = df[df["datetime_parsed"].notna()]
+        rows = upsert_series(df, {"price_eur_per_mwh": series_for_indicator(int(ind))}, datetime_col="datetime_parsed")
+        print(f"  {series_for_indicator(int(ind))}: {rows} values written to the price store")
+    print(f"Snapshots refreshed ({len(refresh_snapshots())} rewritten).")
+    print("Dashboard copy published." if publish() else "Dashboard copy already current.")
+
 
 if __name__ == "__main__":
     main()
@@ -5,11 +5,13 @@ from pathlib import Path
 
 import pandas as pd
 
+from db import DB_PATH, writer
+from price_cache import bump_data_version
+from publish import publish
+from snapshots import refresh_snapshots
 
 BASE_DIR = Path(__file__).resolve().parent
 PV_DIR = BASE_DIR / "pv_prod"
-# Use the unified data DB for PV profiles as well
-DB_PATH = BASE_DIR / "data" / "data.db"
 PROFILES_TABLE = "pv_profiles"
 
 
@@ -39,7 +41,6 @@ def ensure_profiles_table(conn: sqlite3.Connection) -> None:
         )
         """
     )
-    conn.commit()
 
 
 def ensure_profile_column(conn: sqlite3.Connection, column: str) -> None:
@@ -51,7 +52,6 @@ def ensure_profile_column(conn: sqlite3.Connection, column: str) -> None:
     cols = [row[1] for row in cur.fetchall()]
     if column not in cols:
         cur.execute(f'ALTER TABLE "{PROFILES_TABLE}" ADD COLUMN "{column}" REAL')
-        conn.commit()
 
 
 def load_single_file(path: Path, conn: sqlite3.Connection) -> None:
@@ -153,7 +153,8 @@ def load_single_file(path: Path, conn: sqlite3.Connection) -> None:
         """,
         [(e, m, d, h) for m, d, h, e in rows],
     )
-    conn.commit()
+    # Drop cached copies of the PV profiles held by running app processes
+    bump_data_version(PROFILES_TABLE, conn)
 
     print(f"  Inserted/updated {len(rows)} hourly rows for profile '{profile_col}'.")
 
@@ -170,15 +171,13 @@ def main() -> None:
 
     if not DB_PATH.exists():
         print(f"SQLite DB '{DB_PATH}' does not exist. Creating it.")
-        DB_PATH.parent.mkdir(parents=True, exist_ok=True)
-        DB_PATH.touch()
 
-    conn = sqlite3.connect(DB_PATH)
-    try:
-        for path in csv_files:
+    # One transaction per file
+    for path in csv_files:
+        with writer() as conn:
             load_single_file(path, conn)
-    finally:
-        conn.close()
+    print(f"Snapshots refreshed ({len(refresh_snapshots())} rewritten).")
+    print("Dashboard copy published." if publish() else "Dashboard copy already current.")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,517 @@
+"""
+Versioned schema migrations for data/data.db.
+
+Applied migrations are recorded in the ``schema_version`` table, so each one
+runs once per database. Migrations are set-based SQL executed in bounded
+batches of rowids. Each batch is a short write transaction that also saves
+its position in ``migration_progress``:
+- readers (the dashboard) are never blocked for longer than one batch
+- memory use does not depend on the table size
+- an interrupted migration resumes from its last committed batch
+
+Tables are rebuilt by copying rowid ranges into ``<table>__migrating`` while
+the original stays readable, then swapping the two in one transaction.
+Ingestion should be paused while a rebuild runs: rows written to the
+original during the copy are only picked up if they land past the copied
+range.
+
+Usage:
+    python migrations.py            # apply pending migrations
+    python migrations.py --status   # list applied and pending migrations
+    python migrations.py --force 4  # run one migration again
+"""
+import argparse
+import re
+import sqlite3
+import time
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+from db import DB_PATH, reader, writer
+from price_cache import bump_data_version
+from publish import publish
+
+
+SCHEMA_VERSION_TABLE = "schema_version"
+PROGRESS_TABLE = "migration_progress"
+
+# Migration that copies the legacy price tables into price_store. Until it is
+# recorded, price_store skips writes and the loaders read the legacy tables
+PRICE_STORE_MIGRATION = 7
+
+# Rowids per batch (one write transaction each)
+MIGRATION_BATCH_ROWS = 50_000
+# Pause between batches, so writers waiting in SQLite's busy handler get the lock
+MIGRATION_PAUSE_SECONDS = 0.05
+
+# Standard "YYYY-MM-DD HH:MM:SS" form of a legacy datetime string. Only the
+# first 19 characters are used, so 'T', 'Z', fractional seconds and UTC
+# offsets are dropped without shifting the wall-clock time (as in
+# price_store._LEGACY_EPOCH_MINUTES_SQL); unparseable values are kept.
+_STANDARD_DATETIME_SQL = "COALESCE(strftime('%Y-%m-%d %H:%M:%S', substr(datetime, 1, 19)), datetime)"
+
+
+@dataclass
+class Migration:
+    version: int
+    name: str
+    # Whether the database still needs the migration (False records it as applied)
+    pending: Callable[[sqlite3.Cursor], bool]
+    # Runs the migration and returns the number of rows it touched
+    apply: Callable[[int], int]
+
+
+def init_migrations(conn: sqlite3.Connection) -> None:
+    """Create the schema_version and migration_progress tables if they do not exist."""
+    conn.execute(
+        f"""
+        CREATE TABLE IF NOT EXISTS {SCHEMA_VERSION_TABLE} (
+            version INTEGER PRIMARY KEY,
+            name TEXT NOT NULL,
+            applied_at TEXT NOT NULL,
+            rows INTEGER,
+            seconds REAL
+        )
+        """
+    )
+    conn.execute(
+        f"""
+        CREATE TABLE IF NOT EXISTS {PROGRESS_TABLE} (
+            version INTEGER NOT NULL,
+            step TEXT NOT NULL,
+            position INTEGER NOT NULL,
+            rows INTEGER NOT NULL,
+            PRIMARY KEY (version, step)
+        )
+        """
+    )
+
+
+def _table_exists(cur: sqlite3.Cursor, table: str) -> bool:
+    cur.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name=?", (table,))
+    return cur.fetchone() is not None
+
+
+def _columns(cur: sqlite3.Cursor, table: str) -> list[tuple]:
+    """PRAGMA table_info rows of a table (empty if it does not exist)."""
+    cur.execute(f'PRAGMA table_info("{table}")')
+    return cur.fetchall()
+
+
+def _batched(version: int, step: str, table: str, statement: str) -> int:
+    """
+    Run a statement over consecutive rowid ranges of a table, one transaction per batch.
+
+    Args:
+        version: Migration version (progress is saved under it)
+        step: Step name, unique within the migration
+        table: Table whose rowids are walked
+        statement: SQL whose first two parameters are the exclusive lower
+                   and inclusive upper rowid of the batch
+
+    Returns:
+        Rows changed by all batches, including those of an earlier interrupted run
+    """
+    with reader() as conn:
+        cur = conn.cursor()
+        cur.execute(f"SELECT position, rows FROM {PROGRESS_TABLE} WHERE version = ? AND step = ?", (version, step))
+        saved = cur.fetchone()
+        cur.execute(f'SELECT MIN(rowid), MAX(rowid) FROM "{table}"')
+        first, last = cur.fetchone()
+    if first is None:
+        return saved[1] if saved else 0
+    position, rows = saved if saved else (first - 1, 0)
+    start = first - 1
+
+    while True:
+        with reader() as conn:
+            # New rows appended while the step runs are included
+            last = conn.execute(f'SELECT MAX(rowid) FROM "{table}"').fetchone()[0] or position
+        if position >= last:
+            break
+        upper = min(position + MIGRATION_BATCH_ROWS, last)
+        with writer() as conn:
+            rows += conn.execute(statement, (position, upper)).rowcount
+            conn.execute(
+                f"INSERT OR REPLACE INTO {PROGRESS_TABLE} (version, step, position, rows) VALUES (?, ?, ?, ?)",
+                (version, step, upper, rows),
+            )
+        position = upper
+        time.sleep(MIGRATION_PAUSE_SECONDS)
+        done = (position - start) / max(last - start, 1)
+        if position < last:
+            print(f"    {step}: {done:6.1%} ({rows} rows)", end="\r", flush=True)
+    print(f"    {step}: 100.0% ({rows} rows)")
+    return rows
+
+
+# SQL tokens: string literals, quoted identifiers, words, whitespace, any other character
+_SQL_TOKEN_RE = re.compile(r"""'(?:[^']|'')*'|"(?:[^"]|"")*"|`(?:[^`]|``)*`|\[[^\]]*\]|\w+|\s+|.""", re.S)
+# Words starting a table constraint rather than a column definition
+_TABLE_CONSTRAINT_WORDS = {"constraint", "primary", "unique", "check", "foreign"}
+
+
+def _identifier(token: str) -> Optional[str]:
+    """Unquoted name of an identifier token (None for literals and punctuation)."""
+    if token[0] in "\"`" and len(token) > 1:
+        return token[1:-1].replace(token[0] * 2, token[0])
+    if token[0] == "[":
+        return token[1:-1]
+    if token[0].isalpha() or token[0] == "_":
+        return token
+    return None
+
+
+def _rewrite_columns(tokens: list[str], rename: dict[str, str], drop: tuple[str, ...]) -> Optional[str]:
+    """
+    Join SQL tokens with renamed columns, or return None if a dropped column is referenced.
+
+    A word directly followed by "(" is a function call (e.g. datetime('now'))
+    and is left alone.
+    """
+    renamed = {old.lower(): new for old, new in rename.items()}
+    dropped = {col.lower() for col in drop}
+    out = []
+    for i, token in enumerate(tokens):
+        name = _identifier(token)
+        following = next((t for t in tokens[i + 1:] if not t.isspace()), "")
+        if name is not None and following != "(":
+            if name.lower() in dropped:
+                return None
+            if name.lower() in renamed:
+                token = f'"{renamed[name.lower()]}"'
+        out.append(token)
+    return "".join(out)
+
+
+def _split_definitions(body: str) -> list[list[str]]:
+    """Token lists of the comma-separated items of a CREATE TABLE body."""
+    items: list[list[str]] = [[]]
+    depth = 0
+    for token in _SQL_TOKEN_RE.findall(body):
+        if token == "(":
+            depth += 1
+        elif token == ")":
+            depth -= 1
+        elif token == "," and depth == 0:
+            items.append([])
+            continue
+        items[-1].append(token)
+    return items
+
+
+def _staging_table_sql(create_sql: str, staging: str, rename: dict[str, str], drop: tuple[str, ...]) -> str:
+    """
+    CREATE TABLE statement of the staging table, from the source table's own SQL.
+
+    Column constraints (NOT NULL, DEFAULT, UNIQUE, CHECK, ...) and table
+    constraints are kept; columns in drop are left out and renamed columns
+    get their new name.
+    """
+    body = create_sql[create_sql.index("(") + 1:create_sql.rindex(")")]
+    options = create_sql[create_sql.rindex(")") + 1:]
+    definitions = []
+    for tokens in _split_definitions(body):
+        words = [t for t in tokens if not t.isspace()]
+        if not words:
+            continue
+        is_column = words[0].lower() not in _TABLE_CONSTRAINT_WORDS
+        if is_column and (_identifier(words[0]) or "").lower() in {col.lower() for col in drop}:
+            continue
+        definition = _rewrite_columns(tokens, rename, drop)
+        if definition is None:
+            raise ValueError(f"Cannot drop {drop}: referenced by table constraint {''.join(tokens).strip()!r}")
+        definitions.append(definition.strip())
+    return f'CREATE TABLE IF NOT EXISTS "{staging}" ({", ".join(definitions)}){options}'
+
+
+def _index_sql(create_sql: str, table: str, rename: dict[str, str], drop: tuple[str, ...]) -> Optional[str]:
+    """CREATE INDEX statement moved to another table with renamed columns (None if it uses a dropped column)."""
+    tokens = _SQL_TOKEN_RE.findall(create_sql)
+    on = next(i for i, t in enumerate(tokens) if t.lower() == "on")
+    target = next(i for i in range(on + 1, len(tokens)) if not tokens[i].isspace())
+    rest = _rewrite_columns(tokens[target + 1:], rename, drop)
+    if rest is None:
+        return None
+    return "".join(tokens[:target]) + f'"{table}"' + rest
+
+
+def rebuild_table(
+    version: int,
+    source: str,
+    target: str,
+    rename: Optional[dict[str, str]] = None,
+    drop: tuple[str, ...] = (),
+) -> int:
+    """
+    Rebuild a table with renamed or dropped columns by copying rowid ranges.
+
+    The copy goes to ``<target>__migrating``, created from the source's own
+    CREATE TABLE statement (so its constraints are kept). The source's
+    indexes are recreated on the copy and the source is replaced by it, all
+    in one final transaction; indexes on a dropped column are left out.
+
+    Args:
+        version: Migration version
+        source: Table to copy from (dropped at the end)
+        target: Name of the rebuilt table (may equal source)
+        rename: Optional mapping of old -> new column name
+        drop: Columns left out of the new table
+
+    Returns:
+        Number of rows copied
+    """
+    rename = rename or {}
+    staging = f"{target}__migrating"
+    with reader() as conn:
+        cur = conn.cursor()
+        info = _columns(cur, source)
+        cur.execute("SELECT sql FROM sqlite_master WHERE type='table' AND name=?", (source,))
+        create_sql = cur.fetchone()[0]
+        # Automatic indexes (sql IS NULL) come back with the table's constraints
+        cur.execute(
+            "SELECT name, sql FROM sqlite_master WHERE type='index' AND tbl_name=? AND sql IS NOT NULL", (source,)
+        )
+        indexes = cur.fetchall()
+    kept = [col for col in info if col[1] not in drop]
+    new_cols = ", ".join(f'"{rename.get(col[1], col[1])}"' for col in kept)
+    old_cols = ", ".join(f'"{col[1]}"' for col in kept)
+
+    with writer() as conn:
+        conn.execute(_staging_table_sql(create_sql, staging, rename, drop))
+    copied = _batched(
+        version,
+        f"copy {source}",
+        source,
+        f'INSERT INTO "{staging}" ({new_cols}) SELECT {old_cols} FROM "{source}" '
+        f"WHERE rowid > ? AND rowid <= ? ORDER BY rowid",
+    )
+    with writer() as conn:
+        for name, sql in indexes:
+            # Index names are schema-wide, so the source's index goes first
+            conn.execute(f'DROP INDEX "{name}"')
+            moved = _index_sql(sql, staging, rename, drop)
+            if moved is None:
+                print(f"    index {name} dropped with its column")
+                continue
+            conn.execute(moved)
+        conn.execute(f'DROP TABLE "{source}"')
+        conn.execute(f'ALTER TABLE "{staging}" RENAME TO "{target}"')
+    return copied
+
+
+# Migrations (formerly one-off scripts)
+
+_SPOT_INDICATOR_COLUMNS = ("612", "613", "614")
+_HISTORICAL_PRICE_COLUMNS = ("OMIE_SP_DA_prices", "OMIE_PT_DA_prices", "ESIOS_600_DA_prices")
+
+
+def _spot_indicators_pending(cur: sqlite3.Cursor) -> bool:
+    return any(col[1] in _SPOT_INDICATOR_COLUMNS for col in _columns(cur, "spot_prices"))
+
+
+def _remove_spot_indicators(version: int) -> int:
+    return rebuild_table(version, "spot_prices", "spot_prices", drop=_SPOT_INDICATOR_COLUMNS)
+
+
+def _rename_spot_prices_pending(cur: sqlite3.Cursor) -> bool:
+    has_column = any(col[1] == "day_ahead_prices" for col in _columns(cur, "spot_prices"))
+    return has_column and not _table_exists(cur, "historical_prices")
+
+
+def _rename_spot_prices(version: int) -> int:
+    return rebuild_table(
+        version, "spot_prices", "historical_prices", rename={"day_ahead_prices": "ESIOS_600_DA_prices"}
+    )
+
+
+def _omie_da_pending(cur: sqlite3.Cursor) -> bool:
+    return any(col[1] == "OMIE_DA_prices" for col in _columns(cur, "historical_prices"))
+
+
+def _remove_omie_da(version: int) -> int:
+    return rebuild_table(version, "historical_prices", "historical_prices", drop=("OMIE_DA_prices",))
+
+
+def _historical_exists(cur: sqlite3.Cursor) -> bool:
+    return _table_exists(cur, "historical_prices")
+
+
+def _standardize_datetimes(version: int) -> int:
+    return _batched(
+        version,
+        "standardize datetime",
+        "historical_prices",
+        f"UPDATE historical_prices SET datetime = {_STANDARD_DATETIME_SQL} "
+        f"WHERE rowid > ? AND rowid <= ? AND datetime != {_STANDARD_DATETIME_SQL}",
+    )
+
+
+def _delete_empty_rows(version: int) -> int:
+    with reader() as conn:
+        columns = {col[1] for col in _columns(conn.cursor(), "historical_prices")}
+    conditions = [f'"{col}" IS NULL' for col in _HISTORICAL_PRICE_COLUMNS if col in columns]
+    if not conditions:
+        return 0
+    return _batched(
+        version,
+        "delete empty rows",
+        "historical_prices",
+        f"DELETE FROM historical_prices WHERE rowid > ? AND rowid <= ? AND {' AND '.join(conditions)}",
+    )
+
+
+def _swap_pv2_pv3_pending(cur: sqlite3.Cursor) -> bool:
+    # Not detectable from the schema. Existing databases already have the
+    # swap (captured_prices labels assume it), so it is only recorded;
+    # --force 6 performs it
+    return False
+
+
+def _swap_pv2_pv3(version: int) -> int:
+    with writer() as conn:
+        columns = {col[1] for col in _columns(conn.cursor(), "pv_profiles")}
+        if not {"pv2", "pv3"} <= columns:
+            return 0
+        # Column renames only rewrite the schema, not the rows
+        conn.execute('ALTER TABLE pv_profiles RENAME COLUMN "pv2" TO "pv2__swap"')
+        conn.execute('ALTER TABLE pv_profiles RENAME COLUMN "pv3" TO "pv2"')
+        conn.execute('ALTER TABLE pv_profiles RENAME COLUMN "pv2__swap" TO "pv3"')
+        bump_data_version("pv_profiles", conn)
+        return conn.execute("SELECT COUNT(*) FROM pv_profiles").fetchone()[0]
+
+
+def _copy_legacy_prices(version: int) -> int:
+    # Imported here: price_store checks this migration before writing
+    from price_store import migrate_legacy_schema
+
+    # One set-based INSERT ... SELECT per legacy table; the store must be
+    # complete before loaders switch to it, so it is not split into batches
+    return sum(migrate_legacy_schema().values())
+
+
+def _always_pending(cur: sqlite3.Cursor) -> bool:
+    return True
+
+
+MIGRATIONS = [
+    Migration(1, "remove indicator columns 612-614 from spot_prices", _spot_indicators_pending, _remove_spot_indicators),
+    Migration(2, "rename spot_prices to historical_prices", _rename_spot_prices_pending, _rename_spot_prices),
+    Migration(3, "remove OMIE_DA_prices from historical_prices", _omie_da_pending, _remove_omie_da),
+    Migration(4, "standardize historical_prices datetimes", _historical_exists, _standardize_datetimes),
+    Migration(5, "delete historical_prices rows without prices", _historical_exists, _delete_empty_rows),
+    Migration(6, "swap pv2 and pv3 in pv_profiles", _swap_pv2_pv3_pending, _swap_pv2_pv3),
+    Migration(PRICE_STORE_MIGRATION, "copy legacy price tables into price_store", _always_pending, _copy_legacy_prices),
+]
+
+
+def migration_applied(conn: sqlite3.Connection, version: int) -> bool:
+    """Return True if the migration is recorded in schema_version (False if the table does not exist)."""
+    try:
+        row = conn.execute(f"SELECT 1 FROM {SCHEMA_VERSION_TABLE} WHERE version = ?", (version,)).fetchone()
+    except sqlite3.OperationalError:
+        # schema_version not created yet
+        return False
+    return row is not None
+
+
+def record_migration(
+    conn: sqlite3.Connection, version: int, rows: Optional[int] = None, seconds: Optional[float] = None
+) -> None:
+    """Record a migration as applied in schema_version (inside the caller's write transaction)."""
+    init_migrations(conn)
+    name = next(migration.name for migration in MIGRATIONS if migration.version == version)
+    conn.execute(
+        f"""
+        INSERT OR REPLACE INTO {SCHEMA_VERSION_TABLE} (version, name, applied_at, rows, seconds)
+        VALUES (?, ?, datetime('now'), ?, ?)
+        """,
+        (version, name, rows, seconds),
+    )
+
+
+def applied_versions() -> dict[int, tuple[str, str]]:
+    """Return {version: (name, applied_at)} of the migrations recorded in the database."""
+    with writer() as conn:
+        init_migrations(conn)
+    with reader() as conn:
+        rows = conn.execute(f"SELECT version, name, applied_at FROM {SCHEMA_VERSION_TABLE}").fetchall()
+    return {version: (name, applied_at) for version, name, applied_at in rows}
+
+
+def run_migration(migration: Migration, force: bool = False) -> int:
+    """
+    Run one migration (if pending or forced) and record it in schema_version.
+
+    Returns:
+        Number of rows touched (0 if there was nothing to do)
+    """
+    start = time.perf_counter()
+    with writer() as conn:
+        init_migrations(conn)
+    with reader() as conn:
+        needed = force or migration.pending(conn.cursor())
+    rows = migration.apply(migration.version) if needed else 0
+    with writer() as conn:
+        record_migration(conn, migration.version, rows, time.perf_counter() - start)
+        conn.execute(f"DELETE FROM {PROGRESS_TABLE} WHERE version = ?", (migration.version,))
+    return rows
+
+
+def migrate(force: Optional[int] = None) -> dict[int, int]:
+    """
+    Apply all pending migrations in version order.
+
+    Args:
+        force: Optional version to run again even if applied or not detected as needed
+
+    Returns:
+        Dictionary mapping version -> rows touched, for the migrations run now
+    """
+    applied = applied_versions()
+    results = {}
+    for migration in MIGRATIONS:
+        forced = migration.version == force
+        if migration.version in applied and not forced:
+            continue
+        print(f"  {migration.version}: {migration.name}...")
+        results[migration.version] = run_migration(migration, force=forced)
+    return results
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Apply versioned schema migrations to data/data.db.")
+    parser.add_argument("--status", action="store_true", help="List applied and pending migrations and exit")
+    parser.add_argument("--force", type=int, metavar="VERSION", help="Run one migration again")
+    parser.add_argument("--batch-rows", type=int, default=MIGRATION_BATCH_ROWS, help="Rowids per transaction")
+    return parser.parse_args()
+
+
+def main() -> None:
+    global MIGRATION_BATCH_ROWS
+    args = parse_args()
+    if not DB_PATH.exists():
+        print(f"Database {DB_PATH} does not exist. Nothing to migrate.")
+        return
+    if args.status:
+        applied = applied_versions()
+        for migration in MIGRATIONS:
+            state = f"applied {applied[migration.version][1]}" if migration.version in applied else "pending"
+            print(f"  {migration.version}: {migration.name} ({state})")
+        return
+
+    MIGRATION_BATCH_ROWS = max(args.batch_rows, 1)
+    start = time.perf_counter()
+    results = migrate(force=args.force)
+    elapsed = time.perf_counter() - start
+    if not results:
+        print("✓ Schema is up to date")
+        return
+    for version, rows in results.items():
+        print(f"  {version}: {rows} rows")
+    print(f"✓ {len(results)} migration(s) applied in {elapsed:.1f}s")
+    print("Dashboard copy published." if publish() else "Dashboard copy already current.")
+
+
+if __name__ == "__main__":
+    main()
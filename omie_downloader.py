@@ -5,15 +5,20 @@ Downloads OMIE marginalpdbc files (daily .1 files or yearly .zip archives)
 from the OMIE file-access-list HTML index. Never guesses URLs - always extracts
 them from the HTML index.
 """
+import json
 import os
 import re
+import threading
+import time
 import zipfile
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
-from typing import Dict, Optional
+from typing import Dict, List, Optional, Tuple
 from datetime import datetime, timedelta
 
 import requests
 from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
 
 
 # Base URL for OMIE file access list
@@ -32,21 +37,62 @@ DATA_DIR = Path("data") / "omie"
 DATA_DIR.mkdir(parents=True, exist_ok=True)
 
 
-def get_file_index() -> Dict[str, str]:
+# Cached copy of the parsed file index with the ETag/Last-Modified it was served with
+INDEX_CACHE_PATH = DATA_DIR / "file_index.json"
+
+
+def _load_index_cache() -> Optional[dict]:
+    if not INDEX_CACHE_PATH.exists():
+        return None
+    try:
+        with open(INDEX_CACHE_PATH, "r", encoding="utf-8") as f:
+            cached = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return cached if isinstance(cached.get("files"), dict) else None
+
+
+def _save_index_cache(files: Dict[str, str], etag: Optional[str], last_modified: Optional[str]) -> None:
+    tmp_path = INDEX_CACHE_PATH.with_suffix(".json.tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"etag": etag, "last_modified": last_modified, "files": files}, f)
+    os.replace(tmp_path, INDEX_CACHE_PATH)
+
+
+def get_file_index(use_cache: bool = True) -> Dict[str, str]:
     """
     Load the OMIE file-access-list page and extract all file links.
     
+    The parsed index is cached in data/omie/file_index.json. With use_cache,
+    the page is requested conditionally (If-None-Match / If-Modified-Since)
+    and a 304 reply returns the cached index without re-parsing the HTML.
+    If the request fails, the cached index is returned when there is one.
+    
     Returns:
         Dictionary mapping filename -> full download URL
         Example: {"marginalpdbc_20250101.1": "https://www.omie.es/.../file.1"}
     """
     print("Loading OMIE file index...")
     
+    cached = _load_index_cache() if use_cache else None
+    headers = {}
+    if cached:
+        if cached.get("etag"):
+            headers["If-None-Match"] = cached["etag"]
+        if cached.get("last_modified"):
+            headers["If-Modified-Since"] = cached["last_modified"]
+    
     try:
-        response = requests.get(OMIE_INDEX_URL, timeout=30)
+        response = requests.get(OMIE_INDEX_URL, timeout=30, headers=headers)
+        if response.status_code == 304 and cached:
+            print(f"OMIE file index unchanged, using cached index ({len(cached['files'])} files)")
+            return cached["files"]
         response.raise_for_status()
     except requests.RequestException as e:
         print(f"Error loading OMIE index: {e}")
+        if cached:
+            print(f"Using cached index ({len(cached['files'])} files)")
+            return cached["files"]
         return {}
     
     soup = BeautifulSoup(response.text, "html.parser")
@@ -74,41 +120,226 @@ def get_file_index() -> Dict[str, str]:
             file_index[filename] = full_url
     
     print(f"Found {len(file_index)} files in OMIE index")
+    if file_index:
+        _save_index_cache(file_index, response.headers.get("ETag"), response.headers.get("Last-Modified"))
     return file_index
 
 
-def download_file(url: str, local_path: Path, force: bool = False) -> bool:
+# Verified downloads (filename -> size) so re-runs skip them without touching the files
+MANIFEST_PATH = DATA_DIR / "manifest.json"
+
+# Concurrent downloads and attempts per file (429/5xx, truncated and invalid content are all retried)
+DOWNLOAD_WORKERS = 8
+DOWNLOAD_ATTEMPTS = 3
+# First retry delay in seconds, doubled per attempt (a Retry-After header takes precedence)
+RETRY_BACKOFF_SECONDS = 1.0
+
+_manifest_lock = threading.Lock()
+
+
+def load_manifest() -> Dict[str, dict]:
+    """Return the download manifest (empty if missing or unreadable)."""
+    if not MANIFEST_PATH.exists():
+        return {}
+    try:
+        with open(MANIFEST_PATH, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_manifest(manifest: Dict[str, dict]) -> None:
+    """Write the download manifest atomically."""
+    with _manifest_lock:
+        tmp_path = MANIFEST_PATH.with_suffix(".json.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=0, sort_keys=True)
+        os.replace(tmp_path, MANIFEST_PATH)
+
+
+def validate_omie_file(path: Path) -> bool:
+    """
+    Check that a downloaded file is complete.
+    
+    - .1 files must start with the MARGINALPDBC; header and end with the * trailer
+    - .zip files must open and pass the member CRC check
+    """
+    try:
+        if path.suffix == ".zip":
+            with zipfile.ZipFile(path, "r") as zf:
+                return zf.testzip() is None
+        data = path.read_bytes().strip()
+        return data.startswith(b"MARGINALPDBC;") and data.endswith(b"*")
+    except (OSError, zipfile.BadZipFile):
+        return False
+
+
+def _make_session(pool_size: int) -> requests.Session:
+    """Pooled session without transport-level retries (_fetch_verified retries whole downloads)."""
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def _retry_delay(attempt: int, response: Optional[requests.Response]) -> float:
+    """Seconds to wait before the next attempt: Retry-After if the server sent one, else exponential backoff."""
+    retry_after = response.headers.get("Retry-After") if response is not None else None
+    if retry_after is not None and retry_after.strip().isdigit():
+        return float(retry_after)
+    return RETRY_BACKOFF_SECONDS * 2 ** (attempt - 1)
+
+
+def _fetch_verified(url: str, local_path: Path, session: requests.Session) -> int:
+    """
+    Download url into a temporary file, validate it and rename it into place.
+    
+    HTTP errors, connection errors, truncated bodies and invalid contents are
+    retried up to DOWNLOAD_ATTEMPTS times in total.
+    
+    Returns:
+        Size of the verified file in bytes
+    
+    Raises:
+        requests.RequestException or ValueError after DOWNLOAD_ATTEMPTS failures
+    """
+    # Same suffix as the final file (validation depends on it), hidden from the *.1 globs
+    tmp_path = local_path.with_name(f".part_{local_path.name}")
+    for attempt in range(1, DOWNLOAD_ATTEMPTS + 1):
+        response = None
+        try:
+            response = session.get(url, timeout=60, stream=True)
+            response.raise_for_status()
+            size = 0
+            with open(tmp_path, "wb") as f:
+                for chunk in response.iter_content(chunk_size=65536):
+                    f.write(chunk)
+                    size += len(chunk)
+            # Content-Length counts the bytes on the wire, which differ from the
+            # decoded size for gzip/deflate responses
+            expected = response.headers.get("Content-Length")
+            received = response.raw.tell()
+            if expected is not None and int(expected) != received:
+                raise ValueError(f"truncated download ({received} of {expected} bytes)")
+            if not validate_omie_file(tmp_path):
+                raise ValueError("invalid file contents")
+            # Only complete, validated files ever appear under the final name
+            os.replace(tmp_path, local_path)
+            return size
+        except (requests.RequestException, ValueError):
+            tmp_path.unlink(missing_ok=True)
+            if response is not None:
+                response.close()
+            if attempt == DOWNLOAD_ATTEMPTS:
+                raise
+            time.sleep(_retry_delay(attempt, response))
+    raise AssertionError("unreachable")
+
+
+def _matches_manifest(path: Path, entry: dict) -> bool:
+    """Return True if the file exists with the size recorded in its manifest entry."""
+    try:
+        return path.stat().st_size == entry.get("size")
+    except OSError:
+        return False
+
+
+def download_file(
+    url: str,
+    local_path: Path,
+    force: bool = False,
+    session: Optional[requests.Session] = None,
+    manifest: Optional[Dict[str, dict]] = None,
+) -> bool:
     """
     Download a file from URL to local path.
     
+    Files listed in the manifest are skipped if they are still on disk with the
+    recorded size; otherwise the entry is dropped and the file fetched again.
+    A file already on disk but not in the manifest is validated once and recorded.
+    
     Args:
         url: Full download URL
         local_path: Local file path to save to
         force: If True, re-download even if file exists
+        session: Optional pooled session (see download_many)
+        manifest: Optional manifest shared by a batch; the caller saves it.
+            If omitted, the manifest is loaded and saved here.
     
     Returns:
         True if download succeeded, False otherwise
     """
-    # Skip if file already exists (unless force=True)
-    if local_path.exists() and not force:
-        print(f"  File already exists: {local_path.name}")
-        return True
+    own_manifest = manifest is None
+    if own_manifest:
+        manifest = load_manifest()
+    name = local_path.name
     
     try:
-        print(f"  Downloading: {local_path.name}...", end=" ", flush=True)
-        response = requests.get(url, timeout=60, stream=True)
-        response.raise_for_status()
-        
-        # Write file
-        with open(local_path, "wb") as f:
-            for chunk in response.iter_content(chunk_size=8192):
-                f.write(chunk)
+        # Skip verified files (unless force=True) that are still in place;
+        # a missing or resized file is fetched again
+        stale = False
+        if not force and name in manifest:
+            if _matches_manifest(local_path, manifest[name]):
+                return True
+            stale = True
+            with _manifest_lock:
+                manifest.pop(name, None)
+        if not force and not stale and local_path.exists() and validate_omie_file(local_path):
+            print(f"  File already exists: {name}")
+            with _manifest_lock:
+                manifest[name] = {"size": local_path.stat().st_size}
+            return True
         
-        print("✓")
+        try:
+            size = _fetch_verified(url, local_path, session or _make_session(1))
+        except (requests.RequestException, ValueError) as e:
+            print(f"  Downloading: {name}... ✗ Error: {e}")
+            with _manifest_lock:
+                manifest.pop(name, None)
+            return False
+        print(f"  Downloading: {name}... ✓")
+        with _manifest_lock:
+            manifest[name] = {"size": size}
         return True
-    except requests.RequestException as e:
-        print(f"✗ Error: {e}")
-        return False
+    finally:
+        if own_manifest:
+            save_manifest(manifest)
+
+
+def download_many(
+    items: List[Tuple[str, Path]],
+    force: bool = False,
+    workers: Optional[int] = None,
+) -> Dict[str, bool]:
+    """
+    Download many files concurrently over one pooled session.
+    
+    Args:
+        items: List of (url, local_path)
+        force: If True, re-download even if files exist
+        workers: Maximum concurrent downloads (default DOWNLOAD_WORKERS)
+    
+    Returns:
+        Dictionary mapping filename -> True if the file is present and verified
+    """
+    if not items:
+        return {}
+    workers = workers or DOWNLOAD_WORKERS
+    manifest = load_manifest()
+    session = _make_session(workers)
+    results: Dict[str, bool] = {}
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = {
+                pool.submit(download_file, url, path, force, session, manifest): path.name
+                for url, path in items
+            }
+            for future in as_completed(futures):
+                results[futures[future]] = future.result()
+    finally:
+        save_manifest(manifest)
+    return results
 
 
 def download_daily(day: str, file_index: Optional[Dict[str, str]] = None, force: bool = False) -> Optional[Path]:
@@ -140,7 +371,12 @@ def download_daily(day: str, file_index: Optional[Dict[str, str]] = None, force:
     return None
 
 
-def download_year(year: str, file_index: Optional[Dict[str, str]] = None, force: bool = False) -> int:
+def download_year(
+    year: str,
+    file_index: Optional[Dict[str, str]] = None,
+    force: bool = False,
+    extract: bool = True,
+) -> int:
     """
     Download the yearly .zip archive for a given year and extract all .1 files.
     
@@ -148,6 +384,8 @@ def download_year(year: str, file_index: Optional[Dict[str, str]] = None, force:
         year: Year string (e.g., "2022")
         file_index: Optional pre-loaded file index. If None, will fetch it.
         force: If True, re-download even if file exists
+        extract: If False, only download the ZIP (backfill_omie.parse_omie_zip
+            reads the members straight from the archive)
     
     Returns:
         Number of .1 files extracted
@@ -168,7 +406,21 @@ def download_year(year: str, file_index: Optional[Dict[str, str]] = None, force:
     if not download_file(url, zip_path, force=force):
         return 0
     
-    # Extract ZIP file
+    if not extract:
+        return 0
+    
+    return extract_year_zip(year, force=force)
+
+
+def extract_year_zip(year: str, force: bool = False) -> int:
+    """
+    Extract all .1 files of a downloaded yearly ZIP into data/omie/marginalpdbc_YYYY/.
+    
+    Returns:
+        Number of .1 files extracted
+    """
+    zip_filename = f"marginalpdbc_{year}.zip"
+    zip_path = DATA_DIR / zip_filename
     extract_dir = DATA_DIR / f"marginalpdbc_{year}"
     extract_dir.mkdir(exist_ok=True)
     
@@ -200,17 +452,42 @@ def download_year(year: str, file_index: Optional[Dict[str, str]] = None, force:
         return 0
 
 
-def download_range(start_date: str, end_date: str, force: bool = False) -> Dict[str, int]:
+def download_days(days: List[str], file_index: Dict[str, str], force: bool = False) -> List[Path]:
+    """
+    Download several daily .1 files concurrently.
+    
+    Args:
+        days: Date strings in format "YYYYMMDD"
+        file_index: Pre-loaded file index (see get_file_index)
+        force: If True, re-download even if files exist
+    
+    Returns:
+        Paths of the files that are present and verified, in the order of days
+    """
+    items = []
+    for day in days:
+        filename = f"marginalpdbc_{day}.1"
+        if filename not in file_index:
+            print(f"  File not found in OMIE index: {filename}")
+            continue
+        items.append((file_index[filename], DATA_DIR / filename))
+    results = download_many(items, force=force)
+    return [path for _, path in items if results.get(path.name)]
+
+
+def download_range(start_date: str, end_date: str, force: bool = False, extract: bool = True) -> Dict[str, int]:
     """
     Download OMIE files for a date range, automatically choosing between
     daily .1 files and yearly .zip archives.
     
-    Downloads are done from most recent to oldest (so ZIP files are hit at the end).
+    Files are queued from most recent to oldest (so ZIP files are hit at the end)
+    and downloaded concurrently (see download_many).
     
     Args:
         start_date: Start date in format "YYYYMMDD"
         end_date: End date in format "YYYYMMDD"
         force: If True, re-download even if files exist
+        extract: If False, yearly ZIPs are downloaded but not extracted
     
     Returns:
         Dictionary with download statistics:
@@ -252,27 +529,40 @@ def download_range(start_date: str, end_date: str, force: bool = False) -> Dict[
         "total_extracted": 0,
     }
     
-    # Process years from most recent to oldest
+    # Queue years from most recent to oldest: one ZIP where available, else daily files
+    zip_years = []
+    items = []
     for year in sorted(dates_by_year.keys(), reverse=True):
         days = sorted(dates_by_year[year], reverse=True)  # Most recent first within year
         
         # Check if yearly ZIP exists in index
         zip_filename = f"marginalpdbc_{year}.zip"
-        has_zip = zip_filename in file_index
-        
-        if has_zip:
-            # Download yearly ZIP
-            print(f"\nProcessing year {year} (ZIP archive)...")
-            extracted = download_year(year, file_index=file_index, force=force)
-            stats["yearly_zips"] += 1
-            stats["total_extracted"] += extracted
+        if zip_filename in file_index:
+            zip_years.append(year)
+            items.append((file_index[zip_filename], DATA_DIR / zip_filename))
         else:
-            # Download individual daily files
-            print(f"\nProcessing year {year} (daily files)...")
             for day in days:
-                result = download_daily(day, file_index=file_index, force=force)
-                if result:
-                    stats["daily_files"] += 1
+                filename = f"marginalpdbc_{day}.1"
+                if filename in file_index:
+                    items.append((file_index[filename], DATA_DIR / filename))
+                else:
+                    print(f"  File not found in OMIE index: {filename}")
+    
+    print(f"\nDownloading {len(items)} files ({len(zip_years)} yearly ZIPs) with up to {DOWNLOAD_WORKERS} workers...")
+    results = download_many(items, force=force)
+    
+    for name, ok in results.items():
+        if not ok:
+            continue
+        if name.endswith(".zip"):
+            stats["yearly_zips"] += 1
+        else:
+            stats["daily_files"] += 1
+    
+    if extract:
+        for year in zip_years:
+            if results.get(f"marginalpdbc_{year}.zip"):
+                stats["total_extracted"] += extract_year_zip(year, force=force)
     
     print(f"\n{'='*50}")
     print("Download Summary:")
@@ -1,6 +1,8 @@
+import startup_profile
+startup_profile.page_started("01_Electricity_Prices")
+
 from datetime import datetime, time
 
-import pandas as pd
 import streamlit as st
 import altair as alt
 
@@ -20,6 +22,10 @@ except Exception:
 from style_config import apply_brand_styling
 apply_brand_styling()
 
+# Read the published copy of the database, not the one ingest writes to
+from db import use_published_db
+use_published_db()
+
 from data_loader import DataSource, load_price_data
 from session_state import get_data_source_selector, get_inflation_input, get_date_range_selector
 from chart_config import (
@@ -34,7 +40,11 @@ from chart_config import (
     ensure_all_days,
     ensure_all_hours,
     MONTH_ORDER,
+    CHART_ORDER,
 )
+from price_cache import get_data_version
+from price_store import has_series, series_for_source
+from rollups import rollups_available, chart_data, chart_data_from_frame
 
 
 def main() -> None:
@@ -49,10 +59,19 @@ def main() -> None:
     # Sidebar: Inflation (4) - only for forecasts
     inflation_rate = get_inflation_input(source)
     
-    # Load data with inflation adjustment for forecasts
-    df = load_price_data(source, start_dt=start_dt, end_dt=end_dt, inflation_rate=inflation_rate)
-    
-    if df.empty:
+    # Chart aggregates come from the precomputed rollups when possible (constant
+    # time in the history length); inflation-adjusted forecasts need raw rows
+    series = series_for_source(source)
+    use_rollups = inflation_rate == 0 and rollups_available(series)
+    if use_rollups:
+        df = None
+        frames = {t: chart_data(series, t, start_dt, end_dt) for t in CHART_ORDER}
+    else:
+        # Load data with inflation adjustment for forecasts
+        df = load_price_data(source, start_dt=start_dt, end_dt=end_dt, inflation_rate=inflation_rate)
+        frames = {t: chart_data_from_frame(df, t) for t in CHART_ORDER} if not df.empty else {}
+
+    if not frames or frames["yearly"].empty:
         st.warning(
             "No data found in the database for the selected source and date range."
         )
@@ -102,38 +121,22 @@ def main() -> None:
 
     # Yearly average prices
     st.subheader(get_chart_title("yearly", "prices"))
-    yearly = (
-        df.groupby("year", as_index=False)["price_eur_per_mwh"].mean()
-    )
+    yearly = frames["yearly"]
     if not yearly.empty:
         chart = create_yearly_chart(yearly, "price_eur_per_mwh", "€/MWh", show_labels=True)
         st.altair_chart(chart, use_container_width=True)
 
     # Monthly average prices (all months in period)
     st.subheader(get_chart_title("year_month", "prices"))
-    monthly = df.copy()
-    monthly["year_month"] = (
-        monthly["datetime_parsed"].dt.to_period("M").dt.to_timestamp()
-    )
-    monthly_agg = (
-        monthly.groupby("year_month", as_index=False)["price_eur_per_mwh"].mean()
-    )
+    monthly_agg = frames["year_month"]
     if not monthly_agg.empty:
         chart = create_year_month_chart(monthly_agg, "price_eur_per_mwh", "€/MWh", show_labels=False)
         st.altair_chart(chart, use_container_width=True)
 
-    # Calendar-month average prices (Jan–Dec)
+    # Calendar-month average prices (Jan–Dec), averaged across years
     st.subheader(get_chart_title("calendar_month", "prices"))
-    month_year = (
-        df.groupby(["year", "month"], as_index=False)["price_eur_per_mwh"]
-        .mean()
-        .rename(columns={"price_eur_per_mwh": "avg_price"})
-    )
-    if not month_year.empty:
-        # Aggregate across all years for each calendar month
-        cal_month = (
-            month_year.groupby("month", as_index=False)["avg_price"].mean()
-        )
+    cal_month = frames["calendar_month"]
+    if not cal_month.empty:
         # Ensure all 12 calendar months are present
         cal_month = ensure_all_months(cal_month, "month")
         cal_month["month_name"] = cal_month["month"].apply(
@@ -144,43 +147,33 @@ def main() -> None:
 
     # Daily average prices
     st.subheader(get_chart_title("daily", "prices"))
-    daily_avg = df.copy()
-    daily_avg["date"] = daily_avg["datetime_parsed"].dt.date
-    daily_agg = (
-        daily_avg.groupby("date", as_index=False)["price_eur_per_mwh"].mean()
-    )
+    daily_agg = frames["daily"]
     if not daily_agg.empty:
-        daily_agg["date_dt"] = pd.to_datetime(daily_agg["date"])
         chart = create_daily_chart(daily_agg, "price_eur_per_mwh", "€/MWh", "date_dt")
         st.altair_chart(chart, use_container_width=True)
 
     # Daily average prices (by day of week)
     st.subheader(get_chart_title("day_of_week", "prices"))
-    daily_df = df.copy()
-    daily_df["date"] = daily_df["datetime_parsed"].dt.date
-    daily = (
-        daily_df.groupby("date", as_index=False)["price_eur_per_mwh"].mean()
-    )
-    if not daily.empty:
-        daily["weekday"] = pd.to_datetime(daily["date"]).dt.day_name()
-        daily["weekday_order"] = pd.to_datetime(daily["date"]).dt.weekday  # Monday=0, Sunday=6
-        daily_agg = daily.groupby(["weekday", "weekday_order"], as_index=False)["price_eur_per_mwh"].mean()
+    daily_agg = frames["day_of_week"]
+    if not daily_agg.empty:
         daily_agg = ensure_all_days(daily_agg, "weekday", "weekday_order")
         chart = create_day_of_week_chart(daily_agg, "price_eur_per_mwh", "€/MWh", "weekday", show_labels=True)
         st.altair_chart(chart, use_container_width=True)
 
     # Hourly average prices (0–23)
     st.subheader(get_chart_title("hour_of_day", "prices"))
-    hourly = (
-        df.groupby("hour", as_index=False)["price_eur_per_mwh"].mean()
-    )
+    hourly = frames["hour_of_day"]
     if not hourly.empty:
         hourly = ensure_all_hours(hourly, "hour")
         chart = create_hour_of_day_chart(hourly, "price_eur_per_mwh", "€/MWh", "hour", show_labels=True)
         st.altair_chart(chart, use_container_width=True)
 
-    # Raw data and download
+    # Raw data and download (interval rows are only loaded on request)
     st.subheader("Raw data")
+    if df is None:
+        if not st.checkbox("Load raw interval data", value=False):
+            return
+        df = load_price_data(source, start_dt=start_dt, end_dt=end_dt, inflation_rate=inflation_rate)
     cols = [
         "datetime",
         "price_eur_per_mwh",
@@ -191,20 +184,27 @@ def main() -> None:
     ]
     available_cols = [c for c in cols if c in df.columns]
     st.dataframe(df[available_cols], use_container_width=True, height=400)
-    # Format datetime for CSV export
-    from utils import format_datetime_for_csv
-    df_export = format_datetime_for_csv(df[available_cols])
-    csv = df_export.to_csv(index=False).encode("utf-8")
+    # Streamed export, read chunk by chunk from the store when the series is migrated
+    from export import export_download_button, iter_store_chunks
+    export_inflation = inflation_rate if source not in ("historical_prices", "omie_da") else 0.0
+
+    def store_chunks(columns):
+        return iter_store_chunks(series, start_dt, end_dt, columns, inflation_rate=export_inflation)
+
+    data = store_chunks if has_series(series) else df
     start_date_str = start_dt.strftime("%Y-%m-%d")
     end_date_str = end_dt.strftime("%Y-%m-%d")
-    st.download_button(
-        label="Download data as CSV",
-        data=csv,
-        file_name=f"prices_{source}_{start_date_str}_{end_date_str}.csv",
-        mime="text/csv",
+    export_download_button(
+        label="Download data",
+        data=data,
+        file_stem=f"prices_{source}_{start_date_str}_{end_date_str}",
+        columns=available_cols,
+        key="prices_export",
+        data_key=f"{export_inflation}|{get_data_version(series)}",
     )
 
 
 # Streamlit automatically calls this when the page is loaded
 main()
 
+startup_profile.page_rendered("01_Electricity_Prices")
@@ -1,10 +1,10 @@
-import sqlite3
+import startup_profile
+startup_profile.page_started("02_Price_Distribution")
+
 from datetime import datetime, time, timedelta
 
 import altair as alt
 import numpy as np
-import plotly.graph_objects as go
-from plotly.subplots import make_subplots
 import pandas as pd
 import streamlit as st
 
@@ -24,9 +24,14 @@ except Exception:
 from style_config import apply_brand_styling
 apply_brand_styling()
 
-from data_loader import DataSource, load_price_data
+# Read the published copy of the database, not the one ingest writes to
+from db import use_published_db
+use_published_db()
+
+from data_loader import DataSource
 from session_state import get_data_source_selector, get_inflation_input, get_date_range_selector
 from chart_config import BRAND_COLOR, MONTH_ORDER, get_chart_title
+from query_backend import get_backend
 
 
 def main() -> None:
@@ -41,10 +46,13 @@ def main() -> None:
     # Sidebar: Inflation (4) - only for forecasts
     inflation_rate = get_inflation_input(source)
     
-    # Load data with inflation adjustment for forecasts
-    df = load_price_data(source, start_dt=start_dt, end_dt=end_dt, inflation_rate=inflation_rate)
+    # Hourly prices are aggregated by the query backend; the page only
+    # receives per-group statistics, histogram counts and threshold counts
+    backend = get_backend()
+    window = dict(start_dt=start_dt, end_dt=end_dt, inflation_rate=inflation_rate)
+    stats = backend.price_stats(source, ["yearly"], **window)["yearly"]
     
-    if df.empty:
+    if stats.empty:
         st.warning(
             "No data found in the database for the selected source and date range."
         )
@@ -92,41 +100,11 @@ def main() -> None:
     Use the threshold slider to explore price patterns and identify periods of low prices.
     """)
     
-    df_filtered = df.copy()
-
-    # Standardise to hourly resolution: average of all readings within each hour.
-    # First build a global hourly table so we can compute overall percentages.
-    df_all = df_filtered.copy()
-    df_all["hour_key"] = df_all["datetime_parsed"].dt.floor("H")
-    hourly_all = (
-        df_all.groupby("hour_key", as_index=False)
-        .agg(
-            price_eur_per_mwh=("price_eur_per_mwh", "mean"),
-        )
-        .rename(columns={"hour_key": "datetime_hour"})
-    )
-    total_hours_all = len(hourly_all)
-
-    # Hourly for the selected window
-    df_filtered["hour_key"] = df_filtered["datetime_parsed"].dt.floor("H")
-    hourly_base = (
-        df_filtered.groupby("hour_key", as_index=False)
-        .agg(
-            price_eur_per_mwh=("price_eur_per_mwh", "mean"),
-            year=("year", "first"),
-            month=("month", "first"),
-            day=("day", "first"),
-            hour=("hour", "first"),
-        )
-        .rename(columns={"hour_key": "datetime_hour"})
-    )
-
-    total_hours_sel = len(hourly_base)
+    # Prices are standardised to hourly resolution (average of all readings
+    # within each hour) by the backend
+    total_hours_sel = int(stats["n"].sum())
 
     st.subheader("Price distribution (histogram)")
-    if hourly_base.empty:
-        st.info("No data in the selected window.")
-        return
     
     # Get threshold first (needed for bin alignment)
     threshold = st.slider(
@@ -138,8 +116,8 @@ def main() -> None:
     )
     
     # Allow shrinking the histogram x-axis range
-    price_min = float(hourly_base["price_eur_per_mwh"].min())
-    price_max = float(hourly_base["price_eur_per_mwh"].max())
+    price_min = float(stats["min"].min())
+    price_max = float(stats["max"].max())
 
     # Use session state to persist slider value across reruns
     # Key includes source so each data source has its own slider state
@@ -179,7 +157,7 @@ def main() -> None:
     )
 
     # Align bins so that threshold is the upper bound (inclusive) of one bin
-    # With numpy histogram right=True, bins are (left, right], so threshold at edges[i+1] 
+    # Bins are (left, right], so threshold at edges[i+1] 
     # means values <= threshold go into bin i (inclusive upper bound)
     # We want: threshold = bin_start + n * bin_width for some integer n
     # So: bin_start = threshold - n * bin_width
@@ -207,43 +185,11 @@ def main() -> None:
     if closest_edge_idx > 0 and closest_edge_idx < len(bins):
         threshold_bin_idx = closest_edge_idx - 1
     
-    # Build histogram where values outside [x_min, x_max] are clipped into
-    # the first/last bin so total hours are conserved.
-    prices = np.clip(
-        hourly_base["price_eur_per_mwh"].to_numpy(dtype=float), x_min, x_max
-    )
-    
-    # Use np.histogram with right parameter if available, otherwise use workaround
-    # right=True makes bins (left, right] - inclusive on the right
-    try:
-        # Try using right=True (available in NumPy >= 1.11.0)
-        counts, edges = np.histogram(prices, bins=bins, right=True)
-    except TypeError:
-        # Fallback for older NumPy versions: use np.digitize for right-inclusive bins
-        # np.digitize with right=True gives us (left, right] behavior
-        try:
-            # Try np.digitize with right parameter
-            bin_indices = np.digitize(prices, bins, right=True)
-            # Count values in each bin (bin_indices are 1-indexed, with 0 for values < bins[0])
-            counts = np.bincount(bin_indices, minlength=len(bins))
-            # Remove the count for values below first bin (index 0)
-            if len(counts) > len(bins):
-                counts = counts[1:]
-            # Ensure counts has correct length
-            counts = counts[:len(bins)-1]
-            edges = bins
-        except TypeError:
-            # If np.digitize also doesn't support right, use manual binning
-            # Default histogram gives [left, right), we want (left, right]
-            counts, edges = np.histogram(prices, bins=bins)
-            # Manually adjust: for each bin edge, move values exactly at edge to previous bin
-            for i in range(1, len(edges)):
-                at_edge = np.sum(prices == edges[i])
-                if at_edge > 0 and i-1 < len(counts):
-                    # Values at edges[i] should go to bin i-1 (right-inclusive)
-                    if i < len(counts):
-                        counts[i] -= at_edge
-                    counts[i-1] += at_edge
+    # Histogram of the hourly prices, with values outside [x_min, x_max]
+    # clipped into the first/last bin so total hours are conserved.
+    # Bins are (left, right] - inclusive on the right
+    edges = bins
+    counts = backend.price_histogram(source, edges, clip=(x_min, x_max), **window)
     if total_hours_sel > 0:
         perc = counts / total_hours_sel * 100.0
     else:
@@ -251,6 +197,10 @@ def main() -> None:
 
     bin_centers = (edges[:-1] + edges[1:]) / 2.0
 
+    # plotly is only needed for this chart; imported here to keep page startup light
+    import plotly.graph_objects as go
+    from plotly.subplots import make_subplots
+
     fig_hist = make_subplots(specs=[[{"secondary_y": True}]])
     # Bars for hours (left axis)
     fig_hist.add_bar(
@@ -321,8 +271,13 @@ def main() -> None:
 
     st.subheader("Hours at or below price threshold")
 
-    th_df = hourly_base[hourly_base["price_eur_per_mwh"] <= threshold].copy()
-    total_hours = len(th_df)
+    # Hours at or below the threshold per grouping, counted by the query backend
+    counts = backend.threshold_hours(
+        source, threshold, ["yearly", "year_month", "daily", "day_of_week", "hour_of_day"], **window
+    )
+    # Charts only show groups with at least one such hour (hour of day shows all 24)
+    hits = {grouping: c[c["hours"] > 0].reset_index(drop=True) for grouping, c in counts.items()}
+    total_hours = int(counts["yearly"]["hours"].sum())
     
     # Calculate percentage of hours at or below threshold
     if total_hours_sel > 0:
@@ -349,13 +304,7 @@ def main() -> None:
 
     # Yearly counts
     st.subheader(get_chart_title("yearly", "prices"))
-    yearly_totals = (
-        hourly_base.groupby("year", as_index=False)["price_eur_per_mwh"].count()
-    ).rename(columns={"price_eur_per_mwh": "total_hours"})
-    yearly_hits = (
-        th_df.groupby("year", as_index=False)["price_eur_per_mwh"].count()
-    ).rename(columns={"price_eur_per_mwh": "hours"})
-    yearly = yearly_hits.merge(yearly_totals, on="year", how="left")
+    yearly = hits["yearly"].copy()
     yearly["percent"] = yearly["hours"] / yearly["total_hours"] * 100
     # Format hours label with thousand separator
     yearly["hours_label"] = yearly["hours"].apply(lambda x: f"{int(x):,}")
@@ -413,26 +362,7 @@ def main() -> None:
 
     # Monthly counts – all months in window
     st.subheader(get_chart_title("year_month", "prices"))
-    monthly = th_df.copy()
-    monthly["year_month"] = (
-        monthly["datetime_hour"].dt.to_period("M").dt.to_timestamp()
-    )
-    monthly_agg = monthly.groupby("year_month", as_index=False)[
-        "price_eur_per_mwh"
-    ].count()
-    monthly_agg = monthly_agg.rename(columns={"price_eur_per_mwh": "hours"})
-    
-    # Get total hours per month from hourly_base
-    monthly_totals = hourly_base.copy()
-    monthly_totals["year_month"] = (
-        monthly_totals["datetime_hour"].dt.to_period("M").dt.to_timestamp()
-    )
-    monthly_totals_agg = monthly_totals.groupby("year_month", as_index=False)[
-        "price_eur_per_mwh"
-    ].count().rename(columns={"price_eur_per_mwh": "total_hours"})
-    
-    monthly_agg = monthly_agg.merge(monthly_totals_agg, on="year_month", how="left")
-    monthly_agg["total_hours"] = monthly_agg["total_hours"].fillna(0)
+    monthly_agg = hits["year_month"].copy()
     # Calculate percent as hours in that month / total hours in that month
     monthly_agg["percent"] = monthly_agg.apply(
         lambda row: (row["hours"] / row["total_hours"] * 100) if row["total_hours"] > 0 else 0,
@@ -482,29 +412,10 @@ def main() -> None:
 
     # Monthly counts – average calendar month (Jan–Dec) over years
     st.subheader(get_chart_title("calendar_month", "prices"))
-    monthly_by_year = th_df.copy()
-    monthly_by_year["year"] = monthly_by_year["datetime_hour"].dt.year
-    monthly_by_year["month"] = monthly_by_year["datetime_hour"].dt.month
-    # hours per (year, month) at or below threshold
-    ym_counts = (
-        monthly_by_year.groupby(["year", "month"], as_index=False)["price_eur_per_mwh"]
-        .count()
-        .rename(columns={"price_eur_per_mwh": "hours"})
-    )
-    
-    # Get total hours per (year, month) from hourly_base
-    monthly_totals_by_year = hourly_base.copy()
-    monthly_totals_by_year["year"] = monthly_totals_by_year["datetime_hour"].dt.year
-    monthly_totals_by_year["month"] = monthly_totals_by_year["datetime_hour"].dt.month
-    ym_totals = (
-        monthly_totals_by_year.groupby(["year", "month"], as_index=False)["price_eur_per_mwh"]
-        .count()
-        .rename(columns={"price_eur_per_mwh": "total_hours"})
-    )
-    
-    # Merge to get percentages per (year, month)
-    ym_merged = ym_counts.merge(ym_totals, on=["year", "month"], how="left")
-    ym_merged["total_hours"] = ym_merged["total_hours"].fillna(0)
+    # hours per (year, month) at or below threshold, with the month's total hours
+    ym_merged = hits["year_month"].copy()
+    ym_merged["year"] = ym_merged["year_month"].dt.year
+    ym_merged["month"] = ym_merged["year_month"].dt.month
     ym_merged["percent"] = ym_merged.apply(
         lambda row: (row["hours"] / row["total_hours"] * 100) if row["total_hours"] > 0 else 0,
         axis=1,
@@ -588,20 +499,7 @@ def main() -> None:
 
     # Daily counts
     st.subheader(get_chart_title("daily", "prices"))
-    daily = th_df.copy()
-    daily["date"] = daily["datetime_hour"].dt.date
-    daily_agg = daily.groupby("date", as_index=False)["price_eur_per_mwh"].count()
-    daily_agg = daily_agg.rename(columns={"price_eur_per_mwh": "hours"})
-    
-    # Get total hours per day from hourly_base
-    daily_totals = hourly_base.copy()
-    daily_totals["date"] = daily_totals["datetime_hour"].dt.date
-    daily_totals_agg = daily_totals.groupby("date", as_index=False)[
-        "price_eur_per_mwh"
-    ].count().rename(columns={"price_eur_per_mwh": "total_hours"})
-    
-    daily_agg = daily_agg.merge(daily_totals_agg, on="date", how="left")
-    daily_agg["total_hours"] = daily_agg["total_hours"].fillna(0)
+    daily_agg = hits["daily"].copy()
     # Calculate percent as hours in that day / total hours in that day
     daily_agg["percent"] = daily_agg.apply(
         lambda row: (row["hours"] / row["total_hours"] * 100) if row["total_hours"] > 0 else 0,
@@ -651,24 +549,7 @@ def main() -> None:
 
     # Day-of-week counts
     st.subheader(get_chart_title("day_of_week", "prices"))
-    dow = th_df.copy()
-    dow["weekday"] = dow["datetime_hour"].dt.day_name()
-    dow["weekday_order"] = dow["datetime_hour"].dt.weekday  # Monday=0, Sunday=6
-    dow_agg = dow.groupby(["weekday", "weekday_order"], as_index=False)[
-        "price_eur_per_mwh"
-    ].count()
-    dow_agg = dow_agg.rename(columns={"price_eur_per_mwh": "hours"})
-    
-    # Get total hours per weekday from hourly_base
-    dow_totals = hourly_base.copy()
-    dow_totals["weekday"] = dow_totals["datetime_hour"].dt.day_name()
-    dow_totals["weekday_order"] = dow_totals["datetime_hour"].dt.weekday
-    dow_totals_agg = dow_totals.groupby(["weekday", "weekday_order"], as_index=False)[
-        "price_eur_per_mwh"
-    ].count().rename(columns={"price_eur_per_mwh": "total_hours"})
-    
-    dow_agg = dow_agg.merge(dow_totals_agg, on=["weekday", "weekday_order"], how="left")
-    dow_agg["total_hours"] = dow_agg["total_hours"].fillna(0)
+    dow_agg = hits["day_of_week"].copy()
     # Calculate percent as hours in that weekday / total hours in that weekday
     dow_agg["percent"] = dow_agg.apply(
         lambda row: (row["hours"] / row["total_hours"] * 100) if row["total_hours"] > 0 else 0,
@@ -744,18 +625,9 @@ def main() -> None:
 
     # Hour-of-day counts
     st.subheader(get_chart_title("hour_of_day", "prices"))
-    hourly_totals = (
-        hourly_base.groupby("hour", as_index=False)["price_eur_per_mwh"].count()
-    ).rename(columns={"price_eur_per_mwh": "total_hours"})
-    hourly_hits = (
-        th_df.groupby("hour", as_index=False)["price_eur_per_mwh"].count()
-    ).rename(columns={"price_eur_per_mwh": "hours"})
-
     # Ensure all 24 hours 0–23 exist
     all_hours = pd.DataFrame({"hour": list(range(24))})
-    hourly = all_hours.merge(hourly_totals, on="hour", how="left").merge(
-        hourly_hits, on="hour", how="left"
-    )
+    hourly = all_hours.merge(counts["hour_of_day"], on="hour", how="left")
     hourly[["total_hours", "hours"]] = hourly[["total_hours", "hours"]].fillna(0)
     # Avoid division by zero
     hourly["percent"] = hourly.apply(
@@ -819,4 +691,4 @@ def main() -> None:
 # Streamlit automatically calls this when the page is loaded
 main()
 
-
+startup_profile.page_rendered("02_Price_Distribution")
@@ -1,5 +1,7 @@
+import startup_profile
+startup_profile.page_started("03_PV_Production")
+
 from datetime import datetime
-import sqlite3
 
 import altair as alt
 import pandas as pd
@@ -21,7 +23,12 @@ except Exception:
 from style_config import apply_brand_styling
 apply_brand_styling()
 
-from captured_prices import PV_DB, list_pv_profiles
+# Read the published copy of the database, not the one ingest writes to
+from db import use_published_db
+use_published_db()
+
+from captured_prices import list_pv_profiles
+from db import reader
 from chart_config import BRAND_COLOR
 
 # Different shades of brand green for PV profiles
@@ -44,9 +51,8 @@ def _profile_label(name: str) -> str:
 
 def load_pv_profiles_long() -> pd.DataFrame:
     """Load pv_profiles table as a long DataFrame: month, day, hour, profile, pv_mwh."""
-    conn = sqlite3.connect(PV_DB)
-    df = pd.read_sql("SELECT * FROM pv_profiles", conn)
-    conn.close()
+    with reader() as conn:
+        df = pd.read_sql("SELECT * FROM pv_profiles", conn)
 
     profiles = [c for c in df.columns if c not in ("month", "day", "hour")]
     if not profiles:
@@ -254,19 +260,17 @@ def main() -> None:
     # Raw data and download
     st.subheader("Raw PV production data")
     st.dataframe(df_long, use_container_width=True, height=400)
-    # Format datetime for CSV export if datetime column exists
-    from utils import format_datetime_for_csv
-    df_export = format_datetime_for_csv(df_long)
-    csv = df_export.to_csv(index=False).encode("utf-8")
-    st.download_button(
-        label="Download PV production data as CSV",
-        data=csv,
-        file_name="pv_production_raw.csv",
-        mime="text/csv",
+    from export import export_download_button
+    export_download_button(
+        label="Download PV production data",
+        data=df_long,
+        file_stem="pv_production_raw",
+        columns=list(df_long.columns),
+        key="pv_production_export",
     )
 
 
 # Streamlit automatically calls this when the page is loaded
 main()
 
-
+startup_profile.page_rendered("03_PV_Production")
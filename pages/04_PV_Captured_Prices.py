@@ -1,3 +1,6 @@
+import startup_profile
+startup_profile.page_started("04_PV_Captured_Prices")
+
 from datetime import datetime, time, timedelta
 
 import altair as alt
@@ -20,13 +23,18 @@ except Exception:
 from style_config import apply_brand_styling
 apply_brand_styling()
 
+# Read the published copy of the database, not the one ingest writes to
+from db import use_published_db
+use_published_db()
+
 from captured_prices import (
-    compute_captured_price_aggregations,
+    captured_price_by,
     compute_typical_day_profiles,
     join_price_with_pv,
     list_markets,
     list_pv_profiles,
     load_price_series,
+    load_pv_array,
     load_pv_profile,
 )
 from chart_config import (
@@ -153,13 +161,12 @@ def main() -> None:
     from session_state import get_inflation_input
     inflation_rate = get_inflation_input(source)
 
-    # Load prices to determine date range
-    prices_all = load_price_series(market, inflation_rate=inflation_rate)
-    if prices_all.empty:
-        st.info("No price data available for the selected market.")
+    # Only the selected date range is read from the database
+    prices = load_price_series(market, start_dt=start_dt, end_dt=end_dt, inflation_rate=inflation_rate)
+    if prices.empty:
+        st.info("No price data available for the selected market and date range.")
         return
 
-    prices = load_price_series(market, start_dt=start_dt, end_dt=end_dt, inflation_rate=inflation_rate)
     pv = load_pv_profile(profile)
     joined = join_price_with_pv(prices, pv)
 
@@ -201,30 +208,29 @@ def main() -> None:
     # But we keep it for consistency with aggregations
     joined["captured_price"] = joined["price_eur_per_mwh"]
 
-    # PV-weighted captured price aggregations
+    # PV-weighted captured price aggregations, all groupings in one pass over
+    # the prices (PV looked up from the dense profile array)
+    captured = captured_price_by(prices, load_pv_array(profile))
+
     # Yearly
     st.subheader(get_chart_title("yearly", "pv_captured"))
-    yearly = compute_captured_price_aggregations(joined, ["year"])
+    yearly = captured["yearly"]
     if not yearly.empty:
         chart = create_yearly_chart(yearly, "captured_price", "€/MWh", show_labels=True)
         st.altair_chart(chart, use_container_width=True)
 
     # Year-month
     st.subheader(get_chart_title("year_month", "pv_captured"))
-    ym = joined.copy()
-    ym["year_month"] = ym["datetime"].dt.to_period("M").dt.to_timestamp()
-    ym_agg = compute_captured_price_aggregations(ym, ["year_month"])
+    ym_agg = captured["year_month"]
     if not ym_agg.empty:
         chart = create_year_month_chart(ym_agg, "captured_price", "€/MWh", show_labels=False)
         st.altair_chart(chart, use_container_width=True)
 
     # Calendar-month
     st.subheader(get_chart_title("calendar_month", "pv_captured"))
-    cal = joined.copy()
-    cal["month"] = cal["datetime"].dt.month
-    cal_agg = compute_captured_price_aggregations(cal, ["month"])
+    cal_agg = captured["calendar_month"]
     if not cal_agg.empty:
-        first_year = cal["datetime"].dt.year.min() if not cal.empty else 2000
+        first_year = int(yearly["year"].min()) if not yearly.empty else 2000
         cal_agg = ensure_all_months(cal_agg, "month")
         cal_agg["month_label"] = cal_agg["month"].apply(
             lambda m: datetime(first_year, m, 1).strftime("%b")
@@ -234,9 +240,7 @@ def main() -> None:
 
     # Daily
     st.subheader(get_chart_title("daily", "pv_captured"))
-    daily_avg = joined.copy()
-    daily_avg["date"] = daily_avg["datetime"].dt.date
-    daily_agg = compute_captured_price_aggregations(daily_avg, ["date"])
+    daily_agg = captured["daily"]
     if not daily_agg.empty:
         daily_agg["date_dt"] = pd.to_datetime(daily_agg["date"])
         chart = create_daily_chart(daily_agg, "captured_price", "€/MWh", "date_dt")
@@ -244,10 +248,7 @@ def main() -> None:
 
     # Day-of-week
     st.subheader(get_chart_title("day_of_week", "pv_captured"))
-    dow = joined.copy()
-    dow["weekday"] = dow["datetime"].dt.day_name()
-    dow["weekday_order"] = dow["datetime"].dt.weekday   # Monday=0 … Sunday=6
-    dow_agg = compute_captured_price_aggregations(dow, ["weekday", "weekday_order"])
+    dow_agg = captured["day_of_week"]
     if not dow_agg.empty:
         dow_agg = ensure_all_days(dow_agg, "weekday", "weekday_order")
         chart = create_day_of_week_chart(dow_agg, "captured_price", "€/MWh", "weekday", show_labels=True)
@@ -255,9 +256,7 @@ def main() -> None:
 
     # Hour-of-day
     st.subheader(get_chart_title("hour_of_day", "pv_captured"))
-    hod = joined.copy()
-    hod["hour"] = hod["datetime"].dt.hour
-    hod_agg = compute_captured_price_aggregations(hod, ["hour"])
+    hod_agg = captured["hour_of_day"]
     if not hod_agg.empty:
         hod_agg = ensure_all_hours(hod_agg, "hour")
         chart = create_hour_of_day_chart(hod_agg, "captured_price", "€/MWh", "hour", show_labels=True)
@@ -279,19 +278,17 @@ def main() -> None:
     ]
     available_cols = [c for c in cols if c in joined.columns]
     st.dataframe(joined[available_cols], use_container_width=True, height=400)
-    # Format datetime for CSV export
-    from utils import format_datetime_for_csv
-    df_export = format_datetime_for_csv(joined[available_cols])
-    csv = df_export.to_csv(index=False).encode("utf-8")
-    st.download_button(
-        label="Download PV captured price data as CSV",
-        data=csv,
-        file_name=f"pv_captured_prices_{market}_{profile}.csv",
-        mime="text/csv",
+    from export import export_download_button
+    export_download_button(
+        label="Download PV captured price data",
+        data=joined,
+        file_stem=f"pv_captured_prices_{market}_{profile}",
+        columns=available_cols,
+        key="pv_captured_prices_export",
     )
 
 
 # Streamlit automatically calls this when the page is loaded
 main()
 
-
+startup_profile.page_rendered("04_PV_Captured_Prices")
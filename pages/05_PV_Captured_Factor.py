@@ -1,3 +1,6 @@
+import startup_profile
+startup_profile.page_started("05_PV_Captured_Factor")
+
 from datetime import datetime, time, timedelta
 
 import altair as alt
@@ -20,12 +23,17 @@ except Exception:
 from style_config import apply_brand_styling
 apply_brand_styling()
 
+# Read the published copy of the database, not the one ingest writes to
+from db import use_published_db
+use_published_db()
+
 from captured_prices import (
-    compute_captured_price_aggregations,
+    captured_price_sums,
     join_price_with_pv,
     list_markets,
     list_pv_profiles,
     load_price_series,
+    load_pv_array,
     load_pv_profile,
 )
 from chart_config import (
@@ -52,11 +60,7 @@ def _profile_label(name: str) -> str:
     return mapping.get(name, name)
 
 
-def compute_captured_factor_aggregations(
-    joined_df: pd.DataFrame,
-    prices_df: pd.DataFrame,
-    group_cols: list[str]
-) -> pd.DataFrame:
+def compute_captured_factor_aggregations(sums: pd.DataFrame, group_cols: list[str]) -> pd.DataFrame:
     """
     Compute PV-weighted captured factor over arbitrary groupings.
     
@@ -65,26 +69,24 @@ def compute_captured_factor_aggregations(
     - PV_captured_price = sum(price * pv_mwh) / sum(pv_mwh) for the group
     - baseload_price = mean(price) for the same group
     
+    Args:
+        sums: Per-group sums from captured_prices.captured_price_sums
+        group_cols: Grouping columns of sums
+    
     Returns a DataFrame with group_cols and captured_factor column.
     """
-    if joined_df.empty or prices_df.empty:
+    if sums.empty:
         return pd.DataFrame(columns=group_cols + ["captured_factor"])
     
-    # Calculate PV captured price for the group
-    captured_price_df = compute_captured_price_aggregations(joined_df, group_cols)
-    
-    # Calculate baseload price (average price) for the same group
-    # Need to merge on the group columns to ensure same grouping
-    baseload_price_df = prices_df.groupby(group_cols, as_index=False)["price_eur_per_mwh"].mean()
-    baseload_price_df = baseload_price_df.rename(columns={"price_eur_per_mwh": "baseload_price"})
-    
-    # Merge captured price and baseload price
-    merged = captured_price_df.merge(baseload_price_df, on=group_cols, how="inner")
+    # Only groups with PV output have a captured price
+    merged = sums[sums["sum_pv"] > 0].copy()
+    merged["captured_price"] = merged["sum_price_pv"] / merged["sum_pv"]
+    merged["baseload_price"] = merged["sum_price"] / merged["n_prices"]
     
     # Calculate captured factor
     merged["captured_factor"] = merged["captured_price"] / merged["baseload_price"]
     
-    return merged[group_cols + ["captured_factor"]]
+    return merged[group_cols + ["captured_factor"]].reset_index(drop=True)
 
 
 def main() -> None:
@@ -187,13 +189,12 @@ def main() -> None:
     from session_state import get_inflation_input
     inflation_rate = get_inflation_input(source)
 
-    # Load prices to determine date range
-    prices_all = load_price_series(market, inflation_rate=inflation_rate)
-    if prices_all.empty:
-        st.info("No price data available for the selected market.")
+    # Only the selected date range is read from the database
+    prices = load_price_series(market, start_dt=start_dt, end_dt=end_dt, inflation_rate=inflation_rate)
+    if prices.empty:
+        st.info("No price data available for the selected market and date range.")
         return
 
-    prices = load_price_series(market, start_dt=start_dt, end_dt=end_dt, inflation_rate=inflation_rate)
     pv = load_pv_profile(profile)
     joined = join_price_with_pv(prices, pv)
 
@@ -235,34 +236,29 @@ def main() -> None:
     - A factor < 1.0 means PV captures a discount (lower prices during PV generation)
     """)
 
-    # PV-weighted captured factor aggregations
+    # PV-weighted captured factor aggregations, all groupings in one pass over
+    # the prices (PV looked up from the dense profile array)
+    sums = captured_price_sums(prices, load_pv_array(profile))
+
     # Yearly
     st.subheader(get_chart_title("yearly", "pv_captured_factor"))
-    yearly = compute_captured_factor_aggregations(joined, prices, ["year"])
+    yearly = compute_captured_factor_aggregations(sums["yearly"], ["year"])
     if not yearly.empty:
         chart = create_yearly_chart(yearly, "captured_factor", "Factor", show_labels=True)
         st.altair_chart(chart, use_container_width=True)
 
     # Year-month
     st.subheader(get_chart_title("year_month", "pv_captured_factor"))
-    ym = joined.copy()
-    ym["year_month"] = ym["datetime"].dt.to_period("M").dt.to_timestamp()
-    ym_prices = prices.copy()
-    ym_prices["year_month"] = ym_prices["datetime"].dt.to_period("M").dt.to_timestamp()
-    ym_agg = compute_captured_factor_aggregations(ym, ym_prices, ["year_month"])
+    ym_agg = compute_captured_factor_aggregations(sums["year_month"], ["year_month"])
     if not ym_agg.empty:
         chart = create_year_month_chart(ym_agg, "captured_factor", "Factor", show_labels=False)
         st.altair_chart(chart, use_container_width=True)
 
     # Calendar-month
     st.subheader(get_chart_title("calendar_month", "pv_captured_factor"))
-    cal = joined.copy()
-    cal["month"] = cal["datetime"].dt.month
-    cal_prices = prices.copy()
-    cal_prices["month"] = cal_prices["datetime"].dt.month
-    cal_agg = compute_captured_factor_aggregations(cal, cal_prices, ["month"])
+    cal_agg = compute_captured_factor_aggregations(sums["calendar_month"], ["month"])
     if not cal_agg.empty:
-        first_year = cal["datetime"].dt.year.min() if not cal.empty else 2000
+        first_year = int(yearly["year"].min()) if not yearly.empty else 2000
         cal_agg = ensure_all_months(cal_agg, "month")
         cal_agg["month_label"] = cal_agg["month"].apply(
             lambda m: datetime(first_year, m, 1).strftime("%b")
@@ -272,11 +268,7 @@ def main() -> None:
 
     # Daily
     st.subheader(get_chart_title("daily", "pv_captured_factor"))
-    daily_avg = joined.copy()
-    daily_avg["date"] = daily_avg["datetime"].dt.date
-    daily_prices = prices.copy()
-    daily_prices["date"] = daily_prices["datetime"].dt.date
-    daily_agg = compute_captured_factor_aggregations(daily_avg, daily_prices, ["date"])
+    daily_agg = compute_captured_factor_aggregations(sums["daily"], ["date"])
     if not daily_agg.empty:
         daily_agg["date_dt"] = pd.to_datetime(daily_agg["date"])
         chart = create_daily_chart(daily_agg, "captured_factor", "Factor", "date_dt")
@@ -284,13 +276,7 @@ def main() -> None:
 
     # Day-of-week
     st.subheader(get_chart_title("day_of_week", "pv_captured_factor"))
-    dow = joined.copy()
-    dow["weekday"] = dow["datetime"].dt.day_name()
-    dow["weekday_order"] = dow["datetime"].dt.weekday   # Monday=0 … Sunday=6
-    dow_prices = prices.copy()
-    dow_prices["weekday"] = dow_prices["datetime"].dt.day_name()
-    dow_prices["weekday_order"] = dow_prices["datetime"].dt.weekday
-    dow_agg = compute_captured_factor_aggregations(dow, dow_prices, ["weekday", "weekday_order"])
+    dow_agg = compute_captured_factor_aggregations(sums["day_of_week"], ["weekday", "weekday_order"])
     if not dow_agg.empty:
         dow_agg = ensure_all_days(dow_agg, "weekday", "weekday_order")
         chart = create_day_of_week_chart(dow_agg, "captured_factor", "Factor", "weekday", show_labels=True)
@@ -298,11 +284,7 @@ def main() -> None:
 
     # Hour-of-day
     st.subheader(get_chart_title("hour_of_day", "pv_captured_factor"))
-    hod = joined.copy()
-    hod["hour"] = hod["datetime"].dt.hour
-    hod_prices = prices.copy()
-    hod_prices["hour"] = hod_prices["datetime"].dt.hour
-    hod_agg = compute_captured_factor_aggregations(hod, hod_prices, ["hour"])
+    hod_agg = compute_captured_factor_aggregations(sums["hour_of_day"], ["hour"])
     if not hod_agg.empty:
         hod_agg = ensure_all_hours(hod_agg, "hour")
         chart = create_hour_of_day_chart(hod_agg, "captured_factor", "Factor", "hour", show_labels=True)
@@ -336,18 +318,17 @@ def main() -> None:
     ]
     available_cols = [c for c in cols if c in joined_display.columns]
     st.dataframe(joined_display[available_cols], use_container_width=True, height=400)
-    # Format datetime for CSV export
-    from utils import format_datetime_for_csv
-    df_export = format_datetime_for_csv(joined_display[available_cols])
-    csv = df_export.to_csv(index=False).encode("utf-8")
-    st.download_button(
-        label="Download PV captured factor data as CSV",
-        data=csv,
-        file_name=f"pv_captured_factor_{market}_{profile}.csv",
-        mime="text/csv",
+    from export import export_download_button
+    export_download_button(
+        label="Download PV captured factor data",
+        data=joined_display,
+        file_stem=f"pv_captured_factor_{market}_{profile}",
+        columns=available_cols,
+        key="pv_captured_factor_export",
     )
 
 
 # Streamlit automatically calls this when the page is loaded
 main()
 
+startup_profile.page_rendered("05_PV_Captured_Factor")
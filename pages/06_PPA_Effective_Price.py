@@ -1,3 +1,6 @@
+import startup_profile
+startup_profile.page_started("06_PPA_Effective_Price")
+
 from datetime import datetime, time, timedelta
 
 import altair as alt
@@ -20,7 +23,10 @@ except Exception:
 from style_config import apply_brand_styling
 apply_brand_styling()
 
-from config import INDICATORS
+# Read the published copy of the database, not the one ingest writes to
+from db import use_published_db
+use_published_db()
+
 from captured_prices import (
     join_price_with_pv,
     list_markets,
@@ -299,13 +305,7 @@ def main() -> None:
         format="%.2f",
     )
     
-    # Load prices to determine date range
-    prices_all = load_price_series(market, inflation_rate=inflation_rate)
-    if prices_all.empty:
-        st.warning("No price data available for the selected market.")
-        return
-    
-    # Load and join data
+    # Load and join data (only the selected date range is read from the database)
     prices = load_price_series(market, start_dt=start_dt, end_dt=end_dt, inflation_rate=inflation_rate)
     if prices.empty:
         st.warning("No price data available for the selected date range.")
@@ -469,18 +469,17 @@ def main() -> None:
     available_cols = [c for c in cols if c in df_with_metrics.columns]
     st.dataframe(df_with_metrics[available_cols], use_container_width=True, height=400)
     
-    # Format datetime for CSV export
-    from utils import format_datetime_for_csv
-    df_export = format_datetime_for_csv(df_with_metrics[available_cols])
-    csv = df_export.to_csv(index=False).encode("utf-8")
-    st.download_button(
-        label="Download PPA data as CSV",
-        data=csv,
-        file_name=f"ppa_effective_price_{market}_{profile}_{strike_price:.0f}.csv",
-        mime="text/csv",
+    from export import export_download_button
+    export_download_button(
+        label="Download PPA data",
+        data=df_with_metrics,
+        file_stem=f"ppa_effective_price_{market}_{profile}_{strike_price:.0f}",
+        columns=available_cols,
+        key="ppa_export",
     )
 
 
 # Streamlit automatically calls this when the page is loaded
 main()
 
+startup_profile.page_rendered("06_PPA_Effective_Price")
@@ -1,5 +1,7 @@
+import startup_profile
+startup_profile.page_started("07_BESS_Spreads")
+
 from datetime import datetime, time, timedelta
-from typing import List, Tuple, Optional
 
 import altair as alt
 import pandas as pd
@@ -21,6 +23,19 @@ except Exception:
 from style_config import apply_brand_styling
 apply_brand_styling()
 
+# Read the published copy of the database, not the one ingest writes to
+from db import use_published_db
+use_published_db()
+
+from bess import (
+    bess_price_metrics,
+    compute_bess_metrics,
+    cycle_schedules,
+    optimize_battery_operations,
+    simulate_battery_operations,
+    sweep_bess,
+    validate_cycles,
+)
 from data_loader import DataSource, load_price_data
 from session_state import get_data_source_selector, get_inflation_input, get_date_range_selector
 from chart_config import (
@@ -86,329 +101,112 @@ def time_input_with_arrows(label: str, default_time: time, key: str) -> time:
     return selected_time
 
 
-def validate_cycles(
-    charge1: time, discharge1: time,
-    charge2: Optional[time], discharge2: Optional[time]
-) -> Tuple[bool, str]:
-    """
-    Validate that charge/discharge cycles don't overlap.
-    
-    Returns:
-        (is_valid, error_message)
-    """
-    if charge2 is None or discharge2 is None:
-        # Single cycle: just check charge is before discharge
-        if charge1 >= discharge1:
-            return False, "Charge time must be before discharge time for cycle 1."
-        return True, ""
-    
-    # Two cycles: check all constraints
-    if charge1 >= discharge1:
-        return False, "Charge time must be before discharge time for cycle 1."
-    if charge2 >= discharge2:
-        return False, "Charge time must be before discharge time for cycle 2."
-    
-    # Check for overlaps
-    times = [
-        ("Charge 1", charge1),
-        ("Discharge 1", discharge1),
-        ("Charge 2", charge2),
-        ("Discharge 2", discharge2),
-    ]
-    sorted_times = sorted(times, key=lambda x: (x[1].hour, x[1].minute))
-    
-    # Check if cycle 2 is completely before cycle 1
-    if discharge2 <= charge1:
-        return True, ""
-    
-    # Check if cycle 2 is completely after cycle 1
-    if charge2 >= discharge1:
-        return True, ""
-    
-    # Otherwise, they overlap
-    return False, "Cycles overlap. Charge and discharge times must not overlap between cycles."
+def render_schedule_sweep(df: pd.DataFrame, capacity_mw: float, duration_hours: float, efficiency: float) -> None:
+    """Sweep fixed hourly schedules (plus durations/efficiencies) and show the best per year."""
+    st.subheader("Best Fixed Schedule per Year")
+    st.markdown(
+        "Evaluates every whole-hour charge/discharge schedule (one or two cycles per day) "
+        "for the selected durations and efficiencies, ranked by total revenue."
+    )
 
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        duration_options = sorted({1.0, 2.0, 4.0, 6.0, 8.0, float(duration_hours)})
+        durations = st.multiselect(
+            "Durations (hours)",
+            options=duration_options,
+            default=[float(duration_hours)],
+            key="bess_sweep_durations",
+        )
+    with col2:
+        efficiency_options = sorted({80, 85, 90, 95, round(efficiency * 100)})
+        efficiencies = st.multiselect(
+            "Round-trip efficiencies (%)",
+            options=efficiency_options,
+            default=[round(efficiency * 100)],
+            key="bess_sweep_efficiencies",
+        )
+    with col3:
+        cycles = st.multiselect(
+            "Cycles per day",
+            options=[1, 2],
+            default=[1, 2],
+            key="bess_sweep_cycles",
+        )
+    with col4:
+        top_n = st.number_input("Top schedules shown", min_value=1, max_value=50, value=5, step=1, key="bess_sweep_top_n")
 
-def simulate_battery_operations(
-    df: pd.DataFrame,
-    capacity_mw: float,
-    duration_hours: float,
-    efficiency: float,
-    charge1: time,
-    discharge1: time,
-    charge2: Optional[time] = None,
-    discharge2: Optional[time] = None,
-) -> pd.DataFrame:
-    """
-    Simulate battery charging and discharging operations.
-    
-    Args:
-        df: DataFrame with datetime and price_eur_per_mwh columns
-        capacity_mw: Battery capacity in MW
-        duration_hours: Battery duration in hours
-        efficiency: Round-trip efficiency (0-1)
-        charge1, discharge1: First cycle times
-        charge2, discharge2: Optional second cycle times
-    
-    Returns:
-        DataFrame with added columns:
-        - charge_mwh: Energy charged in this hour (MWh)
-        - discharge_mwh: Energy discharged in this hour (MWh)
-        - battery_soc: State of charge at end of hour (MWh)
-        - charge_cost: Cost of charging in this hour (€)
-        - discharge_revenue: Revenue from discharging in this hour (€)
-        - net_revenue: Net revenue (discharge - charge) in this hour (€)
-        - cycle: Which cycle this hour belongs to (0 = none, 1 = first, 2 = second)
-    """
-    df = df.copy()
-    df = df.sort_values("datetime_parsed")
-    
-    capacity_mwh = capacity_mw * duration_hours
-    
-    # Detect data resolution by checking time differences
-    if len(df) > 1:
-        time_diffs = df["datetime_parsed"].diff().dropna()
-        median_diff = time_diffs.median()
-        # If median difference is around 15 minutes, we have 15-minute data
-        is_15min_data = median_diff <= pd.Timedelta(minutes=20) and median_diff >= pd.Timedelta(minutes=10)
-    else:
-        is_15min_data = False
-    
-    # Calculate interval duration in hours
-    if is_15min_data:
-        interval_hours = 0.25  # 15 minutes = 0.25 hours
-        intervals_per_hour = 4
-    else:
-        interval_hours = 1.0  # 1 hour
-        intervals_per_hour = 1
-    
-    # Calculate number of intervals for full duration
-    total_intervals = int(duration_hours * intervals_per_hour)
-    
-    # Initialize columns
-    df["charge_mwh"] = 0.0
-    df["discharge_mwh"] = 0.0
-    df["battery_soc"] = 0.0  # State of charge at end of interval
-    df["charge_cost"] = 0.0
-    df["discharge_revenue"] = 0.0
-    df["net_revenue"] = 0.0
-    df["cycle"] = 0
-    
-    # Extract time components
-    df["hour_of_day"] = df["datetime_parsed"].dt.hour
-    df["minute"] = df["datetime_parsed"].dt.minute
-    df["date"] = df["datetime_parsed"].dt.date
-    
-    # Track cumulative net revenue across ALL days (not reset per day)
-    cumulative_net_revenue = 0.0
-    
-    # Group by date to process each day separately
-    for date, day_df in df.groupby("date"):
-        day_df = day_df.sort_values("datetime_parsed").copy()
-        soc = 0.0  # Start each day with empty battery
-        cycle1_charge_cost = 0.0
-        cycle2_charge_cost = 0.0
-        cycle1_discharge_revenue = 0.0
-        cycle2_discharge_revenue = 0.0
-        
-        # Process all intervals in order to track SOC
-        for idx, row in day_df.iterrows():
-            dt = row["datetime_parsed"]
-            hour = row["hour_of_day"]
-            minute = row["minute"]
-            is_charging = False
-            is_discharging = False
-            cycle_num = 0
-            
-            # Calculate charge/discharge windows based on actual datetime
-            # Charge1 window: from charge1 time for duration_hours on this date
-            charge1_start_dt = pd.Timestamp(date).replace(hour=charge1.hour, minute=charge1.minute, second=0, microsecond=0)
-            charge1_end_dt = charge1_start_dt + pd.Timedelta(hours=duration_hours)
-            
-            # Discharge1 window: from discharge1 time for duration_hours on this date
-            discharge1_start_dt = pd.Timestamp(date).replace(hour=discharge1.hour, minute=discharge1.minute, second=0, microsecond=0)
-            discharge1_end_dt = discharge1_start_dt + pd.Timedelta(hours=duration_hours)
-            
-            # Check if this interval is within charge1 window
-            if charge1_start_dt <= dt < charge1_end_dt:
-                is_charging = True
-                cycle_num = 1
-            
-            # Check if this interval is within discharge1 window
-            if discharge1_start_dt <= dt < discharge1_end_dt:
-                is_discharging = True
-                cycle_num = 1
-            
-            # Check cycle 2 if enabled
-            if charge2 is not None and discharge2 is not None:
-                charge2_start_dt = pd.Timestamp(date).replace(hour=charge2.hour, minute=charge2.minute, second=0, microsecond=0)
-                charge2_end_dt = charge2_start_dt + pd.Timedelta(hours=duration_hours)
-                
-                discharge2_start_dt = pd.Timestamp(date).replace(hour=discharge2.hour, minute=discharge2.minute, second=0, microsecond=0)
-                discharge2_end_dt = discharge2_start_dt + pd.Timedelta(hours=duration_hours)
-                
-                if charge2_start_dt <= dt < charge2_end_dt:
-                    is_charging = True
-                    cycle_num = 2
-                
-                if discharge2_start_dt <= dt < discharge2_end_dt:
-                    is_discharging = True
-                    cycle_num = 2
-            
-            # Initialize incremental net revenue for this interval
-            incremental_net_revenue = 0.0
-            
-            # Charge if in charging window (and not discharging)
-            if is_charging and not is_discharging:
-                if soc < capacity_mwh:
-                    remaining_capacity = capacity_mwh - soc
-                    # Charge at full MW rate for this interval
-                    # For hourly data: 10MW * 1.0 hour = 10MWh per hour
-                    # For 15-min data: 10MW * 0.25 hour = 2.5MWh per 15-min interval
-                    charge_energy = min(capacity_mw * interval_hours, remaining_capacity)
-                    if charge_energy > 0:
-                        # Cost is negative (money going out)
-                        charge_cost_this_interval = -(charge_energy * row["price_eur_per_mwh"])
-                        df.loc[idx, "charge_mwh"] = charge_energy
-                        df.loc[idx, "charge_cost"] = charge_cost_this_interval  # Already negative
-                        df.loc[idx, "cycle"] = cycle_num
-                        if cycle_num == 1:
-                            cycle1_charge_cost += abs(charge_cost_this_interval)  # Track absolute cost
-                        else:
-                            cycle2_charge_cost += abs(charge_cost_this_interval)  # Track absolute cost
-                        soc = soc + charge_energy
-                        # Net revenue for this interval (negative when charging)
-                        incremental_net_revenue = charge_cost_this_interval  # Already negative
-            
-            # Discharge if in discharging window (and not charging)
-            elif is_discharging and not is_charging:
-                if soc > 0:
-                    available_energy = soc * efficiency
-                    # Discharge at full MW rate for this interval
-                    discharge_energy = min(capacity_mw * interval_hours, available_energy)
-                    if discharge_energy > 0:
-                        energy_removed_from_battery = discharge_energy / efficiency
-                        discharge_revenue_this_interval = discharge_energy * row["price_eur_per_mwh"]
-                        df.loc[idx, "discharge_mwh"] = discharge_energy
-                        df.loc[idx, "discharge_revenue"] = discharge_revenue_this_interval
-                        df.loc[idx, "cycle"] = cycle_num
-                        soc = soc - energy_removed_from_battery
-                        # Track discharge revenue for this cycle
-                        if cycle_num == 1:
-                            cycle1_discharge_revenue += discharge_revenue_this_interval
-                        else:
-                            cycle2_discharge_revenue += discharge_revenue_this_interval
-                        # Net revenue for this interval (positive when discharging)
-                        incremental_net_revenue = discharge_revenue_this_interval
-            
-            # Update cumulative net revenue
-            cumulative_net_revenue += incremental_net_revenue
-            df.loc[idx, "net_revenue"] = cumulative_net_revenue
-            
-            # Update SOC for all intervals (even when not charging/discharging)
-            # SOC is the cumulative MWh in the battery at this point in time
-            # It should be calculated as: (cumulative MWh in battery) / (total capacity MWh) * 100
-            df.loc[idx, "battery_soc"] = soc
-            # Calculate SOC percentage immediately (will be recalculated later with capacity_mwh, but store for debugging)
-    
-    return df
+    if not durations or not efficiencies or not cycles:
+        st.info("Select at least one duration, efficiency and number of cycles.")
+        return
 
+    # Results are kept across reruns for the same inputs
+    sweep_key = (
+        tuple(df["datetime_parsed"].iloc[[0, -1]]),
+        len(df),
+        capacity_mw,
+        tuple(durations),
+        tuple(efficiencies),
+        tuple(cycles),
+        int(top_n),
+    )
+    if st.button("Run schedule sweep", key="bess_sweep_run"):
+        schedules = cycle_schedules(cycles=cycles)
+        with st.spinner(f"Evaluating {len(schedules) * len(durations) * len(efficiencies):,} configurations..."):
+            results = sweep_bess(
+                df,
+                capacity_mw=capacity_mw,
+                durations=durations,
+                efficiencies=[e / 100.0 for e in efficiencies],
+                schedules=schedules,
+                top_n=int(top_n),
+            )
+        st.session_state["bess_sweep"] = (sweep_key, results)
 
-def compute_bess_metrics(df: pd.DataFrame) -> dict:
-    """
-    Compute BESS performance metrics.
-    
-    Returns:
-        Dictionary with metrics:
-        - total_charge_mwh: Total energy charged (MWh)
-        - total_discharge_mwh: Total energy discharged (MWh)
-        - avg_charge_price: Average charge price (€/MWh)
-        - avg_discharge_price: Average discharge price (€/MWh)
-        - avg_spread: Average spread (€/MWh)
-        - total_revenue: Total net revenue (€)
-        - daily_avg_revenue: Daily average revenue (€)
-        - total_cycles: Total number of cycles
-    """
-    if df.empty:
-        return {
-            "total_charge_mwh": 0.0,
-            "total_discharge_mwh": 0.0,
-            "avg_charge_price": 0.0,
-            "avg_discharge_price": 0.0,
-            "avg_spread": 0.0,
-            "total_revenue": 0.0,
-            "daily_avg_revenue": 0.0,
-            "total_cycles": 0,
-        }
-    
-    # Filter to hours with activity
-    active_df = df[(df["charge_mwh"] > 0) | (df["discharge_mwh"] > 0)].copy()
-    
-    if active_df.empty:
-        return {
-            "total_charge_mwh": 0.0,
-            "total_discharge_mwh": 0.0,
-            "avg_charge_price": 0.0,
-            "avg_discharge_price": 0.0,
-            "avg_spread": 0.0,
-            "total_revenue": 0.0,
-            "daily_avg_revenue": 0.0,
-            "total_cycles": 0,
-        }
-    
-    # Total energy
-    total_charge_mwh = active_df["charge_mwh"].sum()
-    total_discharge_mwh = active_df["discharge_mwh"].sum()
-    
-    # Average prices (weighted by energy)
-    charge_hours = active_df[active_df["charge_mwh"] > 0]
-    discharge_hours = active_df[active_df["discharge_mwh"] > 0]
-    
-    # Weighted average charge price (total cost / total energy)
-    if charge_hours["charge_mwh"].sum() > 0:
-        avg_charge_price = charge_hours["charge_cost"].sum() / charge_hours["charge_mwh"].sum()
-    else:
-        avg_charge_price = 0.0
-    
-    # Weighted average discharge price (total revenue / total energy)
-    if discharge_hours["discharge_mwh"].sum() > 0:
-        avg_discharge_price = discharge_hours["discharge_revenue"].sum() / discharge_hours["discharge_mwh"].sum()
-    else:
-        avg_discharge_price = 0.0
-    
-    # Average spread (discharge - charge, accounting for efficiency)
-    # The spread is the difference in prices, but we need to account for efficiency loss
-    # If we charge at price P_c and discharge at price P_d, the effective spread is:
-    # P_d - P_c (since we pay P_c per MWh charged, but get P_d per MWh discharged)
-    # However, due to efficiency, we discharge less than we charge, so the spread needs adjustment
-    avg_spread = avg_discharge_price - avg_charge_price if (avg_charge_price > 0 and avg_discharge_price > 0) else 0.0
-    
-    # Total revenue (use the last cumulative value from the full dataframe, not just active)
-    # net_revenue is already cumulative across all days, so the last value is the total
-    if not df.empty:
-        # Sort by datetime to ensure we get the last value chronologically
-        df_sorted = df.sort_values("datetime_parsed")
-        total_revenue = df_sorted["net_revenue"].iloc[-1]
-    else:
-        total_revenue = 0.0
-    
-    # Daily average revenue
-    num_days = df["date"].nunique()
-    daily_avg_revenue = total_revenue / num_days if num_days > 0 else 0.0
-    
-    # Total cycles (count unique days with at least one discharge)
-    total_cycles = active_df[active_df["discharge_mwh"] > 0]["date"].nunique()
-    
-    return {
-        "total_charge_mwh": total_charge_mwh,
-        "total_discharge_mwh": total_discharge_mwh,
-        "avg_charge_price": avg_charge_price,
-        "avg_discharge_price": avg_discharge_price,
-        "avg_spread": avg_spread,
-        "total_revenue": total_revenue,
-        "daily_avg_revenue": daily_avg_revenue,
-        "total_cycles": total_cycles,
-    }
+    stored = st.session_state.get("bess_sweep")
+    if stored is None or stored[0] != sweep_key:
+        return
+    results = stored[1]
+    if results["overall"].empty:
+        st.info("No configurations to evaluate.")
+        return
+
+    def display(table: pd.DataFrame) -> pd.DataFrame:
+        table = table.copy()
+        for col in ["charge1", "discharge1", "charge2", "discharge2"]:
+            table[col] = table[col].map(lambda t: format_time(t) if isinstance(t, time) else "")
+        table["efficiency"] = (table["efficiency"] * 100).round(0)
+        return table.rename(
+            columns={
+                "year": "Year",
+                "rank": "Rank",
+                "duration_hours": "Duration (h)",
+                "efficiency": "Efficiency (%)",
+                "cycles": "Cycles",
+                "charge1": "Charge 1",
+                "discharge1": "Discharge 1",
+                "charge2": "Charge 2",
+                "discharge2": "Discharge 2",
+                "avg_charge_price": "Avg charge (€/MWh)",
+                "avg_discharge_price": "Avg discharge (€/MWh)",
+                "avg_spread": "Avg spread (€/MWh)",
+                "total_revenue": "Total revenue (€)",
+                "daily_revenue_per_mwh": "Revenue (€/MWh/day)",
+            }
+        )
+
+    columns = [
+        "rank", "duration_hours", "efficiency", "cycles", "charge1", "discharge1", "charge2", "discharge2",
+        "avg_charge_price", "avg_discharge_price", "avg_spread", "total_revenue", "daily_revenue_per_mwh",
+    ]
+    yearly = results["yearly"]
+    best = yearly[yearly["rank"] == 1][["year"] + columns]
+    st.markdown("**Best schedule per year**")
+    st.dataframe(display(best).round(2), use_container_width=True, hide_index=True)
+    st.markdown(f"**Top {int(top_n)} schedules over the whole period**")
+    st.dataframe(display(results["overall"][columns]).round(2), use_container_width=True, hide_index=True)
+    with st.expander(f"Top {int(top_n)} schedules per year"):
+        st.dataframe(display(yearly[["year"] + columns]).round(2), use_container_width=True, hide_index=True)
 
 
 def main() -> None:
@@ -450,6 +248,7 @@ def main() -> None:
     **Key features:**
     - Charge battery at specified times
     - Discharge battery at specified times
+    - Or dispatch optimally with perfect foresight of each day's prices (upper-bound arbitrage value)
     - Account for round-trip efficiency losses
     - Calculate average charge/discharge prices and spreads
     - Compute total and daily average revenues (standardized per MWh of capacity)
@@ -514,48 +313,66 @@ def main() -> None:
         )
     
     with col_cycle2:
-        st.write("")  # Spacer
-    
-    # Cycle 1
-    st.markdown("**Cycle 1:**")
-    col_c1_1, col_c1_2 = st.columns(2)
-    with col_c1_1:
-        st.markdown("**Charge Time:**")
-        charge1 = time_input_with_arrows("Charge Time", time(8, 0), "charge1_time")
-    with col_c1_2:
-        st.markdown("**Discharge Time:**")
-        discharge1 = time_input_with_arrows("Discharge Time", time(20, 0), "discharge1_time")
-    
-    # Cycle 2 (if enabled)
-    charge2 = None
-    discharge2 = None
-    if num_cycles == 2:
-        st.markdown("**Cycle 2:**")
-        col_c2_1, col_c2_2 = st.columns(2)
-        with col_c2_1:
+        dispatch_mode = st.radio(
+            "Dispatch Mode",
+            options=["Fixed schedule", "Optimal (perfect foresight)"],
+            index=0,
+            key="bess_dispatch_mode",
+            help="Optimal dispatch picks the revenue-maximizing charge/discharge intervals of each day "
+            "with hindsight of its prices: the upper bound for any fixed schedule.",
+        )
+    
+    if dispatch_mode == "Fixed schedule":
+        # Cycle 1
+        st.markdown("**Cycle 1:**")
+        col_c1_1, col_c1_2 = st.columns(2)
+        with col_c1_1:
             st.markdown("**Charge Time:**")
-            charge2 = time_input_with_arrows("Charge Time", time(12, 0), "charge2_time")
-        with col_c2_2:
+            charge1 = time_input_with_arrows("Charge Time", time(8, 0), "charge1_time")
+        with col_c1_2:
             st.markdown("**Discharge Time:**")
-            discharge2 = time_input_with_arrows("Discharge Time", time(18, 0), "discharge2_time")
-    
-    # Validate cycles
-    is_valid, error_msg = validate_cycles(charge1, discharge1, charge2, discharge2)
-    if not is_valid:
-        st.error(f"Invalid cycle configuration: {error_msg}")
-        return
-    
-    # Simulate battery operations
-    df_with_bess = simulate_battery_operations(
-        df,
-        capacity_mw=capacity_mw,
-        duration_hours=duration_hours,
-        efficiency=efficiency,
-        charge1=charge1,
-        discharge1=discharge1,
-        charge2=charge2,
-        discharge2=discharge2,
-    )
+            discharge1 = time_input_with_arrows("Discharge Time", time(20, 0), "discharge1_time")
+        
+        # Cycle 2 (if enabled)
+        charge2 = None
+        discharge2 = None
+        if num_cycles == 2:
+            st.markdown("**Cycle 2:**")
+            col_c2_1, col_c2_2 = st.columns(2)
+            with col_c2_1:
+                st.markdown("**Charge Time:**")
+                charge2 = time_input_with_arrows("Charge Time", time(12, 0), "charge2_time")
+            with col_c2_2:
+                st.markdown("**Discharge Time:**")
+                discharge2 = time_input_with_arrows("Discharge Time", time(18, 0), "discharge2_time")
+        
+        # Validate cycles
+        is_valid, error_msg = validate_cycles(charge1, discharge1, charge2, discharge2)
+        if not is_valid:
+            st.error(f"Invalid cycle configuration: {error_msg}")
+            return
+        
+        # Simulate battery operations
+        df_with_bess = simulate_battery_operations(
+            df,
+            capacity_mw=capacity_mw,
+            duration_hours=duration_hours,
+            efficiency=efficiency,
+            charge1=charge1,
+            discharge1=discharge1,
+            charge2=charge2,
+            discharge2=discharge2,
+        )
+    else:
+        # Best daily schedule with hindsight, at most num_cycles charge/discharge cycles per day
+        with st.spinner("Optimizing daily dispatch..."):
+            df_with_bess = optimize_battery_operations(
+                df,
+                capacity_mw=capacity_mw,
+                duration_hours=duration_hours,
+                efficiency=efficiency,
+                max_cycles=num_cycles,
+            )
     
     # Compute metrics
     metrics = compute_bess_metrics(df_with_bess)
@@ -607,44 +424,14 @@ def main() -> None:
             f"{daily_revenue_per_mwh:.2f} €/MWh/day",
         )
     
-    # Calculate aggregations for charge/discharge prices and spreads
-    # Filter to intervals with activity
-    active_df = df_with_bess[(df_with_bess["charge_mwh"] > 0) | (df_with_bess["discharge_mwh"] > 0)].copy()
-    
-    if not active_df.empty:
-        # Add date components for aggregation
-        active_df["date_dt"] = pd.to_datetime(active_df["date"])
-        active_df["year"] = active_df["date_dt"].dt.year
-        active_df["month"] = active_df["date_dt"].dt.month
-        active_df["weekday"] = active_df["date_dt"].dt.day_name()
-        active_df["weekday_order"] = active_df["date_dt"].dt.weekday
-        
-        # Helper function to compute weighted averages for a group
-        def compute_price_metrics(group_df):
-            charge_df = group_df[group_df["charge_mwh"] > 0]
-            discharge_df = group_df[group_df["discharge_mwh"] > 0]
-            
-            # Weighted average charge price (absolute value since charge_cost is negative)
-            if charge_df["charge_mwh"].sum() > 0:
-                avg_charge = abs(charge_df["charge_cost"].sum()) / charge_df["charge_mwh"].sum()
-            else:
-                avg_charge = 0.0
-            
-            # Weighted average discharge price
-            if discharge_df["discharge_mwh"].sum() > 0:
-                avg_discharge = discharge_df["discharge_revenue"].sum() / discharge_df["discharge_mwh"].sum()
-            else:
-                avg_discharge = 0.0
-            
-            # Average spread
-            avg_spread = avg_discharge - avg_charge if (avg_charge > 0 and avg_discharge > 0) else 0.0
-            
-            return pd.Series({
-                "avg_charge_price": avg_charge,
-                "avg_discharge_price": avg_discharge,
-                "avg_spread": avg_spread,
-            })
-        
+    # Parameter sweep over fixed schedules
+    render_schedule_sweep(df, capacity_mw, duration_hours, efficiency)
+    
+    # Energy-weighted charge/discharge prices and spreads for every chart grouping,
+    # from one set of daily partials over the intervals with activity
+    price_metrics = bess_price_metrics(df_with_bess)
+    
+    if not price_metrics["daily"].empty:
         # Helper to build metric mapping
         def build_metric_mapping(show_charge, show_discharge, show_spread):
             selected = []
@@ -679,7 +466,7 @@ def main() -> None:
         
         # Yearly averages
         st.subheader("Yearly average charge/discharge prices and spreads")
-        yearly = active_df.groupby("year").apply(compute_price_metrics).reset_index()
+        yearly = price_metrics["yearly"]
         if not yearly.empty:
             # Create multi-series chart
             yearly_melted = yearly.melt(
@@ -717,8 +504,7 @@ def main() -> None:
             monthly_metrics = ["avg_spread"] if "avg_spread" in selected_metrics else selected_metrics
             monthly_mapping = metric_mapping
         
-        active_df["year_month"] = active_df["date_dt"].dt.to_period("M").dt.to_timestamp()
-        monthly = active_df.groupby("year_month").apply(compute_price_metrics).reset_index()
+        monthly = price_metrics["year_month"]
         if not monthly.empty:
             monthly_melted = monthly.melt(
                 id_vars=["year_month"],
@@ -742,7 +528,7 @@ def main() -> None:
         
         # Calendar-month averages (Jan–Dec)
         st.subheader("Calendar-month average charge/discharge prices and spreads (Jan–Dec)")
-        month_year = active_df.groupby(["year", "month"]).apply(compute_price_metrics).reset_index()
+        month_year = price_metrics["month_year"]
         if not month_year.empty:
             # Average across all years for each calendar month
             agg_dict = {}
@@ -795,7 +581,7 @@ def main() -> None:
             daily_metrics = ["avg_spread"] if "avg_spread" in selected_metrics else selected_metrics
             daily_mapping = metric_mapping
         
-        daily = active_df.groupby("date").apply(compute_price_metrics).reset_index()
+        daily = price_metrics["daily"].copy()
         if not daily.empty:
             daily["date_dt"] = pd.to_datetime(daily["date"])
             daily_melted = daily.melt(
@@ -820,7 +606,7 @@ def main() -> None:
         
         # Day-of-week averages
         st.subheader("Day-of-week average charge/discharge prices and spreads")
-        dow = active_df.groupby(["weekday", "weekday_order"]).apply(compute_price_metrics).reset_index()
+        dow = price_metrics["day_of_week"]
         if not dow.empty:
             dow = ensure_all_days(dow, "weekday", "weekday_order")
             dow_melted = dow.melt(
@@ -879,20 +665,19 @@ def main() -> None:
     available_cols = [c for c in cols if c in display_df.columns]
     st.dataframe(display_df[available_cols], use_container_width=True, height=400)
     
-    # Format datetime for CSV export
-    from utils import format_datetime_for_csv
-    df_export = format_datetime_for_csv(display_df[available_cols])
-    csv = df_export.to_csv(index=False).encode("utf-8")
+    from export import export_download_button
     start_date_str = start_dt.strftime("%Y-%m-%d")
     end_date_str = end_dt.strftime("%Y-%m-%d")
-    st.download_button(
-        label="Download BESS data as CSV",
-        data=csv,
-        file_name=f"bess_spreads_{source}_{start_date_str}_{end_date_str}.csv",
-        mime="text/csv",
+    export_download_button(
+        label="Download BESS data",
+        data=display_df,
+        file_stem=f"bess_spreads_{source}_{start_date_str}_{end_date_str}",
+        columns=available_cols,
+        key="bess_export",
     )
 
 
 # Streamlit automatically calls this when the page is loaded
 main()
 
+startup_profile.page_rendered("07_BESS_Spreads")
@@ -0,0 +1,247 @@
+import startup_profile
+startup_profile.page_started("08_Captured_Price_Matrix")
+
+from datetime import datetime
+
+import altair as alt
+import pandas as pd
+import streamlit as st
+
+st.set_page_config(
+    page_title="Captured Price Matrix",
+    page_icon=":sunny:",
+    layout="wide"
+)
+
+# Display logo in sidebar
+try:
+    st.sidebar.image("NP_logo.svg", use_container_width=True)
+except Exception:
+    pass  # Logo file not found, continue without it
+
+# Apply brand styling
+from style_config import apply_brand_styling
+apply_brand_styling()
+
+# Read the published copy of the database, not the one ingest writes to
+from db import use_published_db
+use_published_db()
+
+from captured_prices import (
+    CAPTURED_GROUPINGS,
+    captured_price_matrix,
+    list_markets,
+    list_pv_profiles,
+)
+from chart_config import CHART_ORDER, DAY_ORDER, MONTH_ORDER, get_chart_title
+from data_loader import get_data_source_date_range
+
+
+def _profile_label(name: str) -> str:
+    # Note: pv2 and pv3 columns have been swapped in the database
+    mapping = {
+        "pv1": "PV 1.2 DC/AC",
+        "pv2": "PV 2.0 DC/AC",  # pv2 now contains what was pv3
+        "pv3": "PV 1.5 DC/AC",  # pv3 now contains what was pv2
+    }
+    return mapping.get(name, name)
+
+
+def _market_source(market_id: str) -> str:
+    """Data source used for date ranges and inflation of a market."""
+    if market_id == "600":
+        return "historical_prices"
+    return market_id
+
+
+METRICS = {
+    "captured_price": ("Captured price", "€/MWh", 2),
+    "capture_factor": ("Capture factor", "Factor", 3),
+}
+
+
+def _group_label(df: pd.DataFrame, grouping: str) -> pd.Series:
+    """Column label for a group (x axis of the grid)."""
+    if grouping == "yearly":
+        return df["year"].astype(str)
+    if grouping == "year_month":
+        return df["year_month"].dt.strftime("%Y-%m")
+    if grouping == "calendar_month":
+        return df["month"].map(lambda m: MONTH_ORDER[m - 1])
+    if grouping == "daily":
+        return pd.to_datetime(df["date"]).dt.strftime("%Y-%m-%d")
+    if grouping == "day_of_week":
+        return df["weekday"]
+    return df["hour"].astype(str)
+
+
+def _label_order(grouping: str, labels: pd.Series) -> list[str]:
+    if grouping == "calendar_month":
+        return [m for m in MONTH_ORDER if m in set(labels)]
+    if grouping == "day_of_week":
+        return [d for d in DAY_ORDER if d in set(labels)]
+    if grouping == "hour_of_day":
+        return [str(h) for h in range(24) if str(h) in set(labels)]
+    return sorted(set(labels))
+
+
+def main() -> None:
+    markets = list_markets()
+    pv_profiles = list_pv_profiles()
+
+    if not markets:
+        st.warning("No markets found in prices DB.")
+        return
+    if not pv_profiles:
+        st.warning("No PV profiles found in PV DB.")
+        return
+
+    # Standardized market order: 1) OMIE DA SP, 2) ESIOS DA 600, 3) Aurora, 4) Baringa
+    standardized_order = ["omie_da", "600", "Aurora_Jun_2025", "Baringa_Q2_2025"]
+    market_ids = [m for m in standardized_order if m in markets]
+    market_ids += [m for m in markets if m not in market_ids]
+
+    # Sidebar: Markets and PV profiles
+    st.sidebar.header("Markets")
+    selected_markets = st.sidebar.multiselect(
+        "Markets",
+        options=market_ids,
+        default=market_ids,
+        format_func=lambda k: markets[k].label,
+    )
+    st.sidebar.header("PV Profiles")
+    selected_profiles = st.sidebar.multiselect(
+        "PV profiles",
+        options=pv_profiles,
+        default=pv_profiles,
+        format_func=_profile_label,
+    )
+    if not selected_markets or not selected_profiles:
+        st.info("Select at least one market and one PV profile.")
+        return
+
+    # Sidebar: Years (historical and forecast markets cover different periods,
+    # so the window spans the union of their ranges)
+    st.sidebar.header("Years")
+    ranges = [get_data_source_date_range(_market_source(m)) for m in selected_markets]
+    min_year = min(r[0].year for r in ranges)
+    max_year = max(r[1].year for r in ranges)
+    if min_year < max_year:
+        start_year, end_year = st.sidebar.slider(
+            "Year range",
+            min_value=min_year,
+            max_value=max_year,
+            value=(min_year, max_year),
+        )
+    else:
+        start_year = end_year = min_year
+    start_dt = datetime(start_year, 1, 1)
+    end_dt = datetime(end_year, 12, 31, 23, 59, 59)
+
+    # Sidebar: Inflation - only applied to forecasts
+    forecast_markets = [m for m in selected_markets if m in ("Aurora_Jun_2025", "Baringa_Q2_2025")]
+    inflation_rate = 0.0
+    if forecast_markets:
+        from session_state import get_inflation_input
+        inflation_rate = get_inflation_input(_market_source(forecast_markets[0]))
+
+    # All market x profile pairs in one pass per market
+    matrix = captured_price_matrix(
+        selected_markets, selected_profiles, start_dt=start_dt, end_dt=end_dt, inflation_rate=inflation_rate
+    )
+    if matrix["yearly"].empty:
+        st.info("No overlapping price and PV data for the selected combination.")
+        return
+
+    st.title("Captured Price Matrix")
+    st.markdown(f"**Years:** {start_year} to {end_year}")
+    if inflation_rate > 0:
+        st.markdown(f"**Inflation:** forecasts inflated at {inflation_rate*100:.1f}% p.a.")
+    st.markdown("""
+    This page compares PV captured prices and capture factors for every selected market and PV profile.
+    **Capture factor = PV captured price / baseload price** over the same period.
+    """)
+
+    def pair_label(df: pd.DataFrame) -> pd.Series:
+        return df["market"].map(lambda m: markets[m].label) + " · " + df["profile"].map(_profile_label)
+
+    # Whole-period grid (market rows, profile columns), rolled up from the yearly sums
+    st.subheader("Whole period")
+    totals = (
+        matrix["yearly"]
+        .groupby(["market", "profile"], as_index=False)[["sum_price_pv", "sum_pv", "sum_price", "n_prices"]]
+        .sum()
+    )
+    totals["captured_price"] = totals["sum_price_pv"] / totals["sum_pv"]
+    totals["capture_factor"] = totals["captured_price"] / (totals["sum_price"] / totals["n_prices"])
+    totals["Market"] = totals["market"].map(lambda m: markets[m].label)
+    totals["Profile"] = totals["profile"].map(_profile_label)
+    market_order = [markets[m].label for m in selected_markets if m in set(totals["market"])]
+    profile_order = [_profile_label(p) for p in selected_profiles]
+    col1, col2 = st.columns(2)
+    for col, metric in zip((col1, col2), METRICS):
+        title, unit, decimals = METRICS[metric]
+        grid = totals.pivot(index="Market", columns="Profile", values=metric)
+        grid = grid.reindex(index=market_order, columns=[p for p in profile_order if p in grid.columns])
+        col.markdown(f"**{title} ({unit})**")
+        col.dataframe(grid.round(decimals), use_container_width=True)
+
+    # Grid for one of the standard groupings
+    st.subheader("By grouping")
+    grouping = st.selectbox(
+        "Grouping",
+        options=[g for g in CHART_ORDER if g in CAPTURED_GROUPINGS],
+        format_func=get_chart_title,
+    )
+    metric = st.radio(
+        "Metric",
+        options=list(METRICS),
+        format_func=lambda m: METRICS[m][0],
+        horizontal=True,
+    )
+    unit = METRICS[metric][1]
+
+    df = matrix[grouping].copy()
+    df["pair"] = pair_label(df)
+    df["group"] = _group_label(df, grouping)
+    pair_order = [
+        f"{markets[m].label} · {_profile_label(p)}" for m in selected_markets for p in selected_profiles
+    ]
+    heatmap = (
+        alt.Chart(df)
+        .mark_rect()
+        .encode(
+            x=alt.X("group:O", title=None, sort=_label_order(grouping, df["group"])),
+            y=alt.Y("pair:N", title=None, sort=[p for p in pair_order if p in set(df["pair"])]),
+            color=alt.Color(f"{metric}:Q", title=unit, scale=alt.Scale(scheme="greens")),
+            tooltip=[
+                alt.Tooltip("pair:N", title="Market · profile"),
+                alt.Tooltip("group:O", title="Group"),
+                alt.Tooltip("captured_price:Q", title="Captured price", format=".2f"),
+                alt.Tooltip("baseload_price:Q", title="Baseload price", format=".2f"),
+                alt.Tooltip("capture_factor:Q", title="Capture factor", format=".3f"),
+            ],
+        )
+        .properties(height=max(30 * len(pair_order), 150))
+    )
+    st.altair_chart(heatmap, use_container_width=True)
+
+    # Full matrix and download
+    st.subheader("Raw captured price matrix")
+    group_cols = CAPTURED_GROUPINGS[grouping]
+    cols = ["market", "profile"] + group_cols + ["captured_price", "baseload_price", "capture_factor"]
+    st.dataframe(df[cols], use_container_width=True, height=400)
+    from export import export_download_button
+    export_download_button(
+        label="Download captured price matrix",
+        data=df,
+        file_stem=f"captured_price_matrix_{grouping}_{start_year}_{end_year}",
+        columns=cols,
+        key="captured_matrix_export",
+    )
+
+
+# Streamlit automatically calls this when the page is loaded
+main()
+
+startup_profile.page_rendered("08_Captured_Price_Matrix")
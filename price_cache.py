@@ -0,0 +1,259 @@
+"""
+Process-wide in-memory cache for price series and PV profiles.
+
+Entries are keyed on (kind, name, data version). Every writer bumps the
+version of the series it touches in the ``data_versions`` table, so a
+cached entry stops matching as soon as new data is ingested, including by
+a backfill script running in another process.
+
+Cached values are shared between Streamlit sessions without copying.
+Their NumPy data is marked read-only when stored, and callers receive a
+new pandas object (or array view) on the same data. Adding or replacing a
+column only changes the caller's object; writing into the shared data in
+place (e.g. ``df.loc[mask, col] = x``) raises, so callers that need to do
+that take a ``.copy()`` first. Dicts are copied with their values shared
+the same way. Other values must be immutable.
+"""
+import os
+import sqlite3
+import sys
+import threading
+from collections import OrderedDict
+from typing import Callable, Optional
+
+import numpy as np
+import pandas as pd
+
+from db import DB_PATH, reader, writer
+
+
+DATA_VERSIONS_TABLE = "data_versions"
+
+
+def _ensure_versions_table(conn: sqlite3.Connection) -> None:
+    conn.execute(
+        f"CREATE TABLE IF NOT EXISTS {DATA_VERSIONS_TABLE} (name TEXT PRIMARY KEY, version INTEGER NOT NULL)"
+    )
+
+
+def bump_data_version(names, conn: Optional[sqlite3.Connection] = None) -> None:
+    """
+    Increment the data version of one or more series so cached copies are dropped.
+
+    Args:
+        names: Series name or iterable of names (e.g. "OMIE_SP", "pv_profiles")
+        conn: Optional write connection (committed by the caller's transaction if given)
+    """
+    if isinstance(names, str):
+        names = [names]
+    if conn is None:
+        with writer() as conn:
+            return bump_data_version(names, conn)
+    _ensure_versions_table(conn)
+    conn.executemany(
+        f"""
+        INSERT INTO {DATA_VERSIONS_TABLE} (name, version) VALUES (?, 1)
+        ON CONFLICT(name) DO UPDATE SET version = version + 1
+        """,
+        [(name,) for name in names],
+    )
+
+
+def get_data_version(name: Optional[str] = None) -> int:
+    """
+    Return the current data version of a series (0 if never written).
+
+    With no name, return a version that changes whenever any series is written.
+    """
+    if not DB_PATH.exists():
+        return 0
+    with reader() as conn:
+        cur = conn.cursor()
+        cur.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name=?", (DATA_VERSIONS_TABLE,))
+        if cur.fetchone() is None:
+            return 0
+        if name is None:
+            cur.execute(f"SELECT COALESCE(SUM(version), 0) FROM {DATA_VERSIONS_TABLE}")
+        else:
+            cur.execute(f"SELECT version FROM {DATA_VERSIONS_TABLE} WHERE name = ?", (name,))
+        row = cur.fetchone()
+    return int(row[0]) if row else 0
+
+
+def _size_bytes(value) -> int:
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(index=True, deep=True).sum())
+    if isinstance(value, pd.Series):
+        return int(value.memory_usage(index=True, deep=True))
+    if isinstance(value, np.ndarray):
+        return int(value.nbytes)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(_size_bytes(k) + _size_bytes(v) for k, v in value.items())
+    return sys.getsizeof(value)
+
+
+def _read_only(values: np.ndarray) -> np.ndarray:
+    values.flags.writeable = False
+    return values
+
+
+def _column_data(column: pd.Series):
+    """Read-only NumPy data of a column; extension arrays (e.g. tz-aware) are kept as they are."""
+    if isinstance(column.dtype, np.dtype):
+        return _read_only(column.to_numpy(copy=False))
+    return column.array
+
+
+def _freeze(value):
+    """
+    Return the value to store, with its NumPy data marked read-only.
+
+    Frames are rebuilt column by column from read-only views of their data
+    (no copy). The stored frame is never consolidated, since callers only
+    ever get shallow copies of it, so its blocks stay read-only.
+    """
+    if isinstance(value, pd.DataFrame) and value.columns.is_unique:
+        columns = {col: _column_data(value[col]) for col in value.columns}
+        return pd.DataFrame(columns, index=value.index, copy=False)
+    if isinstance(value, pd.Series):
+        return pd.Series(_column_data(value), index=value.index, name=value.name, copy=False)
+    if isinstance(value, np.ndarray):
+        return _read_only(value)
+    if isinstance(value, dict):
+        return {key: _freeze(item) for key, item in value.items()}
+    return value
+
+
+def _share(value):
+    """Return a new object on the cached data; writing into that data in place raises."""
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        return value.copy(deep=False)
+    if isinstance(value, np.ndarray):
+        return value.view()
+    if isinstance(value, dict):
+        return {key: _share(item) for key, item in value.items()}
+    return value
+
+
+class PriceCache:
+    """
+    Thread-safe LRU cache bounded by the total size of the cached values.
+
+    Keys are (kind, name, version) tuples; storing a new version of a
+    (kind, name) pair drops the older ones straight away.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[tuple, tuple[object, int]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: tuple):
+        """Return a shared view of the cached value, or None on a miss."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return _share(entry[0])
+
+    def put(self, key: tuple, value):
+        """
+        Store a value, evicting least recently used entries to stay under max_bytes.
+
+        Returns:
+            The value as stored, with its NumPy data read-only (see _freeze)
+        """
+        # Measured before freezing: pandas cannot size read-only object columns
+        size = _size_bytes(value)
+        value = _freeze(value)
+        with self._lock:
+            for stale in [k for k in self._entries if k[:-1] == key[:-1]]:
+                self._bytes -= self._entries.pop(stale)[1]
+            if size > self.max_bytes:
+                return value
+            self._entries[key] = (value, size)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+                self.evictions += 1
+        return value
+
+    def get_or_load(self, key: tuple, loader: Callable[[], object]):
+        """Return the cached value for key, calling loader() to fill it on a miss."""
+        value = self.get(key)
+        if value is not None:
+            return value
+        return _share(self.put(key, loader()))
+
+    def invalidate(self, name: Optional[str] = None) -> None:
+        """Drop every entry, or only the entries for one series name."""
+        with self._lock:
+            for key in list(self._entries):
+                if name is None or key[1] == name:
+                    self._bytes -= self._entries.pop(key)[1]
+
+    def stats(self) -> dict:
+        """Return hit/miss/eviction counters and current memory use."""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+            }
+
+
+# Default budget 512 MB; override with PRICE_CACHE_MAX_MB
+PRICE_CACHE = PriceCache(max_bytes=int(float(os.getenv("PRICE_CACHE_MAX_MB", "512")) * 1024 * 1024))
+
+
+def cached(kind: str, name: str, loader: Callable[[], object], version_name: Optional[str] = None):
+    """
+    Return loader() through the shared cache, keyed on the current data version.
+
+    Args:
+        kind: Which loader produced the value (e.g. "price_frame", "pv_profile")
+        name: Series or profile name
+        loader: Zero-argument function reading the value from SQLite
+        version_name: Data version to key on (defaults to name; "" means any write)
+
+    Returns:
+        The cached value (shared read-only, see module docstring)
+    """
+    version_name = name if version_name is None else version_name
+    version = get_data_version(version_name or None)
+    return PRICE_CACHE.get_or_load((kind, name, version), loader)
+
+
+def slice_by_datetime(
+    frame: pd.DataFrame,
+    start_dt: Optional[pd.Timestamp] = None,
+    end_dt: Optional[pd.Timestamp] = None,
+    column: str = "datetime",
+) -> pd.DataFrame:
+    """
+    Return the rows of a datetime-sorted frame inside [start_dt, end_dt].
+
+    Uses a binary search on the sorted column, so the result is a row slice
+    sharing data with the input instead of a boolean-mask copy. The slice is
+    a frame of its own, so callers can add columns to it.
+    """
+    values = frame[column].to_numpy()
+    lo = 0 if start_dt is None else values.searchsorted(pd.Timestamp(start_dt).to_datetime64(), side="left")
+    hi = len(values) if end_dt is None else values.searchsorted(pd.Timestamp(end_dt).to_datetime64(), side="right")
+    return frame.iloc[lo:hi].copy(deep=False)
+
+
+def cache_stats() -> dict:
+    """Return the shared cache counters (for debug panels)."""
+    return PRICE_CACHE.stats()
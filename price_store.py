@@ -0,0 +1,538 @@
+"""
+Columnar, time-indexed price store.
+
+All price series live in a single ``price_store`` table keyed on integer
+epoch minutes (naive wall-clock time, as stored in the legacy tables), with
+one REAL column per series. Reads come back with a ``datetime64`` index
+straight from the integer key, so no timestamp strings are parsed.
+
+The store is filled from the legacy tables by migration 7 (``python
+migrations.py``, or ``python price_store.py``). Until that has run, writes
+to the store are skipped and has_series() is False, so the loaders keep
+reading the legacy tables and a partly filled store is never served.
+
+Series names:
+- ESIOS_600: ESIOS day-ahead indicator 600 (historical_prices.ESIOS_600_DA_prices)
+- OMIE_SP / OMIE_PT: OMIE day-ahead Spain / Portugal (historical_prices.OMIE_*_DA_prices)
+- ESIOS_<id>: other ESIOS indicators (spot_prices_<id>.price_eur_per_mwh)
+- one column per forecast source (e.g. Aurora_Jun_2025, Baringa_Q2_2025)
+
+Usage:
+    python price_store.py
+    python price_store.py --benchmark --series OMIE_SP
+"""
+import argparse
+import sqlite3
+import time
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from db import DB_PATH, reader, writer
+from migrations import PRICE_STORE_MIGRATION, migration_applied, record_migration
+from price_cache import bump_data_version
+
+
+PRICE_STORE_TABLE = "price_store"
+
+# Legacy historical_prices column -> store series
+LEGACY_HISTORICAL_COLUMNS = {
+    "ESIOS_600_DA_prices": "ESIOS_600",
+    "OMIE_SP_DA_prices": "OMIE_SP",
+    "OMIE_PT_DA_prices": "OMIE_PT",
+}
+
+# Data source / market identifiers used by the pages -> store series
+SOURCE_SERIES = {
+    "historical_prices": "ESIOS_600",
+    "600": "ESIOS_600",
+    "omie_da": "OMIE_SP",
+}
+
+# SQLite expression turning a legacy datetime string into epoch minutes.
+# Only the first 19 characters are used, so 'Z' and '+01:00' suffixes are
+# dropped without shifting the wall-clock time (same as utils.parse_timestamp).
+_LEGACY_EPOCH_MINUTES_SQL = "CAST(strftime('%s', substr(datetime, 1, 19)) AS INTEGER) / 60"
+
+
+def series_for_source(source: str) -> str:
+    """Return the store series name for a data source or market identifier."""
+    return SOURCE_SERIES.get(source, source)
+
+
+def series_for_indicator(indicator_id: int) -> str:
+    """Return the store series name for an ESIOS indicator."""
+    return f"ESIOS_{indicator_id}"
+
+
+def to_epoch_minutes(datetimes) -> np.ndarray:
+    """Convert naive datetimes (anything pd.to_datetime accepts) to int64 epoch minutes."""
+    values = pd.to_datetime(datetimes).to_numpy(dtype="datetime64[ns]")
+    return values.astype("datetime64[m]").astype(np.int64)
+
+
+def from_epoch_minutes(minutes: np.ndarray) -> pd.DatetimeIndex:
+    """Convert int64 epoch minutes to a naive DatetimeIndex."""
+    minutes = np.asarray(minutes, dtype=np.int64)
+    return pd.DatetimeIndex(minutes.astype("datetime64[m]").astype("datetime64[ns]"), name="datetime")
+
+
+def _store_columns(cur: sqlite3.Cursor) -> list[str]:
+    cur.execute(f"PRAGMA table_info({PRICE_STORE_TABLE})")
+    return [row[1] for row in cur.fetchall()]
+
+
+def init_store(conn: Optional[sqlite3.Connection] = None) -> None:
+    """Create the price_store table with the historical series columns if it does not exist."""
+    if conn is None:
+        with writer() as conn:
+            return init_store(conn)
+    series_cols = ", ".join(f'"{s}" REAL' for s in LEGACY_HISTORICAL_COLUMNS.values())
+    conn.execute(
+        f"CREATE TABLE IF NOT EXISTS {PRICE_STORE_TABLE} (ts INTEGER PRIMARY KEY, {series_cols})"
+    )
+
+
+def ensure_series(series: str, conn: Optional[sqlite3.Connection] = None) -> None:
+    """Add a REAL column for the series to price_store if it does not exist."""
+    if conn is None:
+        with writer() as conn:
+            return ensure_series(series, conn)
+    init_store(conn)
+    cur = conn.cursor()
+    if series not in _store_columns(cur):
+        cur.execute(f'ALTER TABLE {PRICE_STORE_TABLE} ADD COLUMN "{series}" REAL')
+
+
+def store_ready(conn: sqlite3.Connection) -> bool:
+    """Return True once the legacy tables have been copied into the store (migration 7)."""
+    return migration_applied(conn, PRICE_STORE_MIGRATION)
+
+
+def has_series(series: str) -> bool:
+    """Return True if the store has been filled from the legacy tables and holds a value for the series."""
+    if not DB_PATH.exists():
+        return False
+    with reader() as conn:
+        cur = conn.cursor()
+        if not store_ready(conn) or series not in _store_columns(cur):
+            return False
+        cur.execute(f'SELECT 1 FROM {PRICE_STORE_TABLE} WHERE "{series}" IS NOT NULL LIMIT 1')
+        return cur.fetchone() is not None
+
+
+def upsert_series(
+    frame: pd.DataFrame,
+    columns: dict[str, str],
+    datetime_col: str = "datetime",
+    conn: Optional[sqlite3.Connection] = None,
+) -> int:
+    """
+    Write one or more series into the store, leaving other series untouched.
+
+    Nothing is written before the store has been filled from the legacy
+    tables (see store_ready): the caller's legacy rows are copied by that
+    migration, whereas a series created here first would hold only them.
+    The data versions are bumped either way.
+
+    Args:
+        frame: DataFrame with a datetime column and one value column per series
+        columns: Mapping of frame column -> store series name
+        datetime_col: Name of the datetime column in frame
+        conn: Optional write connection (committed by the caller's transaction if given)
+
+    Returns:
+        Number of rows written (0 if the store has not been filled yet)
+    """
+    if frame.empty or not columns:
+        return 0
+
+    if conn is None:
+        with writer() as conn:
+            return upsert_series(frame, columns, datetime_col, conn)
+    if not store_ready(conn):
+        # The legacy tables changed all the same (publish and the caches key on it)
+        bump_data_version(list(columns.values()), conn)
+        return 0
+    for series in columns.values():
+        ensure_series(series, conn)
+
+    ts = to_epoch_minutes(frame[datetime_col])
+    values = [frame[col].astype(float).to_numpy() for col in columns]
+    rows = [
+        (int(t), *[None if np.isnan(v) else float(v) for v in vals])
+        for t, *vals in zip(ts, *values)
+    ]
+
+    target_cols = ", ".join(f'"{s}"' for s in columns.values())
+    placeholders = ", ".join("?" for _ in range(len(columns) + 1))
+    updates = ", ".join(f'"{s}" = excluded."{s}"' for s in columns.values())
+    conn.executemany(
+        f"""
+        INSERT INTO {PRICE_STORE_TABLE} (ts, {target_cols})
+        VALUES ({placeholders})
+        ON CONFLICT(ts) DO UPDATE SET {updates}
+        """,
+        rows,
+    )
+    # Imported here: rollups, the catalog and coverage read the store through this module
+    from coverage_index import update_coverage
+    from rollups import refresh_rollups
+    from series_catalog import refresh_catalog
+    refresh_rollups(list(columns.values()), int(ts.min()), int(ts.max()), conn)
+    refresh_catalog(list(columns.values()), conn)
+    for series, vals in zip(columns.values(), values):
+        update_coverage(series, ts, ~np.isnan(vals), conn)
+    bump_data_version(list(columns.values()), conn)
+    return len(rows)
+
+
+def delete_series_range(
+    series_list: list[str],
+    start_dt=None,
+    end_dt=None,
+    conn: Optional[sqlite3.Connection] = None,
+) -> int:
+    """
+    Clear the values of one or more series in a datetime range, leaving other series untouched.
+
+    Rollups, catalog rows and coverage bits of the cleared intervals are
+    refreshed and the data versions bumped, as in upsert_series.
+
+    Args:
+        series_list: Store series names (series not in the store are ignored)
+        start_dt: Optional inclusive start datetime (default: no lower bound)
+        end_dt: Optional inclusive end datetime (default: no upper bound)
+        conn: Optional write connection (committed by the caller's transaction if given)
+
+    Returns:
+        Number of values cleared
+    """
+    if conn is None:
+        with writer() as conn:
+            return delete_series_range(series_list, start_dt, end_dt, conn)
+    if not store_ready(conn):
+        # Only the caller's legacy rows changed (see upsert_series)
+        bump_data_version(series_list, conn)
+        return 0
+    stored = set(_store_columns(conn.cursor()))
+    series_list = [series for series in series_list if series in stored]
+    if not series_list:
+        return 0
+    lo_ts = int(to_epoch_minutes([start_dt])[0]) if start_dt is not None else np.iinfo(np.int64).min
+    hi_ts = int(to_epoch_minutes([end_dt])[0]) if end_dt is not None else np.iinfo(np.int64).max
+
+    # Imported here: rollups, the catalog and coverage read the store through this module
+    from coverage_index import update_coverage
+    from rollups import refresh_rollups
+    from series_catalog import refresh_catalog
+    cleared = 0
+    for series in series_list:
+        column = f'"{series}"'
+        where = f"ts BETWEEN ? AND ? AND {column} IS NOT NULL"
+        rows = conn.execute(f"SELECT ts FROM {PRICE_STORE_TABLE} WHERE {where}", (lo_ts, hi_ts)).fetchall()
+        if not rows:
+            continue
+        ts = np.array([row[0] for row in rows], dtype=np.int64)
+        conn.execute(f"UPDATE {PRICE_STORE_TABLE} SET {column} = NULL WHERE {where}", (lo_ts, hi_ts))
+        refresh_rollups([series], int(ts.min()), int(ts.max()), conn)
+        update_coverage(series, ts, np.zeros(len(ts), dtype=bool), conn)
+        cleared += len(ts)
+    refresh_catalog(series_list, conn)
+    bump_data_version(series_list, conn)
+    return cleared
+
+
+def read_series(
+    series: str,
+    start_dt: Optional[pd.Timestamp] = None,
+    end_dt: Optional[pd.Timestamp] = None,
+) -> pd.Series:
+    """
+    Read a price series as a float Series with a naive DatetimeIndex named 'datetime'.
+
+    A current snapshot (see snapshots) is used when there is one; the result
+    is then a float32 view on the memory-mapped files.
+
+    Args:
+        series: Store series name (see series_for_source)
+        start_dt: Optional inclusive start datetime
+        end_dt: Optional inclusive end datetime
+
+    Returns:
+        Series of prices sorted by datetime (empty if the series is unknown)
+    """
+    if not DB_PATH.exists():
+        return _empty_series(series)
+
+    # Imported here: snapshots builds on this module
+    from snapshots import snapshot_series
+    snapshot = snapshot_series(series, start_dt, end_dt)
+    if snapshot is not None:
+        return snapshot
+    return _read_store(series, start_dt, end_dt)
+
+
+def _empty_series(series: str) -> pd.Series:
+    return pd.Series([], index=from_epoch_minutes(np.array([], dtype=np.int64)), dtype=float, name=series)
+
+
+def _read_store(series: str, start_dt=None, end_dt=None) -> pd.Series:
+    """read_series from the price_store table (no snapshot)."""
+    with reader() as conn:
+        cur = conn.cursor()
+        if series not in _store_columns(cur):
+            return _empty_series(series)
+        query = f'SELECT ts, "{series}" FROM {PRICE_STORE_TABLE} WHERE "{series}" IS NOT NULL'
+        params: list = []
+        if start_dt is not None:
+            query += " AND ts >= ?"
+            params.append(int(to_epoch_minutes([start_dt])[0]))
+        if end_dt is not None:
+            query += " AND ts <= ?"
+            params.append(int(to_epoch_minutes([end_dt])[0]))
+        query += " ORDER BY ts"
+        cur.execute(query, params)
+        rows = cur.fetchall()
+
+    if not rows:
+        return _empty_series(series)
+    data = np.array(rows, dtype=np.float64)
+    return pd.Series(data[:, 1], index=from_epoch_minutes(data[:, 0].astype(np.int64)), name=series)
+
+
+def series_date_range(series: str) -> Optional[tuple[pd.Timestamp, pd.Timestamp]]:
+    """Return (min, max) datetime stored for the series, or None if it has no data."""
+    if not DB_PATH.exists():
+        return None
+    with reader() as conn:
+        cur = conn.cursor()
+        if series not in _store_columns(cur):
+            return None
+        # Walk the ts key from each end to the first value instead of scanning
+        # the whole column for MIN/MAX
+        ends = []
+        for order in ("ASC", "DESC"):
+            cur.execute(
+                f'SELECT ts FROM {PRICE_STORE_TABLE} WHERE "{series}" IS NOT NULL ORDER BY ts {order} LIMIT 1'
+            )
+            row = cur.fetchone()
+            if row is None:
+                return None
+            ends.append(row[0])
+    bounds = from_epoch_minutes(np.array(ends, dtype=np.int64))
+    return bounds[0], bounds[1]
+
+
+def price_frame(series: pd.Series) -> pd.DataFrame:
+    """
+    Expand a store series into the row-per-interval frame shape the pages use.
+
+    The datetime and price columns share the series' data (e.g. a mapped
+    snapshot) rather than copying it.
+
+    Returns:
+        DataFrame with columns: datetime, datetime_parsed, year, month, day, hour, minute, price_eur_per_mwh
+    """
+    idx = series.index
+    return pd.DataFrame(
+        {
+            "datetime": idx,
+            "datetime_parsed": idx,
+            "year": idx.year,
+            "month": idx.month,
+            "day": idx.day,
+            "hour": idx.hour,
+            "minute": idx.minute,
+            "price_eur_per_mwh": series.to_numpy(),
+        },
+        copy=False,
+    )
+
+
+def migrate_legacy_schema() -> dict[str, int]:
+    """
+    Copy historical_prices, spot_prices_<id> and forecasts into price_store.
+
+    Runs entirely in SQL (timestamps are converted with strftime), so no
+    rows are pulled into Python. Safe to re-run: existing keys are updated.
+    The copy is recorded as migration 7 in the same transaction, so ingest
+    starts writing the store exactly when its legacy rows are in. The
+    rollups of every series, the series catalog and the coverage bitmaps
+    are rebuilt afterwards.
+
+    Returns:
+        Dictionary mapping series name -> number of non-null values now stored
+    """
+    with writer() as conn:
+        cur = conn.cursor()
+        init_store(conn)
+
+        cur.execute("SELECT name FROM sqlite_master WHERE type='table'")
+        tables = {row[0] for row in cur.fetchall()}
+
+        if "historical_prices" in tables:
+            cur.execute("PRAGMA table_info(historical_prices)")
+            legacy_cols = [c[1] for c in cur.fetchall()]
+            mapping = {c: s for c, s in LEGACY_HISTORICAL_COLUMNS.items() if c in legacy_cols}
+            if mapping:
+                target_cols = ", ".join(f'"{s}"' for s in mapping.values())
+                source_cols = ", ".join(mapping.keys())
+                updates = ", ".join(f'"{s}" = excluded."{s}"' for s in mapping.values())
+                cur.execute(
+                    f"""
+                    INSERT INTO {PRICE_STORE_TABLE} (ts, {target_cols})
+                    SELECT {_LEGACY_EPOCH_MINUTES_SQL}, {source_cols}
+                    FROM historical_prices
+                    WHERE {_LEGACY_EPOCH_MINUTES_SQL} IS NOT NULL
+                    ON CONFLICT(ts) DO UPDATE SET {updates}
+                    """
+                )
+
+        for table in sorted(tables):
+            indicator = table.removeprefix("spot_prices_")
+            if indicator == table or not indicator.isdigit():
+                continue
+            series = series_for_indicator(int(indicator))
+            ensure_series(series, conn)
+            cur.execute(
+                f"""
+                INSERT INTO {PRICE_STORE_TABLE} (ts, "{series}")
+                SELECT {_LEGACY_EPOCH_MINUTES_SQL}, price_eur_per_mwh
+                FROM "{table}"
+                WHERE {_LEGACY_EPOCH_MINUTES_SQL} IS NOT NULL
+                ON CONFLICT(ts) DO UPDATE SET "{series}" = excluded."{series}"
+                """
+            )
+
+        if "forecasts" in tables:
+            cur.execute("SELECT DISTINCT source FROM forecasts")
+            sources = [row[0] for row in cur.fetchall() if row[0]]
+            for source in sources:
+                ensure_series(source, conn)
+                cur.execute(
+                    f"""
+                    INSERT INTO {PRICE_STORE_TABLE} (ts, "{source}")
+                    SELECT {_LEGACY_EPOCH_MINUTES_SQL}, price_eur_per_mwh
+                    FROM forecasts
+                    WHERE source = ? AND {_LEGACY_EPOCH_MINUTES_SQL} IS NOT NULL
+                    ON CONFLICT(ts) DO UPDATE SET "{source}" = excluded."{source}"
+                    """,
+                    (source,),
+                )
+
+        counts = {}
+        for series in _store_columns(cur):
+            if series == "ts":
+                continue
+            cur.execute(f'SELECT COUNT(*) FROM {PRICE_STORE_TABLE} WHERE "{series}" IS NOT NULL')
+            counts[series] = cur.fetchone()[0]
+        bump_data_version(list(counts), conn)
+        record_migration(conn, PRICE_STORE_MIGRATION, sum(counts.values()))
+
+    from coverage_index import rebuild_coverage
+    from rollups import rebuild_rollups
+    from series_catalog import rebuild_catalog
+    rebuild_rollups(list(counts))
+    rebuild_catalog()
+    rebuild_coverage()
+    return counts
+
+
+def _read_legacy(series: str) -> pd.Series:
+    """Read a series the way the loaders did before the store: pd.read_sql on the legacy table, then parse."""
+    # Imported here: only the benchmark needs the string parser
+    from timestamps import parse_timestamps
+
+    legacy_column = {s: c for c, s in LEGACY_HISTORICAL_COLUMNS.items()}.get(series)
+    with reader() as conn:
+        if legacy_column is not None:
+            df = pd.read_sql(
+                f"SELECT datetime, {legacy_column} AS price FROM historical_prices "
+                f"WHERE {legacy_column} IS NOT NULL ORDER BY datetime",
+                conn,
+            )
+        else:
+            df = pd.read_sql(
+                "SELECT datetime, price_eur_per_mwh AS price FROM forecasts WHERE source = ? ORDER BY datetime",
+                conn,
+                params=[series],
+            )
+    parsed = parse_timestamps(df["datetime"])
+    return pd.Series(df["price"].to_numpy(), index=pd.DatetimeIndex(parsed, name="datetime"), name=series).dropna()
+
+
+def run_benchmark(series_list: list[str], repeat: int) -> None:
+    """Time legacy pd.read_sql reads against read_series (store table and snapshot) and compare their values."""
+    readers = {"legacy": _read_legacy, "store": _read_store, "read_series": read_series}
+    for series in series_list:
+        print(f"{series}:")
+        results = {}
+        for name, read in readers.items():
+            times = []
+            for _ in range(max(repeat, 1)):
+                start = time.perf_counter()
+                try:
+                    result = read(series)
+                except (sqlite3.OperationalError, pd.errors.DatabaseError):
+                    result = None
+                    break
+                times.append(time.perf_counter() - start)
+            if result is None:
+                print(f"  {name:<12} no legacy table")
+                continue
+            print(
+                f"  {name:<12} first {times[0] * 1000:8.1f} ms, "
+                f"best {min(times) * 1000:8.1f} ms, {len(result)} rows"
+            )
+            results[name] = (min(times), result)
+        if "legacy" in results:
+            legacy_time, legacy = results["legacy"]
+            for name in ("store", "read_series"):
+                best, result = results[name]
+                aligned = result.reindex(legacy.index)
+                diff = float(np.nanmax(np.abs(aligned.to_numpy(dtype=float) - legacy.to_numpy()), initial=0.0))
+                print(
+                    f"  {name} vs legacy: {legacy_time / best:.1f}x faster, "
+                    f"{int(aligned.isna().sum())} legacy rows missing, max difference {diff:.2e}"
+                )
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Migrate the legacy price tables into price_store, or benchmark reads.")
+    parser.add_argument(
+        "--benchmark", action="store_true", help="Time read_series against the legacy pd.read_sql path instead of migrating"
+    )
+    parser.add_argument("--series", type=str, nargs="+", help="Series to benchmark (default: every stored series)")
+    parser.add_argument("--repeat", type=int, default=3, help="Reads per series and path (the first one is cold)")
+    return parser.parse_args()
+
+
+def main() -> None:
+    """Migrate the legacy tables into price_store and print per-series counts (or run the read benchmark)."""
+    args = parse_args()
+    if not DB_PATH.exists():
+        print(f"Database {DB_PATH} does not exist. Nothing to do.")
+        return
+    if args.benchmark:
+        with reader() as conn:
+            stored = [c for c in _store_columns(conn.cursor()) if c != "ts"]
+        print("Benchmarking series reads...")
+        run_benchmark(args.series or stored, args.repeat)
+        return
+    print("Migrating historical_prices and forecasts into price_store...")
+    start = time.perf_counter()
+    counts = migrate_legacy_schema()
+    elapsed = time.perf_counter() - start
+    for series, count in counts.items():
+        print(f"  {series}: {count} rows")
+    print(f"✓ Migration complete in {elapsed:.1f}s")
+    from publish import publish
+    from snapshots import refresh_snapshots
+    print(f"Snapshots refreshed ({len(refresh_snapshots())} rewritten).")
+    print("Dashboard copy published." if publish() else "Dashboard copy already current.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+"""
+Publish a read-optimised copy of the database for the dashboard.
+
+Ingest scripts write data/data.db; the Streamlit pages read
+data/data.published.db (see db.use_published_db), so a long backfill
+transaction can never lock or stall a page. A publish:
+
+1. copies the live database with VACUUM INTO (a plain read transaction, so
+   writers are not blocked, and the copy comes out defragmented),
+2. adds the indexes only the dashboard needs (writers do not pay for them),
+   runs ANALYZE and switches the copy to rollback-journal mode,
+3. swaps it in with an atomic rename.
+
+The published file is never modified in place, which is what lets the pages
+open it with immutable=1. Readers holding the previous file keep reading it
+until their next query, when the pool notices the new inode.
+
+Ingest scripts publish when they finish; nothing is copied when the published
+data versions and schema already match the live database. By hand:
+    python publish.py [--force]
+"""
+import argparse
+import os
+import sqlite3
+import time
+from typing import Optional
+
+from db import DB_PATH, PUBLISHED_DB_PATH, connect, reader
+from price_cache import DATA_VERSIONS_TABLE
+
+
+# Indexes for the dashboard's queries, created in the published copy only:
+# (table, column it needs, statement)
+READ_INDEXES = [
+    # Forecast loads filter on source, then a datetime range
+    (
+        "forecasts",
+        "source",
+        "CREATE INDEX idx_forecasts_source_datetime ON forecasts (source, datetime, price_eur_per_mwh)",
+    ),
+    # Covering partial indexes for the per-market price loads
+    (
+        "historical_prices",
+        "ESIOS_600_DA_prices",
+        "CREATE INDEX idx_historical_esios_600 ON historical_prices (datetime, ESIOS_600_DA_prices) "
+        "WHERE ESIOS_600_DA_prices IS NOT NULL",
+    ),
+    (
+        "historical_prices",
+        "OMIE_SP_DA_prices",
+        "CREATE INDEX idx_historical_omie_sp ON historical_prices (datetime, OMIE_SP_DA_prices) "
+        "WHERE OMIE_SP_DA_prices IS NOT NULL",
+    ),
+]
+
+
+def _state(conn: sqlite3.Connection) -> tuple:
+    """Data versions and schema of a database, to tell whether a copy is current."""
+    cur = conn.cursor()
+    cur.execute(
+        "SELECT type, name, sql FROM sqlite_master "
+        "WHERE name NOT LIKE 'idx_%' AND name NOT LIKE 'sqlite_stat%' ORDER BY type, name"
+    )
+    schema = cur.fetchall()
+    versions = []
+    if any(name == DATA_VERSIONS_TABLE for _, name, _ in schema):
+        cur.execute(f"SELECT name, version FROM {DATA_VERSIONS_TABLE} ORDER BY name")
+        versions = cur.fetchall()
+    return schema, versions
+
+
+def is_published() -> bool:
+    """Return True if the published copy matches the live database."""
+    if not DB_PATH.exists() or not PUBLISHED_DB_PATH.exists():
+        return False
+    live = connect(read_only=True)
+    published = sqlite3.connect(f"{PUBLISHED_DB_PATH.resolve().as_uri()}?mode=ro&immutable=1", uri=True)
+    try:
+        return _state(live) == _state(published)
+    finally:
+        live.close()
+        published.close()
+
+
+def _ensure_derived_tables() -> None:
+    """
+    Build tables the pages would otherwise build on first use (the copy is read-only).
+
+    Also without a price_store: the catalog then lists the legacy tables'
+    series, and the coverage table is empty.
+    """
+    # Imported here: these modules import the price store, which is only needed when publishing
+    from coverage_index import COVERAGE_TABLE, rebuild_coverage
+    from series_catalog import CATALOG_TABLE, rebuild_catalog
+
+    with reader() as conn:
+        tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type='table'")}
+    if CATALOG_TABLE not in tables:
+        rebuild_catalog()
+    if COVERAGE_TABLE not in tables:
+        rebuild_coverage()
+
+
+def publish(force: bool = False) -> Optional[dict]:
+    """
+    Build and swap in a new published copy of the database.
+
+    Args:
+        force: Publish even if the current copy matches the live database
+
+    Returns:
+        Dictionary with seconds, size_mb and indexes created, or None when the
+        copy was already current (or there is no database)
+    """
+    if not DB_PATH.exists():
+        return None
+    if not force and is_published():
+        return None
+    start = time.perf_counter()
+    _ensure_derived_tables()
+
+    tmp_path = PUBLISHED_DB_PATH.with_name(f".{PUBLISHED_DB_PATH.name}.{os.getpid()}.tmp")
+    tmp_path.unlink(missing_ok=True)
+    source = connect(read_only=True)
+    try:
+        source.execute("VACUUM INTO ?", (str(tmp_path),))
+    finally:
+        source.close()
+
+    indexes = 0
+    conn = sqlite3.connect(tmp_path, isolation_level=None)
+    try:
+        conn.execute("PRAGMA journal_mode=DELETE")
+        for table, column, statement in READ_INDEXES:
+            if column in {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}:
+                conn.execute(statement)
+                indexes += 1
+        conn.execute("ANALYZE")
+    finally:
+        conn.close()
+
+    os.replace(tmp_path, PUBLISHED_DB_PATH)
+    return {
+        "seconds": time.perf_counter() - start,
+        "size_mb": PUBLISHED_DB_PATH.stat().st_size / 1024 / 1024,
+        "indexes": indexes,
+    }
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Publish the read-optimised database copy used by the dashboard.")
+    parser.add_argument("--force", action="store_true", help="Publish even if the copy is already current")
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    if not DB_PATH.exists():
+        print(f"Database {DB_PATH} does not exist. Nothing to publish.")
+        return
+    result = publish(force=args.force)
+    if result is None:
+        print(f"✓ {PUBLISHED_DB_PATH} is already current")
+    else:
+        print(
+            f"✓ Published {PUBLISHED_DB_PATH} ({result['size_mb']:.1f} MB, "
+            f"{result['indexes']} read indexes) in {result['seconds']:.1f}s"
+        )
+
+
+if __name__ == "__main__":
+    main()
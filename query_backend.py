@@ -0,0 +1,524 @@
+"""
+Analytical query backends for the hourly price statistics, histogram and
+threshold counts of the Price Distribution page.
+
+The page asks a backend for small results (one frame per chart grouping, the
+grouping names of captured_prices.CAPTURED_GROUPINGS, or one count per
+histogram bin) instead of loading the raw intervals and aggregating them
+itself. Every query works on hourly average prices. Two implementations
+answer the same three queries:
+
+- SQLiteBackend: the current path. Prices come from data_loader (shared
+  cache, snapshots, SQLite); their hourly averages are cached per data
+  version and aggregated in pandas/NumPy.
+- DuckDBBackend: pushes the hourly averages, the aggregations, the
+  histogram and the threshold counts into DuckDB. It reads a Parquet export
+  of historical_prices and forecasts, so only the result rows reach Python.
+  Needs the optional ``duckdb`` package.
+
+QUERY_BACKEND=duckdb selects DuckDB, falling back to SQLite when duckdb is
+not installed. The Parquet export in data/parquet/ is rewritten on first use
+whenever the data versions (see price_cache) have changed.
+
+Usage:
+    python query_backend.py --export
+    python query_backend.py --benchmark --source omie_da
+"""
+import abc
+import argparse
+import importlib.util
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from captured_prices import CAPTURED_GROUPINGS
+from data_loader import DataSource, apply_inflation_to_forecasts, load_price_data
+from db import DATA_DIR, DB_PATH, reader
+from price_cache import DATA_VERSIONS_TABLE, cached, slice_by_datetime
+from price_store import series_for_source
+
+
+# Set QUERY_BACKEND=duckdb to push aggregations into DuckDB
+QUERY_BACKEND = os.getenv("QUERY_BACKEND", "sqlite")
+
+PARQUET_DIR = DATA_DIR / "parquet"
+PARQUET_MANIFEST = "manifest.json"
+PARQUET_TABLES = ["historical_prices", "forecasts"]
+EXPORT_CHUNK_ROWS = 200_000
+
+# Historical sources -> historical_prices column (other sources are forecasts)
+HISTORICAL_COLUMNS = {
+    "historical_prices": "ESIOS_600_DA_prices",
+    "omie_da": "OMIE_SP_DA_prices",
+}
+
+# Output columns after the grouping's columns
+STATS_COLUMNS = ["n", "mean", "min", "max"]
+THRESHOLD_COLUMNS = ["total_hours", "hours"]
+
+
+def _check_groupings(groupings: Optional[List[str]]) -> List[str]:
+    groupings = list(CAPTURED_GROUPINGS) if groupings is None else list(groupings)
+    unknown = [g for g in groupings if g not in CAPTURED_GROUPINGS]
+    if unknown:
+        raise ValueError(f"Unknown grouping(s) {unknown}. Available: {list(CAPTURED_GROUPINGS)}")
+    return groupings
+
+
+def _finish(grouping: str, df: pd.DataFrame, columns: List[str]) -> pd.DataFrame:
+    """Same dtypes and row order from every backend."""
+    group_cols = CAPTURED_GROUPINGS[grouping]
+    df = df[group_cols + columns].sort_values(group_cols, ignore_index=True)
+    if grouping == "year_month":
+        df["year_month"] = pd.to_datetime(df["year_month"]).astype("datetime64[ns]")
+    elif grouping == "daily":
+        df["date"] = pd.to_datetime(df["date"]).dt.date
+    for col in group_cols + columns:
+        if col in ("year", "month", "hour", "weekday_order", "n", "total_hours", "hours"):
+            df[col] = df[col].astype(np.int64)
+    return df
+
+
+def _bin_counts(prices: np.ndarray, edges: np.ndarray, clip: Optional[Tuple[float, float]]) -> np.ndarray:
+    """Counts per (edges[i], edges[i + 1]] bin; values outside the edges go to the first / last bin."""
+    if clip is not None:
+        prices = np.clip(prices, *clip)
+    bins = np.clip(np.searchsorted(edges, prices, side="left") - 1, 0, len(edges) - 2)
+    return np.bincount(bins, minlength=len(edges) - 1).astype(np.int64)
+
+
+class QueryBackend(abc.ABC):
+    """
+    Queries over the hourly average prices of one source (see data_loader.DataSource).
+
+    Prices are first averaged per clock hour; the hours starting inside the
+    (inclusive) date bounds are used. price_stats and threshold_hours return a
+    dictionary mapping grouping name -> DataFrame with the grouping's columns
+    (CAPTURED_GROUPINGS) followed by the method's result columns, one row per
+    group in ascending group order. Forecast prices are inflated from now
+    when inflation_rate is given.
+    """
+
+    name = ""
+
+    @abc.abstractmethod
+    def price_stats(
+        self,
+        source: DataSource,
+        groupings: Optional[List[str]] = None,
+        start_dt: Optional[pd.Timestamp] = None,
+        end_dt: Optional[pd.Timestamp] = None,
+        inflation_rate: float = 0.0,
+    ) -> Dict[str, pd.DataFrame]:
+        """Hour count, mean, min and max hourly price per group (columns n, mean, min, max)."""
+
+    @abc.abstractmethod
+    def price_histogram(
+        self,
+        source: DataSource,
+        edges: np.ndarray,
+        clip: Optional[Tuple[float, float]] = None,
+        start_dt: Optional[pd.Timestamp] = None,
+        end_dt: Optional[pd.Timestamp] = None,
+        inflation_rate: float = 0.0,
+    ) -> np.ndarray:
+        """
+        Hours per price bin.
+
+        Bins are right-inclusive, (edges[i], edges[i + 1]]; hourly prices
+        below the first edge count in the first bin and prices above the last
+        edge in the last one.
+
+        Args:
+            edges: Increasing bin edges
+            clip: Optional (low, high) the hourly prices are clipped to first
+
+        Returns:
+            int64 array of len(edges) - 1 hour counts
+        """
+
+    @abc.abstractmethod
+    def threshold_hours(
+        self,
+        source: DataSource,
+        threshold: float,
+        groupings: Optional[List[str]] = None,
+        start_dt: Optional[pd.Timestamp] = None,
+        end_dt: Optional[pd.Timestamp] = None,
+        inflation_rate: float = 0.0,
+    ) -> Dict[str, pd.DataFrame]:
+        """
+        Hours at or below a price per group.
+
+        Columns: total_hours, hours (hours with an average <= threshold).
+        """
+
+
+def _hourly_prices(source: DataSource) -> pd.DataFrame:
+    """Hourly average prices of a whole source (datetime, price_eur_per_mwh), sorted by hour."""
+    df = load_price_data(source)
+    if df.empty:
+        return pd.DataFrame({"datetime": pd.Series(dtype="datetime64[ns]"), "price_eur_per_mwh": []})
+    hours = df["datetime_parsed"].dt.floor("h")
+    hourly = df["price_eur_per_mwh"].astype(float).groupby(hours.to_numpy()).mean()
+    return pd.DataFrame({"datetime": hourly.index.to_numpy(dtype="datetime64[ns]"), "price_eur_per_mwh": hourly.to_numpy()})
+
+
+class SQLiteBackend(QueryBackend):
+    """Loads prices through data_loader and aggregates them in pandas."""
+
+    name = "sqlite"
+
+    def _prices(self, source, start_dt, end_dt, inflation_rate) -> pd.DataFrame:
+        # Hourly averages of the whole source are cached per data version and
+        # shared by the three queries; the date range is a row slice of them
+        hourly = cached("hourly_prices", source, lambda: _hourly_prices(source), series_for_source(source))
+        df = slice_by_datetime(hourly, start_dt, end_dt)
+        if source not in HISTORICAL_COLUMNS and inflation_rate > 0.0 and not df.empty:
+            # Forecasts are hourly, so inflating the averages is the same as inflating the intervals
+            inflated = apply_inflation_to_forecasts(df.assign(datetime_parsed=df["datetime"]), inflation_rate)
+            df = inflated.drop(columns=["datetime_parsed"])
+        return df
+
+    @staticmethod
+    def _group_keys(datetimes: pd.Series, grouping: str) -> Dict[str, pd.Series]:
+        dt = datetimes.dt
+        if grouping == "yearly":
+            return {"year": dt.year}
+        if grouping == "year_month":
+            return {"year_month": dt.to_period("M").dt.to_timestamp()}
+        if grouping == "calendar_month":
+            return {"month": dt.month}
+        if grouping == "daily":
+            return {"date": dt.date}
+        if grouping == "day_of_week":
+            return {"weekday": dt.day_name(), "weekday_order": dt.weekday}
+        return {"hour": dt.hour}
+
+    def _grouped(self, frame: pd.DataFrame, grouping: str, aggregations: dict) -> pd.DataFrame:
+        keys = self._group_keys(frame["datetime"], grouping)
+        return frame.assign(**keys).groupby(list(keys), as_index=False).agg(**aggregations)
+
+    def price_stats(self, source, groupings=None, start_dt=None, end_dt=None, inflation_rate=0.0):
+        groupings = _check_groupings(groupings)
+        hourly = self._prices(source, start_dt, end_dt, inflation_rate)
+        aggregations = {
+            "n": ("price_eur_per_mwh", "count"),
+            "mean": ("price_eur_per_mwh", "mean"),
+            "min": ("price_eur_per_mwh", "min"),
+            "max": ("price_eur_per_mwh", "max"),
+        }
+        return {g: _finish(g, self._grouped(hourly, g, aggregations), STATS_COLUMNS) for g in groupings}
+
+    def price_histogram(self, source, edges, clip=None, start_dt=None, end_dt=None, inflation_rate=0.0):
+        hourly = self._prices(source, start_dt, end_dt, inflation_rate)
+        return _bin_counts(hourly["price_eur_per_mwh"].to_numpy(dtype=float), np.asarray(edges, dtype=float), clip)
+
+    def threshold_hours(self, source, threshold, groupings=None, start_dt=None, end_dt=None, inflation_rate=0.0):
+        groupings = _check_groupings(groupings)
+        hourly = self._prices(source, start_dt, end_dt, inflation_rate)
+        hourly = hourly.assign(at_or_below=hourly["price_eur_per_mwh"] <= threshold)
+        aggregations = {"total_hours": ("price_eur_per_mwh", "size"), "hours": ("at_or_below", "sum")}
+        return {g: _finish(g, self._grouped(hourly, g, aggregations), THRESHOLD_COLUMNS) for g in groupings}
+
+
+# DuckDB expressions for each grouping's columns, over a TIMESTAMP column ts
+_DUCKDB_GROUP_SQL = {
+    "yearly": ['year(ts) AS "year"'],
+    "year_month": ["date_trunc('month', ts) AS year_month"],
+    "calendar_month": ['month(ts) AS "month"'],
+    "daily": ['CAST(ts AS DATE) AS "date"'],
+    "day_of_week": ["dayname(ts) AS weekday", "isodow(ts) - 1 AS weekday_order"],
+    "hour_of_day": ['hour(ts) AS "hour"'],
+}
+
+
+def _read_versions() -> dict:
+    with reader() as conn:
+        try:
+            return dict(conn.execute(f"SELECT name, version FROM {DATA_VERSIONS_TABLE}").fetchall())
+        except sqlite3.OperationalError:
+            # data_versions not created yet
+            return {}
+
+
+def export_parquet(force: bool = False) -> Dict[str, int]:
+    """
+    Write historical_prices and forecasts to data/parquet/ with DuckDB.
+
+    Datetime text columns become TIMESTAMP columns and rows are sorted by
+    time, so date-range filters skip whole row groups. Nothing is written
+    when the recorded data versions still match the database.
+
+    Args:
+        force: Rewrite the files even if they are current
+
+    Returns:
+        Dictionary mapping table -> rows written (empty if already current)
+    """
+    try:
+        import duckdb
+    except ImportError as exc:
+        raise RuntimeError("The Parquet export needs duckdb: pip install duckdb") from exc
+
+    versions = _read_versions()
+    manifest_path = PARQUET_DIR / PARQUET_MANIFEST
+    if not force and manifest_path.exists():
+        manifest = json.loads(manifest_path.read_text(encoding="utf-8"))
+        files_exist = all((PARQUET_DIR / f"{t}.parquet").exists() for t in manifest.get("tables", []))
+        if manifest.get("versions") == versions and files_exist:
+            return {}
+
+    PARQUET_DIR.mkdir(parents=True, exist_ok=True)
+    written = {}
+    con = duckdb.connect()
+    try:
+        with reader() as conn:
+            tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type='table'")}
+            for table in PARQUET_TABLES:
+                if table not in tables:
+                    continue
+                con.execute("DROP TABLE IF EXISTS export")
+                rows = 0
+                for chunk in pd.read_sql(f"SELECT * FROM {table}", conn, chunksize=EXPORT_CHUNK_ROWS):
+                    if "datetime" in chunk.columns:
+                        # Canonical 'YYYY-MM-DD HH:MM:SS' text; anything else is dropped
+                        chunk["datetime"] = pd.to_datetime(chunk["datetime"], format="%Y-%m-%d %H:%M:%S", errors="coerce")
+                        chunk = chunk.dropna(subset=["datetime"])
+                    con.register("chunk", chunk)
+                    if rows == 0:
+                        con.execute("CREATE TABLE export AS SELECT * FROM chunk")
+                    else:
+                        con.execute("INSERT INTO export SELECT * FROM chunk")
+                    con.unregister("chunk")
+                    rows += len(chunk)
+                if rows == 0:
+                    continue
+                tmp_path = PARQUET_DIR / f".{table}.{os.getpid()}.parquet"
+                con.execute(f"COPY (SELECT * FROM export ORDER BY datetime) TO '{tmp_path}' (FORMAT parquet)")
+                os.replace(tmp_path, PARQUET_DIR / f"{table}.parquet")
+                written[table] = rows
+    finally:
+        con.close()
+
+    manifest = {"versions": versions, "tables": sorted(written), "created": pd.Timestamp.now().isoformat()}
+    manifest_path.write_text(json.dumps(manifest, indent=1), encoding="utf-8")
+    return written
+
+
+class DuckDBBackend(QueryBackend):
+    """Runs every query in DuckDB over the Parquet export."""
+
+    name = "duckdb"
+
+    def __init__(self):
+        import duckdb
+
+        self._con = duckdb.connect()
+        self._lock = threading.Lock()
+        self._versions: Optional[dict] = None
+
+    def _cursor(self):
+        # Re-export when ingest has bumped a data version since the last check
+        versions = _read_versions()
+        with self._lock:
+            if versions != self._versions:
+                export_parquet()
+                self._versions = versions
+            # One cursor per query: DuckDB connections are not shared across threads
+            return self._con.cursor()
+
+    def _price_sql(self, source, start_dt, end_dt, inflation_rate) -> tuple[str, list]:
+        """SELECT producing (ts, price) rows of a source, and its parameters."""
+        if source in HISTORICAL_COLUMNS:
+            column = HISTORICAL_COLUMNS[source]
+            sql = (
+                f"SELECT datetime AS ts, \"{column}\" AS price "
+                f"FROM read_parquet('{PARQUET_DIR / 'historical_prices.parquet'}') WHERE \"{column}\" IS NOT NULL"
+            )
+            params: list = []
+        else:
+            price = "price_eur_per_mwh"
+            if inflation_rate > 0.0:
+                # nominal = real * (1 + rate) ^ years from now (see apply_inflation_to_forecasts)
+                price = "price_eur_per_mwh * pow(1 + ?, date_diff('microsecond', ?::TIMESTAMP, datetime) / 1e6 / (365.25 * 86400))"
+            sql = (
+                f"SELECT datetime AS ts, {price} AS price "
+                f"FROM read_parquet('{PARQUET_DIR / 'forecasts.parquet'}') "
+                "WHERE source = ? AND price_eur_per_mwh IS NOT NULL"
+            )
+            params = ([inflation_rate, pd.Timestamp.now().to_pydatetime()] if inflation_rate > 0.0 else []) + [source]
+        if start_dt is not None:
+            sql += " AND datetime >= ?"
+            params.append(pd.Timestamp(start_dt).to_pydatetime())
+        if end_dt is not None:
+            sql += " AND datetime <= ?"
+            params.append(pd.Timestamp(end_dt).to_pydatetime())
+        return sql, params
+
+    def _hourly_sql(self, source, start_dt, end_dt, inflation_rate) -> tuple[str, list]:
+        """SELECT producing (ts, price) hourly average rows of a source, and its parameters."""
+        # Every interval of the hours at the bounds is read, then only the hours
+        # starting inside the bounds are kept
+        first = None if start_dt is None else pd.Timestamp(start_dt).floor("h")
+        last = None if end_dt is None else pd.Timestamp(end_dt).floor("h") + pd.Timedelta(hours=1, microseconds=-1)
+        prices, params = self._price_sql(source, first, last, inflation_rate)
+        sql = f"SELECT date_trunc('hour', ts) AS ts, avg(price) AS price FROM ({prices}) GROUP BY 1"
+        bounds = [(">=", start_dt), ("<=", end_dt)]
+        having = [f"date_trunc('hour', ts) {op} ?" for op, bound in bounds if bound is not None]
+        if having:
+            sql += " HAVING " + " AND ".join(having)
+            params = params + [pd.Timestamp(bound).to_pydatetime() for _, bound in bounds if bound is not None]
+        return sql, params
+
+    def _grouped(self, grouping: str, relation: str, params: list, aggregates: str, extra: list = ()) -> pd.DataFrame:
+        keys = _DUCKDB_GROUP_SQL[grouping]
+        positions = ", ".join(str(i + 1) for i in range(len(keys)))
+        sql = f"SELECT {', '.join(keys)}, {aggregates} FROM ({relation}) GROUP BY {positions}"
+        # Placeholders bind in text order: the aggregates come before the relation
+        return self._cursor().execute(sql, [*extra, *params]).df()
+
+    def price_stats(self, source, groupings=None, start_dt=None, end_dt=None, inflation_rate=0.0):
+        groupings = _check_groupings(groupings)
+        relation, params = self._hourly_sql(source, start_dt, end_dt, inflation_rate)
+        aggregates = "count(*) AS n, avg(price) AS mean, min(price) AS min, max(price) AS max"
+        return {g: _finish(g, self._grouped(g, relation, params, aggregates), STATS_COLUMNS) for g in groupings}
+
+    def price_histogram(self, source, edges, clip=None, start_dt=None, end_dt=None, inflation_rate=0.0):
+        edges = [float(e) for e in edges]
+        relation, params = self._hourly_sql(source, start_dt, end_dt, inflation_rate)
+        value, extra = ("greatest(least(price, ?), ?)", [float(clip[1]), float(clip[0])]) if clip else ("price", [])
+        # Each price joins the bin with the largest lower edge below it, so bins
+        # are right-inclusive; an open first edge takes prices below the edges
+        lows = [float("-inf")] + edges[1:-1]
+        sql = (
+            "WITH bins AS (SELECT unnest(?::DOUBLE[]) AS lo, unnest(range(?)) AS bin) "
+            f"SELECT bin, count(*) AS n FROM (SELECT {value} AS price FROM ({relation})) h "
+            "ASOF JOIN bins ON h.price > bins.lo GROUP BY 1"
+        )
+        result = self._cursor().execute(sql, [lows, len(lows), *extra, *params]).df()
+        counts = np.zeros(len(edges) - 1, dtype=np.int64)
+        counts[result["bin"].to_numpy(dtype=np.int64)] = result["n"].to_numpy(dtype=np.int64)
+        return counts
+
+    def threshold_hours(self, source, threshold, groupings=None, start_dt=None, end_dt=None, inflation_rate=0.0):
+        groupings = _check_groupings(groupings)
+        relation, params = self._hourly_sql(source, start_dt, end_dt, inflation_rate)
+        aggregates = "count(*) AS total_hours, count(*) FILTER (WHERE price <= ?) AS hours"
+        return {
+            g: _finish(g, self._grouped(g, relation, params, aggregates, [threshold]), THRESHOLD_COLUMNS)
+            for g in groupings
+        }
+
+
+def available_backends() -> List[str]:
+    """Return the backends usable here (DuckDB needs the duckdb package)."""
+    has_duckdb = importlib.util.find_spec("duckdb") is not None
+    return ["sqlite"] + (["duckdb"] if has_duckdb else [])
+
+
+_backends: Dict[str, QueryBackend] = {}
+_backends_lock = threading.Lock()
+
+
+def get_backend(name: Optional[str] = None) -> QueryBackend:
+    """
+    Return the shared backend instance.
+
+    Args:
+        name: "sqlite" or "duckdb" (default: QUERY_BACKEND). An unavailable
+              backend falls back to SQLite.
+    """
+    name = (name or QUERY_BACKEND).lower()
+    if name not in available_backends():
+        name = "sqlite"
+    with _backends_lock:
+        if name not in _backends:
+            _backends[name] = DuckDBBackend() if name == "duckdb" else SQLiteBackend()
+        return _backends[name]
+
+
+def _max_difference(left: Dict[str, pd.DataFrame], right: Dict[str, pd.DataFrame]) -> float:
+    worst = 0.0
+    for grouping, frame in left.items():
+        other = right[grouping]
+        if len(frame) != len(other):
+            return float("inf")
+        for col in frame.columns:
+            if pd.api.types.is_float_dtype(frame[col]):
+                worst = max(worst, float(np.nanmax(np.abs(frame[col].to_numpy() - other[col].to_numpy()), initial=0.0)))
+    return worst
+
+
+def run_benchmark(source: DataSource, threshold: float, repeat: int) -> None:
+    """Time the three queries on every available backend and compare their results."""
+    edges = np.arange(-50.0, 300.0 + 1.0, 1.0)
+    queries = {
+        "price_stats": lambda b: b.price_stats(source),
+        "price_histogram": lambda b: {"bins": pd.DataFrame({"hours": b.price_histogram(source, edges)})},
+        "threshold_hours": lambda b: b.threshold_hours(source, threshold),
+    }
+
+    results = {}
+    for name in available_backends():
+        backend = get_backend(name)
+        for query, run in queries.items():
+            times = []
+            for _ in range(max(repeat, 1)):
+                start = time.perf_counter()
+                result = run(backend)
+                times.append(time.perf_counter() - start)
+            rows = sum(len(df) for df in result.values())
+            print(
+                f"  {name:<7} {query:<16} first {times[0] * 1000:8.1f} ms, "
+                f"best {min(times) * 1000:8.1f} ms, {rows} result rows"
+            )
+            results[(name, query)] = result
+    if "duckdb" in available_backends():
+        for query in queries:
+            diff = _max_difference(results[("sqlite", query)], results[("duckdb", query)])
+            print(f"  {query}: max difference between backends {diff:.2e}")
+    else:
+        print("  duckdb is not installed; only the SQLite backend was timed.")
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Parquet export and benchmark of the analytical query backends.")
+    parser.add_argument("--export", action="store_true", help="Write the Parquet export used by DuckDB")
+    parser.add_argument("--force", action="store_true", help="With --export, rewrite even if current")
+    parser.add_argument("--benchmark", action="store_true", help="Time every available backend")
+    parser.add_argument("--source", type=str, default="omie_da", help="Price source to benchmark (default: omie_da)")
+    parser.add_argument("--threshold", type=float, default=0.0, help="Price threshold for the hour counts")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per query (the first one is cold)")
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    if not DB_PATH.exists():
+        print(f"Database {DB_PATH} does not exist. Nothing to do.")
+        return
+    if args.export and "duckdb" not in available_backends():
+        print("The Parquet export needs duckdb (pip install duckdb). Nothing exported.")
+    elif args.export:
+        start = time.perf_counter()
+        written = export_parquet(force=args.force)
+        for table, rows in written.items():
+            print(f"  {table}: {rows} rows")
+        if written:
+            print(f"✓ Exported {len(written)} table(s) to {PARQUET_DIR} in {time.perf_counter() - start:.1f}s")
+        else:
+            print("✓ Parquet export already up to date")
+    if args.benchmark:
+        print(f"Benchmarking {', '.join(available_backends())} on {args.source}...")
+        run_benchmark(args.source, args.threshold, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -4,73 +4,80 @@ Rename forecast source values in the forecasts table.
 Renames:
 - "baringa" → "Baringa_Q2_2025"
 - "aurora" → "Aurora_Jun_2025"
+
+The price store follows: the renamed rows are written to the new series
+(refreshing its rollups, catalog row, coverage and data version) and the
+old series is cleared.
 """
-import sqlite3
-from pathlib import Path
+import pandas as pd
+
+from db import writer
+from price_store import delete_series_range, upsert_series
+from publish import publish
+from snapshots import refresh_snapshots
+from timestamps import parse_timestamps
 
-DB_PATH = Path("data") / "data.db"
+
+RENAMES = {
+    "baringa": "Baringa_Q2_2025",
+    "aurora": "Aurora_Jun_2025",
+}
 
 
 def rename_forecast_sources():
-    """Rename forecast source values in the forecasts table."""
-    conn = sqlite3.connect(DB_PATH)
-    cur = conn.cursor()
-    
-    # Check if forecasts table exists
-    cur.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='forecasts'")
-    if cur.fetchone() is None:
-        print("Table 'forecasts' does not exist. Nothing to rename.")
-        conn.close()
-        return
-    
-    # Check current source values
-    cur.execute("SELECT DISTINCT source FROM forecasts")
-    current_sources = [row[0] for row in cur.fetchall()]
-    print(f"Current source values: {current_sources}")
-    
-    # Count rows to be updated
-    cur.execute('SELECT COUNT(*) FROM forecasts WHERE source = "baringa"')
-    baringa_count = cur.fetchone()[0]
-    
-    cur.execute('SELECT COUNT(*) FROM forecasts WHERE source = "aurora"')
-    aurora_count = cur.fetchone()[0]
-    
-    print(f"\nRows to update:")
-    print(f"  'baringa' → 'Baringa_Q2_2025': {baringa_count} rows")
-    print(f"  'aurora' → 'Aurora_Jun_2025': {aurora_count} rows")
-    
-    if baringa_count == 0 and aurora_count == 0:
-        print("\nNo rows to update.")
-        conn.close()
-        return
-    
-    # Update baringa
-    if baringa_count > 0:
-        cur.execute(
-            'UPDATE forecasts SET source = ? WHERE source = ?',
-            ("Baringa_Q2_2025", "baringa")
-        )
-        print(f"✓ Updated {baringa_count} rows: 'baringa' → 'Baringa_Q2_2025'")
-    
-    # Update aurora
-    if aurora_count > 0:
-        cur.execute(
-            'UPDATE forecasts SET source = ? WHERE source = ?',
-            ("Aurora_Jun_2025", "aurora")
-        )
-        print(f"✓ Updated {aurora_count} rows: 'aurora' → 'Aurora_Jun_2025'")
-    
-    conn.commit()
-    
-    # Verify
-    cur.execute("SELECT DISTINCT source FROM forecasts")
-    new_sources = [row[0] for row in cur.fetchall()]
-    print(f"\nNew source values: {new_sources}")
-    
-    conn.close()
+    """Rename forecast source values in the forecasts table and the price store."""
+    with writer() as conn:
+        cur = conn.cursor()
+
+        # Check if forecasts table exists
+        cur.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='forecasts'")
+        if cur.fetchone() is None:
+            print("Table 'forecasts' does not exist. Nothing to rename.")
+            return
+
+        # Check current source values
+        cur.execute("SELECT DISTINCT source FROM forecasts")
+        current_sources = [row[0] for row in cur.fetchall()]
+        print(f"Current source values: {current_sources}")
+
+        # Count rows to be updated
+        counts = {}
+        for old in RENAMES:
+            cur.execute("SELECT COUNT(*) FROM forecasts WHERE source = ?", (old,))
+            counts[old] = cur.fetchone()[0]
+
+        print(f"\nRows to update:")
+        for old, new in RENAMES.items():
+            print(f"  '{old}' → '{new}': {counts[old]} rows")
+
+        if not any(counts.values()):
+            print("\nNo rows to update.")
+            return
+
+        for old, new in RENAMES.items():
+            if counts[old] == 0:
+                continue
+            cur.execute("UPDATE forecasts SET source = ? WHERE source = ?", (new, old))
+
+            # Move the series in the price store
+            df = pd.read_sql(
+                "SELECT datetime, price_eur_per_mwh FROM forecasts WHERE source = ?", conn, params=(new,)
+            )
+            df["datetime_parsed"] = parse_timestamps(df["datetime"])
+            df = df[df["datetime_parsed"].notna()]
+            upsert_series(df, {"price_eur_per_mwh": new}, datetime_col="datetime_parsed", conn=conn)
+            delete_series_range([old], conn=conn)
+            print(f"✓ Updated {counts[old]} rows: '{old}' → '{new}'")
+
+        # Verify
+        cur.execute("SELECT DISTINCT source FROM forecasts")
+        new_sources = [row[0] for row in cur.fetchall()]
+        print(f"\nNew source values: {new_sources}")
+
+    print(f"Snapshots refreshed ({len(refresh_snapshots())} rewritten).")
+    print("Dashboard copy published." if publish() else "Dashboard copy already current.")
     print("\n✓ Successfully renamed forecast sources in database")
 
 
 if __name__ == "__main__":
     rename_forecast_sources()
-
@@ -0,0 +1,444 @@
+"""
+Materialized rollups of the price store for the standard chart groupings.
+
+For every series three tables of partial aggregates are kept:
+- rollup_daily: one row per (series, date)
+- rollup_monthly: one row per (series, month)
+- rollup_month_hour: one row per (series, month, hour of day)
+
+Each partial holds n, total, sumsq, min and max, so partials combine
+exactly (sums add, min/max take the extreme). A date-range query is
+answered from whole months and whole days, plus a raw scan of at most the
+days in the two edge months. Its cost is therefore bounded by the number
+of months and days in the range, not by the number of intervals.
+
+Rollups are refreshed for the touched months whenever price_store.upsert_series
+writes, and can be rebuilt from scratch with ``python rollups.py``.
+"""
+import sqlite3
+import time
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from db import DB_PATH, reader, writer
+from price_cache import cached
+from price_store import PRICE_STORE_TABLE, _store_columns, series_date_range
+
+
+ROLLUP_TABLES = {
+    "rollup_daily": ["date"],
+    "rollup_monthly": ["month"],
+    "rollup_month_hour": ["month", "hour"],
+}
+
+# SQLite expressions over the epoch-minute key of price_store
+_DATE_SQL = "date(ts * 60, 'unixepoch')"
+_MONTH_SQL = "strftime('%Y-%m', ts * 60, 'unixepoch')"
+_HOUR_SQL = "(ts / 60) % 24"
+
+PARTIAL_COLUMNS = ["n", "total", "sumsq", "min", "max"]
+
+MINUTES_PER_DAY = 1440
+
+
+def init_rollups(conn: sqlite3.Connection) -> None:
+    """Create the rollup tables if they do not exist."""
+    for table, keys in ROLLUP_TABLES.items():
+        key_defs = ", ".join(f"{k} {'INTEGER' if k == 'hour' else 'TEXT'}" for k in keys)
+        conn.execute(
+            f"""
+            CREATE TABLE IF NOT EXISTS {table} (
+                series TEXT,
+                {key_defs},
+                n INTEGER,
+                total REAL,
+                sumsq REAL,
+                min REAL,
+                max REAL,
+                PRIMARY KEY (series, {", ".join(keys)})
+            )
+            """
+        )
+
+
+def _aggregate_sql(value: str) -> str:
+    """SELECT list producing the partial columns (in PARTIAL_COLUMNS order) for a value."""
+    aggregates = [f"COUNT({value})", f"SUM({value})", f"SUM({value} * {value})", f"MIN({value})", f"MAX({value})"]
+    return ", ".join(f"{agg} AS {name}" for agg, name in zip(aggregates, PARTIAL_COLUMNS))
+
+
+def refresh_rollups(
+    series_list: list[str],
+    lo_ts: int,
+    hi_ts: int,
+    conn: sqlite3.Connection,
+) -> None:
+    """
+    Recompute the rollups of the months touched by [lo_ts, hi_ts] (epoch minutes).
+
+    Runs inside the caller's transaction; the caller commits.
+    """
+    init_rollups(conn)
+    # Widen to whole months so monthly and month-hour partials are complete
+    lo_month = pd.Timestamp(int(lo_ts) * 60, unit="s").to_period("M")
+    hi_month = pd.Timestamp(int(hi_ts) * 60, unit="s").to_period("M")
+    start_ts = int(lo_month.start_time.value // 60_000_000_000)
+    end_ts = int((hi_month + 1).start_time.value // 60_000_000_000) - 1
+    month_bounds = (str(lo_month), str(hi_month))
+    date_bounds = (lo_month.start_time.strftime("%Y-%m-%d"), hi_month.end_time.strftime("%Y-%m-%d"))
+
+    for series in series_list:
+        col = f'"{series}"'
+        where = f"ts BETWEEN ? AND ? AND {col} IS NOT NULL"
+        conn.execute("DELETE FROM rollup_daily WHERE series = ? AND date BETWEEN ? AND ?", (series, *date_bounds))
+        conn.execute("DELETE FROM rollup_monthly WHERE series = ? AND month BETWEEN ? AND ?", (series, *month_bounds))
+        conn.execute("DELETE FROM rollup_month_hour WHERE series = ? AND month BETWEEN ? AND ?", (series, *month_bounds))
+        conn.execute(
+            f"""
+            INSERT INTO rollup_daily (series, date, n, total, sumsq, min, max)
+            SELECT ?, {_DATE_SQL} AS d, {_aggregate_sql(col)}
+            FROM {PRICE_STORE_TABLE} WHERE {where} GROUP BY d
+            """,
+            (series, start_ts, end_ts),
+        )
+        conn.execute(
+            f"""
+            INSERT INTO rollup_month_hour (series, month, hour, n, total, sumsq, min, max)
+            SELECT ?, {_MONTH_SQL} AS m, {_HOUR_SQL} AS h, {_aggregate_sql(col)}
+            FROM {PRICE_STORE_TABLE} WHERE {where} GROUP BY m, h
+            """,
+            (series, start_ts, end_ts),
+        )
+        # Monthly partials combine the month-hour partials just written
+        conn.execute(
+            """
+            INSERT INTO rollup_monthly (series, month, n, total, sumsq, min, max)
+            SELECT series, month, SUM(n), SUM(total), SUM(sumsq), MIN(min), MAX(max)
+            FROM rollup_month_hour WHERE series = ? AND month BETWEEN ? AND ?
+            GROUP BY month
+            """,
+            (series, *month_bounds),
+        )
+
+
+def rebuild_rollups(series_list: Optional[list[str]] = None) -> dict[str, int]:
+    """
+    Rebuild the rollups of the given series (default: every price_store series).
+
+    Returns:
+        Dictionary mapping series name -> number of daily partials
+    """
+    with writer() as conn:
+        init_rollups(conn)
+        cur = conn.cursor()
+        if series_list is None:
+            series_list = [c for c in _store_columns(cur) if c != "ts"]
+        counts = {}
+        for series in series_list:
+            cur.execute(
+                f'SELECT MIN(ts), MAX(ts) FROM {PRICE_STORE_TABLE} WHERE "{series}" IS NOT NULL'
+            )
+            lo_ts, hi_ts = cur.fetchone()
+            for table in ROLLUP_TABLES:
+                conn.execute(f"DELETE FROM {table} WHERE series = ?", (series,))
+            if lo_ts is not None:
+                refresh_rollups([series], lo_ts, hi_ts, conn)
+            cur.execute("SELECT COUNT(*) FROM rollup_daily WHERE series = ?", (series,))
+            counts[series] = cur.fetchone()[0]
+        return counts
+
+
+def rollups_available(series: str) -> bool:
+    """Return True if rollups have been built for the series."""
+    if not DB_PATH.exists():
+        return False
+    with reader() as conn:
+        try:
+            cur = conn.execute("SELECT 1 FROM rollup_daily WHERE series = ? LIMIT 1", (series,))
+            return cur.fetchone() is not None
+        except sqlite3.OperationalError:
+            return False
+
+
+def _combine(frames: list[pd.DataFrame], keys: list[str]) -> pd.DataFrame:
+    """Merge partials that share the same keys."""
+    frames = [f for f in frames if not f.empty]
+    if not frames:
+        return pd.DataFrame(columns=keys + PARTIAL_COLUMNS)
+    if len(frames) == 1 and not frames[0].duplicated(keys).any():
+        return frames[0].sort_values(keys, ignore_index=True)
+    df = pd.concat(frames, ignore_index=True)
+    return (
+        df.groupby(keys, as_index=False)
+        .agg(n=("n", "sum"), total=("total", "sum"), sumsq=("sumsq", "sum"), min=("min", "min"), max=("max", "max"))
+        .sort_values(keys, ignore_index=True)
+    )
+
+
+class _RangePlan:
+    """Split [start_dt, end_dt] into whole months, whole days and raw edge minutes."""
+
+    def __init__(self, series: str, start_dt, end_dt):
+        if start_dt is None or end_dt is None:
+            bounds = series_date_range(series) or (pd.Timestamp(0), pd.Timestamp(0))
+            start_dt = bounds[0] if start_dt is None else start_dt
+            end_dt = bounds[1] if end_dt is None else end_dt
+        start = pd.Timestamp(start_dt)
+        end = pd.Timestamp(end_dt)
+        # Inclusive epoch-minute range covered by the query
+        self.lo_ts = int(np.ceil(start.value / 60e9))
+        self.hi_ts = int(end.value // 60_000_000_000)
+
+        # Whole days inside the range: [first_day, last_day] (day numbers since epoch)
+        self.first_day = -(-self.lo_ts // MINUTES_PER_DAY)
+        self.last_day = (self.hi_ts + 1) // MINUTES_PER_DAY - 1
+
+        # Whole months inside the whole days
+        self.first_month = self.last_month = None
+        if self.first_day <= self.last_day:
+            first = pd.Timestamp(self.first_day * MINUTES_PER_DAY * 60, unit="s")
+            last = pd.Timestamp(self.last_day * MINUTES_PER_DAY * 60, unit="s")
+            first_month = first.to_period("M") if first.day == 1 else first.to_period("M") + 1
+            last_month = last.to_period("M") if last.is_month_end else last.to_period("M") - 1
+            if first_month <= last_month:
+                self.first_month, self.last_month = first_month, last_month
+
+    def day_text(self, day: int) -> str:
+        return pd.Timestamp(day * MINUTES_PER_DAY * 60, unit="s").strftime("%Y-%m-%d")
+
+    def raw_edges(self) -> list[tuple[int, int]]:
+        """Minute ranges not covered by whole days."""
+        if self.first_day > self.last_day:
+            return [(self.lo_ts, self.hi_ts)] if self.lo_ts <= self.hi_ts else []
+        edges = []
+        if self.lo_ts < self.first_day * MINUTES_PER_DAY:
+            edges.append((self.lo_ts, self.first_day * MINUTES_PER_DAY - 1))
+        if self.hi_ts > (self.last_day + 1) * MINUTES_PER_DAY - 1:
+            edges.append(((self.last_day + 1) * MINUTES_PER_DAY, self.hi_ts))
+        return edges
+
+    def day_ranges_outside_months(self) -> list[tuple[int, int]]:
+        """Whole-day ranges (day numbers) not covered by whole months."""
+        if self.first_day > self.last_day:
+            return []
+        if self.first_month is None:
+            return [(self.first_day, self.last_day)]
+        month_first_day = int(self.first_month.start_time.value // (MINUTES_PER_DAY * 60_000_000_000))
+        month_last_day = int(self.last_month.end_time.normalize().value // (MINUTES_PER_DAY * 60_000_000_000))
+        ranges = []
+        if self.first_day < month_first_day:
+            ranges.append((self.first_day, month_first_day - 1))
+        if self.last_day > month_last_day:
+            ranges.append((month_last_day + 1, self.last_day))
+        return ranges
+
+
+def _raw_partials(conn: sqlite3.Connection, series: str, lo_ts: int, hi_ts: int, key_sql: dict[str, str]) -> pd.DataFrame:
+    col = f'"{series}"'
+    keys = ", ".join(f"{expr} AS {name}" for name, expr in key_sql.items())
+    return pd.read_sql(
+        f"""
+        SELECT {keys}, {_aggregate_sql(col)}
+        FROM {PRICE_STORE_TABLE}
+        WHERE ts BETWEEN ? AND ? AND {col} IS NOT NULL
+        GROUP BY {", ".join(key_sql)}
+        """,
+        conn,
+        params=(lo_ts, hi_ts),
+    )
+
+
+def _stored_partials(conn: sqlite3.Connection, table: str, series: str, key: str, lo: str, hi: str, columns: str) -> pd.DataFrame:
+    return pd.read_sql(
+        f"SELECT {columns}, n, total, sumsq, min, max FROM {table} "
+        f"WHERE series = ? AND {key} BETWEEN ? AND ?",
+        conn,
+        params=(series, lo, hi),
+    )
+
+
+def daily_partials(series: str, start_dt=None, end_dt=None) -> pd.DataFrame:
+    """
+    Partials per calendar date inside [start_dt, end_dt].
+
+    Returns:
+        DataFrame with columns: date (YYYY-MM-DD), n, total, sumsq, min, max
+    """
+    plan = _RangePlan(series, start_dt, end_dt)
+    with reader() as conn:
+        frames = []
+        if plan.first_day <= plan.last_day:
+            frames.append(
+                _stored_partials(
+                    conn, "rollup_daily", series, "date",
+                    plan.day_text(plan.first_day), plan.day_text(plan.last_day), "date",
+                )
+            )
+        for lo_ts, hi_ts in plan.raw_edges():
+            frames.append(_raw_partials(conn, series, lo_ts, hi_ts, {"date": _DATE_SQL}))
+    return _combine(frames, ["date"])
+
+
+def monthly_partials(series: str, start_dt=None, end_dt=None) -> pd.DataFrame:
+    """
+    Partials per calendar month (YYYY-MM) inside [start_dt, end_dt].
+
+    Returns:
+        DataFrame with columns: month, n, total, sumsq, min, max
+    """
+    plan = _RangePlan(series, start_dt, end_dt)
+    with reader() as conn:
+        frames = []
+        if plan.first_month is not None:
+            frames.append(
+                _stored_partials(
+                    conn, "rollup_monthly", series, "month",
+                    str(plan.first_month), str(plan.last_month), "month",
+                )
+            )
+        for first, last in plan.day_ranges_outside_months():
+            days = _stored_partials(
+                conn, "rollup_daily", series, "date", plan.day_text(first), plan.day_text(last), "date"
+            )
+            days["month"] = days["date"].str[:7]
+            frames.append(days.drop(columns=["date"]))
+        for lo_ts, hi_ts in plan.raw_edges():
+            frames.append(_raw_partials(conn, series, lo_ts, hi_ts, {"month": _MONTH_SQL}))
+    return _combine(frames, ["month"])
+
+
+def hour_of_day_partials(series: str, start_dt=None, end_dt=None) -> pd.DataFrame:
+    """
+    Partials per hour of day (0-23) over [start_dt, end_dt].
+
+    Whole months come from rollup_month_hour; the remaining days (at most the
+    two edge months) are read raw.
+
+    Returns:
+        DataFrame with columns: hour, n, total, sumsq, min, max
+    """
+    plan = _RangePlan(series, start_dt, end_dt)
+    with reader() as conn:
+        frames = []
+        if plan.first_month is not None:
+            frames.append(
+                _stored_partials(
+                    conn, "rollup_month_hour", series, "month",
+                    str(plan.first_month), str(plan.last_month), "hour",
+                )
+            )
+        raw_ranges = [
+            (first * MINUTES_PER_DAY, (last + 1) * MINUTES_PER_DAY - 1)
+            for first, last in plan.day_ranges_outside_months()
+        ] + plan.raw_edges()
+        for lo_ts, hi_ts in raw_ranges:
+            frames.append(_raw_partials(conn, series, lo_ts, hi_ts, {"hour": _HOUR_SQL}))
+    return _combine(frames, ["hour"])
+
+
+def _mean(partials: pd.DataFrame) -> pd.Series:
+    return partials["total"] / partials["n"]
+
+
+def chart_data(series: str, chart_type: str, start_dt=None, end_dt=None) -> pd.DataFrame:
+    """
+    Aggregated frame for one of chart_config.CHART_ORDER, computed from partials.
+
+    Results go through the shared price cache, keyed on the series version,
+    so reruns with the same range are free until the series is re-ingested.
+
+    The shapes and averaging rules match the raw-row aggregations on the
+    Electricity Prices page:
+    - yearly: year, price_eur_per_mwh (mean of all intervals in the year)
+    - year_month: year_month (Timestamp), price_eur_per_mwh
+    - calendar_month: month, avg_price (mean over years of the monthly means)
+    - daily: date, date_dt, price_eur_per_mwh
+    - day_of_week: weekday, weekday_order, price_eur_per_mwh (mean of daily means)
+    - hour_of_day: hour, price_eur_per_mwh
+    """
+    key = f"{series}|{chart_type}|{start_dt}|{end_dt}"
+    return cached(
+        "rollup_chart", key, lambda: _chart_data_uncached(series, chart_type, start_dt, end_dt), version_name=series
+    )
+
+
+def _chart_data_uncached(series: str, chart_type: str, start_dt, end_dt) -> pd.DataFrame:
+    if chart_type in ("yearly", "year_month", "calendar_month"):
+        p = monthly_partials(series, start_dt, end_dt)
+        month_start = pd.to_datetime(p["month"], format="%Y-%m")
+        if chart_type == "yearly":
+            p["year"] = month_start.dt.year
+            yearly = p.groupby("year", as_index=False)[["n", "total"]].sum()
+            return pd.DataFrame({"year": yearly["year"], "price_eur_per_mwh": _mean(yearly)})
+        if chart_type == "year_month":
+            return pd.DataFrame({"year_month": month_start, "price_eur_per_mwh": _mean(p)})
+        month_means = pd.DataFrame({"month": month_start.dt.month, "avg_price": _mean(p)})
+        return month_means.groupby("month", as_index=False)["avg_price"].mean()
+
+    if chart_type in ("daily", "day_of_week"):
+        p = daily_partials(series, start_dt, end_dt)
+        date_dt = pd.to_datetime(p["date"], format="%Y-%m-%d")
+        daily = pd.DataFrame({"date": date_dt.dt.date, "date_dt": date_dt, "price_eur_per_mwh": _mean(p)})
+        if chart_type == "daily":
+            return daily
+        daily["weekday"] = date_dt.dt.day_name()
+        daily["weekday_order"] = date_dt.dt.weekday  # Monday=0, Sunday=6
+        return daily.groupby(["weekday", "weekday_order"], as_index=False)["price_eur_per_mwh"].mean()
+
+    if chart_type == "hour_of_day":
+        p = hour_of_day_partials(series, start_dt, end_dt)
+        return pd.DataFrame({"hour": p["hour"].astype(int), "price_eur_per_mwh": _mean(p)})
+
+    raise ValueError(f"Unknown chart type '{chart_type}'")
+
+
+def chart_data_from_frame(df: pd.DataFrame, chart_type: str) -> pd.DataFrame:
+    """
+    Same frames as chart_data, computed from raw rows (load_price_data output).
+
+    Used when rollups cannot answer the query, e.g. inflation-adjusted
+    forecasts, where every row gets its own inflation factor.
+    """
+    if chart_type == "yearly":
+        return df.groupby("year", as_index=False)["price_eur_per_mwh"].mean()
+    if chart_type == "year_month":
+        year_month = df["datetime_parsed"].dt.to_period("M").dt.to_timestamp()
+        return df.assign(year_month=year_month).groupby("year_month", as_index=False)["price_eur_per_mwh"].mean()
+    if chart_type == "calendar_month":
+        month_year = df.groupby(["year", "month"], as_index=False)["price_eur_per_mwh"].mean()
+        return (
+            month_year.rename(columns={"price_eur_per_mwh": "avg_price"})
+            .groupby("month", as_index=False)["avg_price"].mean()
+        )
+    if chart_type in ("daily", "day_of_week"):
+        date = df["datetime_parsed"].dt.date
+        daily = df.assign(date=date).groupby("date", as_index=False)["price_eur_per_mwh"].mean()
+        daily["date_dt"] = pd.to_datetime(daily["date"])
+        if chart_type == "daily":
+            return daily
+        daily["weekday"] = daily["date_dt"].dt.day_name()
+        daily["weekday_order"] = daily["date_dt"].dt.weekday  # Monday=0, Sunday=6
+        return daily.groupby(["weekday", "weekday_order"], as_index=False)["price_eur_per_mwh"].mean()
+    if chart_type == "hour_of_day":
+        return df.groupby("hour", as_index=False)["price_eur_per_mwh"].mean()
+    raise ValueError(f"Unknown chart type '{chart_type}'")
+
+
+def main() -> None:
+    """Rebuild all rollups from price_store and print per-series counts."""
+    if not DB_PATH.exists():
+        print(f"Database {DB_PATH} does not exist. Nothing to do.")
+        return
+    print("Rebuilding rollups from price_store...")
+    start = time.perf_counter()
+    counts = rebuild_rollups()
+    elapsed = time.perf_counter() - start
+    for series, count in counts.items():
+        print(f"  {series}: {count} days")
+    print(f"✓ Rollups rebuilt in {elapsed:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
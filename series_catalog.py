@@ -0,0 +1,276 @@
+"""
+Metadata catalog of the stored price series.
+
+The ``series_catalog`` table holds one row per series: where it comes from
+(legacy table and column), how many values it has, its first and last
+timestamp (epoch minutes, as in price_store), the resolution of its most
+recent data and when the row was last refreshed.
+
+price_store.upsert_series refreshes the rows of the series it writes, so
+every ingest path keeps the catalog current. Market discovery and date
+ranges are read from it instead of probing the price tables on every page
+load. The catalog is built on first use, and can be rebuilt with
+``python series_catalog.py``.
+"""
+import sqlite3
+import time
+from typing import Iterable, Optional
+
+import numpy as np
+import pandas as pd
+
+from db import DB_PATH, get_table_name, query_live, reader, writer
+from price_store import (
+    _LEGACY_EPOCH_MINUTES_SQL,
+    LEGACY_HISTORICAL_COLUMNS,
+    PRICE_STORE_TABLE,
+    _store_columns,
+    from_epoch_minutes,
+)
+
+
+CATALOG_TABLE = "series_catalog"
+
+# Most recent intervals used to infer a series' resolution
+RESOLUTION_SAMPLE = 97
+
+_LEGACY_SERIES_COLUMNS = {series: column for column, series in LEGACY_HISTORICAL_COLUMNS.items()}
+
+
+def init_catalog(conn: sqlite3.Connection) -> None:
+    """Create the series_catalog table if it does not exist."""
+    conn.execute(
+        f"""
+        CREATE TABLE IF NOT EXISTS {CATALOG_TABLE} (
+            series TEXT PRIMARY KEY,
+            source_table TEXT,
+            source_column TEXT,
+            row_count INTEGER,
+            min_ts INTEGER,
+            max_ts INTEGER,
+            resolution_minutes INTEGER,
+            updated_at TEXT
+        )
+        """
+    )
+
+
+def legacy_source(series: str) -> tuple[str, str]:
+    """Return the legacy (table, price column) a store series is mirrored from."""
+    if series in _LEGACY_SERIES_COLUMNS:
+        return "historical_prices", _LEGACY_SERIES_COLUMNS[series]
+    indicator = series.removeprefix("ESIOS_")
+    if indicator != series and indicator.isdigit():
+        return get_table_name(int(indicator)), "price_eur_per_mwh"
+    return "forecasts", "price_eur_per_mwh"
+
+
+def _resolution_minutes(latest_desc: list) -> Optional[int]:
+    """Median step (minutes) between the most recent timestamps, newest first."""
+    if len(latest_desc) < 2:
+        return None
+    steps = -np.diff(np.asarray(latest_desc, dtype=np.int64))
+    return int(round(float(np.median(steps))))
+
+
+def _store_stats(cur: sqlite3.Cursor, series: str) -> Optional[tuple]:
+    """(row_count, min_ts, max_ts, resolution) of a price_store series, or None if empty."""
+    column = f'"{series}"'
+    cur.execute(f"SELECT ts FROM {PRICE_STORE_TABLE} WHERE {column} IS NOT NULL ORDER BY ts LIMIT 1")
+    first = cur.fetchone()
+    if first is None:
+        return None
+    cur.execute(
+        f"SELECT ts FROM {PRICE_STORE_TABLE} WHERE {column} IS NOT NULL ORDER BY ts DESC LIMIT ?",
+        (RESOLUTION_SAMPLE,),
+    )
+    latest = [row[0] for row in cur.fetchall()]
+
+    # Value counts come from the monthly rollups when they exist
+    row_count = 0
+    try:
+        cur.execute("SELECT COALESCE(SUM(n), 0) FROM rollup_monthly WHERE series = ?", (series,))
+        row_count = cur.fetchone()[0]
+    except sqlite3.OperationalError:
+        pass
+    if not row_count:
+        cur.execute(f"SELECT COUNT({column}) FROM {PRICE_STORE_TABLE}")
+        row_count = cur.fetchone()[0]
+    return row_count, first[0], latest[0], _resolution_minutes(latest)
+
+
+def _legacy_stats(cur: sqlite3.Cursor, table: str, column: str, source: Optional[str] = None) -> Optional[tuple]:
+    """(row_count, min_ts, max_ts, resolution) of a legacy table column, or None if empty."""
+    where = f'"{column}" IS NOT NULL' + (" AND source = ?" if source is not None else "")
+    params = (source,) if source is not None else ()
+    cur.execute(
+        f"SELECT COUNT(*), MIN({_LEGACY_EPOCH_MINUTES_SQL}), MAX({_LEGACY_EPOCH_MINUTES_SQL}) "
+        f"FROM {table} WHERE {where}",
+        params,
+    )
+    row_count, min_ts, max_ts = cur.fetchone()
+    if not row_count or min_ts is None:
+        return None
+    cur.execute(
+        f"SELECT {_LEGACY_EPOCH_MINUTES_SQL} FROM {table} WHERE {where} ORDER BY datetime DESC LIMIT ?",
+        (*params, RESOLUTION_SAMPLE),
+    )
+    latest = [row[0] for row in cur.fetchall() if row[0] is not None]
+    return row_count, min_ts, max_ts, _resolution_minutes(latest)
+
+
+def _write_entry(conn: sqlite3.Connection, series: str, table: str, column: str, stats: tuple) -> None:
+    conn.execute(
+        f"""
+        INSERT OR REPLACE INTO {CATALOG_TABLE}
+        (series, source_table, source_column, row_count, min_ts, max_ts, resolution_minutes, updated_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?, datetime('now'))
+        """,
+        (series, table, column, *stats),
+    )
+
+
+def refresh_catalog(series_list: Iterable[str], conn: sqlite3.Connection) -> None:
+    """
+    Recompute the catalog rows of the given price_store series.
+
+    Called inside the writer transaction of price_store.upsert_series, after
+    the rollups of the written range are refreshed.
+
+    Args:
+        series_list: Store series names
+        conn: Write connection (committed by the caller's transaction)
+    """
+    init_catalog(conn)
+    cur = conn.cursor()
+    for series in series_list:
+        stats = _store_stats(cur, series)
+        if stats is None:
+            conn.execute(f"DELETE FROM {CATALOG_TABLE} WHERE series = ?", (series,))
+        else:
+            _write_entry(conn, series, *legacy_source(series), stats)
+
+
+def rebuild_catalog() -> dict[str, int]:
+    """
+    Rebuild the catalog from price_store, plus any legacy series not migrated yet.
+
+    Returns:
+        Dictionary mapping series name -> row count
+    """
+    with writer() as conn:
+        init_catalog(conn)
+        conn.execute(f"DELETE FROM {CATALOG_TABLE}")
+        cur = conn.cursor()
+        cur.execute("SELECT name FROM sqlite_master WHERE type='table'")
+        tables = {row[0] for row in cur.fetchall()}
+
+        if PRICE_STORE_TABLE in tables:
+            refresh_catalog([c for c in _store_columns(cur) if c != "ts"], conn)
+        cur.execute(f"SELECT series FROM {CATALOG_TABLE}")
+        cataloged = {row[0] for row in cur.fetchall()}
+
+        # Legacy tables only fill series the store does not hold yet
+        legacy: list[tuple[str, str, str, Optional[str]]] = []
+        if "historical_prices" in tables:
+            cur.execute("PRAGMA table_info(historical_prices)")
+            columns = {row[1] for row in cur.fetchall()}
+            legacy += [
+                (series, "historical_prices", column, None)
+                for column, series in LEGACY_HISTORICAL_COLUMNS.items()
+                if column in columns
+            ]
+        if "forecasts" in tables:
+            cur.execute("SELECT DISTINCT source FROM forecasts")
+            legacy += [
+                (row[0], "forecasts", "price_eur_per_mwh", row[0]) for row in cur.fetchall() if row[0]
+            ]
+        for series, table, column, source in legacy:
+            if series in cataloged:
+                continue
+            stats = _legacy_stats(cur, table, column, source)
+            if stats is not None:
+                _write_entry(conn, series, table, column, stats)
+
+        cur.execute(f"SELECT series, row_count FROM {CATALOG_TABLE} ORDER BY series")
+        return dict(cur.fetchall())
+
+
+def _query_catalog(sql: str, params: tuple = ()) -> list[tuple]:
+    """
+    Run a catalog query, building the catalog first if the table is missing.
+
+    If the pages' published copy lacks the table, the query falls back to
+    the live database (see db.query_live).
+    """
+    try:
+        with reader() as conn:
+            return conn.execute(sql, params).fetchall()
+    except sqlite3.OperationalError as exc:
+        if "no such table" not in str(exc):
+            raise
+    return query_live(sql, params, build=rebuild_catalog)
+
+
+def load_catalog() -> pd.DataFrame:
+    """
+    Return the whole catalog.
+
+    Returns:
+        DataFrame indexed by series with columns: source_table, source_column,
+        row_count, min_datetime, max_datetime, resolution_minutes, updated_at
+    """
+    columns = ["series", "source_table", "source_column", "row_count", "min_ts", "max_ts",
+               "resolution_minutes", "updated_at"]
+    if not DB_PATH.exists():
+        rows = []
+    else:
+        rows = _query_catalog(f"SELECT {', '.join(columns)} FROM {CATALOG_TABLE} ORDER BY series")
+    df = pd.DataFrame(rows, columns=columns).set_index("series")
+    df["min_datetime"] = from_epoch_minutes(df["min_ts"].to_numpy(dtype=np.int64))
+    df["max_datetime"] = from_epoch_minutes(df["max_ts"].to_numpy(dtype=np.int64))
+    return df.drop(columns=["min_ts", "max_ts"])[
+        ["source_table", "source_column", "row_count", "min_datetime", "max_datetime",
+         "resolution_minutes", "updated_at"]
+    ]
+
+
+def catalog_sources() -> dict[str, tuple[str, str]]:
+    """Return {series: (source table, source column)} for every cataloged series."""
+    if not DB_PATH.exists():
+        return {}
+    rows = _query_catalog(f"SELECT series, source_table, source_column FROM {CATALOG_TABLE}")
+    return {series: (table, column) for series, table, column in rows}
+
+
+def catalog_date_range(series: str) -> Optional[tuple[pd.Timestamp, pd.Timestamp]]:
+    """Return the cataloged (min, max) datetime of a series, or None if it has no data."""
+    if not DB_PATH.exists():
+        return None
+    rows = _query_catalog(f"SELECT min_ts, max_ts FROM {CATALOG_TABLE} WHERE series = ?", (series,))
+    if not rows:
+        return None
+    bounds = from_epoch_minutes(np.array(rows[0], dtype=np.int64))
+    return bounds[0], bounds[1]
+
+
+def main() -> None:
+    """Rebuild the series catalog and print it."""
+    if not DB_PATH.exists():
+        print(f"Database {DB_PATH} does not exist. Nothing to do.")
+        return
+    print("Rebuilding series catalog...")
+    start = time.perf_counter()
+    rebuild_catalog()
+    elapsed = time.perf_counter() - start
+    for series, entry in load_catalog().iterrows():
+        resolution = f"{entry['resolution_minutes']} min" if pd.notna(entry["resolution_minutes"]) else "n/a"
+        print(
+            f"  {series}: {entry['row_count']} rows, {entry['min_datetime']} to {entry['max_datetime']}, "
+            f"{resolution} ({entry['source_table']}.{entry['source_column']})"
+        )
+    print(f"✓ Catalog rebuilt in {elapsed:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -315,3 +315,18 @@ def get_date_range_selector(source: DataSource) -> tuple[datetime, datetime]:
     
     return start_dt, end_dt
 
+
+
+def show_cache_debug_panel():
+    """Display the shared price cache counters in a collapsed sidebar expander."""
+    from price_cache import cache_stats
+
+    stats = cache_stats()
+    lookups = stats["hits"] + stats["misses"]
+    hit_rate = stats["hits"] / lookups * 100.0 if lookups else 0.0
+    with st.sidebar.expander("Cache debug", expanded=False):
+        st.write(f"Hits: {stats['hits']} ({hit_rate:.0f}%)")
+        st.write(f"Misses: {stats['misses']}")
+        st.write(f"Evictions: {stats['evictions']}")
+        st.write(f"Entries: {stats['entries']}")
+        st.write(f"Memory: {stats['bytes'] / 1e6:.1f} / {stats['max_bytes'] / 1e6:.0f} MB")
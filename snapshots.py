@@ -0,0 +1,296 @@
+"""
+Memory-mapped NumPy snapshots of the price series and PV profiles.
+
+Each price_store series and each pv_profiles column is dumped to a pair of
+``.npy`` files: int64 keys (epoch nanoseconds for prices, dense PV slot
+numbers for profiles, see captured_prices.pv_profile_array) and float32
+values. The loaders map them read-only with ``np.load(mmap_mode="r")``, so
+every Streamlit session and every app process reading a series shares the
+same OS page-cache pages instead of holding its own copy decoded from SQLite.
+
+Layout under data/snapshots/:
+- gen-<time>-<pid>/: one complete generation (manifest.json plus the files)
+- CURRENT: name of the generation readers should use
+
+A refresh writes a new generation next to the current one, reusing the files
+of unchanged entries (hard links), and switches CURRENT with an atomic
+rename. Readers therefore see either the old or the new generation, never a
+partial one. Each manifest entry records the data version it was built from
+(see price_cache), and entries whose version no longer matches the database
+are ignored, so a missed refresh only costs a fallback to SQLite.
+
+Ingest scripts refresh the snapshots when they finish; to rebuild by hand:
+    python snapshots.py [--force]
+"""
+import argparse
+import json
+import os
+import re
+import shutil
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from db import DATA_DIR, DB_PATH, connect
+from price_cache import DATA_VERSIONS_TABLE, get_data_version
+from price_store import PRICE_STORE_TABLE, _store_columns, to_epoch_minutes
+
+
+SNAPSHOT_DIR = DATA_DIR / "snapshots"
+CURRENT_FILE = "CURRENT"
+MANIFEST_FILE = "manifest.json"
+PV_PROFILES_TABLE = "pv_profiles"
+
+# Set PRICE_SNAPSHOTS=0 to always read from SQLite
+SNAPSHOTS_ENABLED = os.getenv("PRICE_SNAPSHOTS", "1") not in ("", "0")
+
+# Superseded generations are removed once they are this old (seconds);
+# processes still mapping them keep their pages until they move on
+STALE_GENERATION_SECONDS = 10 * 60
+
+_NS_PER_MINUTE = 60 * 1_000_000_000
+
+_lock = threading.Lock()
+# Generation currently mapped by this process, its manifest and open memmaps
+_state: dict = {"generation": None, "manifest": {}, "arrays": {}}
+
+
+def _file_stem(kind: str, name: str) -> str:
+    return f"{kind}.{re.sub(r'[^A-Za-z0-9_.-]', '_', name)}"
+
+
+def _read_versions(cur: sqlite3.Cursor) -> dict[str, int]:
+    cur.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name=?", (DATA_VERSIONS_TABLE,))
+    if cur.fetchone() is None:
+        return {}
+    cur.execute(f"SELECT name, version FROM {DATA_VERSIONS_TABLE}")
+    return dict(cur.fetchall())
+
+
+def _series_arrays(cur: sqlite3.Cursor, series: str) -> tuple[np.ndarray, np.ndarray]:
+    cur.execute(f'SELECT ts, "{series}" FROM {PRICE_STORE_TABLE} WHERE "{series}" IS NOT NULL ORDER BY ts')
+    data = np.array(cur.fetchall(), dtype=np.float64).reshape(-1, 2)
+    return data[:, 0].astype(np.int64) * _NS_PER_MINUTE, data[:, 1].astype(np.float32)
+
+
+def _pv_arrays(cur: sqlite3.Cursor, column: str) -> tuple[np.ndarray, np.ndarray]:
+    # Imported here: captured_prices reads the snapshots through this module
+    from captured_prices import _slot_index
+
+    cur.execute(f'SELECT month, day, hour, "{column}" FROM {PV_PROFILES_TABLE} WHERE "{column}" IS NOT NULL')
+    data = np.array(cur.fetchall(), dtype=np.float64).reshape(-1, 4)
+    slots = _slot_index(data[:, 0], data[:, 1], data[:, 2])
+    order = np.argsort(slots, kind="stable")
+    return slots[order].astype(np.int64), data[order, 3].astype(np.float32)
+
+
+def _current_generation() -> Optional[Path]:
+    try:
+        name = (SNAPSHOT_DIR / CURRENT_FILE).read_text(encoding="utf-8").strip()
+    except FileNotFoundError:
+        return None
+    path = SNAPSHOT_DIR / name
+    return path if name and path.is_dir() else None
+
+
+def _load_manifest(generation: Optional[Path]) -> dict:
+    if generation is None:
+        return {}
+    try:
+        return json.loads((generation / MANIFEST_FILE).read_text(encoding="utf-8"))["entries"]
+    except (FileNotFoundError, ValueError, KeyError):
+        return {}
+
+
+def _remove_stale_generations(current: Path) -> None:
+    cutoff = time.time() - STALE_GENERATION_SECONDS
+    for path in SNAPSHOT_DIR.iterdir():
+        if path == current or not path.is_dir() or not path.name.startswith(("gen-", "tmp-")):
+            continue
+        try:
+            if path.stat().st_mtime < cutoff:
+                shutil.rmtree(path)
+        except OSError:
+            pass  # Still mapped (Windows) or removed by another refresh
+
+
+def refresh_snapshots(force: bool = False) -> dict[str, int]:
+    """
+    Bring the snapshots up to date with the database.
+
+    Entries whose data version changed (or that are missing) are rewritten;
+    the others are carried over from the current generation. Nothing is
+    written when every entry is current.
+
+    Args:
+        force: Rewrite every entry
+
+    Returns:
+        Dictionary mapping rewritten entry ("series.<name>" / "pv_profile.<column>")
+        -> number of values
+    """
+    if not DB_PATH.exists():
+        return {}
+    current = _current_generation()
+    previous = {} if force else _load_manifest(current)
+
+    conn = connect(read_only=True)
+    try:
+        cur = conn.cursor()
+        # One read transaction: data and versions come from the same database state
+        cur.execute("BEGIN")
+        versions = _read_versions(cur)
+        cur.execute("SELECT name FROM sqlite_master WHERE type='table'")
+        tables = {row[0] for row in cur.fetchall()}
+
+        wanted: dict[str, tuple[str, str, int]] = {}
+        if PRICE_STORE_TABLE in tables:
+            for series in _store_columns(cur):
+                if series != "ts":
+                    wanted[_file_stem("series", series)] = ("series", series, versions.get(series, 0))
+        if PV_PROFILES_TABLE in tables:
+            cur.execute(f"PRAGMA table_info({PV_PROFILES_TABLE})")
+            for column in [row[1] for row in cur.fetchall()]:
+                if column not in ("month", "day", "hour"):
+                    wanted[_file_stem("pv_profile", column)] = (
+                        "pv_profile", column, versions.get(PV_PROFILES_TABLE, 0)
+                    )
+
+        stale = [
+            stem for stem, (_, _, version) in wanted.items()
+            if previous.get(stem, {}).get("version") != version
+        ]
+        if not stale and set(previous) == set(wanted):
+            return {}
+
+        SNAPSHOT_DIR.mkdir(parents=True, exist_ok=True)
+        generation = f"gen-{time.strftime('%Y%m%dT%H%M%S')}-{os.getpid()}-{time.perf_counter_ns() % 1_000_000}"
+        tmp_dir = SNAPSHOT_DIR / f"tmp-{generation}"
+        tmp_dir.mkdir()
+        entries = {}
+        rewritten = {}
+        for stem, (kind, name, version) in wanted.items():
+            entry = {"kind": kind, "name": name, "version": version}
+            if stem in stale:
+                keys, values = _series_arrays(cur, name) if kind == "series" else _pv_arrays(cur, name)
+                np.save(tmp_dir / f"{stem}.keys.npy", keys)
+                np.save(tmp_dir / f"{stem}.values.npy", values)
+                entry["rows"] = len(values)
+                rewritten[stem] = len(values)
+            else:
+                for part in ("keys", "values"):
+                    src = current / f"{stem}.{part}.npy"
+                    try:
+                        os.link(src, tmp_dir / src.name)
+                    except OSError:
+                        shutil.copy2(src, tmp_dir / src.name)
+                entry["rows"] = previous[stem]["rows"]
+            entries[stem] = entry
+        cur.execute("COMMIT")
+    finally:
+        conn.close()
+
+    manifest = {"created": pd.Timestamp.now().isoformat(timespec="seconds"), "entries": entries}
+    (tmp_dir / MANIFEST_FILE).write_text(json.dumps(manifest, indent=1), encoding="utf-8")
+    os.replace(tmp_dir, SNAPSHOT_DIR / generation)
+
+    # Switch readers over in one rename
+    pointer_tmp = SNAPSHOT_DIR / f".{CURRENT_FILE}.{os.getpid()}.tmp"
+    pointer_tmp.write_text(generation, encoding="utf-8")
+    os.replace(pointer_tmp, SNAPSHOT_DIR / CURRENT_FILE)
+    _remove_stale_generations(SNAPSHOT_DIR / generation)
+    return rewritten
+
+
+def _snapshot_arrays(kind: str, name: str, version_name: str) -> Optional[tuple[np.ndarray, np.ndarray]]:
+    """Memory-mapped (keys, values) of an entry, or None if missing or out of date."""
+    if not SNAPSHOTS_ENABLED:
+        return None
+    generation = _current_generation()
+    if generation is None:
+        return None
+    stem = _file_stem(kind, name)
+    with _lock:
+        if generation != _state["generation"]:
+            _state.update(generation=generation, manifest=_load_manifest(generation), arrays={})
+        entry = _state["manifest"].get(stem)
+        if entry is None:
+            return None
+        arrays = _state["arrays"].get(stem)
+    if entry["version"] != get_data_version(version_name):
+        return None
+    if arrays is None:
+        try:
+            arrays = (
+                np.load(generation / f"{stem}.keys.npy", mmap_mode="r"),
+                np.load(generation / f"{stem}.values.npy", mmap_mode="r"),
+            )
+        except (FileNotFoundError, ValueError):
+            return None
+        with _lock:
+            if _state["generation"] == generation:
+                _state["arrays"][stem] = arrays
+    return arrays
+
+
+def snapshot_series(
+    series: str,
+    start_dt: Optional[pd.Timestamp] = None,
+    end_dt: Optional[pd.Timestamp] = None,
+) -> Optional[pd.Series]:
+    """
+    Read a price series from its snapshot, as price_store.read_series would.
+
+    The index and values are read-only views on the mapped files (values
+    are float32); the date range is a binary search on the sorted keys.
+
+    Returns:
+        Series with a naive DatetimeIndex named 'datetime', or None when the
+        series has no current snapshot
+    """
+    arrays = _snapshot_arrays("series", series, series)
+    if arrays is None:
+        return None
+    keys, values = arrays
+    lo = 0 if start_dt is None else int(np.searchsorted(keys, to_epoch_minutes([start_dt])[0] * _NS_PER_MINUTE))
+    hi = len(keys) if end_dt is None else int(
+        np.searchsorted(keys, to_epoch_minutes([end_dt])[0] * _NS_PER_MINUTE, side="right")
+    )
+    index = pd.DatetimeIndex(keys[lo:hi].view("datetime64[ns]"), name="datetime", copy=False)
+    return pd.Series(values[lo:hi], index=index, name=series, copy=False)
+
+
+def snapshot_pv_profile(column: str) -> Optional[tuple[np.ndarray, np.ndarray]]:
+    """Return the mapped (PV slots, float32 values) of a PV profile, or None without a current snapshot."""
+    return _snapshot_arrays("pv_profile", column, PV_PROFILES_TABLE)
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Refresh the memory-mapped price and PV snapshots.")
+    parser.add_argument("--force", action="store_true", help="Rewrite every snapshot, not only out-of-date ones")
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    if not DB_PATH.exists():
+        print(f"Database {DB_PATH} does not exist. Nothing to do.")
+        return
+    start = time.perf_counter()
+    rewritten = refresh_snapshots(force=args.force)
+    elapsed = time.perf_counter() - start
+    for stem, rows in rewritten.items():
+        print(f"  {stem}: {rows} values")
+    if rewritten:
+        print(f"✓ Rewrote {len(rewritten)} snapshot(s) in {elapsed:.1f}s ({_current_generation().name})")
+    else:
+        print("✓ Snapshots already up to date")
+
+
+if __name__ == "__main__":
+    main()
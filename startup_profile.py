@@ -0,0 +1,246 @@
+"""
+Startup instrumentation and cold page-load benchmark.
+
+With STARTUP_PROFILE=1 in the environment, every module imported after this
+one is timed (self and cumulative time, as ``python -X importtime`` reports
+them), and each page reports how long its script took to render, split into
+the first (cold) run in the process and later reruns. Pages call
+page_started() at the top and page_rendered() at the end; both are no-ops
+when profiling is off.
+
+``python startup_profile.py`` is the regression benchmark. Each page is
+loaded in a fresh interpreter, with streamlit's AppTest when streamlit is
+installed. Otherwise the modules the page imports are timed. The run fails
+(exit code 1) if any page exceeds its budget.
+
+Usage:
+    STARTUP_PROFILE=1 streamlit run app.py
+    python startup_profile.py --budget 2.5
+"""
+import argparse
+import ast
+import importlib.abc
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Optional
+
+PROFILE_ENABLED = os.getenv("STARTUP_PROFILE", "") not in ("", "0")
+
+BASE_DIR = Path(__file__).resolve().parent
+PAGE_SCRIPTS = ["app.py"] + sorted(str(p.relative_to(BASE_DIR)) for p in (BASE_DIR / "pages").glob("*.py"))
+
+# Cold-load budgets per page (seconds): full AppTest run / imports only
+PAGE_LOAD_BUDGET_S = 6.0
+IMPORT_BUDGET_S = 1.5
+
+_lock = threading.Lock()
+# Module -> [self seconds, cumulative seconds]
+_import_times: dict[str, list[float]] = {}
+_import_stack: list[list] = []
+# Page -> {"first": seconds, "runs": n, "total": seconds}
+_page_times: dict[str, dict] = {}
+_page_starts: dict[str, tuple[float, int]] = {}
+
+
+class _TimingFinder(importlib.abc.MetaPathFinder):
+    """Meta path hook wrapping each module's exec_module with a timer."""
+
+    def find_spec(self, fullname, path, target=None):
+        for finder in sys.meta_path:
+            if finder is self or not hasattr(finder, "find_spec"):
+                continue
+            spec = finder.find_spec(fullname, path, target)
+            if spec is None:
+                continue
+            loader = spec.loader
+            # Built-in and frozen importers are shared classes; only time per-module loaders
+            if loader is not None and not isinstance(loader, type) and hasattr(loader, "exec_module"):
+                loader.exec_module = _timed_exec(fullname, loader.exec_module)
+            return spec
+        return None
+
+
+def _timed_exec(name: str, exec_module):
+    def run(module):
+        frame = [name, 0.0]  # children's cumulative time
+        _import_stack.append(frame)
+        start = time.perf_counter()
+        try:
+            return exec_module(module)
+        finally:
+            elapsed = time.perf_counter() - start
+            _import_stack.pop()
+            if _import_stack:
+                _import_stack[-1][1] += elapsed
+            with _lock:
+                _import_times[name] = [elapsed - frame[1], elapsed]
+    return run
+
+
+if PROFILE_ENABLED and not any(isinstance(f, _TimingFinder) for f in sys.meta_path):
+    sys.meta_path.insert(0, _TimingFinder())
+
+
+def import_times(top: Optional[int] = None) -> list[tuple[str, float, float]]:
+    """
+    Return (module, self seconds, cumulative seconds), slowest cumulative first.
+
+    Args:
+        top: Optional number of entries to keep
+    """
+    with _lock:
+        rows = [(name, t[0], t[1]) for name, t in _import_times.items()]
+    rows.sort(key=lambda r: r[2], reverse=True)
+    return rows[:top] if top else rows
+
+
+def page_started(page: str) -> None:
+    """Mark the start of a page script run (no-op unless profiling)."""
+    if PROFILE_ENABLED:
+        _page_starts[page] = (time.perf_counter(), len(_import_times))
+
+
+def page_rendered(page: str) -> None:
+    """Mark the end of a page script run and print its timing (no-op unless profiling)."""
+    if not PROFILE_ENABLED or page not in _page_starts:
+        return
+    start, imports_before = _page_starts.pop(page)
+    elapsed = time.perf_counter() - start
+    with _lock:
+        stats = _page_times.setdefault(page, {"first": elapsed, "runs": 0, "total": 0.0})
+        stats["runs"] += 1
+        stats["total"] += elapsed
+        new_imports = list(_import_times.items())[imports_before:]
+    kind = "first render" if stats["runs"] == 1 else f"rerun {stats['runs']}"
+    line = f"[startup] {page}: {kind} in {elapsed:.3f}s"
+    if new_imports:
+        slowest = sorted(new_imports, key=lambda item: item[1][0], reverse=True)[:5]
+        line += f", {len(new_imports)} modules imported (slowest self: " + ", ".join(
+            f"{name} {t[0]*1000:.0f}ms" for name, t in slowest
+        ) + ")"
+    print(line, flush=True)
+
+
+def page_times() -> dict[str, dict]:
+    """Return {page: {"first", "runs", "total"}} for the pages rendered so far."""
+    with _lock:
+        return {page: dict(stats) for page, stats in _page_times.items()}
+
+
+def page_imports(script: str) -> list[str]:
+    """
+    Module names a page script imports while it loads.
+
+    Imports inside function bodies are lazy (paid only when that code runs)
+    and are left out.
+    """
+    tree = ast.parse((BASE_DIR / script).read_text(encoding="utf-8"))
+    names = []
+    pending = list(tree.body)
+    while pending:
+        node = pending.pop(0)
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.Lambda)):
+            continue
+        if isinstance(node, ast.Import):
+            names += [alias.name for alias in node.names]
+        elif isinstance(node, ast.ImportFrom) and node.level == 0 and node.module != "__future__":
+            names.append(node.module)
+        pending += list(ast.iter_child_nodes(node))
+    return list(dict.fromkeys(names))
+
+
+# Runs in a fresh interpreter: loads one page cold and prints a JSON result
+_HARNESS = r"""
+import importlib, json, sys, time
+start = time.perf_counter()
+import startup_profile
+script, modules = sys.argv[1], json.loads(sys.argv[2])
+result = {"script": script, "missing": []}
+try:
+    from streamlit.testing.v1 import AppTest
+except ImportError:
+    AppTest = None
+if AppTest is not None:
+    result["mode"] = "apptest"
+    AppTest.from_file(script, default_timeout=120).run()
+else:
+    result["mode"] = "imports"
+    for name in modules:
+        try:
+            importlib.import_module(name)
+        except ImportError as exc:
+            # Report the dependency that is missing, not the page module needing it
+            if (exc.name or name) not in result["missing"]:
+                result["missing"].append(exc.name or name)
+result["seconds"] = time.perf_counter() - start
+result["slowest"] = [
+    f"{name} {cumulative * 1000:.0f}ms" for name, _, cumulative in startup_profile.import_times() if name in modules
+][:5]
+print(json.dumps(result))
+"""
+
+
+def measure_page(script: str) -> dict:
+    """
+    Load one page in a fresh interpreter and time it.
+
+    Returns:
+        Dictionary with script, mode ("apptest" or "imports"), seconds,
+        missing (dependencies not installed here) and slowest (the page's
+        direct imports by cumulative time)
+    """
+    env = dict(os.environ, STARTUP_PROFILE="1", PYTHONPATH=str(BASE_DIR))
+    proc = subprocess.run(
+        [sys.executable, "-c", _HARNESS, script, json.dumps(page_imports(script))],
+        cwd=BASE_DIR,
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"{script} failed to load:\n{proc.stderr.strip()}")
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Cold page-load benchmark; exits 1 if a page exceeds its budget.")
+    parser.add_argument("--budget", type=float, help="Budget per page in seconds (default depends on the mode)")
+    parser.add_argument("--repeat", type=int, default=3, help="Cold loads per page (the fastest counts)")
+    parser.add_argument("--pages", type=str, help="Comma-separated substrings selecting pages (default: all)")
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    scripts = PAGE_SCRIPTS
+    if args.pages:
+        wanted = [p.strip() for p in args.pages.split(",")]
+        scripts = [s for s in scripts if any(w in s for w in wanted)]
+
+    failures = []
+    for script in scripts:
+        runs = [measure_page(script) for _ in range(max(args.repeat, 1))]
+        best = min(runs, key=lambda r: r["seconds"])
+        budget = args.budget or (PAGE_LOAD_BUDGET_S if best["mode"] == "apptest" else IMPORT_BUDGET_S)
+        status = "ok" if best["seconds"] <= budget else "OVER BUDGET"
+        line = f"{script:<36} {best['mode']:<8} {best['seconds']:6.3f}s / {budget:.1f}s  {status}"
+        line += f"  slowest: {', '.join(best['slowest'])}"
+        if best["missing"]:
+            line += f"  (not installed: {', '.join(best['missing'])})"
+        print(line)
+        if status != "ok":
+            failures.append(script)
+
+    if failures:
+        print(f"✗ {len(failures)} page(s) over budget: {', '.join(failures)}")
+        sys.exit(1)
+    print(f"✓ All {len(scripts)} pages within budget")
+
+
+if __name__ == "__main__":
+    main()
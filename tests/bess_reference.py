@@ -0,0 +1,199 @@
+"""
+Reference implementations the BESS dispatch engine replaced, and its benchmark.
+
+test_bess.py checks the vectorised dispatch against the per-row loop here.
+Run `python tests/bess_reference.py` to time the dispatch engine against the
+loop, and the grouped price metrics against one groupby-apply per view.
+"""
+import sys
+import time as timer
+from datetime import time
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from bess import (  # noqa: E402
+    BESS_GROUPINGS,
+    _interval_hours,
+    bess_daily_partials,
+    grouped_price_metrics,
+    simulate_battery_operations,
+)
+
+
+def simulate_battery_operations_loop(
+    df: pd.DataFrame,
+    capacity_mw: float,
+    duration_hours: float,
+    efficiency: float,
+    charge1: time,
+    discharge1: time,
+    charge2: Optional[time] = None,
+    discharge2: Optional[time] = None,
+) -> pd.DataFrame:
+    """The former per-row implementation of bess.simulate_battery_operations."""
+    df = df.copy()
+    df = df.sort_values("datetime_parsed")
+
+    capacity_mwh = capacity_mw * duration_hours
+    interval_hours = _interval_hours(df["datetime_parsed"])
+
+    df["charge_mwh"] = 0.0
+    df["discharge_mwh"] = 0.0
+    df["battery_soc"] = 0.0
+    df["charge_cost"] = 0.0
+    df["discharge_revenue"] = 0.0
+    df["net_revenue"] = 0.0
+    df["cycle"] = 0
+
+    df["hour_of_day"] = df["datetime_parsed"].dt.hour
+    df["minute"] = df["datetime_parsed"].dt.minute
+    df["date"] = df["datetime_parsed"].dt.date
+
+    def window(date, start: time) -> tuple[pd.Timestamp, pd.Timestamp]:
+        window_start = pd.Timestamp(date).replace(hour=start.hour, minute=start.minute, second=0, microsecond=0)
+        return window_start, window_start + pd.Timedelta(hours=duration_hours)
+
+    cumulative_net_revenue = 0.0
+    for date, day_df in df.groupby("date"):
+        day_df = day_df.sort_values("datetime_parsed").copy()
+        soc = 0.0
+        for idx, row in day_df.iterrows():
+            dt = row["datetime_parsed"]
+            is_charging = False
+            is_discharging = False
+            cycle_num = 0
+
+            charge1_start, charge1_end = window(date, charge1)
+            discharge1_start, discharge1_end = window(date, discharge1)
+            if charge1_start <= dt < charge1_end:
+                is_charging = True
+                cycle_num = 1
+            if discharge1_start <= dt < discharge1_end:
+                is_discharging = True
+                cycle_num = 1
+            if charge2 is not None and discharge2 is not None:
+                charge2_start, charge2_end = window(date, charge2)
+                discharge2_start, discharge2_end = window(date, discharge2)
+                if charge2_start <= dt < charge2_end:
+                    is_charging = True
+                    cycle_num = 2
+                if discharge2_start <= dt < discharge2_end:
+                    is_discharging = True
+                    cycle_num = 2
+
+            incremental_net_revenue = 0.0
+            if is_charging and not is_discharging:
+                if soc < capacity_mwh:
+                    charge_energy = min(capacity_mw * interval_hours, capacity_mwh - soc)
+                    if charge_energy > 0:
+                        charge_cost = -(charge_energy * row["price_eur_per_mwh"])
+                        df.loc[idx, "charge_mwh"] = charge_energy
+                        df.loc[idx, "charge_cost"] = charge_cost
+                        df.loc[idx, "cycle"] = cycle_num
+                        soc = soc + charge_energy
+                        incremental_net_revenue = charge_cost
+            elif is_discharging and not is_charging:
+                if soc > 0:
+                    discharge_energy = min(capacity_mw * interval_hours, soc * efficiency)
+                    if discharge_energy > 0:
+                        discharge_revenue = discharge_energy * row["price_eur_per_mwh"]
+                        df.loc[idx, "discharge_mwh"] = discharge_energy
+                        df.loc[idx, "discharge_revenue"] = discharge_revenue
+                        df.loc[idx, "cycle"] = cycle_num
+                        soc = soc - discharge_energy / efficiency
+                        incremental_net_revenue = discharge_revenue
+
+            cumulative_net_revenue += incremental_net_revenue
+            df.loc[idx, "net_revenue"] = cumulative_net_revenue
+            df.loc[idx, "battery_soc"] = soc
+
+    return df
+
+
+def benchmark_dispatch(df: pd.DataFrame, loop_days: int = 30) -> pd.DataFrame:
+    """Time the vectorised dispatch against the former per-row loop; returns the full simulation."""
+    args = (10.0, 4.0, 0.9, time(3, 0), time(18, 0))
+    # The loop takes seconds per month of 15-minute data, so it only runs on the first days
+    sample = df[df["datetime_parsed"] < df["datetime_parsed"].iloc[0] + pd.Timedelta(days=loop_days)]
+    start = timer.perf_counter()
+    expected = simulate_battery_operations_loop(sample, *args)
+    loop_seconds = timer.perf_counter() - start
+    start = timer.perf_counter()
+    result = simulate_battery_operations(sample, *args)
+    sample_seconds = timer.perf_counter() - start
+    start = timer.perf_counter()
+    df_with_bess = simulate_battery_operations(df, *args)
+    full_seconds = timer.perf_counter() - start
+
+    difference = float(np.abs(result["net_revenue"].to_numpy() - expected["net_revenue"].to_numpy()).max())
+    print(f"Dispatch, {loop_days} days: loop {loop_seconds:.3f}s, vectorised {sample_seconds:.3f}s "
+          f"({loop_seconds / sample_seconds:.0f}x, max difference {difference:.1e})")
+    print(f"Dispatch, all days: vectorised {full_seconds:.3f}s "
+          f"(loop extrapolated ~{loop_seconds * len(df) / len(sample):.0f}s)")
+    return df_with_bess
+
+
+def main() -> None:
+    """Benchmark the dispatch engine and grouped price metrics on 8 years of 15-minute prices."""
+    rng = np.random.default_rng(0)
+    index = pd.date_range("2018-01-01", "2025-12-31 23:45", freq="15min")
+    hour = index.hour.to_numpy()
+    prices = 60 + 25 * np.sin((hour - 8) / 24 * 2 * np.pi) + rng.normal(0, 15, len(index))
+    df = pd.DataFrame({"datetime_parsed": index, "price_eur_per_mwh": prices})
+    print(f"{len(df):,} intervals, {index.normalize().nunique():,} days")
+    df_with_bess = benchmark_dispatch(df)
+
+    def compute_price_metrics(group_df):
+        charge_df = group_df[group_df["charge_mwh"] > 0]
+        discharge_df = group_df[group_df["discharge_mwh"] > 0]
+        avg_charge = -charge_df["charge_cost"].sum() / charge_df["charge_mwh"].sum() if charge_df["charge_mwh"].sum() > 0 else 0.0
+        avg_discharge = (
+            discharge_df["discharge_revenue"].sum() / discharge_df["discharge_mwh"].sum()
+            if discharge_df["discharge_mwh"].sum() > 0
+            else 0.0
+        )
+        avg_spread = avg_discharge - avg_charge if (avg_charge > 0 and avg_discharge > 0) else 0.0
+        return pd.Series({"avg_charge_price": avg_charge, "avg_discharge_price": avg_discharge, "avg_spread": avg_spread})
+
+    # Before: calendar columns on the active intervals, then one apply per view
+    start = timer.perf_counter()
+    active = df_with_bess[(df_with_bess["charge_mwh"] > 0) | (df_with_bess["discharge_mwh"] > 0)].copy()
+    active["date_dt"] = pd.to_datetime(active["date"])
+    active["year"] = active["date_dt"].dt.year
+    active["month"] = active["date_dt"].dt.month
+    active["year_month"] = active["date_dt"].dt.to_period("M").dt.to_timestamp()
+    active["weekday"] = active["date_dt"].dt.day_name()
+    active["weekday_order"] = active["date_dt"].dt.weekday
+    before_setup = timer.perf_counter() - start
+    before = {}
+    for grouping, group_cols in BESS_GROUPINGS.items():
+        start = timer.perf_counter()
+        active.groupby(group_cols).apply(compute_price_metrics)
+        before[grouping] = timer.perf_counter() - start
+
+    # After: one set of daily partials, then one sum-and-divide per view
+    start = timer.perf_counter()
+    partials = bess_daily_partials(df_with_bess)
+    after_setup = timer.perf_counter() - start
+    after = {}
+    for grouping, group_cols in BESS_GROUPINGS.items():
+        start = timer.perf_counter()
+        grouped_price_metrics(partials, group_cols)
+        after[grouping] = timer.perf_counter() - start
+
+    print(f"{'view':<14}{'apply':>10}{'partials':>10}")
+    print(f"{'(setup)':<14}{before_setup:>9.3f}s{after_setup:>9.3f}s")
+    for grouping in BESS_GROUPINGS:
+        print(f"{grouping:<14}{before[grouping]:>9.3f}s{after[grouping]:>9.3f}s")
+    total_before = before_setup + sum(before.values())
+    total_after = after_setup + sum(after.values())
+    print(f"{'total':<14}{total_before:>9.3f}s{total_after:>9.3f}s ({total_before / total_after:.0f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,30 @@
+"""Make the repository's root-level modules importable from the tests."""
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+
+@pytest.fixture
+def temp_db(tmp_path, monkeypatch):
+    """Run the test against an empty database under tmp_path (db.DB_PATH is relative)."""
+    from db import close_connections
+    from price_cache import PRICE_CACHE
+
+    close_connections()
+    PRICE_CACHE.invalidate()
+    monkeypatch.chdir(tmp_path)
+    yield tmp_path
+    close_connections()
+    PRICE_CACHE.invalidate()
+
+
+@pytest.fixture
+def store_db(temp_db):
+    """An empty database whose price store is filled (migration 7 recorded), so upserts are written."""
+    from price_store import migrate_legacy_schema
+
+    migrate_legacy_schema()
+    return temp_db
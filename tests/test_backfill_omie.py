@@ -0,0 +1,59 @@
+"""One-pass OMIE parser against the former per-file parser, and its DST handling."""
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from backfill_omie import _parse_omie_file_loop, _synthetic_omie_day, parse_omie_records
+
+DAYS = {
+    "hourly": (datetime(2019, 6, 12), 24),
+    "spring_dst_hourly": (datetime(2018, 3, 25), 23),
+    "quarter_hourly": (datetime(2025, 10, 2), 96),
+    # 15-minute DST day: periods 97-100 fall past 24:00 and are dropped by both parsers
+    "autumn_dst_quarter_hourly": (datetime(2025, 10, 26), 100),
+}
+
+
+def _write(tmp_path, day: datetime, periods: int, seed: int = 0):
+    path = tmp_path / f"marginalpdbc_{day:%Y%m%d}.1"
+    path.write_bytes(_synthetic_omie_day(day, periods, np.random.default_rng(seed)))
+    return path
+
+
+@pytest.mark.parametrize("name", list(DAYS))
+def test_one_pass_parser_matches_per_file_parser(tmp_path, name):
+    path = _write(tmp_path, *DAYS[name])
+    expected = _parse_omie_file_loop(path)
+    result = parse_omie_records([path.read_bytes()])
+
+    pd.testing.assert_frame_equal(result, expected, check_dtype=False)
+
+
+def test_several_files_in_one_pass(tmp_path):
+    paths = [_write(tmp_path, day, periods, seed) for seed, (day, periods) in enumerate(DAYS.values())]
+    expected = pd.concat([_parse_omie_file_loop(p) for p in paths]).sort_values("datetime", ignore_index=True)
+    result = parse_omie_records(p.read_bytes() for p in paths)
+
+    pd.testing.assert_frame_equal(result, expected, check_dtype=False)
+
+
+def test_25_hour_dst_day_parses_as_hourly(tmp_path):
+    """2018-10-28 has 25 hourly periods: hours 0-23 are kept and period 25 is dropped."""
+    path = _write(tmp_path, datetime(2018, 10, 28), 25)
+    prices = [float(line.split(";")[4]) for line in path.read_text().splitlines()[1:-1]]
+
+    result = parse_omie_records([path.read_bytes()])
+
+    assert len(result) == 24
+    assert result["hour"].tolist() == list(range(24))
+    assert (result["minute"] == 0).all()
+    assert result["datetime"].iloc[0] == "2018-10-28 00:00:00"
+    assert result["datetime"].iloc[-1] == "2018-10-28 23:00:00"
+    assert result["OMIE_SP_DA_prices"].tolist() == prices[:24]
+
+    # The former parser read the day as 15-minute data (00:00-06:00)
+    former = _parse_omie_file_loop(path)
+    assert former["minute"].tolist()[:4] == [0, 15, 30, 45]
+    assert former["datetime"].iloc[-1] == "2018-10-28 06:00:00"
@@ -0,0 +1,254 @@
+"""ESIOS backfill against a local fake ESIOS server."""
+import json
+import threading
+import time
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+import pandas as pd
+import pytest
+import requests
+
+import esios_client
+from backfill_spot import iter_chunks, plan_chunks, run_backfill
+from config import EsiosConfig
+from db import get_completed_chunks, init_checkpoints, init_db
+from esios_client import TokenBucket, get_indicator_data, make_session
+
+INDICATOR = 600
+START = datetime(2024, 1, 1, tzinfo=timezone.utc)
+END = datetime(2024, 1, 13, tzinfo=timezone.utc)
+
+
+class FakeEsios:
+    """
+    State of the fake server.
+
+    Each request to /indicators/<id> returns hourly values for
+    [start_date, end_date). Faults are keyed on the requested start_date.
+    """
+
+    def __init__(self):
+        self.latency = 0.0
+        # start_date -> statuses answered (in order) before the real response
+        self.faults: dict[str, list[int]] = {}
+        # start_date -> status answered on every request
+        self.broken: dict[str, int] = {}
+        # start_dates answered with no values (a gap at the source)
+        self.empty: set[str] = set()
+        self.retry_after: str = "1"
+        self.requests: list[tuple[float, str]] = []
+        self.lock = threading.Lock()
+
+    def starts(self) -> list[str]:
+        with self.lock:
+            return [start for _, start in self.requests]
+
+    def response(self, start: str, end: str) -> tuple[int, dict]:
+        with self.lock:
+            self.requests.append((time.monotonic(), start))
+            pending = self.faults.get(start)
+            if pending:
+                return pending.pop(0), {}
+        if start in self.broken:
+            return self.broken[start], {}
+        values = []
+        if start not in self.empty:
+            utc = pd.date_range(pd.Timestamp(start), pd.Timestamp(end), freq="h", inclusive="left")
+            for ts in utc:
+                local = ts.tz_convert("Europe/Madrid")
+                values.append(
+                    {
+                        "value": 50.0 + local.hour,
+                        "datetime": local.isoformat(),
+                        "datetime_utc": ts.isoformat().replace("+00:00", "Z"),
+                        "geo_id": 3,
+                        "geo_name": "España",
+                    }
+                )
+        return 200, {"indicator": {"id": INDICATOR, "values": values}}
+
+
+def _handler(server: FakeEsios):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            query = parse_qs(urlparse(self.path).query)
+            if server.latency:
+                time.sleep(server.latency)
+            status, payload = server.response(query["start_date"][0], query["end_date"][0])
+            body = json.dumps(payload).encode()
+            self.send_response(status)
+            if status == 429:
+                self.send_header("Retry-After", server.retry_after)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    return Handler
+
+
+@pytest.fixture
+def esios(monkeypatch):
+    state = FakeEsios()
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), _handler(state))
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    base_url = f"http://127.0.0.1:{httpd.server_port}"
+    monkeypatch.setattr(esios_client, "EsiosConfig", lambda: EsiosConfig(base_url=base_url))
+    yield state
+    httpd.shutdown()
+    httpd.server_close()
+
+
+@pytest.fixture
+def spot_db(store_db):
+    init_db(INDICATOR)
+    init_checkpoints()
+    return store_db
+
+
+def _tasks(chunk_days: int = 1) -> list[tuple[int, str, str]]:
+    return [(INDICATOR, s, e) for s, e in iter_chunks(START, END, chunk_days)]
+
+
+def test_429_waits_for_retry_after(esios):
+    esios.faults["2024-01-01T00:00:00Z"] = [429]
+    session = make_session(pool_size=1, retries=3, backoff_factor=0.0)
+
+    t0 = time.perf_counter()
+    data = get_indicator_data(INDICATOR, "2024-01-01T00:00:00Z", "2024-01-02T00:00:00Z", session=session)
+    elapsed = time.perf_counter() - t0
+
+    assert len(data["indicator"]["values"]) == 24
+    assert esios.starts() == ["2024-01-01T00:00:00Z"] * 2
+    assert elapsed >= 1.0
+
+
+def test_5xx_retried_with_backoff(esios):
+    esios.faults["2024-01-01T00:00:00Z"] = [503, 500]
+    session = make_session(pool_size=1, retries=3, backoff_factor=0.1)
+
+    t0 = time.perf_counter()
+    data = get_indicator_data(INDICATOR, "2024-01-01T00:00:00Z", "2024-01-02T00:00:00Z", session=session)
+    elapsed = time.perf_counter() - t0
+
+    assert len(data["indicator"]["values"]) == 24
+    assert len(esios.starts()) == 3
+    # Backoff before the second retry: backoff_factor * 2
+    assert elapsed >= 0.2
+
+
+def test_5xx_gives_up_after_retries(esios):
+    esios.broken["2024-01-01T00:00:00Z"] = 502
+    session = make_session(pool_size=1, retries=2, backoff_factor=0.0)
+
+    with pytest.raises(requests.HTTPError):
+        get_indicator_data(INDICATOR, "2024-01-01T00:00:00Z", "2024-01-02T00:00:00Z", session=session)
+    assert len(esios.starts()) == 3
+
+
+class FakeClock:
+    """Simulated monotonic clock for TokenBucket: sleep() advances it instead of waiting."""
+
+    def __init__(self):
+        self.now = 0.0
+        self._lock = threading.Lock()
+
+    def __call__(self) -> float:
+        with self._lock:
+            return self.now
+
+    def sleep(self, seconds: float) -> None:
+        with self._lock:
+            self.now += seconds
+
+
+class RecordingBucket(TokenBucket):
+    """TokenBucket on a FakeClock recording the simulated time each token is handed out."""
+
+    def __init__(self, rate: float, capacity: float):
+        self.clock = FakeClock()
+        super().__init__(rate, capacity, clock=self.clock, sleep=self.clock.sleep)
+        self.times: list[float] = []
+        self._times_lock = threading.Lock()
+
+    def acquire(self) -> None:
+        super().acquire()
+        with self._times_lock:
+            self.times.append(self.clock())
+
+
+def test_token_bucket_paces_requests(esios, spot_db):
+    rate, workers = 20.0, 4
+    tasks = _tasks()
+    limiter = RecordingBucket(rate, workers)
+    rows, failed = run_backfill(tasks, workers, rate, limiter=limiter)
+
+    assert (rows, failed) == (len(tasks) * 24, 0)
+    assert len(esios.requests) == len(limiter.times) == len(tasks)
+    # A burst of `workers` requests, then at most `rate` per second: the k-th
+    # token is never handed out before (k - workers + 1) / rate
+    times = sorted(limiter.times)
+    for k, t in enumerate(times):
+        assert t >= (k - workers + 1) / rate - 1e-9
+
+
+def test_token_bucket_burst_then_rate():
+    bucket = RecordingBucket(rate=50.0, capacity=5)
+    for _ in range(15):
+        bucket.acquire()
+
+    np.testing.assert_allclose(bucket.times[:5], 0.0)
+    np.testing.assert_allclose(np.diff(bucket.times[4:]), 1 / 50.0)
+
+
+def test_resume_fetches_only_failed_chunks(esios, spot_db):
+    esios.broken["2024-01-05T00:00:00Z"] = 500
+    # A day the source has no data for: checkpointed, not requested again
+    esios.empty.add("2024-01-08T00:00:00Z")
+    session = make_session(pool_size=4, retries=0)
+
+    tasks = [(INDICATOR, s, e) for s, e in plan_chunks(INDICATOR, START, END, 1)]
+    assert len(tasks) == 12
+    rows, failed = run_backfill(tasks, 4, 1000.0, session=session)
+    assert (rows, failed) == (10 * 24, 1)
+    assert len(get_completed_chunks(INDICATOR)) == 11
+
+    # Restart after the outage
+    esios.broken.clear()
+    esios.requests.clear()
+    tasks = [(INDICATOR, s, e) for s, e in plan_chunks(INDICATOR, START, END, 1)]
+    assert tasks == [(INDICATOR, "2024-01-05T00:00:00Z", "2024-01-06T00:00:00Z")]
+    rows, failed = run_backfill(tasks, 4, 1000.0, session=session)
+
+    assert (rows, failed) == (24, 0)
+    assert esios.starts() == ["2024-01-05T00:00:00Z"]
+    assert plan_chunks(INDICATOR, START, END, 1) == []
+
+
+def test_concurrent_backfill_speedup(esios, spot_db, capsys):
+    """Sequential vs concurrent backfill with 100 ms of server latency per request."""
+    esios.latency = 0.1
+    tasks = _tasks() * 2
+
+    timings = {}
+    for workers in (1, 8):
+        t0 = time.perf_counter()
+        rows, failed = run_backfill(tasks, workers, 1000.0)
+        timings[workers] = time.perf_counter() - t0
+        assert (rows, failed) == (len(tasks) * 24, 0)
+
+    with capsys.disabled():
+        print(
+            f"\nbackfill of {len(tasks)} chunks: 1 worker {timings[1]:.2f}s, "
+            f"8 workers {timings[8]:.2f}s ({timings[1] / timings[8]:.1f}x)"
+        )
+    assert timings[1] / timings[8] >= 3
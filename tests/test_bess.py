@@ -0,0 +1,62 @@
+"""Equivalence of the vectorised BESS dispatch with the former per-row loop."""
+from datetime import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from bess import simulate_battery_operations
+from bess_reference import simulate_battery_operations_loop
+
+DISPATCH_COLUMNS = ["charge_mwh", "discharge_mwh", "battery_soc", "charge_cost", "discharge_revenue", "net_revenue", "cycle"]
+
+SCHEDULES = {
+    "one_cycle": (10.0, 2.0, 0.85, time(2, 0), time(18, 0)),
+    "two_cycles": (10.0, 1.5, 0.9, time(1, 30), time(9, 0), time(12, 0), time(19, 15)),
+    # Windows overlapping within a cycle and across cycles
+    "overlapping": (5.0, 4.0, 0.8, time(6, 0), time(8, 0), time(9, 0), time(7, 0)),
+}
+
+
+def _prices(start: str, end: str, freq: str, seed: int = 0) -> pd.DataFrame:
+    index = pd.date_range(start, end, freq=freq)
+    rng = np.random.default_rng(seed)
+    prices = 60 + 30 * np.sin((index.hour.to_numpy() - 8) / 24 * 2 * np.pi) + rng.normal(0, 20, len(index))
+    return pd.DataFrame({"datetime_parsed": index, "price_eur_per_mwh": prices})
+
+
+def _gappy(df: pd.DataFrame, seed: int = 0) -> pd.DataFrame:
+    """Drop a random 10% of intervals and a whole day, then shuffle the rows."""
+    rng = np.random.default_rng(seed)
+    keep = rng.random(len(df)) > 0.1
+    keep &= df["datetime_parsed"].dt.date.astype(str).to_numpy() != "2024-03-05"
+    return df[keep].sample(frac=1.0, random_state=seed)
+
+
+INPUTS = {
+    "hourly": lambda: _prices("2024-03-01", "2024-03-14 23:00", "h"),
+    "15min": lambda: _prices("2024-03-01", "2024-03-07 23:45", "15min"),
+    "gappy_hourly": lambda: _gappy(_prices("2024-03-01", "2024-03-14 23:00", "h")),
+    "gappy_15min": lambda: _gappy(_prices("2024-03-01", "2024-03-07 23:45", "15min")),
+}
+
+
+@pytest.mark.parametrize("schedule", list(SCHEDULES))
+@pytest.mark.parametrize("prices", list(INPUTS))
+def test_vectorised_dispatch_matches_loop(prices, schedule):
+    df = INPUTS[prices]()
+    expected = simulate_battery_operations_loop(df, *SCHEDULES[schedule])
+    result = simulate_battery_operations(df, *SCHEDULES[schedule])
+
+    pd.testing.assert_index_equal(result.index, expected.index)
+    for column in DISPATCH_COLUMNS:
+        np.testing.assert_allclose(
+            result[column].to_numpy(dtype=float), expected[column].to_numpy(dtype=float), atol=1e-9, err_msg=column
+        )
+
+
+def test_empty_input():
+    df = _prices("2024-03-01", "2024-03-01", "h").iloc[:0]
+    result = simulate_battery_operations(df, *SCHEDULES["one_cycle"])
+    assert result.empty
+    assert set(DISPATCH_COLUMNS) <= set(result.columns)
@@ -0,0 +1,29 @@
+"""Store exports read the same database as the pages."""
+import pandas as pd
+
+from db import use_published_db
+from export import iter_store_chunks
+from price_store import upsert_series
+from publish import publish
+
+
+def _prices(start: str, periods: int) -> pd.DataFrame:
+    return pd.DataFrame({"datetime": pd.date_range(start, periods=periods, freq="h"), "price": 50.0})
+
+
+def test_store_chunks_read_published_copy(store_db):
+    upsert_series(_prices("2024-01-01", 48), {"price": "OMIE_SP"})
+    publish(force=True)
+    # Ingest after the publish only reaches the live database
+    upsert_series(_prices("2024-01-03", 24), {"price": "OMIE_SP"})
+
+    use_published_db()
+    try:
+        published = pd.concat(iter_store_chunks("OMIE_SP", chunk_rows=10))
+    finally:
+        use_published_db(False)
+    live = pd.concat(iter_store_chunks("OMIE_SP", chunk_rows=10))
+
+    assert len(published) == 48
+    assert published["datetime"].max() == pd.Timestamp("2024-01-02 23:00")
+    assert len(live) == 72
@@ -0,0 +1,126 @@
+"""Maintenance scripts keep the price store and its derived tables in step with the legacy tables."""
+import numpy as np
+import pandas as pd
+
+from backfill_omie import insert_omie_prices
+from data_loader import load_price_data
+from db import writer
+from import_forecasts import init_forecasts_table
+from migrations import migrate
+from price_cache import get_data_version
+from price_store import has_series, migrate_legacy_schema, read_series, upsert_series
+from rollups import chart_data
+from series_catalog import catalog_date_range, catalog_sources
+
+
+def _legacy_rows(index: pd.DatetimeIndex, prices: np.ndarray, source: str) -> list[tuple]:
+    return [
+        (ts.strftime("%Y-%m-%d %H:%M:%S"), ts.year, ts.month, ts.day, ts.hour, ts.minute, float(price), source)
+        for ts, price in zip(index, prices)
+    ]
+
+
+def test_rename_moves_store_series(temp_db):
+    from rename_forecast_sources import rename_forecast_sources
+
+    index = pd.date_range("2030-01-01", "2030-03-31 23:00", freq="h")
+    prices = np.linspace(40, 80, len(index))
+    init_forecasts_table()
+    with writer() as conn:
+        conn.executemany("INSERT INTO forecasts VALUES (?, ?, ?, ?, ?, ?, ?, ?)", _legacy_rows(index, prices, "baringa"))
+    migrate_legacy_schema()
+    assert has_series("baringa")
+
+    rename_forecast_sources()
+
+    assert not has_series("baringa")
+    assert "baringa" not in catalog_sources()
+    moved = read_series("Baringa_Q2_2025")
+    np.testing.assert_allclose(moved.to_numpy(dtype=float), prices, rtol=1e-6)
+    assert catalog_date_range("Baringa_Q2_2025") == (index[0], index[-1])
+    assert get_data_version("Baringa_Q2_2025") > 0
+    monthly = chart_data("Baringa_Q2_2025", "year_month")
+    assert len(monthly) == 3
+
+
+def test_delete_omie_clears_store_series(temp_db):
+    from backfill_omie import OMIE_REUPLOAD_FROM
+    from delete_omie_from_oct_2025 import delete_omie_from_oct_2025
+
+    index = pd.date_range("2025-09-01", "2025-10-31 23:00", freq="h")
+    with writer() as conn:
+        conn.execute(
+            "CREATE TABLE historical_prices (datetime TEXT PRIMARY KEY, OMIE_SP_DA_prices REAL, OMIE_PT_DA_prices REAL)"
+        )
+        conn.executemany(
+            "INSERT INTO historical_prices VALUES (?, 60.0, 61.0)", [(ts.strftime("%Y-%m-%d %H:%M:%S"),) for ts in index]
+        )
+    migrate_legacy_schema()
+    version = get_data_version("OMIE_SP")
+
+    delete_omie_from_oct_2025()
+
+    cutoff = pd.Timestamp(OMIE_REUPLOAD_FROM)
+    for series in ("OMIE_SP", "OMIE_PT"):
+        assert read_series(series).index.max() < cutoff
+        assert catalog_date_range(series)[1] < cutoff
+    assert get_data_version("OMIE_SP") > version
+    assert chart_data("OMIE_SP", "year_month")["year_month"].max() < cutoff
+    with writer() as conn:
+        left = conn.execute(
+            "SELECT COUNT(*) FROM historical_prices WHERE datetime >= ? AND OMIE_SP_DA_prices IS NOT NULL",
+            (f"{OMIE_REUPLOAD_FROM} 00:00:00",),
+        ).fetchone()[0]
+    assert left == 0
+
+
+def test_delete_series_range_without_bounds(store_db):
+    from price_store import delete_series_range
+
+    index = pd.date_range("2024-01-01", periods=48, freq="h")
+    upsert_series(pd.DataFrame({"datetime": index, "price": 1.0}), {"price": "X"})
+
+    assert delete_series_range(["X"]) == 48
+    assert not has_series("X")
+
+
+def _omie_rows(index: pd.DatetimeIndex, price: float) -> pd.DataFrame:
+    return pd.DataFrame(
+        {
+            "datetime": index.strftime("%Y-%m-%d %H:%M:%S"),
+            "year": index.year,
+            "month": index.month,
+            "day": index.day,
+            "hour": index.hour,
+            "minute": index.minute,
+            "OMIE_SP_DA_prices": price,
+            "OMIE_PT_DA_prices": price,
+        }
+    )
+
+
+def test_ingest_before_store_migration_keeps_legacy_history(temp_db):
+    legacy = pd.date_range("2024-01-01", periods=240, freq="h")
+    new = pd.date_range(legacy[-1] + pd.Timedelta(hours=1), periods=24, freq="h")
+    with writer() as conn:
+        conn.execute(
+            "CREATE TABLE historical_prices (datetime TEXT PRIMARY KEY, year INTEGER, month INTEGER, day INTEGER, "
+            "hour INTEGER, minute INTEGER, ESIOS_600_DA_prices REAL, OMIE_SP_DA_prices REAL, OMIE_PT_DA_prices REAL)"
+        )
+        insert_omie_prices(_omie_rows(legacy, 50.0), conn)
+
+    # Ingest into a database whose store has not been filled yet
+    version = get_data_version("OMIE_SP")
+    insert_omie_prices(_omie_rows(new, 70.0))
+    assert get_data_version("OMIE_SP") > version
+    assert not has_series("OMIE_SP")
+    assert len(load_price_data("omie_da")) == 264
+
+    migrate()
+    assert has_series("OMIE_SP")
+    assert len(read_series("OMIE_SP")) == 264
+    assert len(load_price_data("omie_da")) == 264
+
+    # Once migrated, ingest writes the store as well
+    insert_omie_prices(_omie_rows(new + pd.Timedelta(days=1), 80.0))
+    assert len(load_price_data("omie_da")) == 288
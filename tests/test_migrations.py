@@ -0,0 +1,87 @@
+"""Table rebuilds keep the source table's constraints and indexes."""
+import sqlite3
+
+import pytest
+
+from db import reader, writer
+from migrations import init_migrations, rebuild_table
+
+
+@pytest.fixture
+def spot_prices(temp_db):
+    with writer() as conn:
+        init_migrations(conn)
+        conn.execute(
+            """
+            CREATE TABLE spot_prices (
+                datetime TEXT NOT NULL,
+                source TEXT NOT NULL DEFAULT 'esios',
+                day_ahead_prices REAL CHECK (day_ahead_prices > -1000),
+                "612" REAL,
+                code TEXT UNIQUE,
+                created TEXT DEFAULT (datetime('now')),
+                PRIMARY KEY (datetime, source)
+            )
+            """
+        )
+        conn.execute("CREATE INDEX idx_spot_price ON spot_prices (day_ahead_prices)")
+        conn.execute('CREATE INDEX idx_spot_612 ON spot_prices ("612", datetime)')
+        conn.execute("CREATE INDEX idx_spot_recent ON spot_prices (datetime) WHERE datetime >= '2024-01-01'")
+        conn.executemany(
+            "INSERT INTO spot_prices (datetime, day_ahead_prices, \"612\", code) VALUES (?, ?, ?, ?)",
+            [(f"2024-01-01 {h:02d}:00:00", 40.0 + h, 1.0, f"c{h}") for h in range(24)],
+        )
+    return temp_db
+
+
+def _schema(table: str) -> tuple[str, dict[str, str]]:
+    with reader() as conn:
+        table_sql = conn.execute("SELECT sql FROM sqlite_master WHERE type='table' AND name=?", (table,)).fetchone()[0]
+        indexes = conn.execute(
+            "SELECT name, sql FROM sqlite_master WHERE type='index' AND tbl_name=? AND sql IS NOT NULL", (table,)
+        ).fetchall()
+    return table_sql, dict(indexes)
+
+
+def test_rebuild_keeps_constraints_and_indexes(spot_prices):
+    copied = rebuild_table(
+        1, "spot_prices", "historical_prices", rename={"day_ahead_prices": "ESIOS_600_DA_prices"}, drop=("612",)
+    )
+
+    assert copied == 24
+    table_sql, indexes = _schema("historical_prices")
+    assert "NOT NULL DEFAULT 'esios'" in table_sql
+    assert 'CHECK ("ESIOS_600_DA_prices" > -1000)' in table_sql
+    assert "DEFAULT (datetime('now'))" in table_sql
+    assert "612" not in table_sql
+    assert set(indexes) == {"idx_spot_price", "idx_spot_recent"}
+    assert '"ESIOS_600_DA_prices"' in indexes["idx_spot_price"]
+    assert "WHERE datetime >= '2024-01-01'" in indexes["idx_spot_recent"]
+    with reader() as conn:
+        assert conn.execute("SELECT name FROM sqlite_master WHERE name LIKE 'spot_prices%'").fetchall() == []
+        unique = [row for row in conn.execute("PRAGMA index_list(historical_prices)") if row[2]]
+        assert len(unique) == 2  # primary key and code
+        assert conn.execute("SELECT SUM(ESIOS_600_DA_prices), MIN(source) FROM historical_prices").fetchone() == (
+            sum(40.0 + h for h in range(24)),
+            "esios",
+        )
+
+    with writer() as conn:
+        conn.execute("INSERT INTO historical_prices (datetime, ESIOS_600_DA_prices) VALUES ('2024-01-02 00:00:00', 1.0)")
+    for statement in (
+        "INSERT INTO historical_prices (datetime, source) VALUES (NULL, 'x')",
+        "INSERT INTO historical_prices (datetime, ESIOS_600_DA_prices) VALUES ('2024-01-03 00:00:00', -5000)",
+        "INSERT INTO historical_prices (datetime, code) VALUES ('2024-01-03 00:00:00', 'c1')",
+        "INSERT INTO historical_prices (datetime) VALUES ('2024-01-01 00:00:00')",
+    ):
+        with pytest.raises(sqlite3.IntegrityError), writer() as conn:
+            conn.execute(statement)
+
+
+def test_rebuild_in_place(spot_prices):
+    rebuild_table(3, "spot_prices", "spot_prices", drop=("code",))
+
+    table_sql, indexes = _schema("spot_prices")
+    assert table_sql.startswith('CREATE TABLE "spot_prices"')
+    assert "code" not in table_sql
+    assert set(indexes) == {"idx_spot_price", "idx_spot_612", "idx_spot_recent"}
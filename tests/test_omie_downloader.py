@@ -0,0 +1,184 @@
+"""OMIE downloads against a local HTTP stand-in for www.omie.es."""
+import gzip
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import omie_downloader
+
+DAYS = ["20250101", "20250102", "20250103"]
+
+
+def _omie_file(day: str) -> bytes:
+    lines = ["MARGINALPDBC;"]
+    lines += [f"{day[:4]};{day[4:6]};{day[6:]};{hour};{50 + hour:.2f};{51 + hour:.2f};" for hour in range(1, 25)]
+    return ("\n".join(lines) + "\n*\n").encode("ascii")
+
+
+class FakeOmie:
+    """State of the stand-in server: files served, per-path request log and faults to inject."""
+
+    etag = '"index-v1"'
+
+    def __init__(self):
+        self.files = {f"marginalpdbc_{day}.1": _omie_file(day) for day in DAYS}
+        self.requests: list[str] = []
+        # filename -> remaining responses to cut short
+        self.truncate: dict[str, int] = {}
+        self.gzip: set[str] = set()
+        self.lock = threading.Lock()
+
+    def count(self, path: str) -> int:
+        with self.lock:
+            return self.requests.count(path)
+
+
+def _handler(server: FakeOmie):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            with server.lock:
+                server.requests.append(self.path)
+            if self.path == "/index":
+                if self.headers.get("If-None-Match") == server.etag:
+                    self.send_response(304)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                links = "".join(f'<a href="/files/{name}">{name}</a>' for name in sorted(server.files))
+                self._send(f"<html><body>{links}</body></html>".encode(), {"ETag": server.etag})
+                return
+            name = self.path.rsplit("/", 1)[-1]
+            if name not in server.files:
+                self.send_error(404)
+                return
+            body = server.files[name]
+            with server.lock:
+                cut = server.truncate.get(name, 0)
+                if cut:
+                    server.truncate[name] = cut - 1
+            if cut:
+                # Promise the full body, send half of it and drop the connection
+                self.send_response(200)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body[: len(body) // 2])
+                self.close_connection = True
+                return
+            if name in server.gzip:
+                self._send(gzip.compress(body), {"Content-Encoding": "gzip"})
+                return
+            self._send(body)
+
+        def _send(self, body: bytes, headers: dict = None):
+            self.send_response(200)
+            for key, value in (headers or {}).items():
+                self.send_header(key, value)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    return Handler
+
+
+@pytest.fixture
+def omie(tmp_path, monkeypatch):
+    state = FakeOmie()
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), _handler(state))
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    base_url = f"http://127.0.0.1:{httpd.server_port}"
+    monkeypatch.setattr(omie_downloader, "OMIE_BASE_URL", base_url)
+    monkeypatch.setattr(omie_downloader, "OMIE_INDEX_URL", f"{base_url}/index")
+    monkeypatch.setattr(omie_downloader, "DATA_DIR", tmp_path)
+    monkeypatch.setattr(omie_downloader, "INDEX_CACHE_PATH", tmp_path / "file_index.json")
+    monkeypatch.setattr(omie_downloader, "MANIFEST_PATH", tmp_path / "manifest.json")
+    monkeypatch.setattr(omie_downloader, "RETRY_BACKOFF_SECONDS", 0.0)
+    yield state
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def test_index_reused_on_304(omie):
+    first = omie_downloader.get_file_index()
+    second = omie_downloader.get_file_index()
+
+    assert set(first) == set(omie.files)
+    assert second == first
+    # Both requests reached the server; the second was answered 304 from the cached ETag
+    assert omie.count("/index") == 2
+
+
+def test_download_days(omie):
+    index = omie_downloader.get_file_index()
+    paths = omie_downloader.download_days(DAYS, index)
+
+    assert [path.name for path in paths] == [f"marginalpdbc_{day}.1" for day in DAYS]
+    for path in paths:
+        assert path.read_bytes() == omie.files[path.name]
+    assert not list(omie_downloader.DATA_DIR.glob(".part_*"))
+
+
+def test_truncated_body_is_retried(omie):
+    name = f"marginalpdbc_{DAYS[0]}.1"
+    omie.truncate[name] = 1
+    paths = omie_downloader.download_days(DAYS[:1], omie_downloader.get_file_index())
+
+    assert [path.name for path in paths] == [name]
+    assert paths[0].read_bytes() == omie.files[name]
+    assert omie.count(f"/files/{name}") == 2
+
+
+def test_truncated_body_fails_after_all_attempts(omie):
+    name = f"marginalpdbc_{DAYS[0]}.1"
+    omie.truncate[name] = omie_downloader.DOWNLOAD_ATTEMPTS
+    paths = omie_downloader.download_days(DAYS[:1], omie_downloader.get_file_index())
+
+    assert paths == []
+    assert not (omie_downloader.DATA_DIR / name).exists()
+    assert name not in omie_downloader.load_manifest()
+    # One request per attempt: no transport-level retries on top
+    assert omie.count(f"/files/{name}") == omie_downloader.DOWNLOAD_ATTEMPTS
+
+
+def test_gzip_encoded_body(omie):
+    name = f"marginalpdbc_{DAYS[1]}.1"
+    omie.gzip.add(name)
+    paths = omie_downloader.download_days(DAYS[1:2], omie_downloader.get_file_index())
+
+    assert [path.name for path in paths] == [name]
+    assert paths[0].read_bytes() == omie.files[name]
+    assert omie.count(f"/files/{name}") == 1
+    assert omie_downloader.load_manifest()[name] == {"size": len(omie.files[name])}
+
+
+def test_manifest_skip(omie):
+    index = omie_downloader.get_file_index()
+    omie_downloader.download_days(DAYS, index)
+    paths = omie_downloader.download_days(DAYS, index)
+
+    assert len(paths) == len(DAYS)
+    for day in DAYS:
+        assert omie.count(f"/files/marginalpdbc_{day}.1") == 1
+
+
+def test_manifest_entry_without_file_is_downloaded_again(omie):
+    index = omie_downloader.get_file_index()
+    first = omie_downloader.download_days(DAYS, index)
+    first[0].unlink()
+    # A file left behind with another size (e.g. overwritten) is refetched too
+    first[1].write_bytes(b"MARGINALPDBC;\n*\n")
+
+    paths = omie_downloader.download_days(DAYS, index)
+
+    assert paths == first
+    for path in paths:
+        assert path.read_bytes() == omie.files[path.name]
+    assert omie.count(f"/files/{first[0].name}") == 2
+    assert omie.count(f"/files/{first[1].name}") == 2
+    assert omie.count(f"/files/{first[2].name}") == 1
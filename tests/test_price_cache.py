@@ -0,0 +1,58 @@
+"""Cached values are shared read-only without changing pandas options."""
+import warnings
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from data_loader import load_price_data
+from price_cache import PriceCache
+from price_store import upsert_series
+
+
+def _frame() -> pd.DataFrame:
+    index = pd.date_range("2024-01-01", periods=48, freq="h")
+    return pd.DataFrame({"datetime": index, "hour": index.hour, "price_eur_per_mwh": np.arange(48.0)})
+
+
+def test_pandas_options_untouched():
+    assert pd.get_option("mode.copy_on_write") is False
+
+
+def test_shared_frame_cannot_change_cached_entry():
+    cache = PriceCache(max_bytes=1 << 20)
+    first = cache.get_or_load(("price_frame", "x", 1), _frame)
+
+    with pytest.raises(ValueError, match="read-only"):
+        first.loc[first["hour"] > 12, "price_eur_per_mwh"] = 0.0
+    with pytest.raises(ValueError, match="read-only"):
+        first["hour"] += 1
+    # Whole-column assignment only replaces the caller's column
+    first["price_eur_per_mwh"] = -1.0
+    first["extra"] = 1
+
+    second = cache.get(("price_frame", "x", 1))
+    pd.testing.assert_frame_equal(second, _frame())
+    # An explicit copy is writable
+    copy = second.copy()
+    copy.loc[:, "price_eur_per_mwh"] = 0.0
+
+
+def test_shared_array_is_read_only():
+    cache = PriceCache(max_bytes=1 << 20)
+    array = cache.get_or_load(("pv_array", "pv1", 1), lambda: np.ones(10))
+    with pytest.raises(ValueError, match="read-only"):
+        array[:] = 0
+    assert cache.get(("pv_array", "pv1", 1)).sum() == 10
+
+
+def test_load_price_data_from_cache(store_db):
+    upsert_series(_frame(), {"price_eur_per_mwh": "Aurora_Jun_2025"})
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        for _ in range(2):
+            df = load_price_data(
+                "Aurora_Jun_2025", pd.Timestamp("2024-01-01 06:00"), pd.Timestamp("2024-01-01 18:00"), 0.02
+            )
+            assert len(df) == 13
+            assert (df["source"] == "Aurora_Jun_2025").all()
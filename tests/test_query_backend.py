@@ -0,0 +1,84 @@
+"""Query backends against the hourly aggregation the Price Distribution page used to do itself."""
+import numpy as np
+import pandas as pd
+import pytest
+
+from data_loader import load_price_data
+from db import writer
+from price_store import migrate_legacy_schema
+from query_backend import SQLiteBackend
+
+SOURCE = "omie_da"
+GROUPINGS = ["yearly", "year_month", "daily", "day_of_week", "hour_of_day"]
+WINDOW = dict(start_dt=pd.Timestamp("2024-01-03"), end_dt=pd.Timestamp("2024-02-10 23:59:59.999999"))
+EDGES = np.array([-6.0, -2.0, 0.0, 0.25, 5.0, 20.0, 20.5, 40.0, 61.0])
+
+
+@pytest.fixture
+def prices(temp_db):
+    # 15-minute prices; hours before February repeat one integer price four
+    # times, so many hourly averages fall exactly on a bin edge
+    index = pd.date_range("2024-01-01", "2024-02-29 23:45", freq="15min")
+    rng = np.random.default_rng(0)
+    hourly = np.repeat(rng.integers(-5, 60, len(index) // 4).astype(float), 4)
+    noisy = hourly + rng.normal(0, 3, len(index))
+    values = np.where(index < pd.Timestamp("2024-02-01"), hourly, noisy)
+    with writer() as conn:
+        conn.execute("CREATE TABLE historical_prices (datetime TEXT PRIMARY KEY, OMIE_SP_DA_prices REAL)")
+        conn.executemany(
+            "INSERT INTO historical_prices VALUES (?, ?)",
+            zip(index.strftime("%Y-%m-%d %H:%M:%S"), values.tolist()),
+        )
+    migrate_legacy_schema()
+    return temp_db
+
+
+def _hourly_reference() -> pd.Series:
+    """Hourly averages as the page computed them from load_price_data."""
+    df = load_price_data(SOURCE, **WINDOW)
+    return df.groupby(df["datetime_parsed"].dt.floor("h"))["price_eur_per_mwh"].mean()
+
+
+def test_sqlite_price_stats_and_histogram(prices):
+    backend = SQLiteBackend()
+    hourly = _hourly_reference()
+
+    stats = backend.price_stats(SOURCE, ["yearly"], **WINDOW)["yearly"]
+    assert stats["n"].sum() == len(hourly)
+    assert stats["min"].min() == pytest.approx(hourly.min())
+    assert stats["max"].max() == pytest.approx(hourly.max())
+
+    clip = (-3.0, 55.0)
+    counts = backend.price_histogram(SOURCE, EDGES, clip=clip, **WINDOW)
+    clipped = hourly.clip(*clip).to_numpy()
+    expected = [((clipped > lo) & (clipped <= hi)).sum() for lo, hi in zip(EDGES[:-1], EDGES[1:])]
+    # Right-inclusive bins, so prices on an edge count in the bin below it
+    assert (clipped == 0.0).any()
+    np.testing.assert_array_equal(counts, expected)
+    assert counts.sum() == len(hourly)
+
+
+def test_sqlite_threshold_hours(prices):
+    counts = SQLiteBackend().threshold_hours(SOURCE, 0.0, GROUPINGS, **WINDOW)
+    hourly = _hourly_reference()
+
+    assert counts["yearly"]["total_hours"].sum() == len(hourly)
+    assert counts["yearly"]["hours"].sum() == (hourly <= 0.0).sum()
+    by_hour = (hourly <= 0.0).groupby(hourly.index.hour).sum()
+    np.testing.assert_array_equal(counts["hour_of_day"]["hours"].to_numpy(), by_hour.to_numpy())
+
+
+def test_duckdb_matches_sqlite(prices):
+    pytest.importorskip("duckdb")
+    from query_backend import DuckDBBackend
+
+    sqlite, duckdb = SQLiteBackend(), DuckDBBackend()
+    for grouping, frame in sqlite.price_stats(SOURCE, GROUPINGS, **WINDOW).items():
+        pd.testing.assert_frame_equal(duckdb.price_stats(SOURCE, GROUPINGS, **WINDOW)[grouping], frame)
+    for grouping, frame in sqlite.threshold_hours(SOURCE, 0.0, GROUPINGS, **WINDOW).items():
+        pd.testing.assert_frame_equal(duckdb.threshold_hours(SOURCE, 0.0, GROUPINGS, **WINDOW)[grouping], frame)
+    for clip in (None, (-3.0, 55.0)):
+        np.testing.assert_array_equal(
+            duckdb.price_histogram(SOURCE, EDGES, clip=clip, **WINDOW),
+            sqlite.price_histogram(SOURCE, EDGES, clip=clip, **WINDOW),
+        )
@@ -0,0 +1,43 @@
+"""Rollup chart frames against the same aggregations over raw rows."""
+import numpy as np
+import pandas as pd
+import pytest
+
+from chart_config import CHART_ORDER
+from price_store import price_frame, read_series, upsert_series
+from rollups import chart_data, chart_data_from_frame
+
+SERIES = "OMIE_SP"
+
+RANGES = {
+    "full": (None, None),
+    # Starts and ends mid-day inside partial months
+    "partial_months": (pd.Timestamp("2024-01-20 06:30"), pd.Timestamp("2024-04-03 17:00")),
+    "within_one_day": (pd.Timestamp("2024-02-10 03:00"), pd.Timestamp("2024-02-10 20:00")),
+}
+
+
+@pytest.fixture
+def store(store_db):
+    index = pd.date_range("2023-11-14", "2024-05-09 23:45", freq="15min")
+    rng = np.random.default_rng(0)
+    prices = 60 + 25 * np.sin(index.hour.to_numpy() / 24 * 2 * np.pi) + rng.normal(0, 15, len(index))
+    upsert_series(pd.DataFrame({"datetime": index, "price": prices}), {"price": SERIES})
+    return store_db
+
+
+def _normalised(frame: pd.DataFrame) -> pd.DataFrame:
+    frame = frame.sort_values(list(frame.columns[:-1]), ignore_index=True)
+    return frame[sorted(frame.columns)]
+
+
+@pytest.mark.parametrize("window", list(RANGES))
+@pytest.mark.parametrize("chart_type", CHART_ORDER)
+def test_chart_data_from_frame_matches_rollups(store, chart_type, window):
+    start_dt, end_dt = RANGES[window]
+    raw = price_frame(read_series(SERIES, start_dt, end_dt))
+    expected = _normalised(chart_data(SERIES, chart_type, start_dt, end_dt))
+    result = _normalised(chart_data_from_frame(raw, chart_type))
+
+    assert list(result.columns) == list(expected.columns)
+    pd.testing.assert_frame_equal(result, expected, check_dtype=False, check_exact=False, rtol=1e-9)
@@ -0,0 +1,26 @@
+"""Column timestamp parsing drops offsets without pandas warnings."""
+import warnings
+
+import pandas as pd
+import pytest
+
+from timestamps import parse_timestamps
+
+
+@pytest.mark.parametrize(
+    "values",
+    [
+        ["2024-01-01 00:00:00", "2024-01-01T01:00:00+01:00"],
+        ["2024-01-01 00:00:00", "2024-01-01T01:00:00Z"],
+        ["2024-01-01T00:00:00", "2024-01-01T01:00:00.000+02:00", None],
+        ["2024-01-01 00:00:00", "2024-01-01 01:00:00"],
+    ],
+)
+def test_mixed_offsets_parse_as_wall_clock(values):
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        parsed = parse_timestamps(values)
+
+    expected = [pd.Timestamp("2024-01-01 00:00"), pd.Timestamp("2024-01-01 01:00")] + [pd.NaT] * (len(values) - 2)
+    assert parsed.tolist() == expected
+    assert parsed.dtype == "datetime64[ns]"
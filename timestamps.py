@@ -0,0 +1,175 @@
+"""
+Vectorized timestamp parsing and formatting.
+
+The DB and the ESIOS/OMIE feeds mix several spellings of the same
+wall-clock time:
+- '2025-01-01 00:00:00' (canonical DB format)
+- '2025-01-01T00:00:00', '2025-01-01T00:00:00Z'
+- '2025-01-01T00:00:00+01:00', '2025-01-01T00:00:00.000+01:00'
+
+In all of them the first 19 characters are the wall-clock time (with 'T' or
+a space as separator), and the offset is dropped without shifting the time,
+as utils.parse_timestamp does for a single value. The functions below do
+that for whole columns at once. Sub-second parts are dropped (the canonical
+format has none).
+"""
+import numpy as np
+import pandas as pd
+
+
+CANONICAL_FORMAT = "%Y-%m-%d %H:%M:%S"
+CANONICAL_LENGTH = 19
+
+
+def _as_series(values) -> pd.Series:
+    if isinstance(values, pd.Series):
+        return values
+    return pd.Series(values)
+
+
+def _naive_seconds(parsed: pd.Series) -> np.ndarray:
+    """Wall-clock datetime64[ns] array truncated to whole seconds."""
+    if getattr(parsed.dt, "tz", None) is not None:
+        parsed = parsed.dt.tz_localize(None)
+    return parsed.to_numpy(dtype="datetime64[s]").astype("datetime64[ns]")
+
+
+def _has_long_values(s: pd.Series) -> bool:
+    """Check whether any value is longer than 19 characters (e.g. carries an offset)."""
+    # Fixed-width array one wider than the format: a non-zero last slot
+    # means that value is longer
+    width = CANONICAL_LENGTH + 1
+    chars = s.to_numpy(dtype=f"U{width}").view(np.uint32).reshape(-1, width)
+    return bool((chars[:, CANONICAL_LENGTH] != 0).any())
+
+
+def parse_timestamps(values) -> pd.Series:
+    """
+    Parse a column of mixed timestamps into naive datetime64[ns] wall-clock times.
+
+    Args:
+        values: Series (or array-like) of strings, datetimes or Timestamps
+
+    Returns:
+        Series of datetime64[ns] aligned with the input; unparseable values are NaT
+    """
+    s = _as_series(values)
+    if pd.api.types.is_datetime64_any_dtype(s):
+        return pd.Series(_naive_seconds(s), index=s.index)
+
+    # Fast path: one ISO 8601 pass over the whole column when values carry no
+    # offset (canonical or 'T'-separated). Offset-aware parsing is slow in
+    # pandas, naive and offset values mixed in one call warn (and will raise
+    # in a future pandas), and bad values raise, so those take the general
+    # path. An offset or 'Z' always makes a value longer than 19 characters,
+    # so any such value sends the whole column there.
+    present = s.dropna()
+    if present.empty:
+        return pd.Series(np.full(len(s), np.datetime64("NaT"), dtype="datetime64[ns]"), index=s.index)
+    if isinstance(present.iloc[0], str) and not _has_long_values(present):
+        try:
+            parsed = pd.to_datetime(s, format="ISO8601")
+            if pd.api.types.is_datetime64_any_dtype(parsed):
+                return pd.Series(_naive_seconds(parsed), index=s.index)
+        except (ValueError, TypeError):
+            pass
+
+    # General path: the wall-clock time is the first 19 characters
+    head = s.to_numpy(dtype=f"U{CANONICAL_LENGTH}")
+    parsed = pd.Series(pd.to_datetime(head, format="ISO8601", errors="coerce"), index=s.index)
+    return pd.Series(_naive_seconds(parsed), index=s.index)
+
+
+def _is_canonical(s: pd.Series) -> bool:
+    """Check that every value is a 'YYYY-MM-DD HH:MM:SS' string."""
+    if s.empty:
+        return True
+    # Cheap rejection on the first value before scanning the column
+    first = s.iloc[0]
+    if not isinstance(first, str) or len(first) != CANONICAL_LENGTH or first[10] != " ":
+        return False
+    if s.dtype == object and not s.map(type).eq(str).all():
+        return False
+    # Fixed-width array one wider than the format: a zero in the last slot
+    # means no value is longer than 19 characters
+    width = CANONICAL_LENGTH + 1
+    chars = s.to_numpy(dtype=f"U{width}").view(np.uint32).reshape(-1, width)
+    return bool(
+        (chars[:, CANONICAL_LENGTH] == 0).all()
+        and (chars[:, CANONICAL_LENGTH - 1] != 0).all()
+        and (chars[:, 10] == ord(" ")).all()
+        and (chars[:, 4] == ord("-")).all()
+        and (chars[:, 13] == ord(":")).all()
+    )
+
+
+def format_timestamps(values) -> pd.Series:
+    """
+    Format a column of mixed timestamps as canonical 'YYYY-MM-DD HH:MM:SS' strings.
+
+    Args:
+        values: Series (or array-like) of strings, datetimes or Timestamps
+
+    Returns:
+        Series of strings aligned with the input; unparseable values are None
+    """
+    s = _as_series(values)
+    if pd.api.types.is_datetime64_any_dtype(s):
+        # strftime already writes the wall-clock time, also for tz-aware values
+        return _format_datetime64(s)
+
+    # Fast path: already canonical, nothing to parse
+    if _is_canonical(s.dropna()):
+        return s.astype(object).where(s.notna(), None).astype(object)
+
+    # A full-length value that parses is canonical once 'T' becomes a space;
+    # anything shorter (e.g. date-only) is formatted from the parsed value
+    head = s.to_numpy(dtype=f"U{CANONICAL_LENGTH}")
+    parsed = pd.Series(pd.to_datetime(head, format="ISO8601", errors="coerce"), index=s.index)
+    chars = head.view(np.uint32).reshape(-1, CANONICAL_LENGTH)
+    full = parsed.notna().to_numpy() & (chars[:, CANONICAL_LENGTH - 1] != 0)
+    chars[:, 10] = ord(" ")
+    out = pd.Series(head.astype(object), index=s.index, dtype=object)
+    if not full.all():
+        out = out.where(full, _format_datetime64(parsed)).astype(object)
+    return out
+
+
+def _format_datetime64(parsed: pd.Series) -> pd.Series:
+    """Format datetime64 values; NaT becomes None."""
+    text = parsed.dt.strftime(CANONICAL_FORMAT).astype(object)
+    if parsed.hasnans:
+        text = text.where(parsed.notna(), None).astype(object)
+    return text
+
+
+def main() -> None:
+    """Micro-benchmark against the row-wise utils.parse_timestamp on 1M timestamps."""
+    import time
+
+    from utils import parse_timestamp
+
+    n = 1_000_000
+    index = pd.date_range("2018-01-01", periods=n, freq="15min")
+    columns = {
+        "canonical": pd.Series(index.strftime(CANONICAL_FORMAT)),
+        "ISO with offset": pd.Series(index.strftime("%Y-%m-%dT%H:%M:%S.000+01:00")),
+    }
+    for label, column in columns.items():
+        print(f"{label} ({n:,} values):")
+        start = time.perf_counter()
+        column.apply(parse_timestamp)
+        row_wise = time.perf_counter() - start
+        start = time.perf_counter()
+        parse_timestamps(column)
+        vectorized = time.perf_counter() - start
+        start = time.perf_counter()
+        format_timestamps(column)
+        formatted = time.perf_counter() - start
+        print(f"  apply(parse_timestamp): {row_wise:.2f}s")
+        print(f"  parse_timestamps:       {vectorized:.2f}s ({row_wise / vectorized:.0f}x)")
+        print(f"  format_timestamps:      {formatted:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
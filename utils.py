@@ -52,27 +52,41 @@ def format_datetime_for_csv(df: pd.DataFrame, datetime_col: str = "datetime") ->
     """
     df = df.copy()
     if datetime_col in df.columns:
-        # If datetime column exists, ensure it's a string in the correct format
-        if pd.api.types.is_datetime64_any_dtype(df[datetime_col]):
-            # Convert datetime to string format
-            df[datetime_col] = df[datetime_col].dt.strftime('%Y-%m-%d %H:%M:%S')
-        else:
-            # Already a string, but ensure format is correct
-            # Convert any ISO format (with T) to space format
-            def format_datetime_str(ts_str):
-                if pd.isna(ts_str):
-                    return ''
-                ts_str = str(ts_str)
-                # If already in correct format (has space, no T), return as-is
-                if ' ' in ts_str and 'T' not in ts_str:
-                    return ts_str
-                # Replace T with space for ISO format
-                if 'T' in ts_str:
-                    ts_str = ts_str.replace('T', ' ')
-                # Remove timezone and microseconds if present
-                ts_str = ts_str.replace('Z', '').split('+')[0].split('.')[0].strip()
-                return ts_str
-            
-            df[datetime_col] = df[datetime_col].apply(format_datetime_str)
+        # Canonical strings whatever the input (datetime64 or ISO strings with T/Z/offset)
+        from timestamps import format_timestamps
+
+        df[datetime_col] = format_timestamps(df[datetime_col]).fillna("")
     return df
 
+
+def format_canonical_datetime(ts) -> str:
+    """Format a datetime-like value in the canonical DB format 'YYYY-MM-DD HH:MM:SS'."""
+    return pd.Timestamp(ts).strftime("%Y-%m-%d %H:%M:%S")
+
+
+def datetime_range_clause(
+    start_dt=None,
+    end_dt=None,
+    column: str = "datetime",
+) -> tuple[str, list]:
+    """
+    Build an indexed SQL range predicate on a canonical datetime TEXT column.
+    
+    Canonical 'YYYY-MM-DD HH:MM:SS' strings sort chronologically, so the
+    bounds can be compared as text and served by the datetime index.
+    
+    Args:
+        start_dt: Optional inclusive start datetime
+        end_dt: Optional inclusive end datetime
+        column: Name of the datetime column
+        
+    Returns:
+        Tuple of (SQL predicate starting with ' AND ', parameters); empty if no bounds
+    """
+    if start_dt is not None and end_dt is not None:
+        return f" AND {column} BETWEEN ? AND ?", [format_canonical_datetime(start_dt), format_canonical_datetime(end_dt)]
+    if start_dt is not None:
+        return f" AND {column} >= ?", [format_canonical_datetime(start_dt)]
+    if end_dt is not None:
+        return f" AND {column} <= ?", [format_canonical_datetime(end_dt)]
+    return "", []
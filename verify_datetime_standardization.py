@@ -1,8 +1,7 @@
 """Verify that datetime standardization worked and OMIE columns exist."""
-import sqlite3
-from db import DB_PATH
+from db import connect
 
-conn = sqlite3.connect(DB_PATH)
+conn = connect()
 cur = conn.cursor()
 
 # Check OMIE columns